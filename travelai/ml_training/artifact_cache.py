@@ -0,0 +1,170 @@
+"""
+Content-Addressed Artifact Cache
+
+Training and evaluation scripts regenerate data, refit the scaler and retrain
+from scratch on every run. This cache stores each stage's output under a key
+derived from everything that stage depends on:
+
+    dataset  ← generator source + parameters + seed + input CSV contents
+    splits   ← dataset key + split/scaler config
+    weights  ← splits key + model source + training config
+    tflite   ← weights key + converter config
+
+so reruns with unchanged inputs skip straight to the first stage that changed.
+
+Layout:
+    .artifact_cache/<key[:2]>/<key>/<filename>
+
+Usage:
+    cache = ArtifactCache()
+    key = cache.key(generate_synthetic_data, n_samples=10000, seed=42)
+    df = cache.fetch('dataset', key, 'dataset.pkl', lambda: generate_synthetic_data(10000, seed=42))
+    cache.print_summary()
+
+Set TRAVION_NO_CACHE=1 (or pass enabled=False) to bypass the cache.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = '.artifact_cache'
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, streamed so large CSVs are fine"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _canonical(value):
+    """Turn key parts into JSON-serializable, order-stable values"""
+    if callable(value):
+        # Hash the source so editing a generator/model function invalidates the cache
+        try:
+            return inspect.getsource(value)
+        except (OSError, TypeError):
+            return getattr(value, '__qualname__', repr(value))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _save(path, value):
+    """Write an artifact based on its file extension"""
+    if path.endswith('.pkl'):
+        value.to_pickle(path)
+    elif path.endswith('.npz'):
+        np.savez(path, **value)
+    elif path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(value, f)
+    else:
+        with open(path, 'wb') as f:
+            f.write(value)
+
+def _load(path):
+    """Read an artifact based on its file extension"""
+    if path.endswith('.pkl'):
+        return pd.read_pickle(path)
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+    if path.endswith('.json'):
+        with open(path) as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        return f.read()
+
+class ArtifactCache:
+    """
+    Stores stage outputs by content hash and logs hits/misses per run
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get('TRAVION_NO_CACHE', '') in ('', '0')
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.events = []  # (stage, hit)
+
+    def key(self, *parts, **named_parts):
+        """
+        Hash arbitrary key parts (values, dicts, arrays, functions) into a hex key
+
+        Pass earlier stage keys as parts to chain stages together.
+        """
+        payload = json.dumps(
+            {'parts': _canonical(list(parts)), 'named': _canonical(named_parts)},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, key, filename):
+        """Location of an artifact inside the cache"""
+        return os.path.join(self.cache_dir, key[:2], key, filename)
+
+    def has(self, key, filename):
+        return self.enabled and os.path.exists(self.path(key, filename))
+
+    def record(self, stage, hit):
+        """Log a hit/miss for a stage"""
+        self.events.append((stage, hit))
+        print(f"  [cache] {stage}: {'hit' if hit else 'miss'}")
+
+    def save(self, key, filename, value, save=None):
+        """
+        Store an artifact atomically
+
+        `save(value, path)` overrides the extension-based writer (e.g. for
+        Keras weights). The temp file keeps the final filename as its suffix
+        so extension-sensitive writers still work.
+        """
+        if not self.enabled:
+            return
+        final_path = self.path(key, filename)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(final_path), f".tmp-{os.getpid()}-{filename}")
+        (save or (lambda v, p: _save(p, v)))(value, tmp_path)
+        os.replace(tmp_path, final_path)
+
+    def load(self, key, filename, load=None):
+        """Read an artifact stored with save()"""
+        return (load or _load)(self.path(key, filename))
+
+    def fetch(self, stage, key, filename, build, save=None, load=None):
+        """
+        Return the cached artifact, or build, store and return it
+        """
+        if self.has(key, filename):
+            self.record(stage, True)
+            return self.load(key, filename, load)
+
+        value = build()
+        self.save(key, filename, value, save)
+        self.record(stage, False)
+        return value
+
+    def print_summary(self):
+        """Print which stages were served from the cache in this run"""
+        if not self.enabled:
+            print("\n♻️  Artifact cache disabled")
+            return
+        hits = [stage for stage, hit in self.events if hit]
+        misses = [stage for stage, hit in self.events if not hit]
+        print(f"\n♻️  Artifact cache ({self.cache_dir}): "
+              f"{len(hits)} hit(s), {len(misses)} miss(es)")
+        if hits:
+            print(f"   hits:   {', '.join(hits)}")
+        if misses:
+            print(f"   misses: {', '.join(misses)}")
@@ -0,0 +1,571 @@
+"""
+Performance Benchmark Suite
+
+Times the main ml_training code paths over a range of input sizes so
+changes can be checked against a stored baseline:
+
+    create_training_data          stops:  10 → 100k
+    generate_synthetic_data       events: 1k → 10M
+    suggest_stops_between         stops:  10 → 100k
+    _resolve_location             stops:  10 → 100k
+    predict_integrated            events: 1k → 10M
+    predict                       events: 1k → 10M
+    predict_integrated_batch      events: 1k → 10M
+    calculate_combined_features   events: 1k → 10M
+    tflite_inference              events: 1k → 10M
+
+Each case runs a few times and the fastest run is kept; very fast cases
+are looped so each timing is long enough to be stable. Heavy modules
+(TensorFlow, sklearn) are imported only by the benchmarks that use them.
+Sizes that would take longer than --max-seconds (extrapolated from the
+smaller sizes already measured) are recorded as skipped instead of run.
+
+Usage:
+    python benchmarks.py run --quick                    # small sizes only
+    python benchmarks.py run --output results.json      # full size sweep
+    python benchmarks.py run --only tflite_inference predict_integrated
+    python benchmarks.py compare benchmark_baseline.json results.json --threshold 0.10
+    python benchmarks.py startup                        # CLI startup time per subcommand
+    python benchmarks.py fusion-results                 # dict vs slotted fusion results
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+STOP_SIZES = [10, 100, 1_000, 10_000, 100_000]
+EVENT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+QUICK_STOP_SIZES = [10, 100, 1_000]
+QUICK_EVENT_SIZES = [1_000, 10_000, 100_000]
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.10
+
+# Named endpoints of the synthetic route, matching create_sample_dataset()
+ROUTE_ORIGIN = {'stop_name': 'Mangalore Central', 'latitude': 12.9141, 'longitude': 74.8560}
+ROUTE_DESTINATION = {'stop_name': 'Karkala', 'latitude': 13.2114, 'longitude': 74.9929}
+
+def synthetic_stops(n_stops, seed=0):
+    """Random stops around the Mangalore-Karkala corridor, plus both route endpoints"""
+    rng = np.random.default_rng(seed)
+    n_random = max(n_stops - 2, 0)
+    df = pd.DataFrame({
+        'stop_id': np.arange(3, n_random + 3),
+        'stop_name': [f'Stop {i}' for i in range(n_random)],
+        'latitude': rng.uniform(12.8, 13.4, n_random),
+        'longitude': rng.uniform(74.7, 75.1, n_random),
+    })
+    endpoints = pd.DataFrame([dict(ROUTE_ORIGIN, stop_id=1), dict(ROUTE_DESTINATION, stop_id=2)])
+    return pd.concat([endpoints, df], ignore_index=True).head(max(n_stops, 2))
+
+def synthetic_fusion_inputs(n_distinct=1000, seed=0):
+    """A pool of (location_prediction, type_prediction, gps_coords, dwell_time) inputs"""
+    rng = np.random.default_rng(seed)
+    stop_types = ['traffic_signal', 'toll_gate', 'bus_stop', 'gas_station', 'rest_area', 'unknown']
+    pool = []
+    for i in range(n_distinct):
+        is_known = bool(rng.random() < 0.5)
+        pool.append((
+            {
+                'is_known_stop': is_known,
+                'confidence': float(rng.random()),
+                'nearest_stop': f'Stop {i}' if is_known else None,
+                'distance': float(rng.uniform(0, 2000)),
+            },
+            {
+                'stop_type': stop_types[rng.integers(len(stop_types))],
+                'confidence': float(rng.random()),
+                'probabilities': {},
+            },
+            (float(rng.uniform(12.8, 13.4)), float(rng.uniform(74.7, 75.1))),
+            float(rng.uniform(5, 1800)),
+        ))
+    return pool
+
+def synthetic_type_features(n_distinct=1000, seed=0):
+    """A pool of (location_features, type_features) dicts"""
+    rng = np.random.default_rng(seed)
+    return [
+        (
+            {'confidence': float(rng.random()), 'distance': float(rng.uniform(0, 2000)),
+             'is_known_stop': bool(rng.random() < 0.5)},
+            {'dwell_time': float(rng.uniform(10, 1800)), 'speed_before': float(rng.uniform(0, 120)),
+             'heading': float(rng.uniform(0, 360)), 'visit_count': int(rng.integers(1, 20)),
+             'hour': int(rng.integers(0, 24)), 'day_of_week': int(rng.integers(0, 7)),
+             'model_confidence': float(rng.random())}
+        )
+        for _ in range(n_distinct)
+    ]
+
+# Each setup takes the size and returns a zero-argument callable to time.
+# Setup work (data generation, model loading) is excluded from the timing.
+
+def setup_create_training_data(n_stops):
+    from train_stop_location_model import create_training_data
+    stops = synthetic_stops(n_stops)
+    return lambda: create_training_data(stops, seed=0)
+
+def setup_generate_synthetic_data(n_events):
+    from train_stop_classifier import generate_synthetic_data
+    return lambda: generate_synthetic_data(n_samples=n_events, seed=0)
+
+def _route_suggester(n_stops, tmp_dir):
+    from route_based_suggestions import RouteBasedStopSuggester
+    csv_path = os.path.join(tmp_dir, f'stops_{n_stops}.csv')
+    synthetic_stops(n_stops).to_csv(csv_path, index=False)
+    return RouteBasedStopSuggester(csv_path)
+
+def setup_suggest_stops_between(n_stops, tmp_dir):
+    suggester = _route_suggester(n_stops, tmp_dir)
+    return lambda: suggester.suggest_stops_between(
+        ROUTE_ORIGIN['stop_name'], ROUTE_DESTINATION['stop_name'], max_stops=20
+    )
+
+def setup_resolve_location(n_stops, tmp_dir):
+    suggester = _route_suggester(n_stops, tmp_dir)
+    # A name near the end of the table, so the whole column is scanned
+    name = suggester.stops_df['stop_name'].iloc[-1]
+    return lambda: suggester._resolve_location(name)
+
+def setup_predict_integrated(n_events):
+    from integrated_stop_detector import IntegratedStopDetector
+    detector = IntegratedStopDetector()
+    pool = synthetic_fusion_inputs()
+    n_pool = len(pool)
+
+    def run():
+        for i in range(n_events):
+            detector.predict_integrated(*pool[i % n_pool])
+    return run
+
+def setup_predict(n_events):
+    from integrated_stop_detector import IntegratedStopDetector
+    detector = IntegratedStopDetector()
+    pool = synthetic_fusion_inputs()
+    n_pool = len(pool)
+
+    def run():
+        for i in range(n_events):
+            detector.predict(*pool[i % n_pool])
+    return run
+
+def setup_predict_integrated_batch(n_events):
+    from integrated_stop_detector import IntegratedStopDetector
+    detector = IntegratedStopDetector()
+    pool = synthetic_fusion_inputs()
+    index = np.arange(n_events) % len(pool)
+    columns = {
+        'location_confidence': np.array([p[0]['confidence'] for p in pool])[index],
+        'distance': np.array([p[0]['distance'] for p in pool])[index],
+        'is_known_stop': np.array([p[0]['is_known_stop'] for p in pool])[index],
+        'stop_type': np.array([p[1]['stop_type'] for p in pool])[index],
+        'type_confidence': np.array([p[1]['confidence'] for p in pool])[index],
+        'dwell_time': np.array([p[3] for p in pool])[index],
+    }
+    return lambda: detector.predict_integrated_batch(**columns)
+
+def setup_calculate_combined_features(n_events):
+    from integrated_stop_detector import IntegratedStopDetector
+    detector = IntegratedStopDetector()
+    pool = synthetic_type_features()
+    n_pool = len(pool)
+
+    def run():
+        for i in range(n_events):
+            detector.calculate_combined_features(*pool[i % n_pool])
+    return run
+
+def setup_tflite_inference(n_events, tflite_path='stop_classifier.tflite', batch_size=1024):
+    from evaluate_model import predict_tflite_batched
+    if not os.path.exists(tflite_path):
+        raise FileNotFoundError(f"{tflite_path} not found - run train_stop_classifier.py first")
+    X = np.random.default_rng(0).standard_normal((n_events, 6)).astype(np.float32)
+    return lambda: predict_tflite_batched(tflite_path, X, batch_size)
+
+# name -> (setup, size kind, needs a temp dir)
+BENCHMARKS = {
+    'create_training_data': (setup_create_training_data, 'stops', False),
+    'generate_synthetic_data': (setup_generate_synthetic_data, 'events', False),
+    'suggest_stops_between': (setup_suggest_stops_between, 'stops', True),
+    '_resolve_location': (setup_resolve_location, 'stops', True),
+    'predict_integrated': (setup_predict_integrated, 'events', False),
+    'predict': (setup_predict, 'events', False),
+    'predict_integrated_batch': (setup_predict_integrated_batch, 'events', False),
+    'calculate_combined_features': (setup_calculate_combined_features, 'events', False),
+    'tflite_inference': (setup_tflite_inference, 'events', False),
+}
+
+def predict_seconds(measured, size):
+    """
+    Extrapolate the runtime at `size` from the sizes measured so far
+
+    Uses the scaling exponent between the last two measurements (at least
+    linear), so quadratic code paths are skipped before they blow the budget.
+    """
+    if not measured:
+        return 0.0
+    last_size, last_seconds = measured[-1]
+    exponent = 1.0
+    if len(measured) >= 2:
+        prev_size, prev_seconds = measured[-2]
+        if prev_seconds > 0 and last_seconds > 0:
+            exponent = max(1.0, math.log(last_seconds / prev_seconds) / math.log(last_size / prev_size))
+    return last_seconds * (size / last_size) ** exponent
+
+def time_case(run, repeats, max_seconds, min_timing_seconds=0.2):
+    """
+    Time a callable, returning seconds per call for each repeat
+
+    Fast cases are called in a loop until one timing lasts at least
+    min_timing_seconds (like timeit's autorange) so timer noise doesn't show
+    up as regressions; slow cases get fewer repeats once over max_seconds.
+    """
+    start = time.perf_counter()
+    run()
+    first = time.perf_counter() - start
+    number = max(1, math.ceil(min_timing_seconds / first)) if first > 0 else 1000
+
+    timings = [first] if number == 1 else []
+    spent = first
+    while len(timings) < repeats and spent <= max_seconds:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed / number)
+        spent += elapsed
+    return timings
+
+def run_benchmarks(names=None, quick=False, repeats=5, max_seconds=30.0):
+    """
+    Run the selected benchmarks over their size sweep
+
+    Returns a list of result dicts (one per benchmark and size).
+    """
+    names = names or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {sorted(unknown)}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in names:
+            setup, kind, needs_tmp = BENCHMARKS[name]
+            if kind == 'stops':
+                sizes = QUICK_STOP_SIZES if quick else STOP_SIZES
+            else:
+                sizes = QUICK_EVENT_SIZES if quick else EVENT_SIZES
+
+            print(f"\n⏱️  {name}")
+            measured = []
+            for size in sizes:
+                result = {'benchmark': name, 'size': size, 'unit': kind}
+                estimate = predict_seconds(measured, size)
+                if estimate > max_seconds:
+                    result.update(status='skipped', estimated_seconds=round(estimate, 1))
+                    print(f"   {size:>12,} {kind:<7} skipped (~{estimate:,.0f}s > {max_seconds:g}s budget)")
+                    results.append(result)
+                    continue
+
+                try:
+                    run = setup(size, tmp_dir) if needs_tmp else setup(size)
+                    timings = time_case(run, repeats, max_seconds)
+                except Exception as e:
+                    result.update(status='error', error=str(e))
+                    print(f"   {size:>12,} {kind:<7} error: {e}")
+                    results.append(result)
+                    break
+
+                best = min(timings)
+                measured.append((size, best))
+                result.update(
+                    status='ok',
+                    seconds_min=best,
+                    seconds_median=float(np.median(timings)),
+                    repeats=len(timings),
+                    per_item_us=best / size * 1e6,
+                )
+                print(f"   {size:>12,} {kind:<7} {best:10.4f}s  ({result['per_item_us']:,.2f} µs/item, "
+                      f"{len(timings)} run(s))")
+                results.append(result)
+    return results
+
+HEAVY_MODULES = ('tensorflow', 'keras', 'sklearn', 'matplotlib', 'seaborn')
+STARTUP_LIMIT_SECONDS = 1.0
+
+def imported_heavy_modules(command):
+    """Heavy top-level packages a command imports, read from python -X importtime"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime'] + command,
+                               capture_output=True, text=True)
+    found = set()
+    for line in completed.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            module = line.rsplit('|', 1)[1].strip().split('.')[0]
+            if module in HEAVY_MODULES:
+                found.add(module)
+    return sorted(found)
+
+def run_startup_benchmark(repeats=5, limit=STARTUP_LIMIT_SECONDS):
+    """
+    Wall time of `python cli.py <subcommand>` for the lightweight subcommands
+
+    A plain TensorFlow import is timed as the reference. Returns the result
+    rows and whether every lightweight command stayed under `limit` seconds
+    without importing a heavy package.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    cli = os.path.join(here, 'cli.py')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stops_csv = os.path.join(tmp_dir, 'stops.csv')
+        synthetic_stops(100).to_csv(stops_csv, index=False)
+        detections_json = os.path.join(tmp_dir, 'detections.json')
+        location, type_prediction, gps, dwell = synthetic_fusion_inputs(1)[0]
+        with open(detections_json, 'w') as f:
+            json.dump({'location_prediction': location, 'type_prediction': type_prediction,
+                       'gps_coords': gps, 'dwell_time': dwell}, f)
+
+        cases = [
+            ('cli.py --help', [cli, '--help'], True),
+            ('cli.py suggest', [cli, 'suggest', '--stops', stops_csv,
+                                '--origin', ROUTE_ORIGIN['stop_name'],
+                                '--destination', ROUTE_DESTINATION['stop_name']], True),
+            ('cli.py fuse', [cli, 'fuse', '--input', detections_json], True),
+            ('import tensorflow (reference)', ['-c', 'import tensorflow'], False),
+        ]
+
+        rows = []
+        for label, command, lightweight in cases:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                subprocess.run([sys.executable] + command, cwd=here, capture_output=True, check=True)
+                timings.append(time.perf_counter() - start)
+            heavy = imported_heavy_modules(command) if lightweight else []
+            rows.append({'command': label, 'seconds_median': float(np.median(timings)),
+                         'seconds_min': min(timings), 'heavy_imports': heavy,
+                         'lightweight': lightweight})
+
+    print("\n" + "=" * 78)
+    print("CLI STARTUP TIME")
+    print("=" * 78)
+    print(f"{'Command':<34}{'Median (s)':>12}{'Min (s)':>10}  Heavy imports")
+    print("-" * 78)
+    ok = True
+    for row in rows:
+        passed = not row['lightweight'] or (row['seconds_median'] < limit and not row['heavy_imports'])
+        ok &= passed
+        marker = '' if passed else '❌ '
+        print(f"{marker}{row['command']:<34}{row['seconds_median']:>12.3f}{row['seconds_min']:>10.3f}  "
+              f"{', '.join(row['heavy_imports']) or '-'}")
+    print("=" * 78)
+    print(f"{'✅' if ok else '❌'} Lightweight commands {'start' if ok else 'do not all start'} "
+          f"in under {limit:g}s without TensorFlow/plotting imports")
+    return rows, ok
+
+def run_fusion_result_benchmark(n_events=100_000, repeats=5):
+    """
+    Latency and retained allocations per call: predict_integrated() dicts vs
+    predict() FusionResult objects (from dict and from slotted inputs)
+    """
+    from integrated_stop_detector import IntegratedStopDetector, LocationPrediction, TypePrediction
+    detector = IntegratedStopDetector()
+    pool = synthetic_fusion_inputs()
+    slotted_pool = [(LocationPrediction.from_dict(loc), TypePrediction.from_dict(tp), gps, dwell)
+                    for loc, tp, gps, dwell in pool]
+    variants = [
+        ('predict_integrated → dict', detector.predict_integrated, pool),
+        ('predict → FusionResult', detector.predict, pool),
+        ('predict (slotted inputs)', detector.predict, slotted_pool),
+    ]
+
+    rows = []
+    for label, fn, inputs in variants:
+        n_pool = len(inputs)
+        batch = [inputs[i % n_pool] for i in range(n_events)]
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for args in batch:
+                fn(*args)
+            timings.append(time.perf_counter() - start)
+
+        # Memory the results keep alive, less the list holding them
+        kept = [None] * n_events
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for i, args in enumerate(batch):
+            kept[i] = fn(*args)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        diff = after.compare_to(before, 'filename')
+        rows.append({
+            'variant': label,
+            'us_per_call': min(timings) / n_events * 1e6,
+            'bytes_per_result': sum(d.size_diff for d in diff) / n_events,
+            'blocks_per_result': sum(d.count_diff for d in diff) / n_events,
+        })
+        del kept
+
+    print("\n" + "=" * 74)
+    print(f"FUSION RESULT OBJECTS ({n_events:,} calls)")
+    print("=" * 74)
+    print(f"{'Variant':<30}{'µs/call':>10}{'Bytes/result':>16}{'Allocs/result':>16}")
+    print("-" * 74)
+    for row in rows:
+        print(f"{row['variant']:<30}{row['us_per_call']:>10.2f}{row['bytes_per_result']:>16.0f}"
+              f"{row['blocks_per_result']:>16.1f}")
+    print("=" * 74)
+    base = rows[0]
+    for row in rows[1:]:
+        print(f"{row['variant']}: {base['us_per_call'] / row['us_per_call']:.1f}x faster, "
+              f"{base['bytes_per_result'] / max(row['bytes_per_result'], 1):.1f}x less memory per result")
+    return rows
+
+def environment_info():
+    """Where the numbers came from"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def save_results(results, output_path, quick):
+    with open(output_path, 'w') as f:
+        json.dump({'environment': environment_info(), 'quick': quick, 'results': results}, f, indent=2)
+    print(f"\n✅ Results saved to {output_path}")
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two result documents case by case (fastest run vs fastest run)
+
+    Returns a list of (benchmark, size, baseline s, current s, ratio, verdict);
+    verdict is 'REGRESSION' when current is more than `threshold` slower.
+    """
+    baseline_cases = {
+        (r['benchmark'], r['size']): r for r in baseline['results'] if r.get('status') == 'ok'
+    }
+    rows = []
+    for r in current['results']:
+        base = baseline_cases.get((r['benchmark'], r['size']))
+        if base is None or r.get('status') != 'ok':
+            continue
+        ratio = r['seconds_min'] / base['seconds_min']
+        if ratio > 1 + threshold:
+            verdict = 'REGRESSION'
+        elif ratio < 1 - threshold:
+            verdict = 'faster'
+        else:
+            verdict = 'ok'
+        rows.append((r['benchmark'], r['size'], base['seconds_min'], r['seconds_min'], ratio, verdict))
+    return rows
+
+def print_comparison(rows, threshold):
+    print("\n" + "=" * 86)
+    print(f"BENCHMARK COMPARISON (regression threshold: +{threshold:.0%})")
+    print("=" * 86)
+    print(f"{'Benchmark':<30}{'Size':>12}{'Baseline (s)':>14}{'Current (s)':>14}{'Ratio':>8}  Verdict")
+    print("-" * 86)
+    for name, size, base, cur, ratio, verdict in rows:
+        marker = '❌ ' if verdict == 'REGRESSION' else ''
+        print(f"{name:<30}{size:>12,}{base:>14.4f}{cur:>14.4f}{ratio:>8.2f}  {marker}{verdict}")
+    print("=" * 86)
+    regressions = sum(1 for row in rows if row[5] == 'REGRESSION')
+    if not rows:
+        print("No cases in common between the two result files")
+    elif regressions:
+        print(f"❌ {regressions} regression(s) out of {len(rows)} case(s)")
+    else:
+        print(f"✅ No regressions in {len(rows)} case(s)")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ml_training performance benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='Run benchmarks and write JSON results')
+    run_parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run')
+    run_parser.add_argument('--quick', action='store_true', help='Small sizes only')
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('--max-seconds', type=float, default=30.0,
+                            help='Per-case time budget; larger sizes predicted to exceed it are skipped')
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    run_parser.add_argument('--save-baseline', action='store_true',
+                            help=f'Also store the results as {DEFAULT_BASELINE}')
+    run_parser.add_argument('--compare', metavar='BASELINE',
+                            help='Compare against a baseline after running')
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    compare_parser = sub.add_parser('compare', help='Flag regressions against a baseline')
+    compare_parser.add_argument('baseline', nargs='?', default=DEFAULT_BASELINE)
+    compare_parser.add_argument('current', nargs='?', default='benchmark_results.json')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help='Allowed slowdown as a fraction (0.10 = 10%%)')
+
+    startup_parser = sub.add_parser('startup', help='Time CLI startup for lightweight subcommands')
+    startup_parser.add_argument('--repeats', type=int, default=5)
+    startup_parser.add_argument('--limit', type=float, default=STARTUP_LIMIT_SECONDS)
+    startup_parser.add_argument('--output', default=None, help='Also write the rows as JSON')
+
+    fusion_parser = sub.add_parser('fusion-results',
+                                   help='Per-call latency/allocations of dict vs slotted fusion results')
+    fusion_parser.add_argument('--events', type=int, default=100_000)
+    fusion_parser.add_argument('--repeats', type=int, default=5)
+    fusion_parser.add_argument('--output', default=None, help='Also write the rows as JSON')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'fusion-results':
+        rows = run_fusion_result_benchmark(args.events, args.repeats)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'environment': environment_info(), 'fusion_results': rows}, f, indent=2)
+        return 0
+
+    if args.command == 'startup':
+        rows, ok = run_startup_benchmark(args.repeats, args.limit)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'environment': environment_info(), 'startup': rows}, f, indent=2)
+        return 0 if ok else 1
+
+    if args.command == 'run':
+        results = run_benchmarks(args.only, args.quick, args.repeats, args.max_seconds)
+        save_results(results, args.output, args.quick)
+        if args.save_baseline:
+            save_results(results, DEFAULT_BASELINE, args.quick)
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+            rows = compare_results(baseline, {'results': results}, args.threshold)
+            return 1 if print_comparison(rows, args.threshold) else 0
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare_results(baseline, current, args.threshold)
+    return 1 if print_comparison(rows, args.threshold) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
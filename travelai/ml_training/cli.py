@@ -0,0 +1,271 @@
+"""
+Travion ML Command Line
+
+One entry point for the ml_training scripts:
+
+    python cli.py train-classifier [--samples N] [--fuse-scaler]
+    python cli.py train-location --csv your_bus_stops.csv [--fuse-scaler]
+    python cli.py evaluate [--from-artifacts] [--draft] ...
+    python cli.py suggest --stops stops.csv --origin Mangalore --destination Karkala
+    python cli.py fuse --input detections.json     (or --demo)
+    python cli.py tune-fusion [--events recorded.csv] [--max-fp-rate 0.05]
+    python cli.py train-meta [--events recorded_meta_events.csv]
+    python cli.py detect trips.csv [--stops sample_stops.csv] --output stop_events.ndjson
+    python cli.py simulate --vehicles 1000 --duration 7200 [--shards 8 --workers 4]
+    python cli.py export-bundle --stops stops.csv [--pairs od_pairs.csv] [--workers 4]
+    python cli.py export --model stop_classifier_full.h5 --output stop_classifier.tflite
+
+Add --profile timeline.json (before the subcommand) to write per-stage
+timings and memory peaks; see instrumentation.py.
+
+This module only imports argparse at startup. TensorFlow, scikit-learn and
+matplotlib are imported inside the subcommands that need them, so `suggest`
+and `fuse` start in a fraction of a second instead of paying for a
+TensorFlow import (see `python benchmarks.py startup`).
+"""
+
+import argparse
+import json
+import sys
+
+def cmd_train_classifier(args):
+    from train_stop_classifier import main
+    main(n_samples=args.samples, seed=args.seed, cache_dir=args.cache_dir,
+         fuse_scaler=args.fuse_scaler)
+
+def cmd_train_location(args):
+    from train_stop_location_model import train_location_model
+    train_location_model(args.csv, seed=args.seed, cache_dir=args.cache_dir,
+                         fuse_scaler=args.fuse_scaler)
+
+def cmd_evaluate(args):
+    import evaluate_model
+    if args.from_artifacts and args.stream:
+        evaluate_model.evaluate_stream(args.model, args.scaler, args.test_set, args.chunk_size,
+                                       args.batch_size, draft=args.draft, workers=args.workers,
+                                       n_bootstrap=args.bootstrap)
+    elif args.from_artifacts:
+        evaluate_model.evaluate_artifacts(args.model, args.scaler, args.test_set, args.batch_size,
+                                          tflite_path=args.tflite, draft=args.draft,
+                                          workers=args.workers, n_bootstrap=args.bootstrap)
+    else:
+        evaluate_model.main(draft=args.draft, workers=args.workers, n_bootstrap=args.bootstrap,
+                            fuse_scaler=args.fuse_scaler)
+
+def cmd_suggest(args):
+    from route_based_suggestions import RouteBasedStopSuggester
+    suggester = RouteBasedStopSuggester(args.stops)
+    if args.output:
+        suggester.export_suggestions_json(args.origin, args.destination, args.output)
+        return
+
+    suggestions = suggester.suggest_stops_between(args.origin, args.destination,
+                                                  max_stops=args.max_stops)
+    print(f"📍 {args.origin} → {args.destination}: {len(suggestions)} stop(s)")
+    for i, stop in enumerate(suggestions, 1):
+        print(f"{i:>3}. {stop['stop_name']:<30} {stop['distance_from_origin_km']:>7.2f} km  "
+              f"~{stop['estimated_travel_minutes']} min")
+
+def cmd_fuse(args):
+    from integrated_stop_detector import IntegratedStopDetector, demonstrate_integration
+    if args.demo:
+        demonstrate_integration()
+        return
+    if not args.input:
+        raise SystemExit("fuse: pass --input detections.json or --demo")
+
+    with open(args.input) as f:
+        detections = json.load(f)
+    single = isinstance(detections, dict)
+    if single:
+        detections = [detections]
+
+    detector = IntegratedStopDetector(config_path=args.thresholds, meta_learner_path=args.meta_learner)
+    results = [
+        detector.predict_integrated(
+            d['location_prediction'], d['type_prediction'],
+            tuple(d['gps_coords']), d['dwell_time'], d.get('type_features')
+        )
+        for d in detections
+    ]
+    output = json.dumps(results[0] if single else results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"✅ Wrote {len(results)} fused prediction(s) to {args.output}")
+    else:
+        print(output)
+
+def cmd_tune_fusion(args):
+    from tune_fusion_thresholds import main
+    main(args.events, args.grid, args.max_fp_rate, args.n_events, output_path=args.output)
+
+def cmd_train_meta(args):
+    from train_meta_learner import main
+    main(args.events, args.n_events, args.seed, args.thresholds)
+
+def cmd_detect(args):
+    from streaming_stop_detector import detect_stops
+    detect_stops(args.paths, args.output, args.stops, args.classifier, args.scaler,
+                 args.location_model, args.location_metadata, args.thresholds, args.timezone,
+                 args.meta_learner, args.learn_stops)
+
+def cmd_simulate(args):
+    from trace_simulator import load_stop_table, write_sharded_traces
+    write_sharded_traces(
+        args.vehicles, args.duration, args.output_dir, args.shards, args.workers,
+        stops=load_stop_table(args.stops, args.n_stops, args.seed), fmt=args.format, seed=args.seed,
+        interval_s=args.interval, gps_noise_m=args.gps_noise, dropout=args.dropout
+    )
+
+def cmd_export_bundle(args):
+    from suggestion_bundle import export_bundle
+    export_bundle(args.stops, args.output, args.pairs, args.max_stops, args.workers)
+
+def cmd_export(args):
+    from tensorflow import keras
+    from train_stop_classifier import convert_to_tflite
+    model = keras.models.load_model(args.model, compile=False)
+    with open(args.scaler) as f:
+        scaler_params = json.load(f)
+    convert_to_tflite(model, args.output, scaler_params=scaler_params if args.fuse_scaler else None)
+
+    # Consumers (TFLiteTypeModel, evaluate_model) read this flag to decide whether to scale
+    if scaler_params.get('normalization_fused', False) != args.fuse_scaler:
+        scaler_params['normalization_fused'] = args.fuse_scaler
+        with open(args.scaler, 'w') as f:
+            json.dump(scaler_params, f, indent=2)
+        print(f"Updated {args.scaler}: normalization_fused = {str(args.fuse_scaler).lower()}")
+    if args.fuse_scaler:
+        print("Normalization is fused: feed raw features to the exported model")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='Travion ML tools')
+    parser.add_argument('--profile', default=None, metavar='TIMELINE_JSON',
+                        help='Record stage timings / memory peaks and write them as JSON')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='Also trace Python heap peaks with tracemalloc (slower)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('train-classifier', help='Train the stop type classifier')
+    p.add_argument('--samples', type=int, default=10000)
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--cache-dir', default='.artifact_cache')
+    p.add_argument('--fuse-scaler', action='store_true', help='Export a TFLite model taking raw features')
+    p.set_defaults(func=cmd_train_classifier)
+
+    p = sub.add_parser('train-location', help='Train the stop location model')
+    p.add_argument('--csv', default='your_bus_stops.csv', help='Bus stop CSV (latitude, longitude, ...)')
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--cache-dir', default='.artifact_cache')
+    p.add_argument('--fuse-scaler', action='store_true', help='Export a TFLite model taking raw (lat, lon)')
+    p.set_defaults(func=cmd_train_location)
+
+    p = sub.add_parser('evaluate', help='Evaluation plots and report')
+    p.add_argument('--from-artifacts', action='store_true',
+                   help='Evaluate saved model files instead of retraining')
+    p.add_argument('--model', default='stop_classifier_full.h5', help='.h5 or .tflite model')
+    p.add_argument('--scaler', default='scaler_params.json')
+    p.add_argument('--test-set', default=None)
+    p.add_argument('--batch-size', type=int, default=1024)
+    p.add_argument('--tflite', default='stop_classifier.tflite')
+    p.add_argument('--stream', action='store_true', help='Constant-memory chunked evaluation')
+    p.add_argument('--chunk-size', type=int, default=100000)
+    p.add_argument('--draft', action='store_true', help='Fast low-DPI SVG figures')
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--bootstrap', type=int, default=1000)
+    p.add_argument('--fuse-scaler', action='store_true',
+                   help='Check parity against a TFLite export with the scaler fused in')
+    p.set_defaults(func=cmd_evaluate)
+
+    p = sub.add_parser('suggest', help='Suggest stops between two places')
+    p.add_argument('--stops', default='sample_stops.csv', help='CSV with stop_name, latitude, longitude')
+    p.add_argument('--origin', required=True, help='Stop name or "lat,lon"')
+    p.add_argument('--destination', required=True, help='Stop name or "lat,lon"')
+    p.add_argument('--max-stops', type=int, default=20)
+    p.add_argument('--output', default=None, help='Write suggestions JSON for the app')
+    p.set_defaults(func=cmd_suggest)
+
+    p = sub.add_parser('fuse', help='Fuse location + type model outputs')
+    p.add_argument('--input', default=None,
+                   help='JSON object or list with location_prediction, type_prediction, '
+                        'gps_coords, dwell_time (and type_features for --meta-learner)')
+    p.add_argument('--output', default=None)
+    p.add_argument('--demo', action='store_true', help='Run the example scenarios')
+    p.add_argument('--thresholds', default=None, help='Tuned thresholds JSON (see tune-fusion)')
+    p.add_argument('--meta-learner', default=None,
+                   help='Learned fusion weights (see train-meta); used where type_features are given')
+    p.set_defaults(func=cmd_fuse)
+
+    p = sub.add_parser('tune-fusion', help='Grid-search the fusion decision thresholds')
+    p.add_argument('--events', default=None, help='Recorded model outputs (CSV or .npz)')
+    p.add_argument('--grid', default=None, help='JSON {threshold name: [values]}')
+    p.add_argument('--max-fp-rate', type=float, default=None)
+    p.add_argument('--n-events', type=int, default=10000)
+    p.add_argument('--output', default='fusion_thresholds.json')
+    p.set_defaults(func=cmd_tune_fusion)
+
+    p = sub.add_parser('train-meta', help='Train the fusion meta-learner (Model 3)')
+    p.add_argument('--events', default=None, help='Recorded events CSV with type features and true_type')
+    p.add_argument('--n-events', type=int, default=20000)
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--thresholds', default=None, help='Tuned thresholds JSON for the rule baseline')
+    p.set_defaults(func=cmd_train_meta)
+
+    p = sub.add_parser('detect', help='Stream GPS traces through stop detection + fusion')
+    p.add_argument('paths', nargs='+', help='CSV or NDJSON trace files (optionally .gz)')
+    p.add_argument('--output', default='stop_events.ndjson')
+    p.add_argument('--stops', default=None, help='Known stops CSV instead of the location model')
+    p.add_argument('--classifier', default='stop_classifier.tflite')
+    p.add_argument('--scaler', default='scaler_params.json')
+    p.add_argument('--location-model', default='stop_location_model.tflite')
+    p.add_argument('--location-metadata', default='stop_location_metadata.json')
+    p.add_argument('--thresholds', default=None, help='Tuned fusion thresholds JSON')
+    p.add_argument('--timezone', default=None)
+    p.add_argument('--meta-learner', default=None, help='Learned fusion weights (see train-meta)')
+    p.add_argument('--learn-stops', default=None,
+                   help='Cluster flagged new stops, publish promoted ones, save candidates JSON here')
+    p.set_defaults(func=cmd_detect)
+
+    p = sub.add_parser('simulate', help='Simulate labelled GPS traces for load tests')
+    p.add_argument('--stops', default=None, help='Stop table CSV (default: random stops)')
+    p.add_argument('--n-stops', type=int, default=200)
+    p.add_argument('--vehicles', type=int, default=100)
+    p.add_argument('--duration', type=float, default=3600, help='Seconds simulated per vehicle')
+    p.add_argument('--interval', type=float, default=5, help='Seconds between fixes')
+    p.add_argument('--gps-noise', type=float, default=5.0, help='Position noise (m)')
+    p.add_argument('--dropout', type=float, default=0.0, help='Fraction of fixes lost')
+    p.add_argument('--output-dir', default='traces')
+    p.add_argument('--shards', type=int, default=1)
+    p.add_argument('--workers', type=int, default=1)
+    p.add_argument('--format', default='csv', choices=['csv', 'csv.gz', 'ndjson', 'ndjson.gz'])
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser('export-bundle', help='Precompute route suggestions into a SQLite bundle')
+    p.add_argument('--stops', default='sample_stops.csv', help='Stop CSV / JSON')
+    p.add_argument('--pairs', default=None, help='CSV with origin_id, destination_id (default: all pairs)')
+    p.add_argument('--output', default='suggestion_bundle.db')
+    p.add_argument('--max-stops', type=int, default=20)
+    p.add_argument('--workers', type=int, default=1)
+    p.set_defaults(func=cmd_export_bundle)
+
+    p = sub.add_parser('export', help='Convert a saved Keras classifier to TFLite')
+    p.add_argument('--model', default='stop_classifier_full.h5')
+    p.add_argument('--output', default='stop_classifier.tflite')
+    p.add_argument('--fuse-scaler', action='store_true')
+    p.add_argument('--scaler', default='scaler_params.json',
+                   help='Scaler JSON; its normalization_fused flag is set to match the export')
+    p.set_defaults(func=cmd_export)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        import instrumentation
+        instrumentation.enable(args.profile, trace_memory=args.profile_memory)
+    args.func(args)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,380 @@
+"""
+Pruning & Weight Clustering Export Path
+
+Optional compression stage that sits between training and TFLite export
+for both on-device models:
+
+    train_model / fit_location_model
+        ↓
+    prune (unstructured or 2:4 structured) | cluster weights
+        ↓
+    fine-tune → strip wrappers
+        ↓
+    accuracy gate (refuse export if accuracy drops too much)
+        ↓
+    convert_to_tflite / convert_location_to_tflite
+
+For every setting the script reports test accuracy, the raw and gzipped
+TFLite size (sparsity and clustering only pay off once the flatbuffer is
+compressed, which is how it ships inside the APK) and interpreter latency.
+
+The baseline is the one the training scripts ship: the same seeded, cached
+dataset, scaler and weights (see artifact_cache.py). Each exported model
+gets its scaler next to it (stop_classifier_<setting>_scaler_params.json,
+stop_location_model_<setting>_metadata.json) with normalization_fused set;
+--fuse-scaler bakes the scaler into the exported models.
+
+Requires tensorflow-model-optimization (see requirements.txt).
+
+Usage:
+    python compress_models.py --model classifier
+    python compress_models.py --model location --csv your_bus_stops.csv
+    python compress_models.py --sparsity 0.5 0.8 --clusters 16 --max-accuracy-drop 0.01
+    python compress_models.py --model both --fuse-scaler
+"""
+
+import numpy as np
+from tensorflow import keras
+import tensorflow_model_optimization as tfmot
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from artifact_cache import ArtifactCache, DEFAULT_CACHE_DIR
+from instrumentation import span
+from train_stop_classifier import (
+    load_or_prepare_data, load_or_train_model, convert_to_tflite, benchmark_tflite_model, scaler_arrays
+)
+from train_stop_location_model import (
+    load_your_bus_stops, load_or_prepare_location_data, load_or_fit_location_model,
+    convert_location_to_tflite
+)
+
+# Default sweep
+DEFAULT_SPARSITY_TARGETS = [0.5, 0.75, 0.9]
+DEFAULT_CLUSTER_COUNTS = [16, 8]
+DEFAULT_MAX_ACCURACY_DROP = 0.01  # absolute, e.g. 0.01 = 1 percentage point
+FINE_TUNE_EPOCHS = 10
+BATCH_SIZE = 32
+
+def build_settings(sparsity_targets, cluster_counts, structured=True):
+    """
+    Expand CLI arguments into a list of compression settings
+    """
+    settings = []
+    for target in sparsity_targets:
+        settings.append({
+            'name': f'prune_{int(target * 100)}',
+            'method': 'prune',
+            'initial_sparsity': 0.0,
+            'final_sparsity': target
+        })
+    if structured:
+        settings.append({
+            'name': 'prune_2by4',
+            'method': 'prune_structured',
+            'm_by_n': (2, 4)
+        })
+    for n_clusters in cluster_counts:
+        settings.append({
+            'name': f'cluster_{n_clusters}',
+            'method': 'cluster',
+            'clusters': n_clusters
+        })
+    return settings
+
+def _compile_like(model, reference):
+    """Compile a wrapped model with the same loss as the original"""
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.0005),
+        loss=reference.loss,
+        metrics=['accuracy']
+    )
+
+def apply_compression(model, setting, steps_per_epoch, epochs):
+    """
+    Wrap the Dense layers of a trained model for pruning or clustering
+
+    BatchNorm/Dropout layers are left untouched. The sparsity schedule ramps
+    from initial to final sparsity over the first two thirds of fine-tuning
+    so the last third can recover accuracy at constant sparsity.
+    """
+    end_step = max(1, int(steps_per_epoch * epochs * 2 / 3))
+
+    def wrap(layer):
+        if not isinstance(layer, keras.layers.Dense):
+            return layer
+
+        if setting['method'] == 'prune':
+            schedule = tfmot.sparsity.keras.PolynomialDecay(
+                initial_sparsity=setting['initial_sparsity'],
+                final_sparsity=setting['final_sparsity'],
+                begin_step=0,
+                end_step=end_step,
+                frequency=max(1, min(100, end_step // 10))
+            )
+            return tfmot.sparsity.keras.prune_low_magnitude(layer, pruning_schedule=schedule)
+
+        if setting['method'] == 'prune_structured':
+            m, n = setting['m_by_n']
+            # M:N sparsity groups along the input dimension, which must divide evenly
+            if layer.kernel.shape[0] % n != 0:
+                return layer
+            return tfmot.sparsity.keras.prune_low_magnitude(layer, sparsity_m_by_n=(m, n))
+
+        if setting['method'] == 'cluster':
+            return tfmot.clustering.keras.cluster_weights(
+                layer,
+                number_of_clusters=setting['clusters'],
+                cluster_centroids_init=tfmot.clustering.keras.CentroidInitialization.KMEANS_PLUS_PLUS
+            )
+
+        raise ValueError(f"Unknown compression method: {setting['method']}")
+
+    # The wrappers take over the layer objects they are given, so work on a
+    # copy to keep the baseline intact for the next setting in the sweep
+    baseline_copy = keras.models.clone_model(model)
+    baseline_copy.set_weights(model.get_weights())
+    return keras.models.clone_model(baseline_copy, clone_function=wrap)
+
+def strip_compression(model, setting):
+    """Remove training-only wrappers so the exported graph is plain Keras"""
+    if setting['method'] == 'cluster':
+        return tfmot.clustering.keras.strip_clustering(model)
+    return tfmot.sparsity.keras.strip_pruning(model)
+
+def compress_and_fine_tune(model, setting, X_train, y_train, X_val, y_val, epochs=FINE_TUNE_EPOCHS):
+    """
+    Apply one compression setting to a copy of the model and fine-tune it
+    """
+    steps_per_epoch = int(np.ceil(len(X_train) / BATCH_SIZE))
+    wrapped = apply_compression(model, setting, steps_per_epoch, epochs)
+    _compile_like(wrapped, model)
+
+    callbacks = []
+    if setting['method'].startswith('prune'):
+        callbacks.append(tfmot.sparsity.keras.UpdatePruningStep())
+
+    wrapped.fit(
+        X_train, y_train,
+        validation_data=(X_val, y_val),
+        epochs=epochs,
+        batch_size=BATCH_SIZE,
+        callbacks=callbacks,
+        verbose=0
+    )
+
+    stripped = strip_compression(wrapped, setting)
+    _compile_like(stripped, model)
+    return stripped
+
+def measure_sparsity(model):
+    """Fraction of zero weights across all Dense kernels"""
+    zeros, total = 0, 0
+    for layer in model.layers:
+        if isinstance(layer, keras.layers.Dense):
+            kernel = layer.kernel.numpy()
+            zeros += int(np.sum(kernel == 0))
+            total += kernel.size
+    return zeros / total if total else 0.0
+
+def gzipped_size_kb(path):
+    """Size of the artifact after gzip, as it would ship in the APK"""
+    with open(path, 'rb') as f:
+        return len(gzip.compress(f.read())) / 1024
+
+def unscale(X, params):
+    """Invert the saved scaler, for benchmarking exports that take raw features"""
+    mean, scale = scaler_arrays(params)
+    return np.asarray(X) * scale + mean
+
+def run_compression_sweep(model, converter, data, settings, output_prefix,
+                          max_accuracy_drop=DEFAULT_MAX_ACCURACY_DROP,
+                          epochs=FINE_TUNE_EPOCHS, tflite_X_test=None, sidecar=None):
+    """
+    Compress, gate and export every setting for one model
+
+    Args:
+        model: trained baseline Keras model
+        converter: convert_to_tflite or convert_location_to_tflite
+        data: (X_train, y_train, X_val, y_val, X_test, y_test), already scaled
+        settings: list from build_settings()
+        output_prefix: e.g. 'stop_classifier' -> stop_classifier_prune_50.tflite
+        tflite_X_test: test features in the converted model's input space
+            (raw features when the converter fuses the scaler), default X_test
+        sidecar: (suffix, params) - params are saved as
+            <output_prefix>_<setting>_<suffix>.json next to each export
+
+    Returns:
+        list of per-setting result dicts (baseline first)
+    """
+    X_train, y_train, X_val, y_val, X_test, y_test = data
+    if tflite_X_test is None:
+        tflite_X_test = X_test
+    tmp_dir = tempfile.mkdtemp()
+    results = []
+
+    try:
+        baseline_path = os.path.join(tmp_dir, 'baseline.tflite')
+        with span('conversion', setting='baseline'):
+            converter(model, baseline_path)
+        baseline = benchmark_tflite_model(baseline_path, tflite_X_test, y_test)
+        baseline.update({
+            'name': 'baseline',
+            'gzip_kb': gzipped_size_kb(baseline_path),
+            'sparsity': measure_sparsity(model),
+            'exported': False
+        })
+        results.append(baseline)
+
+        for setting in settings:
+            print(f"\n🔧 {output_prefix}: {setting['name']}")
+            with span('compress', setting=setting['name']):
+                compressed = compress_and_fine_tune(model, setting, X_train, y_train, X_val, y_val, epochs)
+
+            candidate_path = os.path.join(tmp_dir, f"{setting['name']}.tflite")
+            with span('conversion', setting=setting['name']):
+                converter(compressed, candidate_path)
+            result = benchmark_tflite_model(candidate_path, tflite_X_test, y_test)
+            result.update({
+                'name': setting['name'],
+                'gzip_kb': gzipped_size_kb(candidate_path),
+                'sparsity': measure_sparsity(compressed),
+                'accuracy_drop': baseline['accuracy'] - result['accuracy']
+            })
+
+            # Accuracy gate
+            if result['accuracy_drop'] > max_accuracy_drop:
+                print(f"❌ Refusing to export {setting['name']}: accuracy dropped "
+                      f"{result['accuracy_drop']:.4f} (> {max_accuracy_drop:.4f})")
+                result['exported'] = False
+            else:
+                output_path = f"{output_prefix}_{setting['name']}.tflite"
+                shutil.copyfile(candidate_path, output_path)
+                print(f"✅ Exported {output_path}")
+                result['exported'] = True
+                result['path'] = output_path
+                if sidecar is not None:
+                    suffix, params = sidecar
+                    params_path = f"{output_prefix}_{setting['name']}_{suffix}.json"
+                    with open(params_path, 'w') as f:
+                        json.dump(params, f, indent=2)
+                    result['params_path'] = params_path
+
+            results.append(result)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return results
+
+def print_results(title, results):
+    """Print the per-setting comparison table"""
+    print("\n" + "=" * 92)
+    print(title)
+    print("=" * 92)
+    print(f"{'Setting':<16}{'Accuracy':>10}{'Sparsity':>10}{'Size KB':>10}"
+          f"{'Gzip KB':>10}{'p50 ms':>10}{'p99 ms':>10}{'Exported':>12}")
+    print("-" * 92)
+    for r in results:
+        exported = '-' if r['name'] == 'baseline' else ('yes' if r['exported'] else 'REJECTED')
+        print(f"{r['name']:<16}{r['accuracy']:>10.4f}{r['sparsity']:>10.2%}{r['size_kb']:>10.2f}"
+              f"{r['gzip_kb']:>10.2f}{r['latency_ms_p50']:>10.4f}{r['latency_ms_p99']:>10.4f}{exported:>12}")
+    print("=" * 92)
+
+def compress_classifier(settings, max_accuracy_drop, epochs, n_samples=10000, seed=42,
+                        cache_dir=DEFAULT_CACHE_DIR, fuse_scaler=False):
+    """
+    Run the compression sweep on the shipped stop classifier
+
+    Loads (or trains on a cache miss) the same baseline and scaler that
+    train_stop_classifier.py exports for this n_samples/seed.
+    """
+    cache = ArtifactCache(cache_dir)
+    splits, scaler_params, splits_key = load_or_prepare_data(cache, n_samples, seed)
+    scaler_params['normalization_fused'] = fuse_scaler
+
+    print("\nLoading baseline classifier...")
+    with span('fit'):
+        model, _, _ = load_or_train_model(cache, splits, splits_key)
+
+    data = tuple(splits[k] for k in ('X_train', 'y_train', 'X_val', 'y_val', 'X_test', 'y_test'))
+    return run_compression_sweep(
+        model,
+        lambda m, path: convert_to_tflite(m, path, scaler_params=scaler_params if fuse_scaler else None),
+        data, settings, 'stop_classifier',
+        max_accuracy_drop=max_accuracy_drop, epochs=epochs,
+        tflite_X_test=unscale(splits['X_test'], scaler_params) if fuse_scaler else None,
+        sidecar=('scaler_params', scaler_params)
+    )
+
+def compress_location_model(csv_path, settings, max_accuracy_drop, epochs, seed=42,
+                            cache_dir=DEFAULT_CACHE_DIR, fuse_scaler=False):
+    """
+    Run the compression sweep on the shipped location model
+
+    Loads (or fits on a cache miss) the same baseline and metadata that
+    train_stop_location_model.py exports for this CSV/seed.
+    """
+    cache = ArtifactCache(cache_dir)
+    bus_stops = load_your_bus_stops(csv_path)
+    splits, model_metadata, splits_key = load_or_prepare_location_data(cache, csv_path, bus_stops, seed)
+    model_metadata['normalization_fused'] = fuse_scaler
+
+    print("\nLoading baseline location model...")
+    with span('fit'):
+        model, _ = load_or_fit_location_model(cache, splits, splits_key)
+
+    # fit_location_model uses validation_split; fine-tuning validates on the test split
+    X_train, X_test, y_train, y_test = splits['X_train'], splits['X_test'], splits['y_train'], splits['y_test']
+    data = (X_train, y_train, X_test, y_test, X_test, y_test)
+    return run_compression_sweep(
+        model,
+        lambda m, path: convert_location_to_tflite(m, path, model_metadata=model_metadata if fuse_scaler else None),
+        data, settings, 'stop_location_model',
+        max_accuracy_drop=max_accuracy_drop, epochs=epochs,
+        tflite_X_test=unscale(X_test, model_metadata) if fuse_scaler else None,
+        sidecar=('metadata', model_metadata)
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Prune/cluster models before TFLite export')
+    parser.add_argument('--model', choices=['classifier', 'location', 'both'], default='classifier')
+    parser.add_argument('--csv', default='your_bus_stops.csv', help='Bus stop CSV for the location model')
+    parser.add_argument('--sparsity', type=float, nargs='*', default=DEFAULT_SPARSITY_TARGETS,
+                        help='Final sparsity targets for unstructured pruning')
+    parser.add_argument('--clusters', type=int, nargs='*', default=DEFAULT_CLUSTER_COUNTS,
+                        help='Number of weight clusters per layer')
+    parser.add_argument('--no-structured', action='store_true', help='Skip 2:4 structured pruning')
+    parser.add_argument('--max-accuracy-drop', type=float, default=DEFAULT_MAX_ACCURACY_DROP)
+    parser.add_argument('--fine-tune-epochs', type=int, default=FINE_TUNE_EPOCHS)
+    parser.add_argument('--samples', type=int, default=10000, help='Synthetic samples for the classifier')
+    parser.add_argument('--seed', type=int, default=42, help='Seed the baseline was trained with')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--fuse-scaler', action='store_true',
+                        help='Fuse the scaler into the exported models (they take raw features)')
+    args = parser.parse_args()
+
+    settings = build_settings(args.sparsity, args.clusters, structured=not args.no_structured)
+    report = {}
+
+    if args.model in ('classifier', 'both'):
+        report['classifier'] = compress_classifier(settings, args.max_accuracy_drop, args.fine_tune_epochs,
+                                                   n_samples=args.samples, seed=args.seed,
+                                                   cache_dir=args.cache_dir, fuse_scaler=args.fuse_scaler)
+        print_results('STOP CLASSIFIER COMPRESSION', report['classifier'])
+
+    if args.model in ('location', 'both'):
+        report['location'] = compress_location_model(args.csv, settings, args.max_accuracy_drop,
+                                                     args.fine_tune_epochs, seed=args.seed,
+                                                     cache_dir=args.cache_dir, fuse_scaler=args.fuse_scaler)
+        print_results('LOCATION MODEL COMPRESSION', report['location'])
+
+    with open('compression_report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    print("Report saved to compression_report.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Knowledge Distillation for the On-Device Stop Classifier
+
+The deployed `stop_classifier.tflite` runs on every detected stop, so its
+size and latency matter more than the last accuracy point. This script uses
+the full Keras model (`stop_classifier_full.h5`) as a teacher and trains a
+much smaller student on the teacher's softened probabilities.
+
+Pipeline:
+1. Load teacher + `scaler_params.json`
+2. Generate a large synthetic dataset and normalize it with the teacher's scaler
+3. Soften teacher outputs with a temperature T
+4. Train the student on soft targets (KL term) + hard labels (CE term)
+5. Export the student through `convert_to_tflite`, fusing the scaler in
+   when `scaler_params.json` says the shipped model is fused
+6. Report size, latency and accuracy next to the teacher
+
+Usage:
+    python distill_stop_classifier.py
+"""
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+import json
+import os
+
+from train_stop_classifier import (
+    STOP_TYPES, FEATURE_COLUMNS, generate_synthetic_data,
+    convert_to_tflite, benchmark_tflite_model
+)
+
+# Distillation hyperparameters
+TEMPERATURE = 4.0
+ALPHA = 0.1  # Weight of the hard-label loss (1 - ALPHA goes to soft targets)
+STUDENT_HIDDEN_UNITS = 16
+
+def load_teacher(model_path='stop_classifier_full.h5', scaler_path='scaler_params.json'):
+    """Load the teacher Keras model and the scaler it was trained with"""
+    teacher = keras.models.load_model(model_path, compile=False)
+
+    with open(scaler_path) as f:
+        scaler_params = json.load(f)
+
+    return teacher, scaler_params
+
+def soften_probabilities(probabilities, temperature):
+    """
+    Re-apply softmax at a higher temperature
+
+    The teacher ends in a softmax, so log-probabilities are its logits
+    up to a constant, which softmax ignores.
+    """
+    logits = np.log(np.clip(probabilities, 1e-7, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+def create_student_model(input_shape, num_classes, hidden_units=STUDENT_HIDDEN_UNITS,
+                         temperature=TEMPERATURE):
+    """
+    Create a tiny student network
+
+    Returns (training_model, export_model). Both share weights; the training
+    model has an extra temperature-scaled head used only for the soft loss.
+    """
+    inputs = layers.Input(shape=(input_shape,))
+    x = layers.Dense(hidden_units, activation='relu')(inputs)
+    logits = layers.Dense(num_classes, name='logits')(x)
+
+    hard = layers.Activation('softmax', name='hard')(logits)
+    soft = layers.Activation('softmax', name='soft')(
+        layers.Rescaling(1.0 / temperature)(logits)
+    )
+
+    training_model = keras.Model(inputs, {'hard': hard, 'soft': soft})
+    export_model = keras.Model(inputs, hard)
+
+    return training_model, export_model
+
+def train_student(X_train, y_train, soft_train, X_val, y_val, soft_val,
+                  temperature=TEMPERATURE, alpha=ALPHA):
+    """
+    Train the student on a weighted sum of soft-target and hard-label losses
+
+    The soft loss is scaled by T^2 so its gradients stay comparable
+    to the hard loss (Hinton et al., 2015).
+    """
+    training_model, export_model = create_student_model(
+        X_train.shape[1], len(STOP_TYPES), temperature=temperature
+    )
+
+    training_model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.005),
+        loss={
+            'hard': 'sparse_categorical_crossentropy',
+            'soft': keras.losses.KLDivergence()
+        },
+        loss_weights={'hard': alpha, 'soft': (1 - alpha) * temperature ** 2}
+    )
+
+    early_stopping = keras.callbacks.EarlyStopping(
+        monitor='val_loss', patience=5, restore_best_weights=True
+    )
+
+    history = training_model.fit(
+        X_train, {'hard': y_train, 'soft': soft_train},
+        validation_data=(X_val, {'hard': y_val, 'soft': soft_val}),
+        epochs=50,
+        batch_size=256,
+        callbacks=[early_stopping],
+        verbose=1
+    )
+
+    return export_model, history
+
+def print_comparison(teacher, student, teacher_results, student_results):
+    """Print teacher vs student size/latency/accuracy side by side"""
+    print("\n" + "=" * 70)
+    print("DISTILLATION RESULTS")
+    print("=" * 70)
+    print(f"{'':<28}{'Teacher':>18}{'Student':>18}")
+    print("-" * 70)
+    print(f"{'Parameters':<28}{teacher.count_params():>18,}{student.count_params():>18,}")
+    print(f"{'TFLite size (KB)':<28}{teacher_results['size_kb']:>18.2f}{student_results['size_kb']:>18.2f}")
+    print(f"{'Latency p50 (ms)':<28}{teacher_results['latency_ms_p50']:>18.4f}{student_results['latency_ms_p50']:>18.4f}")
+    print(f"{'Latency p99 (ms)':<28}{teacher_results['latency_ms_p99']:>18.4f}{student_results['latency_ms_p99']:>18.4f}")
+    print(f"{'Test accuracy (TFLite)':<28}{teacher_results['accuracy']:>18.4f}{student_results['accuracy']:>18.4f}")
+    print("=" * 70)
+
+def main(n_samples=100000, output_path='stop_classifier_student.tflite',
+         teacher_path='stop_classifier_full.h5', teacher_tflite_path='stop_classifier.tflite'):
+    print("Loading teacher model...")
+    teacher, scaler_params = load_teacher(teacher_path)
+
+    print(f"\nGenerating {n_samples} synthetic samples...")
+    df = generate_synthetic_data(n_samples=n_samples)
+
+    X_raw = df[FEATURE_COLUMNS].values.astype(np.float32)
+    y = df['stop_type'].values
+
+    # Normalize with the teacher's scaler so both models see identical inputs
+    X = (X_raw - np.array(scaler_params['mean'])) / np.array(scaler_params['scale'])
+    X = X.astype(np.float32)
+
+    X_train, X_test, _, X_test_raw, y_train, y_test = train_test_split(
+        X, X_raw, y, test_size=0.1, random_state=42, stratify=y)
+    X_train, X_val, y_train, y_val = train_test_split(X_train, y_train, test_size=0.1, random_state=42, stratify=y_train)
+
+    # Exported models must match scaler_params.json: fused ones take raw features
+    fused = scaler_params.get('normalization_fused', False)
+    export_scaler = scaler_params if fused else None
+    X_test_tflite = X_test_raw if fused else X_test
+
+    print("\nComputing teacher soft targets...")
+    soft_train = soften_probabilities(teacher.predict(X_train, batch_size=1024), TEMPERATURE)
+    soft_val = soften_probabilities(teacher.predict(X_val, batch_size=1024), TEMPERATURE)
+
+    print("\nTraining student model...")
+    student, history = train_student(X_train, y_train, soft_train, X_val, y_val, soft_val)
+
+    print("\nConverting student to TensorFlow Lite...")
+    convert_to_tflite(student, output_path, scaler_params=export_scaler)
+
+    # Teacher TFLite: use the shipped artifact if present, otherwise convert it
+    if not os.path.exists(teacher_tflite_path):
+        print("\nConverting teacher to TensorFlow Lite...")
+        convert_to_tflite(teacher, teacher_tflite_path, scaler_params=export_scaler)
+
+    print("\nBenchmarking TFLite models...")
+    teacher_results = benchmark_tflite_model(teacher_tflite_path, X_test_tflite, y_test)
+    student_results = benchmark_tflite_model(output_path, X_test_tflite, y_test)
+
+    print_comparison(teacher, student, teacher_results, student_results)
+
+    with open('distillation_report.json', 'w') as f:
+        json.dump({
+            'temperature': TEMPERATURE,
+            'alpha': ALPHA,
+            'n_samples': n_samples,
+            'normalization_fused': fused,
+            'teacher': dict(teacher_results, parameters=teacher.count_params()),
+            'student': dict(student_results, parameters=student.count_params())
+        }, f, indent=2)
+    print("Report saved to distillation_report.json")
+
+    print("\n✅ Distillation complete!")
+    print(f"\nTo deploy, copy '{output_path}' to 'assets/stop_classifier.tflite'")
+    if fused:
+        print("(the teacher's scaler is fused in, as scaler_params.json says - feed raw features)")
+    else:
+        print("(scaler_params.json is unchanged - the student uses the teacher's scaler)")
+
+if __name__ == "__main__":
+    main()
@@ -14,24 +14,20 @@ Run this after training to get complete evaluation metrics.
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import (
-    confusion_matrix, classification_report, 
-    precision_recall_fscore_support, roc_curve, auc,
-    accuracy_score, roc_auc_score
-)
+from sklearn.metrics import confusion_matrix, roc_curve, auc, accuracy_score
 from sklearn.preprocessing import label_binarize
 import tensorflow as tf
 from tensorflow import keras
 import json
 import os
+import tempfile
+import time
+from types import SimpleNamespace
 
-# Set style for better-looking plots
-plt.style.use('seaborn-v0_8-darkgrid')
-sns.set_palette("husl")
+from artifact_cache import ArtifactCache, DEFAULT_CACHE_DIR
+from train_stop_classifier import convert_to_tflite
 
 # Stop types mapping
 STOP_TYPES = {
@@ -42,8 +38,13 @@ STOP_TYPES = {
     4: 'Rest Area'
 }
 
-def generate_synthetic_data(n_samples=10000):
+FEATURE_COLUMNS = ['dwell_time', 'speed_before', 'heading', 'visit_count', 'hour', 'day_of_week']
+
+def generate_synthetic_data(n_samples=10000, seed=None):
     """Generate synthetic training data"""
+    if seed is not None:
+        np.random.seed(seed)
+    
     data = []
     
     for _ in range(n_samples):
@@ -105,247 +106,368 @@ def create_model(input_shape, num_classes):
     ])
     return model
 
+def metrics_from_confusion(cm):
+    """
+    Accuracy, per-class precision/recall/F1/support from a confusion matrix
+
+    Matches sklearn's precision_recall_fscore_support(zero_division=0), so the
+    in-memory and streaming paths report identical numbers. Also accepts a
+    stack of matrices (..., k, k), e.g. one per bootstrap resample, in which
+    case every value gains the same leading axes.
+    """
+    cm = np.asarray(cm)
+    tp = np.diagonal(cm, axis1=-2, axis2=-1).astype(np.float64)
+    support = cm.sum(axis=-1)
+    predicted = cm.sum(axis=-2)
+
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+    denominator = precision + recall
+    f1 = np.divide(2 * precision * recall, denominator,
+                   out=np.zeros_like(tp), where=denominator > 0)
+    total = support.sum(axis=-1)
+    accuracy = np.divide(tp.sum(axis=-1), total, out=np.zeros(np.shape(total)), where=total > 0)
+
+    return {
+        'confusion_matrix': cm,
+        'accuracy': float(accuracy) if accuracy.ndim == 0 else accuracy,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'support': support,
+        # Per-class accuracy is the diagonal over the row total (0 for absent classes)
+        'accuracy_per_class': recall,
+    }
+
+def compute_metrics(y_true, y_pred, y_pred_proba=None):
+    """
+    Compute every metric the figures need, once
+
+    Returns plain numpy arrays/floats so the result can be handed to
+    evaluation_plots renderers in worker processes.
+    """
+    n_classes = len(STOP_TYPES)
+    labels = list(range(n_classes))
+
+    metrics = metrics_from_confusion(confusion_matrix(y_true, y_pred, labels=labels))
+
+    if y_pred_proba is not None:
+        # Binarize the output and compute ROC curve and AUC for each class
+        y_true_bin = label_binarize(y_true, classes=labels)
+        metrics['fpr'], metrics['tpr'], metrics['roc_auc'] = [], [], []
+        for i in range(n_classes):
+            fpr, tpr, _ = roc_curve(y_true_bin[:, i], y_pred_proba[:, i])
+            metrics['fpr'].append(fpr)
+            metrics['tpr'].append(tpr)
+            metrics['roc_auc'].append(auc(fpr, tpr))
+
+    return metrics
+
+class StreamingMetrics:
+    """
+    Constant-memory metric accumulator for evaluation sets too large for RAM
+
+    Feed it (y_true, y_pred_proba) chunks; it keeps only a confusion matrix
+    and, per class, fixed-bin histograms of the scores given to positive and
+    negative rows. result() returns the same dict as compute_metrics(), with
+    ROC curves/AUC approximated at the histogram resolution (n_bins
+    thresholds evenly spaced on [0, 1]).
+    """
+
+    def __init__(self, n_classes=len(STOP_TYPES), n_bins=1000):
+        self.n_classes = n_classes
+        self.n_bins = n_bins
+        self.confusion = np.zeros((n_classes, n_classes), dtype=np.int64)
+        self.positive_hist = np.zeros((n_classes, n_bins), dtype=np.int64)
+        self.negative_hist = np.zeros((n_classes, n_bins), dtype=np.int64)
+        self.n_rows = 0
+
+    def update(self, y_true, y_pred_proba):
+        """Add one chunk of labels and class probabilities"""
+        y_true = np.asarray(y_true, dtype=np.int64)
+        y_pred_proba = np.asarray(y_pred_proba)
+        k = self.n_classes
+        if y_pred_proba.ndim != 2 or y_pred_proba.shape != (len(y_true), k):
+            raise ValueError(f"y_pred_proba must have shape ({len(y_true)}, {k}), got {y_pred_proba.shape}")
+        if len(y_true) and (y_true.min() < 0 or y_true.max() >= k):
+            raise ValueError(f"Labels must be in [0, {k - 1}], got values in "
+                             f"[{y_true.min()}, {y_true.max()}]")
+        y_pred = np.argmax(y_pred_proba, axis=1)
+
+        self.confusion += np.bincount(
+            y_true * k + y_pred, minlength=k * k
+        ).reshape(k, k)
+
+        # Score bin per (row, class), flattened to class * n_bins + bin
+        bins = np.clip((y_pred_proba * self.n_bins).astype(np.int64), 0, self.n_bins - 1)
+        flat = bins + np.arange(k) * self.n_bins
+        is_positive = y_true[:, None] == np.arange(k)
+        size = k * self.n_bins
+        self.positive_hist += np.bincount(flat[is_positive], minlength=size).reshape(k, -1)
+        self.negative_hist += np.bincount(flat[~is_positive], minlength=size).reshape(k, -1)
+
+        self.n_rows += len(y_true)
+        return self
+
+    def roc_curves(self):
+        """Approximate per-class ROC points and AUC from the score histograms"""
+        fpr_list, tpr_list, auc_list = [], [], []
+        for i in range(self.n_classes):
+            # Sweep the threshold from the top bin down: counts scored >= threshold
+            tp = np.concatenate([[0], np.cumsum(self.positive_hist[i, ::-1])])
+            fp = np.concatenate([[0], np.cumsum(self.negative_hist[i, ::-1])])
+            tpr = tp / tp[-1] if tp[-1] else np.zeros(len(tp))
+            fpr = fp / fp[-1] if fp[-1] else np.zeros(len(fp))
+            fpr_list.append(fpr)
+            tpr_list.append(tpr)
+            auc_list.append(auc(fpr, tpr))
+        return fpr_list, tpr_list, auc_list
+
+    def result(self):
+        """Metrics dict in the compute_metrics() format"""
+        metrics = metrics_from_confusion(self.confusion)
+        metrics['fpr'], metrics['tpr'], metrics['roc_auc'] = self.roc_curves()
+        return metrics
+
+def accumulate_metrics(chunks, n_bins=1000):
+    """Consume a generator of (y_true, y_pred_proba) chunks into a StreamingMetrics"""
+    accumulator = StreamingMetrics(n_bins=n_bins)
+    for y_true, y_pred_proba in chunks:
+        accumulator.update(y_true, y_pred_proba)
+    return accumulator
+
+def _summary_metrics(metrics):
+    """Headline values (overall + weighted averages + per class) from metrics_from_confusion()"""
+    support = metrics['support']
+    weights = support / np.maximum(support.sum(axis=-1, keepdims=True), 1)
+    return {
+        'accuracy': np.asarray(metrics['accuracy']),
+        'precision': metrics['precision'],
+        'recall': metrics['recall'],
+        'f1': metrics['f1'],
+        'weighted_precision': (metrics['precision'] * weights).sum(axis=-1),
+        'weighted_recall': (metrics['recall'] * weights).sum(axis=-1),
+        'weighted_f1': (metrics['f1'] * weights).sum(axis=-1),
+    }
+
+def _percentile_intervals(resampled, confidence):
+    """Percentile interval per metric: arrays of shape (..., 2) holding (low, high)"""
+    tail = (1 - confidence) / 2 * 100
+    return {
+        name: np.stack(np.percentile(values, [tail, 100 - tail], axis=0), axis=-1)
+        for name, values in resampled.items()
+    }
+
+def bootstrap_confusion_matrices(y_true, y_pred, n_resamples=1000, seed=0,
+                                 n_classes=len(STOP_TYPES), max_block_elements=20_000_000):
+    """
+    Confusion matrix of every bootstrap resample, shape (n_resamples, k, k)
+
+    Each row is reduced to one cell code (true * k + predicted); a block of
+    resamples is an index matrix (block, n) into those codes, offset by
+    resample so a single np.bincount counts all of them at once. Blocks keep
+    the index matrix under max_block_elements.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.asarray(y_true, dtype=np.int64) * n_classes + np.asarray(y_pred, dtype=np.int64)
+    n = len(codes)
+    cells = n_classes * n_classes
+
+    block = max(1, min(n_resamples, max_block_elements // max(n, 1)))
+    matrices = []
+    for start in range(0, n_resamples, block):
+        size = min(block, n_resamples - start)
+        indices = rng.integers(0, n, size=(size, n))
+        flat = codes[indices] + (np.arange(size) * cells)[:, None]
+        counts = np.bincount(flat.ravel(), minlength=size * cells)
+        matrices.append(counts.reshape(size, n_classes, n_classes))
+    return np.concatenate(matrices)
+
+def bootstrap_intervals(y_true=None, y_pred=None, confusion=None, n_resamples=1000,
+                        confidence=0.95, seed=0):
+    """
+    Bootstrap confidence intervals for accuracy and per-class/weighted metrics
+
+    Resamples rows when labels are available. With only an accumulated
+    confusion matrix (streaming evaluation), resampling n rows is the same
+    as drawing the n cell counts from a multinomial over the observed cells.
+    """
+    if y_true is not None:
+        matrices = bootstrap_confusion_matrices(y_true, y_pred, n_resamples, seed)
+    else:
+        confusion = np.asarray(confusion)
+        total = confusion.sum()
+        rng = np.random.default_rng(seed)
+        matrices = rng.multinomial(total, confusion.ravel() / total, size=n_resamples)
+        matrices = matrices.reshape((n_resamples,) + confusion.shape)
+
+    resampled = _summary_metrics(metrics_from_confusion(matrices))
+    intervals = _percentile_intervals(resampled, confidence)
+    intervals['confidence'] = confidence
+    intervals['n_resamples'] = n_resamples
+    return intervals
+
+def format_classification_report(metrics, digits=4):
+    """
+    Text classification report from a metrics dict
+
+    Same layout as sklearn's classification_report, but built from the
+    accumulated counts so it works without the full label arrays.
+    """
+    names = list(STOP_TYPES.values())
+    precision, recall, f1, support = (metrics['precision'], metrics['recall'],
+                                      metrics['f1'], metrics['support'])
+    total = support.sum()
+
+    width = max(max(len(name) for name in names), len('weighted avg'), digits)
+    head_fmt = '{:>{width}s} ' + ' {:>9}' * 4
+    row_fmt = '{:>{width}s} ' + ' {:>9.{digits}f}' * 3 + ' {:>9}\n'
+
+    report = head_fmt.format('', 'precision', 'recall', 'f1-score', 'support', width=width)
+    report += '\n\n'
+    for i, name in enumerate(names):
+        report += row_fmt.format(name, precision[i], recall[i], f1[i], support[i],
+                                 width=width, digits=digits)
+    report += '\n'
+    report += ('{:>{width}s} ' + ' {:>9}' * 2 + ' {:>9.{digits}f} {:>9}\n').format(
+        'accuracy', '', '', metrics['accuracy'], total, width=width, digits=digits)
+    report += row_fmt.format('macro avg', precision.mean(), recall.mean(), f1.mean(), total,
+                             width=width, digits=digits)
+    weights = support if total else None
+    report += row_fmt.format('weighted avg', np.average(precision, weights=weights),
+                             np.average(recall, weights=weights), np.average(f1, weights=weights),
+                             total, width=width, digits=digits)
+    return report
+
+def metrics_table_frame(metrics):
+    """
+    Per-class metrics table (plus weighted average row) as a DataFrame
+
+    When metrics carry bootstrap 'intervals', each score cell also shows its
+    confidence interval.
+    """
+    precision, recall, f1 = metrics['precision'], metrics['recall'], metrics['f1']
+    support = metrics['support']
+    intervals = metrics.get('intervals')
+
+    def cell(value, name, index=None):
+        if intervals is None:
+            return f'{value:.4f}'
+        low, high = intervals[name] if index is None else intervals[name][index]
+        return f'{value:.4f} [{low:.3f}, {high:.3f}]'
+
+    n_classes = len(STOP_TYPES)
+    df = pd.DataFrame({
+        'Class': list(STOP_TYPES.values()),
+        'Precision': [cell(precision[i], 'precision', i) for i in range(n_classes)],
+        'Recall': [cell(recall[i], 'recall', i) for i in range(n_classes)],
+        'F1-Score': [cell(f1[i], 'f1', i) for i in range(n_classes)],
+        # Per-class accuracy is per-class recall, so it shares recall's interval
+        'Accuracy': [cell(metrics['accuracy_per_class'][i], 'recall', i) for i in range(n_classes)],
+        'Support': support
+    })
+
+    # Add average row
+    avg_row = pd.DataFrame({
+        'Class': ['Weighted Avg'],
+        'Precision': [cell(np.average(precision, weights=support), 'weighted_precision')],
+        'Recall': [cell(np.average(recall, weights=support), 'weighted_recall')],
+        'F1-Score': [cell(np.average(f1, weights=support), 'weighted_f1')],
+        'Accuracy': [cell(metrics['accuracy'], 'accuracy')],
+        'Support': [support.sum()]
+    })
+    return pd.concat([df, avg_row], ignore_index=True)
+
+def figure_inputs(history, metrics):
+    """
+    Renderer kwargs for each figure - metric arrays only, no model or raw data
+    """
+    class_names = list(STOP_TYPES.values())
+    table = metrics_table_frame(metrics)
+
+    figures = {}
+    if history is not None:
+        figures['training_history'] = {
+            'history': {k: list(map(float, v)) for k, v in history.history.items()}
+        }
+    figures['confusion_matrix'] = {
+        'cm': metrics['confusion_matrix'],
+        'accuracy': metrics['accuracy'],
+        'class_names': class_names,
+    }
+    figures['classification_metrics'] = {
+        'precision': metrics['precision'],
+        'recall': metrics['recall'],
+        'f1': metrics['f1'],
+        'class_names': class_names,
+    }
+    figures['metrics_table'] = {
+        'columns': list(table.columns),
+        'rows': table.astype(str).values.tolist(),
+    }
+    if 'intervals' in metrics:
+        intervals = metrics['intervals']
+        figures['metrics_table']['subtitle'] = (
+            f"[low, high] = {intervals['confidence']:.0%} bootstrap interval "
+            f"({intervals['n_resamples']:,} resamples)"
+        )
+    if 'roc_auc' in metrics:
+        figures['roc_curves'] = {
+            'fpr': metrics['fpr'],
+            'tpr': metrics['tpr'],
+            'roc_auc': metrics['roc_auc'],
+            'class_names': class_names,
+        }
+    return figures
+
 def plot_training_history(history, save_path='results/training_history.png'):
     """Plot training and validation accuracy/loss"""
-    fig, axes = plt.subplots(1, 2, figsize=(15, 5))
-    
-    # Accuracy plot
-    axes[0].plot(history.history['accuracy'], label='Training Accuracy', linewidth=2)
-    axes[0].plot(history.history['val_accuracy'], label='Validation Accuracy', linewidth=2)
-    axes[0].set_title('Model Accuracy Over Epochs', fontsize=14, fontweight='bold')
-    axes[0].set_xlabel('Epoch', fontsize=12)
-    axes[0].set_ylabel('Accuracy', fontsize=12)
-    axes[0].legend(loc='lower right', fontsize=10)
-    axes[0].grid(True, alpha=0.3)
-    
-    # Loss plot
-    axes[1].plot(history.history['loss'], label='Training Loss', linewidth=2)
-    axes[1].plot(history.history['val_loss'], label='Validation Loss', linewidth=2)
-    axes[1].set_title('Model Loss Over Epochs', fontsize=14, fontweight='bold')
-    axes[1].set_xlabel('Epoch', fontsize=12)
-    axes[1].set_ylabel('Loss', fontsize=12)
-    axes[1].legend(loc='upper right', fontsize=10)
-    axes[1].grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    import evaluation_plots
+    evaluation_plots.render_training_history(history.history, save_path)
     print(f"✅ Training history plot saved to {save_path}")
-    plt.close()
 
 def plot_confusion_matrix(y_true, y_pred, save_path='results/confusion_matrix.png'):
     """Plot confusion matrix heatmap"""
-    cm = confusion_matrix(y_true, y_pred)
-    
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=STOP_TYPES.values(),
-                yticklabels=STOP_TYPES.values(),
-                cbar_kws={'label': 'Count'},
-                linewidths=0.5, linecolor='gray')
-    
-    plt.title('Confusion Matrix - Stop Classification', fontsize=16, fontweight='bold', pad=20)
-    plt.ylabel('True Label', fontsize=12, fontweight='bold')
-    plt.xlabel('Predicted Label', fontsize=12, fontweight='bold')
-    plt.xticks(rotation=45, ha='right')
-    plt.yticks(rotation=0)
-    
-    # Add accuracy annotation
-    accuracy = accuracy_score(y_true, y_pred)
-    plt.text(0.5, -0.15, f'Overall Accuracy: {accuracy:.2%}', 
-             ha='center', transform=plt.gca().transAxes,
-             fontsize=12, bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-    
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    import evaluation_plots
+    metrics = compute_metrics(y_true, y_pred)
+    evaluation_plots.render_confusion_matrix(
+        metrics['confusion_matrix'], metrics['accuracy'], list(STOP_TYPES.values()), save_path
+    )
     print(f"✅ Confusion matrix saved to {save_path}")
-    plt.close()
 
 def plot_classification_metrics(y_true, y_pred, save_path='results/classification_metrics.png'):
     """Plot precision, recall, F1-score as bar charts"""
-    precision, recall, f1, support = precision_recall_fscore_support(y_true, y_pred)
-    
-    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-    
-    classes = list(STOP_TYPES.values())
-    x_pos = np.arange(len(classes))
-    
-    # Precision
-    bars1 = axes[0, 0].bar(x_pos, precision, color='skyblue', edgecolor='navy', linewidth=1.5)
-    axes[0, 0].set_title('Precision by Class', fontsize=14, fontweight='bold')
-    axes[0, 0].set_ylabel('Precision', fontsize=12)
-    axes[0, 0].set_xticks(x_pos)
-    axes[0, 0].set_xticklabels(classes, rotation=45, ha='right')
-    axes[0, 0].set_ylim([0, 1.1])
-    axes[0, 0].grid(axis='y', alpha=0.3)
-    for i, bar in enumerate(bars1):
-        height = bar.get_height()
-        axes[0, 0].text(bar.get_x() + bar.get_width()/2., height,
-                       f'{precision[i]:.3f}', ha='center', va='bottom', fontweight='bold')
-    
-    # Recall
-    bars2 = axes[0, 1].bar(x_pos, recall, color='lightcoral', edgecolor='darkred', linewidth=1.5)
-    axes[0, 1].set_title('Recall by Class', fontsize=14, fontweight='bold')
-    axes[0, 1].set_ylabel('Recall', fontsize=12)
-    axes[0, 1].set_xticks(x_pos)
-    axes[0, 1].set_xticklabels(classes, rotation=45, ha='right')
-    axes[0, 1].set_ylim([0, 1.1])
-    axes[0, 1].grid(axis='y', alpha=0.3)
-    for i, bar in enumerate(bars2):
-        height = bar.get_height()
-        axes[0, 1].text(bar.get_x() + bar.get_width()/2., height,
-                       f'{recall[i]:.3f}', ha='center', va='bottom', fontweight='bold')
-    
-    # F1-Score
-    bars3 = axes[1, 0].bar(x_pos, f1, color='lightgreen', edgecolor='darkgreen', linewidth=1.5)
-    axes[1, 0].set_title('F1-Score by Class', fontsize=14, fontweight='bold')
-    axes[1, 0].set_ylabel('F1-Score', fontsize=12)
-    axes[1, 0].set_xticks(x_pos)
-    axes[1, 0].set_xticklabels(classes, rotation=45, ha='right')
-    axes[1, 0].set_ylim([0, 1.1])
-    axes[1, 0].grid(axis='y', alpha=0.3)
-    for i, bar in enumerate(bars3):
-        height = bar.get_height()
-        axes[1, 0].text(bar.get_x() + bar.get_width()/2., height,
-                       f'{f1[i]:.3f}', ha='center', va='bottom', fontweight='bold')
-    
-    # Combined comparison
-    width = 0.25
-    x_pos_multi = np.arange(len(classes))
-    axes[1, 1].bar(x_pos_multi - width, precision, width, label='Precision', 
-                   color='skyblue', edgecolor='navy', linewidth=1.5)
-    axes[1, 1].bar(x_pos_multi, recall, width, label='Recall', 
-                   color='lightcoral', edgecolor='darkred', linewidth=1.5)
-    axes[1, 1].bar(x_pos_multi + width, f1, width, label='F1-Score', 
-                   color='lightgreen', edgecolor='darkgreen', linewidth=1.5)
-    axes[1, 1].set_title('Combined Metrics Comparison', fontsize=14, fontweight='bold')
-    axes[1, 1].set_ylabel('Score', fontsize=12)
-    axes[1, 1].set_xticks(x_pos_multi)
-    axes[1, 1].set_xticklabels(classes, rotation=45, ha='right')
-    axes[1, 1].set_ylim([0, 1.1])
-    axes[1, 1].legend(loc='upper right', fontsize=10)
-    axes[1, 1].grid(axis='y', alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    import evaluation_plots
+    metrics = compute_metrics(y_true, y_pred)
+    evaluation_plots.render_classification_metrics(
+        metrics['precision'], metrics['recall'], metrics['f1'],
+        list(STOP_TYPES.values()), save_path
+    )
     print(f"✅ Classification metrics plot saved to {save_path}")
-    plt.close()
 
 def create_metrics_table(y_true, y_pred, save_path='results/metrics_table.png'):
     """Create a detailed metrics table as image"""
-    precision, recall, f1, support = precision_recall_fscore_support(y_true, y_pred)
-    
-    # Calculate accuracy per class
-    accuracy_per_class = []
-    for i in range(len(STOP_TYPES)):
-        mask = y_true == i
-        if mask.sum() > 0:
-            acc = accuracy_score(y_true[mask], y_pred[mask])
-        else:
-            acc = 0
-        accuracy_per_class.append(acc)
-    
-    # Create DataFrame
-    df = pd.DataFrame({
-        'Class': list(STOP_TYPES.values()),
-        'Precision': [f'{p:.4f}' for p in precision],
-        'Recall': [f'{r:.4f}' for r in recall],
-        'F1-Score': [f'{f:.4f}' for f in f1],
-        'Accuracy': [f'{a:.4f}' for a in accuracy_per_class],
-        'Support': support
-    })
-    
-    # Add average row
-    avg_row = pd.DataFrame({
-        'Class': ['Weighted Avg'],
-        'Precision': [f'{np.average(precision, weights=support):.4f}'],
-        'Recall': [f'{np.average(recall, weights=support):.4f}'],
-        'F1-Score': [f'{np.average(f1, weights=support):.4f}'],
-        'Accuracy': [f'{accuracy_score(y_true, y_pred):.4f}'],
-        'Support': [support.sum()]
-    })
-    df = pd.concat([df, avg_row], ignore_index=True)
-    
-    # Create figure
-    fig, ax = plt.subplots(figsize=(14, 8))
-    ax.axis('tight')
-    ax.axis('off')
-    
-    # Create table
-    table = ax.table(cellText=df.values, colLabels=df.columns,
-                     cellLoc='center', loc='center',
-                     colWidths=[0.25, 0.15, 0.15, 0.15, 0.15, 0.15])
-    
-    table.auto_set_font_size(False)
-    table.set_fontsize(11)
-    table.scale(1, 2.5)
-    
-    # Style header
-    for i in range(len(df.columns)):
-        cell = table[(0, i)]
-        cell.set_facecolor('#4CAF50')
-        cell.set_text_props(weight='bold', color='white', fontsize=12)
-    
-    # Style rows
-    for i in range(1, len(df) + 1):
-        for j in range(len(df.columns)):
-            cell = table[(i, j)]
-            if i == len(df):  # Last row (average)
-                cell.set_facecolor('#FFF9C4')
-                cell.set_text_props(weight='bold')
-            elif i % 2 == 0:
-                cell.set_facecolor('#E8F5E9')
-            else:
-                cell.set_facecolor('#FFFFFF')
-    
-    plt.title('Detailed Classification Metrics Table', 
-              fontsize=16, fontweight='bold', pad=20)
-    
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    import evaluation_plots
+    df = metrics_table_frame(compute_metrics(y_true, y_pred))
+    evaluation_plots.render_metrics_table(list(df.columns), df.astype(str).values.tolist(), save_path)
     print(f"✅ Metrics table saved to {save_path}")
-    plt.close()
-    
     return df
 
 def plot_roc_curves(y_true, y_pred_proba, save_path='results/roc_curves.png'):
     """Plot ROC curves for each class"""
-    n_classes = len(STOP_TYPES)
-    
-    # Binarize the output
-    y_true_bin = label_binarize(y_true, classes=list(range(n_classes)))
-    
-    # Compute ROC curve and AUC for each class
-    fpr = dict()
-    tpr = dict()
-    roc_auc = dict()
-    
-    for i in range(n_classes):
-        fpr[i], tpr[i], _ = roc_curve(y_true_bin[:, i], y_pred_proba[:, i])
-        roc_auc[i] = auc(fpr[i], tpr[i])
-    
-    # Plot
-    plt.figure(figsize=(12, 8))
-    colors = plt.cm.Set3(np.linspace(0, 1, n_classes))
-    
-    for i, color in enumerate(colors):
-        plt.plot(fpr[i], tpr[i], color=color, lw=2.5,
-                label=f'{STOP_TYPES[i]} (AUC = {roc_auc[i]:.3f})')
-    
-    plt.plot([0, 1], [0, 1], 'k--', lw=2, label='Random Classifier')
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('False Positive Rate', fontsize=12, fontweight='bold')
-    plt.ylabel('True Positive Rate', fontsize=12, fontweight='bold')
-    plt.title('ROC Curves - Multi-class Classification', fontsize=16, fontweight='bold')
-    plt.legend(loc='lower right', fontsize=10)
-    plt.grid(alpha=0.3)
-    
-    plt.tight_layout()
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    import evaluation_plots
+    metrics = compute_metrics(y_true, np.argmax(y_pred_proba, axis=1), y_pred_proba)
+    evaluation_plots.render_roc_curves(
+        metrics['fpr'], metrics['tpr'], metrics['roc_auc'], list(STOP_TYPES.values()), save_path
+    )
     print(f"✅ ROC curves saved to {save_path}")
-    plt.close()
 
-def generate_summary_report(history, y_true, y_pred, save_path='results/summary_report.txt'):
-    """Generate text summary report"""
+def generate_summary_report(history, y_true, y_pred, save_path='results/summary_report.txt',
+                            model_path=None, tflite_results=None, metrics=None):
+    """Generate text summary report (from precomputed metrics when given)"""
+    if metrics is None:
+        metrics = compute_metrics(y_true, y_pred)
+    
     with open(save_path, 'w', encoding='utf-8') as f:
         f.write("="*70 + "\n")
         f.write("TRAVION - STOP CLASSIFICATION MODEL EVALUATION REPORT\n")
@@ -354,30 +476,55 @@ def generate_summary_report(history, y_true, y_pred, save_path='results/summary_
         # Training metrics
         f.write("TRAINING METRICS\n")
         f.write("-"*70 + "\n")
-        f.write(f"Final Training Accuracy:   {history.history['accuracy'][-1]:.4f}\n")
-        f.write(f"Final Validation Accuracy: {history.history['val_accuracy'][-1]:.4f}\n")
-        f.write(f"Final Training Loss:       {history.history['loss'][-1]:.4f}\n")
-        f.write(f"Final Validation Loss:     {history.history['val_loss'][-1]:.4f}\n")
-        f.write(f"Total Epochs:              {len(history.history['accuracy'])}\n\n")
+        if history is not None:
+            f.write(f"Final Training Accuracy:   {history.history['accuracy'][-1]:.4f}\n")
+            f.write(f"Final Validation Accuracy: {history.history['val_accuracy'][-1]:.4f}\n")
+            f.write(f"Final Training Loss:       {history.history['loss'][-1]:.4f}\n")
+            f.write(f"Final Validation Loss:     {history.history['val_loss'][-1]:.4f}\n")
+            f.write(f"Total Epochs:              {len(history.history['accuracy'])}\n\n")
+        else:
+            f.write("Not available (evaluated saved model artifacts)\n")
+            if model_path:
+                f.write(f"Model: {model_path}\n")
+            f.write("\n")
         
         # Test metrics
         f.write("TEST SET METRICS\n")
         f.write("-"*70 + "\n")
-        f.write(f"Test Accuracy: {accuracy_score(y_true, y_pred):.4f}\n\n")
+        f.write(f"Test Accuracy: {metrics['accuracy']:.4f}")
+        intervals = metrics.get('intervals')
+        if intervals is not None:
+            low, high = intervals['accuracy']
+            f.write(f"  ({intervals['confidence']:.0%} CI {low:.4f} - {high:.4f})")
+        f.write("\n\n")
         
         # Classification report
         f.write("DETAILED CLASSIFICATION REPORT\n")
         f.write("-"*70 + "\n")
-        report = classification_report(y_true, y_pred, 
-                                      target_names=list(STOP_TYPES.values()),
-                                      digits=4)
-        f.write(report)
+        f.write(format_classification_report(metrics, digits=4))
         f.write("\n")
         
+        if intervals is not None:
+            f.write(f"BOOTSTRAP {intervals['confidence']:.0%} CONFIDENCE INTERVALS "
+                    f"({intervals['n_resamples']:,} resamples)\n")
+            f.write("-"*70 + "\n")
+            f.write(f"{'':<16}{'precision':>18}{'recall':>18}{'f1-score':>18}\n")
+            for i, class_name in enumerate(STOP_TYPES.values()):
+                f.write(f"{class_name:<16}")
+                for name in ('precision', 'recall', 'f1'):
+                    low, high = intervals[name][i]
+                    f.write(f"{f'{low:.4f} - {high:.4f}':>18}")
+                f.write("\n")
+            f.write(f"{'weighted avg':<16}")
+            for name in ('weighted_precision', 'weighted_recall', 'weighted_f1'):
+                low, high = intervals[name]
+                f.write(f"{f'{low:.4f} - {high:.4f}':>18}")
+            f.write("\n\n")
+        
         # Confusion matrix
         f.write("CONFUSION MATRIX\n")
         f.write("-"*70 + "\n")
-        cm = confusion_matrix(y_true, y_pred)
+        cm = metrics['confusion_matrix']
         f.write("Predicted →\n")
         f.write("True ↓\n\n")
         
@@ -394,55 +541,40 @@ def generate_summary_report(history, y_true, y_pred, save_path='results/summary_
                 f.write(f"{cm[i][j]:>12}")
             f.write("\n")
         
+        # TFLite parity & latency
+        if tflite_results is not None:
+            f.write("\nTFLITE PARITY & LATENCY\n")
+            f.write("-"*70 + "\n")
+            f.write(f"Model:                   {tflite_results['tflite_path']} ({tflite_results['size_kb']:.2f} KB)\n")
+            f.write(f"Samples compared:        {tflite_results['n_samples']}\n")
+            f.write(f"Argmax agreement:        {tflite_results['argmax_agreement']:.4%}\n")
+            f.write(f"Prob drift mean:         {tflite_results['prob_drift_mean']:.6f}\n")
+            f.write(f"Prob drift p99 (row):    {tflite_results['prob_drift_p99']:.6f}\n")
+            f.write(f"Prob drift max:          {tflite_results['prob_drift_max']:.6f}\n")
+            f.write(f"Latency mean (batch 1):  {tflite_results['latency_ms_mean']:.4f} ms\n")
+            f.write(f"Latency p50 / p90 / p99: {tflite_results['latency_ms_p50']:.4f} / "
+                    f"{tflite_results['latency_ms_p90']:.4f} / {tflite_results['latency_ms_p99']:.4f} ms\n")
+            f.write(f"Throughput (batch 1):    {tflite_results['single_throughput_per_s']:,.0f} samples/s\n")
+            batch_note = (f"batch {tflite_results['batch_size']}" if tflite_results['batched_input']
+                          else "fixed batch, 1 per invoke")
+            f.write(f"Throughput ({batch_note}): {tflite_results['batched_throughput_per_s']:,.0f} samples/s\n")
+        
         f.write("\n" + "="*70 + "\n")
         f.write("Report generated successfully!\n")
         f.write("="*70 + "\n")
     
     print(f"✅ Summary report saved to {save_path}")
 
-def main():
-    """Main evaluation pipeline"""
-    print("="*70)
-    print("TRAVION - MODEL EVALUATION & METRICS GENERATION")
-    print("="*70)
-    
-    # Create results directory
-    os.makedirs('results', exist_ok=True)
-    
-    # Generate data
-    print("\n📊 Generating synthetic data...")
-    df = generate_synthetic_data(n_samples=10000)
-    
-    # Prepare features
-    feature_columns = ['dwell_time', 'speed_before', 'heading', 'visit_count', 'hour', 'day_of_week']
-    X = df[feature_columns].values
-    y = df['stop_type'].values
-    
-    # Split data
-    print("📊 Splitting data...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    X_train, X_val, y_train, y_val = train_test_split(
-        X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
-    )
-    
-    # Normalize
-    print("📊 Normalizing features...")
-    scaler = StandardScaler()
-    X_train = scaler.fit_transform(X_train)
-    X_val = scaler.transform(X_val)
-    X_test = scaler.transform(X_test)
-    
-    # Create and train model
-    print("🤖 Training model...")
-    model = create_model(X_train.shape[1], len(STOP_TYPES))
+def compile_model(model):
+    """Compile with the optimizer/loss used for training"""
     model.compile(
         optimizer=keras.optimizers.Adam(learning_rate=0.001),
         loss='sparse_categorical_crossentropy',
         metrics=['accuracy']
     )
-    
+
+def fit_model(model, X_train, y_train, X_val, y_val):
+    """Train with early stopping and LR reduction"""
     early_stopping = keras.callbacks.EarlyStopping(
         monitor='val_loss', patience=10, restore_best_weights=True
     )
@@ -450,7 +582,7 @@ def main():
         monitor='val_loss', factor=0.5, patience=5, min_lr=0.00001
     )
     
-    history = model.fit(
+    return model.fit(
         X_train, y_train,
         validation_data=(X_val, y_val),
         epochs=100,
@@ -458,22 +590,142 @@ def main():
         callbacks=[early_stopping, reduce_lr],
         verbose=1
     )
+
+def split_raw(df):
+    """Split into unscaled train/val/test sets"""
+    X = df[FEATURE_COLUMNS].values
+    y = df['stop_type'].values
+    
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=42, stratify=y_train
+    )
+    
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+def split_and_scale(df):
+    """Split into train/val/test and normalize features"""
+    X_train, X_val, X_test, y_train, y_val, y_test = split_raw(df)
+    
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_val = scaler.transform(X_val)
+    X_test = scaler.transform(X_test)
+    
+    return {
+        'X_train': X_train, 'X_val': X_val, 'X_test': X_test,
+        'y_train': y_train, 'y_val': y_val, 'y_test': y_test,
+        'scaler_mean': scaler.mean_, 'scaler_scale': scaler.scale_
+    }
+
+def main(n_samples=10000, seed=42, cache_dir=DEFAULT_CACHE_DIR, draft=False, workers=None,
+         n_bootstrap=1000, fuse_scaler=False):
+    """
+    Main evaluation pipeline
+    
+    fuse_scaler=True checks parity against a TFLite export with the scaler
+    fused in (fed raw features), as train_stop_classifier.py --fuse-scaler ships it.
+    """
+    print("="*70)
+    print("TRAVION - MODEL EVALUATION & METRICS GENERATION")
+    print("="*70)
+    
+    # Create results directory
+    os.makedirs('results', exist_ok=True)
+    cache = ArtifactCache(cache_dir)
+    
+    # Generate data, split and normalize (skipped on a cache hit)
+    dataset_key = cache.key(generate_synthetic_data, n_samples=n_samples, seed=seed)
+    splits_key = cache.key(dataset_key, split_and_scale)
+    
+    def build_splits():
+        print("\n📊 Generating synthetic data...")
+        df = cache.fetch('dataset', dataset_key, 'dataset.pkl',
+                         lambda: generate_synthetic_data(n_samples=n_samples, seed=seed))
+        print("📊 Splitting and normalizing...")
+        return split_and_scale(df)
+    
+    splits = cache.fetch('splits+scaler', splits_key, 'splits.npz', build_splits)
+    X_train, X_val, X_test = splits['X_train'], splits['X_val'], splits['X_test']
+    y_train, y_val, y_test = splits['y_train'], splits['y_val'], splits['y_test']
+    
+    # Create and train model (skipped on a cache hit)
+    print("🤖 Training model...")
+    model = create_model(X_train.shape[1], len(STOP_TYPES))
+    compile_model(model)
+    
+    weights_key = cache.key(splits_key, create_model, compile_model, fit_model)
+    if cache.has(weights_key, 'model.weights.h5') and cache.has(weights_key, 'history.json'):
+        cache.record('weights', True)
+        model.load_weights(cache.path(weights_key, 'model.weights.h5'))
+        history = SimpleNamespace(history=cache.load(weights_key, 'history.json'))
+    else:
+        history = fit_model(model, X_train, y_train, X_val, y_val)
+        cache.save(weights_key, 'model.weights.h5', model, save=lambda m, p: m.save_weights(p))
+        cache.save(weights_key, 'history.json',
+                   {k: [float(v) for v in values] for k, values in history.history.items()})
+        cache.record('weights', False)
     
     # Predictions
     print("\n🔮 Generating predictions...")
     y_pred_proba = model.predict(X_test)
     y_pred = np.argmax(y_pred_proba, axis=1)
     
-    # Generate all visualizations
+    # TFLite parity & latency on a conversion of the model just evaluated
+    scaler_params = {'mean': splits['scaler_mean'].tolist(), 'scale': splits['scaler_scale'].tolist()}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tflite_path = os.path.join(tmp_dir, 'stop_classifier.tflite')
+        convert_to_tflite(model, tflite_path, scaler_params=scaler_params if fuse_scaler else None)
+        tflite_X = X_test * splits['scaler_scale'] + splits['scaler_mean'] if fuse_scaler else None
+        tflite_results = evaluate_tflite_parity(tflite_path, model, X_test, tflite_X=tflite_X)
+    tflite_results['tflite_path'] = 'converted from evaluated model (float16)'
+    
+    generate_reports(history, y_test, y_pred, y_pred_proba, tflite_results=tflite_results,
+                     draft=draft, workers=workers, n_bootstrap=n_bootstrap)
+    
+    cache.print_summary()
+    print_final_accuracy(y_test, y_pred)
+
+def generate_reports(history, y_test, y_pred, y_pred_proba, model_path=None, tflite_results=None,
+                     draft=False, workers=None, metrics=None, n_bootstrap=1000):
+    """
+    Render all plots, the metrics table and the summary report
+    
+    Metrics are computed once here (or passed in, e.g. from StreamingMetrics,
+    in which case the label/prediction arrays may be None); figures are
+    rendered in parallel worker processes (Agg backend) that only receive the
+    metric arrays. draft=True renders low-DPI SVGs for quick iteration.
+    n_bootstrap resamples (0 to skip) give 95% confidence intervals.
+    """
+    # Plotting is imported here so the rest of this module stays matplotlib-free
+    import evaluation_plots
     print("\n📈 Generating visualizations...")
     print("-"*70)
     
-    plot_training_history(history)
-    plot_confusion_matrix(y_test, y_pred)
-    plot_classification_metrics(y_test, y_pred)
-    metrics_df = create_metrics_table(y_test, y_pred)
-    plot_roc_curves(y_test, y_pred_proba)
-    generate_summary_report(history, y_test, y_pred)
+    if metrics is None:
+        metrics = compute_metrics(y_test, y_pred, y_pred_proba)
+    if n_bootstrap:
+        if y_test is not None:
+            metrics['intervals'] = bootstrap_intervals(y_test, y_pred, n_resamples=n_bootstrap)
+        else:
+            metrics['intervals'] = bootstrap_intervals(confusion=metrics['confusion_matrix'],
+                                                       n_resamples=n_bootstrap)
+    metrics_df = metrics_table_frame(metrics)
+    
+    start = time.perf_counter()
+    rendered = evaluation_plots.render_figures(
+        figure_inputs(history, metrics), results_dir='results', draft=draft, workers=workers
+    )
+    total_seconds = time.perf_counter() - start
+    for name, path, seconds in rendered:
+        print(f"✅ {name:<24} {seconds:6.2f}s  → {path}")
+    print(f"   {len(rendered)} figures in {total_seconds:.2f}s wall time "
+          f"({sum(r[2] for r in rendered):.2f}s summed render time)")
+    
+    generate_summary_report(history, y_test, y_pred, model_path=model_path,
+                            tflite_results=tflite_results, metrics=metrics)
     
     # Print metrics table to console
     print("\n📊 METRICS TABLE:")
@@ -482,21 +734,323 @@ def main():
     print("-"*70)
     
     # Final summary
+    ext = 'svg' if draft else 'png'
     print("\n✅ EVALUATION COMPLETE!")
     print("="*70)
     print("\n📁 All results saved to 'results/' directory:")
-    print("   • training_history.png     - Accuracy & Loss curves")
-    print("   • confusion_matrix.png     - Confusion matrix heatmap")
-    print("   • classification_metrics.png - Precision/Recall/F1 graphs")
-    print("   • metrics_table.png        - Detailed metrics table")
-    print("   • roc_curves.png          - ROC curves for all classes")
+    if history is not None:
+        print(f"   • training_history.{ext}     - Accuracy & Loss curves")
+    print(f"   • confusion_matrix.{ext}     - Confusion matrix heatmap")
+    print(f"   • classification_metrics.{ext} - Precision/Recall/F1 graphs")
+    print(f"   • metrics_table.{ext}        - Detailed metrics table")
+    print(f"   • roc_curves.{ext}          - ROC curves for all classes")
     print("   • summary_report.txt      - Complete text report")
     print("="*70)
-    
-    # Test set accuracy
-    test_accuracy = accuracy_score(y_test, y_pred)
+
+def print_final_accuracy(y_test, y_pred, test_accuracy=None):
+    """Print the headline test accuracy"""
+    if test_accuracy is None:
+        test_accuracy = accuracy_score(y_test, y_pred)
     print(f"\n🎯 Final Test Accuracy: {test_accuracy:.2%}")
     print("="*70)
 
+def load_test_set(test_set_path=None, cache=None, n_samples=10000, seed=42):
+    """
+    Load an unscaled test set
+    
+    test_set_path may be a .npz (X_test, y_test) or a CSV with the feature
+    columns and 'stop_type'. Without a path, the test split of the (cached)
+    synthetic dataset is used - the same rows main() evaluates on.
+    """
+    if test_set_path is not None:
+        if test_set_path.endswith('.npz'):
+            with np.load(test_set_path) as data:
+                return data['X_test'], data['y_test']
+        df = pd.read_csv(test_set_path)
+        return df[FEATURE_COLUMNS].values, df['stop_type'].values
+    
+    cache = cache or ArtifactCache()
+    dataset_key = cache.key(generate_synthetic_data, n_samples=n_samples, seed=seed)
+    df = cache.fetch('dataset', dataset_key, 'dataset.pkl',
+                     lambda: generate_synthetic_data(n_samples=n_samples, seed=seed))
+    _, _, X_test, _, _, y_test = split_raw(df)
+    return X_test, y_test
+
+def supports_batched_input(interpreter):
+    """True if the model's batch dimension is dynamic (-1 in shape_signature)"""
+    signature = interpreter.get_input_details()[0].get('shape_signature')
+    return signature is not None and len(signature) > 0 and signature[0] == -1
+
+def predict_tflite_batched(tflite_path, X, batch_size=1024):
+    """
+    Run a TFLite model over X in batches by resizing the input tensor
+    
+    Falls back to one sample per invocation if the batch dimension is fixed.
+    """
+    return predict_interpreter_batched(tf.lite.Interpreter(model_path=tflite_path), X, batch_size)
+
+def predict_interpreter_batched(interpreter, X, batch_size=1024):
+    """predict_tflite_batched() on an existing interpreter, so it can be reused across calls"""
+    input_index = interpreter.get_input_details()[0]['index']
+    output_index = interpreter.get_output_details()[0]['index']
+    X = np.asarray(X, dtype=np.float32)
+    
+    if not supports_batched_input(interpreter):
+        batch_size = 1
+    
+    outputs = []
+    current_batch = None
+    for start in range(0, len(X), batch_size):
+        batch = X[start:start + batch_size]
+        if len(batch) != current_batch:
+            interpreter.resize_tensor_input(input_index, batch.shape)
+            interpreter.allocate_tensors()
+            current_batch = len(batch)
+        interpreter.set_tensor(input_index, batch)
+        interpreter.invoke()
+        outputs.append(interpreter.get_tensor(output_index).copy())
+    
+    return np.concatenate(outputs)
+
+def measure_tflite_latency(tflite_path, X, n_single=1000, batch_size=1024):
+    """
+    Per-invocation latency percentiles (batch of 1) and batched throughput
+    """
+    interpreter = tf.lite.Interpreter(model_path=tflite_path)
+    interpreter.allocate_tensors()
+    input_index = interpreter.get_input_details()[0]['index']
+    X = np.asarray(X, dtype=np.float32)
+    
+    # Single-sample latency, as the app calls it once per detected stop
+    samples = X[:n_single]
+    latencies = np.empty(len(samples))
+    for i in range(len(samples)):
+        interpreter.set_tensor(input_index, samples[i:i + 1])
+        start = time.perf_counter()
+        interpreter.invoke()
+        latencies[i] = time.perf_counter() - start
+    latencies_ms = latencies * 1000
+    
+    # Batched throughput over the full set
+    start = time.perf_counter()
+    predict_tflite_batched(tflite_path, X, batch_size)
+    batched_seconds = time.perf_counter() - start
+    
+    return {
+        'latency_ms_mean': float(latencies_ms.mean()),
+        'latency_ms_p50': float(np.percentile(latencies_ms, 50)),
+        'latency_ms_p90': float(np.percentile(latencies_ms, 90)),
+        'latency_ms_p99': float(np.percentile(latencies_ms, 99)),
+        'single_throughput_per_s': float(len(samples) / latencies.sum()),
+        'batched_throughput_per_s': float(len(X) / batched_seconds),
+        'batched_input': supports_batched_input(interpreter),
+        'batch_size': batch_size
+    }
+
+def evaluate_tflite_parity(tflite_path, keras_model, X_test, batch_size=1024, tflite_X=None):
+    """
+    Compare TFLite outputs against Keras and measure interpreter speed
+    
+    tflite_X holds the same rows in the TFLite model's input space when it
+    differs from the Keras model's (raw features for a fused model).
+    Returns argmax agreement, probability drift and latency/throughput.
+    """
+    print(f"\n⚖️  Checking TFLite parity: {tflite_path}")
+    X_test = np.asarray(X_test, dtype=np.float32)
+    tflite_X = X_test if tflite_X is None else np.asarray(tflite_X, dtype=np.float32)
+    keras_proba = keras_model.predict(X_test, batch_size=batch_size, verbose=0)
+    tflite_proba = predict_tflite_batched(tflite_path, tflite_X, batch_size)
+    
+    drift = np.abs(keras_proba - tflite_proba)
+    results = {
+        'tflite_path': tflite_path,
+        'size_kb': os.path.getsize(tflite_path) / 1024,
+        'n_samples': len(X_test),
+        'argmax_agreement': float(np.mean(keras_proba.argmax(axis=1) == tflite_proba.argmax(axis=1))),
+        'prob_drift_mean': float(drift.mean()),
+        'prob_drift_p99': float(np.percentile(drift.max(axis=1), 99)),
+        'prob_drift_max': float(drift.max())
+    }
+    results.update(measure_tflite_latency(tflite_path, tflite_X, batch_size=batch_size))
+    
+    print(f"   Argmax agreement:   {results['argmax_agreement']:.4%}")
+    print(f"   Max prob drift:     {results['prob_drift_max']:.6f}")
+    print(f"   Latency p50 / p99:  {results['latency_ms_p50']:.4f} / {results['latency_ms_p99']:.4f} ms")
+    print(f"   Throughput:         {results['batched_throughput_per_s']:,.0f} samples/s (batched)")
+    
+    return results
+
+def model_inputs(X, scaler_params, model_path):
+    """
+    Features in the input space of model_path
+    
+    Only an exported TFLite model can have the scaler fused in; the saved .h5
+    is always the unfused model and takes scaled features.
+    """
+    if model_path.endswith('.tflite') and scaler_params.get('normalization_fused', False):
+        return np.asarray(X, dtype=np.float32)
+    return ((X - np.array(scaler_params['mean'])) / np.array(scaler_params['scale'])).astype(np.float32)
+
+def evaluate_artifacts(model_path='stop_classifier_full.h5', scaler_path='scaler_params.json',
+                       test_set_path=None, batch_size=1024, n_samples=10000, seed=42,
+                       cache_dir=DEFAULT_CACHE_DIR, tflite_path='stop_classifier.tflite',
+                       draft=False, workers=None, n_bootstrap=1000):
+    """
+    Evaluate a saved Keras (.h5) or TFLite model without retraining
+    
+    Loads the model and scaler, runs batched inference on the test set and
+    feeds the same plots and reports as main(). When a Keras model is
+    evaluated and tflite_path exists, TFLite parity/latency is added too.
+    """
+    print("="*70)
+    print("TRAVION - SAVED MODEL EVALUATION")
+    print("="*70)
+    
+    os.makedirs('results', exist_ok=True)
+    cache = ArtifactCache(cache_dir)
+    
+    print("\n📊 Loading test set...")
+    X_test, y_test = load_test_set(test_set_path, cache, n_samples, seed)
+    print(f"   {len(X_test)} samples")
+    
+    with open(scaler_path) as f:
+        scaler_params = json.load(f)
+    X_model = model_inputs(X_test, scaler_params, model_path)
+    
+    print(f"\n🔮 Running inference with {model_path}...")
+    tflite_results = None
+    if model_path.endswith('.tflite'):
+        y_pred_proba = predict_tflite_batched(model_path, X_model, batch_size)
+    else:
+        model = keras.models.load_model(model_path, compile=False)
+        y_pred_proba = model.predict(X_model, batch_size=batch_size, verbose=0)
+        if tflite_path and os.path.exists(tflite_path):
+            tflite_results = evaluate_tflite_parity(
+                tflite_path, model, X_model, batch_size,
+                tflite_X=model_inputs(X_test, scaler_params, tflite_path)
+            )
+    
+    # The shipped model also has an 'unknown' output that never appears in the
+    # evaluation labels; keep the classes the plots and reports know about
+    y_pred_proba = y_pred_proba[:, :len(STOP_TYPES)]
+    y_pred_proba = y_pred_proba / y_pred_proba.sum(axis=1, keepdims=True)
+    y_pred = np.argmax(y_pred_proba, axis=1)
+    
+    generate_reports(None, y_test, y_pred, y_pred_proba, model_path=model_path,
+                     tflite_results=tflite_results, draft=draft, workers=workers,
+                     n_bootstrap=n_bootstrap)
+    
+    cache.print_summary()
+    print_final_accuracy(y_test, y_pred)
+
+def iter_test_chunks(test_set_path=None, chunk_size=100000, cache=None, n_samples=10000, seed=42):
+    """
+    Yield unscaled (X, y) test chunks
+    
+    CSVs are read incrementally, so a CSV test set never has to fit in
+    memory (.npz archives are loaded whole, then sliced). Without a path, the
+    cached synthetic test split is sliced into chunks.
+    """
+    if test_set_path is not None and test_set_path.endswith('.csv'):
+        for df in pd.read_csv(test_set_path, chunksize=chunk_size):
+            yield df[FEATURE_COLUMNS].values, df['stop_type'].values
+        return
+    
+    X, y = load_test_set(test_set_path, cache, n_samples, seed)
+    
+    for start in range(0, len(X), chunk_size):
+        yield np.asarray(X[start:start + chunk_size]), np.asarray(y[start:start + chunk_size])
+
+def iter_prediction_chunks(model_path, scaler_params, test_chunks, batch_size=1024):
+    """
+    Yield (y_true, y_pred_proba) for each test chunk
+    
+    The model (or TFLite interpreter) is loaded once; inputs are scaled per
+    model_inputs() and probabilities are trimmed to the evaluated classes the
+    same way evaluate_artifacts() does.
+    """
+    if model_path.endswith('.tflite'):
+        interpreter = tf.lite.Interpreter(model_path=model_path)
+        predict = lambda X: predict_interpreter_batched(interpreter, X, batch_size)
+    else:
+        model = keras.models.load_model(model_path, compile=False)
+        predict = lambda X: model.predict(X, batch_size=batch_size, verbose=0)
+    
+    for X, y in test_chunks:
+        y_pred_proba = predict(model_inputs(X, scaler_params, model_path))[:, :len(STOP_TYPES)]
+        yield y, y_pred_proba / y_pred_proba.sum(axis=1, keepdims=True)
+
+def evaluate_stream(model_path='stop_classifier_full.h5', scaler_path='scaler_params.json',
+                    test_set_path=None, chunk_size=100000, batch_size=1024, n_bins=1000,
+                    n_samples=10000, seed=42, cache_dir=DEFAULT_CACHE_DIR,
+                    draft=False, workers=None, n_bootstrap=1000):
+    """
+    Evaluate a saved model on an arbitrarily large test set in constant memory
+    
+    Predictions are consumed chunk by chunk by StreamingMetrics; the plots
+    and report are the same as evaluate_artifacts(), with ROC/AUC
+    approximated on n_bins score thresholds. TFLite parity is skipped since
+    it needs the full probability arrays.
+    """
+    print("="*70)
+    print("TRAVION - STREAMING MODEL EVALUATION")
+    print("="*70)
+    
+    os.makedirs('results', exist_ok=True)
+    cache = ArtifactCache(cache_dir)
+    
+    with open(scaler_path) as f:
+        scaler_params = json.load(f)
+    
+    print(f"\n🔮 Streaming predictions from {model_path} in chunks of {chunk_size:,}...")
+    start = time.perf_counter()
+    test_chunks = iter_test_chunks(test_set_path, chunk_size, cache, n_samples, seed)
+    accumulator = accumulate_metrics(
+        iter_prediction_chunks(model_path, scaler_params, test_chunks, batch_size), n_bins
+    )
+    elapsed = time.perf_counter() - start
+    print(f"   {accumulator.n_rows:,} samples in {elapsed:.1f}s "
+          f"({accumulator.n_rows / max(elapsed, 1e-9):,.0f} samples/s)")
+    
+    metrics = accumulator.result()
+    generate_reports(None, None, None, None, model_path=model_path,
+                     draft=draft, workers=workers, metrics=metrics, n_bootstrap=n_bootstrap)
+    
+    cache.print_summary()
+    print_final_accuracy(None, None, test_accuracy=metrics['accuracy'])
+
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Evaluate the stop classifier')
+    parser.add_argument('--from-artifacts', action='store_true',
+                        help='Evaluate saved model files instead of retraining')
+    parser.add_argument('--model', default='stop_classifier_full.h5', help='.h5 or .tflite model')
+    parser.add_argument('--scaler', default='scaler_params.json')
+    parser.add_argument('--test-set', default=None, help='.npz (X_test, y_test) or CSV; default: cached synthetic split')
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--tflite', default='stop_classifier.tflite',
+                        help='TFLite model to check against the Keras model (parity + latency)')
+    parser.add_argument('--stream', action='store_true',
+                        help='With --from-artifacts: constant-memory chunked evaluation for huge test sets')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--fuse-scaler', action='store_true',
+                        help='Check parity against a TFLite export with the scaler fused in')
+    parser.add_argument('--draft', action='store_true',
+                        help='Fast low-DPI SVG figures instead of 300 dpi PNGs')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Figure rendering processes (1 = render serially)')
+    parser.add_argument('--bootstrap', type=int, default=1000,
+                        help='Bootstrap resamples for 95%% confidence intervals (0 = off)')
+    args = parser.parse_args()
+    
+    if args.from_artifacts and args.stream:
+        evaluate_stream(args.model, args.scaler, args.test_set, args.chunk_size, args.batch_size,
+                        draft=args.draft, workers=args.workers, n_bootstrap=args.bootstrap)
+    elif args.from_artifacts:
+        evaluate_artifacts(args.model, args.scaler, args.test_set, args.batch_size,
+                           tflite_path=args.tflite, draft=args.draft, workers=args.workers,
+                           n_bootstrap=args.bootstrap)
+    else:
+        main(draft=args.draft, workers=args.workers, n_bootstrap=args.bootstrap,
+             fuse_scaler=args.fuse_scaler)
@@ -0,0 +1,252 @@
+"""
+Evaluation Figure Rendering
+
+Matplotlib/seaborn renderers for the evaluation figures. They take only
+precomputed metric arrays (no model, no raw predictions), so they can run
+in worker processes that never import TensorFlow or scikit-learn.
+
+    evaluate_model.generate_reports
+        ↓ compute metrics once
+    render_figures(figures)  →  process pool (Agg backend)
+        ↓
+    training_history / confusion_matrix / classification_metrics /
+    metrics_table / roc_curves  (PNG @ 300 dpi, or SVG in draft mode)
+"""
+
+import matplotlib
+matplotlib.use('Agg')  # Headless: figures are only ever saved to disk
+
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import time
+
+# Set style for better-looking plots
+plt.style.use('seaborn-v0_8-darkgrid')
+sns.set_palette("husl")
+
+FINAL_DPI = 300
+DRAFT_DPI = 72
+
+def render_training_history(history, save_path, dpi=FINAL_DPI):
+    """Plot training and validation accuracy/loss from a history dict"""
+    fig, axes = plt.subplots(1, 2, figsize=(15, 5))
+
+    # Accuracy plot
+    axes[0].plot(history['accuracy'], label='Training Accuracy', linewidth=2)
+    axes[0].plot(history['val_accuracy'], label='Validation Accuracy', linewidth=2)
+    axes[0].set_title('Model Accuracy Over Epochs', fontsize=14, fontweight='bold')
+    axes[0].set_xlabel('Epoch', fontsize=12)
+    axes[0].set_ylabel('Accuracy', fontsize=12)
+    axes[0].legend(loc='lower right', fontsize=10)
+    axes[0].grid(True, alpha=0.3)
+
+    # Loss plot
+    axes[1].plot(history['loss'], label='Training Loss', linewidth=2)
+    axes[1].plot(history['val_loss'], label='Validation Loss', linewidth=2)
+    axes[1].set_title('Model Loss Over Epochs', fontsize=14, fontweight='bold')
+    axes[1].set_xlabel('Epoch', fontsize=12)
+    axes[1].set_ylabel('Loss', fontsize=12)
+    axes[1].legend(loc='upper right', fontsize=10)
+    axes[1].grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+def render_confusion_matrix(cm, accuracy, class_names, save_path, dpi=FINAL_DPI):
+    """Plot confusion matrix heatmap"""
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
+                xticklabels=class_names,
+                yticklabels=class_names,
+                cbar_kws={'label': 'Count'},
+                linewidths=0.5, linecolor='gray')
+
+    plt.title('Confusion Matrix - Stop Classification', fontsize=16, fontweight='bold', pad=20)
+    plt.ylabel('True Label', fontsize=12, fontweight='bold')
+    plt.xlabel('Predicted Label', fontsize=12, fontweight='bold')
+    plt.xticks(rotation=45, ha='right')
+    plt.yticks(rotation=0)
+
+    # Add accuracy annotation
+    plt.text(0.5, -0.15, f'Overall Accuracy: {accuracy:.2%}',
+             ha='center', transform=plt.gca().transAxes,
+             fontsize=12, bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+
+    plt.tight_layout()
+    plt.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+def _metric_bars(ax, x_pos, values, classes, title, ylabel, color, edgecolor):
+    """One per-class bar chart with value labels"""
+    bars = ax.bar(x_pos, values, color=color, edgecolor=edgecolor, linewidth=1.5)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.set_xticks(x_pos)
+    ax.set_xticklabels(classes, rotation=45, ha='right')
+    ax.set_ylim([0, 1.1])
+    ax.grid(axis='y', alpha=0.3)
+    for i, bar in enumerate(bars):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'{values[i]:.3f}', ha='center', va='bottom', fontweight='bold')
+
+def render_classification_metrics(precision, recall, f1, class_names, save_path, dpi=FINAL_DPI):
+    """Plot precision, recall, F1-score as bar charts"""
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+
+    classes = list(class_names)
+    x_pos = np.arange(len(classes))
+
+    _metric_bars(axes[0, 0], x_pos, precision, classes, 'Precision by Class', 'Precision',
+                 'skyblue', 'navy')
+    _metric_bars(axes[0, 1], x_pos, recall, classes, 'Recall by Class', 'Recall',
+                 'lightcoral', 'darkred')
+    _metric_bars(axes[1, 0], x_pos, f1, classes, 'F1-Score by Class', 'F1-Score',
+                 'lightgreen', 'darkgreen')
+
+    # Combined comparison
+    width = 0.25
+    axes[1, 1].bar(x_pos - width, precision, width, label='Precision',
+                   color='skyblue', edgecolor='navy', linewidth=1.5)
+    axes[1, 1].bar(x_pos, recall, width, label='Recall',
+                   color='lightcoral', edgecolor='darkred', linewidth=1.5)
+    axes[1, 1].bar(x_pos + width, f1, width, label='F1-Score',
+                   color='lightgreen', edgecolor='darkgreen', linewidth=1.5)
+    axes[1, 1].set_title('Combined Metrics Comparison', fontsize=14, fontweight='bold')
+    axes[1, 1].set_ylabel('Score', fontsize=12)
+    axes[1, 1].set_xticks(x_pos)
+    axes[1, 1].set_xticklabels(classes, rotation=45, ha='right')
+    axes[1, 1].set_ylim([0, 1.1])
+    axes[1, 1].legend(loc='upper right', fontsize=10)
+    axes[1, 1].grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+def render_metrics_table(columns, rows, save_path, dpi=FINAL_DPI, subtitle=None):
+    """Render a metrics table (header + rows, last row highlighted) as an image"""
+    # Cells holding confidence intervals need a wider figure
+    wide = any('[' in str(value) for row in rows for value in row)
+    fig, ax = plt.subplots(figsize=(20 if wide else 14, 8))
+    ax.axis('tight')
+    ax.axis('off')
+
+    # First column holds class names, the rest share the remaining width
+    first = 0.16 if wide else 0.25
+    col_widths = [first] + [(1 - first) / (len(columns) - 1)] * (len(columns) - 1)
+    table = ax.table(cellText=rows, colLabels=columns,
+                     cellLoc='center', loc='center',
+                     colWidths=col_widths)
+
+    table.auto_set_font_size(False)
+    table.set_fontsize(11)
+    table.scale(1, 2.5)
+
+    # Style header
+    for i in range(len(columns)):
+        cell = table[(0, i)]
+        cell.set_facecolor('#4CAF50')
+        cell.set_text_props(weight='bold', color='white', fontsize=12)
+
+    # Style rows
+    for i in range(1, len(rows) + 1):
+        for j in range(len(columns)):
+            cell = table[(i, j)]
+            if i == len(rows):  # Last row (average)
+                cell.set_facecolor('#FFF9C4')
+                cell.set_text_props(weight='bold')
+            elif i % 2 == 0:
+                cell.set_facecolor('#E8F5E9')
+            else:
+                cell.set_facecolor('#FFFFFF')
+
+    plt.title('Detailed Classification Metrics Table',
+              fontsize=16, fontweight='bold', pad=20)
+    if subtitle:
+        fig.text(0.5, 0.08, subtitle, ha='center', fontsize=11, style='italic')
+
+    plt.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+def render_roc_curves(fpr, tpr, roc_auc, class_names, save_path, dpi=FINAL_DPI):
+    """Plot ROC curves for each class from precomputed curve points"""
+    n_classes = len(class_names)
+
+    plt.figure(figsize=(12, 8))
+    colors = plt.cm.Set3(np.linspace(0, 1, n_classes))
+
+    for i, color in enumerate(colors):
+        plt.plot(fpr[i], tpr[i], color=color, lw=2.5,
+                label=f'{class_names[i]} (AUC = {roc_auc[i]:.3f})')
+
+    plt.plot([0, 1], [0, 1], 'k--', lw=2, label='Random Classifier')
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('False Positive Rate', fontsize=12, fontweight='bold')
+    plt.ylabel('True Positive Rate', fontsize=12, fontweight='bold')
+    plt.title('ROC Curves - Multi-class Classification', fontsize=16, fontweight='bold')
+    plt.legend(loc='lower right', fontsize=10)
+    plt.grid(alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+
+RENDERERS = {
+    'training_history': render_training_history,
+    'confusion_matrix': render_confusion_matrix,
+    'classification_metrics': render_classification_metrics,
+    'metrics_table': render_metrics_table,
+    'roc_curves': render_roc_curves,
+}
+
+def render_figure(task):
+    """
+    Render one figure; task = (figure name, save_path, dpi, kwargs)
+
+    Returns (figure name, save_path, seconds). Module-level so it can be
+    sent to worker processes.
+    """
+    name, save_path, dpi, kwargs = task
+    start = time.perf_counter()
+    RENDERERS[name](save_path=save_path, dpi=dpi, **kwargs)
+    return name, save_path, time.perf_counter() - start
+
+def render_figures(figures, results_dir='results', draft=False, workers=None):
+    """
+    Render several figures, in parallel when workers != 1
+
+    Args:
+        figures: {figure name: renderer kwargs (metric arrays only)}
+        draft: lower DPI + SVG (vector) output for quick iteration
+        workers: process count (default: one per figure, capped at CPU count)
+
+    Returns:
+        list of (figure name, save_path, seconds) in the order given
+    """
+    extension = 'svg' if draft else 'png'
+    dpi = DRAFT_DPI if draft else FINAL_DPI
+    tasks = [
+        (name, os.path.join(results_dir, f'{name}.{extension}'), dpi, kwargs)
+        for name, kwargs in figures.items()
+    ]
+
+    if workers is None:
+        workers = min(len(tasks), os.cpu_count() or 1)
+
+    if workers <= 1:
+        return [render_figure(task) for task in tasks]
+
+    # Fork where available: a spawned worker would re-import the calling
+    # script (and TensorFlow with it) before it could draw anything. Workers
+    # only touch matplotlib, which is already on the Agg backend here.
+    start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(start_method)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(render_figure, tasks))
@@ -0,0 +1,384 @@
+"""
+GPS Trace → Stop Event Feature Extraction
+
+Turns recorded GPS logs into the six features the stop classifier expects,
+so it can be trained on real trips instead of only synthetic data.
+
+    GPS fixes (CSV / NDJSON, read in chunks)
+        ↓
+    Stopped? (speed < 2 km/h, same rule as the detector architecture)
+        ↓
+    Run-length segmentation (vectorized, no per-fix Python loop)
+        ↓
+    Per stop event: dwell_time, speed_before, heading, visit_count,
+                    hour, day_of_week (+ lat/lon, vehicle, label)
+        ↓
+    Feature shards (stop_features_00000.csv, ...) ready for train_model
+
+Memory stays constant in the number of fixes: each chunk is processed with
+NumPy and only the open stop (plus a few fixes of context for speed_before)
+is carried into the next chunk.
+
+Input columns:
+    timestamp            unix seconds/ms or ISO-8601 string (required)
+    latitude, longitude  degrees (required)
+    speed                km/h (optional - derived from positions if absent)
+    heading              degrees (optional - derived from positions if absent)
+    vehicle_id           (optional - logs must be sorted by vehicle, then time)
+    stop_type            label id or name (optional - copied to shards)
+
+Usage:
+    python gps_trace_processor.py trips.csv more_trips.ndjson --output-dir stop_features
+"""
+
+import numpy as np
+import pandas as pd
+import argparse
+import glob
+import os
+
+# Must match train_stop_classifier.FEATURE_COLUMNS (kept local so this
+# script does not import TensorFlow)
+FEATURE_COLUMNS = ['dwell_time', 'speed_before', 'heading', 'visit_count', 'hour', 'day_of_week']
+
+STOP_TYPE_IDS = {
+    'traffic_signal': 0,
+    'toll_gate': 1,
+    'regular_stop': 2,
+    'gas_station': 3,
+    'rest_area': 4,
+    'unknown': 5
+}
+
+STOP_SPEED_KMH = 2.0
+MIN_DWELL_SECONDS = 10
+SPEED_BEFORE_FIXES = 10  # moving fixes averaged for speed_before
+VISIT_CELL_DEGREES = 0.0005  # ~50 m grid for visit counting
+
+EARTH_RADIUS_KM = 6371
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized haversine distance in kilometers"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def _bearing_deg(lat1, lon1, lat2, lon2):
+    """Vectorized initial bearing in degrees [0, 360)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+def _to_seconds(timestamps):
+    """Parse a timestamp column into float unix seconds"""
+    if pd.api.types.is_numeric_dtype(timestamps):
+        ts = timestamps.to_numpy(dtype=np.float64)
+        # Millisecond epochs are > 1e12 for any date after 2001
+        return np.where(ts > 1e12, ts / 1000.0, ts)
+    parsed = pd.to_datetime(timestamps, utc=True)
+    return parsed.astype('int64').to_numpy() / 1e9
+
+def _labels_to_ids(labels):
+    """Map label names to STOP_TYPES ids, pass numeric ids through"""
+    if pd.api.types.is_numeric_dtype(labels):
+        return labels.to_numpy(dtype=np.float64)
+    return labels.map(STOP_TYPE_IDS).to_numpy(dtype=np.float64)
+
+def read_trace_chunks(path, chunk_size=500000):
+    """
+    Yield DataFrame chunks from a CSV or NDJSON (optionally gzipped) log
+    """
+    stem = path[:-3] if path.endswith('.gz') else path
+    if stem.endswith(('.ndjson', '.jsonl', '.json')):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_size)
+
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+class StopEventExtractor:
+    """
+    Stateful, chunk-at-a-time stop segmentation
+
+    Call process() for each chunk and flush() at the end of the stream.
+    Only the open stop run and SPEED_BEFORE_FIXES rows of context are
+    kept between chunks.
+    """
+
+    def __init__(self, stop_speed_kmh=STOP_SPEED_KMH, min_dwell_seconds=MIN_DWELL_SECONDS,
+                 speed_before_fixes=SPEED_BEFORE_FIXES, visit_cell_degrees=VISIT_CELL_DEGREES,
+                 timezone=None):
+        self.stop_speed_kmh = stop_speed_kmh
+        self.min_dwell_seconds = min_dwell_seconds
+        self.speed_before_fixes = speed_before_fixes
+        self.visit_cell_degrees = visit_cell_degrees
+        self.timezone = timezone
+
+        self._tail = None          # arrays carried into the next chunk
+        self._tail_context = 0     # leading tail rows that belong to already-emitted runs
+        self._visits = {}          # grid cell -> number of stop events seen
+        self.fixes_processed = 0
+
+    def _chunk_arrays(self, chunk):
+        """Convert a raw chunk into the column arrays used internally"""
+        n = len(chunk)
+        arrays = {
+            'ts': _to_seconds(chunk['timestamp']),
+            'lat': chunk['latitude'].to_numpy(dtype=np.float64),
+            'lon': chunk['longitude'].to_numpy(dtype=np.float64),
+            'speed': (chunk['speed'].to_numpy(dtype=np.float64)
+                      if 'speed' in chunk else np.full(n, np.nan)),
+            'heading': (chunk['heading'].to_numpy(dtype=np.float64)
+                        if 'heading' in chunk else np.full(n, np.nan)),
+            'vehicle': (chunk['vehicle_id'].astype(str).to_numpy()
+                        if 'vehicle_id' in chunk else np.full(n, '', dtype=object)),
+            'label': (_labels_to_ids(chunk['stop_type'])
+                      if 'stop_type' in chunk else np.full(n, np.nan))
+        }
+        arrays['vehicle'] = arrays['vehicle'].astype(object)
+        return arrays
+
+    def process(self, chunk, final=False):
+        """
+        Segment one chunk and return the stop events it closes as a DataFrame
+        """
+        a = self._chunk_arrays(chunk) if chunk is not None else None
+        self.fixes_processed += 0 if a is None else len(a['ts'])
+
+        if self._tail is not None:
+            a = self._tail if a is None else {k: np.concatenate([self._tail[k], a[k]]) for k in a}
+        if a is None or len(a['ts']) == 0:
+            return self._empty_events()
+
+        n = len(a['ts'])
+        idx = np.arange(n)
+        vehicle_change = np.concatenate([[True], a['vehicle'][1:] != a['vehicle'][:-1]])
+
+        # Derive speed/heading from consecutive fixes where the log has none
+        dist_km = np.full(n, np.nan)
+        dt_h = np.full(n, np.nan)
+        dist_km[1:] = _haversine_km(a['lat'][:-1], a['lon'][:-1], a['lat'][1:], a['lon'][1:])
+        dt_h[1:] = (a['ts'][1:] - a['ts'][:-1]) / 3600.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            derived_speed = np.where(vehicle_change | (dt_h <= 0), np.nan, dist_km / dt_h)
+        a['speed'] = np.where(np.isnan(a['speed']), derived_speed, a['speed'])
+
+        derived_heading = np.full(n, np.nan)
+        derived_heading[1:] = _bearing_deg(a['lat'][:-1], a['lon'][:-1], a['lat'][1:], a['lon'][1:])
+        derived_heading[vehicle_change] = np.nan
+        a['heading'] = np.where(np.isnan(a['heading']), derived_heading, a['heading'])
+
+        # Stopped rule; unknown speed (first fix of a vehicle) counts as moving
+        stopped = a['speed'] < self.stop_speed_kmh
+        moving = ~stopped & ~np.isnan(a['speed'])
+
+        # Run-length segmentation: a new run starts on a state or vehicle change
+        run_change = vehicle_change.copy()
+        run_change[1:] |= stopped[1:] != stopped[:-1]
+        starts = np.flatnonzero(run_change)
+        ends = np.append(starts[1:], n)  # exclusive
+
+        # The last run may continue in the next chunk unless this is the end of the stream
+        closed = np.ones(len(starts), dtype=bool)
+        if not final:
+            closed[-1] = False
+        is_event = stopped[starts] & closed & (starts >= self._tail_context)
+
+        events = self._build_events(a, idx, vehicle_change, moving, starts[is_event], ends[is_event])
+
+        # Carry the open run plus context for speed_before into the next chunk
+        if final:
+            self._tail, self._tail_context = None, 0
+        else:
+            open_start = starts[-1] if stopped[starts[-1]] else n
+            tail_start = max(0, min(open_start, n - 1) - self.speed_before_fixes)
+            self._tail = {k: v[tail_start:] for k, v in a.items()}
+            self._tail_context = open_start - tail_start
+
+        return events
+
+    def flush(self):
+        """Close the stop still open at the end of the stream"""
+        return self.process(None, final=True)
+
+    def _build_events(self, a, idx, vehicle_change, moving, starts, ends):
+        """Compute classifier features for closed stop runs (all vectorized)"""
+        if len(starts) == 0:
+            return self._empty_events()
+
+        last = ends - 1
+        dwell = a['ts'][last] - a['ts'][starts]
+        keep = dwell >= self.min_dwell_seconds
+        starts, ends, last, dwell = starts[keep], ends[keep], last[keep], dwell[keep]
+        if len(starts) == 0:
+            return self._empty_events()
+
+        counts = ends - starts
+        lat = self._run_means(a['lat'], starts, ends)
+        lon = self._run_means(a['lon'], starts, ends)
+
+        # speed_before: mean of up to N moving fixes before the stop (same vehicle)
+        vehicle_start = np.maximum.accumulate(np.where(vehicle_change, idx, 0))
+        moving_speed = np.where(moving, a['speed'], 0.0)
+        csum_speed = np.concatenate([[0.0], np.cumsum(moving_speed)])
+        csum_count = np.concatenate([[0], np.cumsum(moving)])
+        lo = np.maximum(starts - self.speed_before_fixes, vehicle_start[starts])
+        n_moving = csum_count[starts] - csum_count[lo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speed_before = np.where(
+                n_moving > 0, (csum_speed[starts] - csum_speed[lo]) / np.maximum(n_moving, 1), 0.0
+            )
+
+        # heading: direction of travel on the last fix before the stop
+        # (headings of stationary fixes are GPS noise)
+        prev = np.maximum(starts - 1, 0)
+        has_prev = starts > vehicle_start[starts]
+        heading = np.where(has_prev, a['heading'][prev], a['heading'][starts])
+        heading = np.nan_to_num(heading, nan=0.0)
+
+        start_time = pd.to_datetime(a['ts'][starts], unit='s', utc=True)
+        if self.timezone:
+            start_time = start_time.tz_convert(self.timezone)
+
+        events = pd.DataFrame({
+            'dwell_time': dwell,
+            'speed_before': np.clip(speed_before, 0, 120),
+            'heading': heading,
+            'visit_count': self._update_visits(lat, lon),
+            'hour': start_time.hour.to_numpy(),
+            'day_of_week': start_time.dayofweek.to_numpy(),
+            'latitude': lat,
+            'longitude': lon,
+            'start_time': a['ts'][starts],
+            'n_fixes': counts,
+            'vehicle_id': a['vehicle'][starts]
+        })
+
+        labels = a['label'][starts]
+        if not np.all(np.isnan(labels)):
+            events['stop_type'] = labels
+
+        return events
+
+    @staticmethod
+    def _run_means(values, starts, ends):
+        """
+        Mean of values[start:end] for each run
+
+        reduceat sums each run on its own, so results do not depend on
+        where the chunk boundaries fall.
+        """
+        bounds = np.column_stack([starts, ends]).ravel()
+        sums = np.add.reduceat(np.append(values, 0.0), bounds)[::2]
+        return sums / (ends - starts)
+
+    def _update_visits(self, lat, lon):
+        """
+        Count visits per ~50 m grid cell, including this one
+
+        Loops over stop events, not fixes, so it is cheap.
+        """
+        cells = zip(np.floor(lat / self.visit_cell_degrees).astype(np.int64),
+                    np.floor(lon / self.visit_cell_degrees).astype(np.int64))
+        counts = np.empty(len(lat), dtype=np.int64)
+        for i, cell in enumerate(cells):
+            counts[i] = self._visits[cell] = self._visits.get(cell, 0) + 1
+        return counts
+
+    @staticmethod
+    def _empty_events():
+        return pd.DataFrame(columns=FEATURE_COLUMNS + [
+            'latitude', 'longitude', 'start_time', 'n_fixes', 'vehicle_id'
+        ])
+
+class ShardWriter:
+    """
+    Buffers stop events and writes fixed-size CSV shards
+    """
+
+    def __init__(self, output_dir, shard_size=100000, prefix='stop_features'):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.shard_paths = []
+        self.events_written = 0
+        self._buffer = []
+        self._buffered = 0
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, events):
+        if len(events) == 0:
+            return
+        self._buffer.append(events)
+        self._buffered += len(events)
+        while self._buffered >= self.shard_size:
+            self._write_shard(self.shard_size)
+
+    def close(self):
+        if self._buffered:
+            self._write_shard(self._buffered)
+
+    def _write_shard(self, n_rows):
+        combined = pd.concat(self._buffer, ignore_index=True)
+        shard, rest = combined.iloc[:n_rows], combined.iloc[n_rows:]
+        path = os.path.join(self.output_dir, f"{self.prefix}_{len(self.shard_paths):05d}.csv")
+        shard.to_csv(path, index=False)
+        self.shard_paths.append(path)
+        self.events_written += len(shard)
+        self._buffer = [rest] if len(rest) else []
+        self._buffered = len(rest)
+
+def extract_stop_events(paths, output_dir='stop_features', chunk_size=500000,
+                        shard_size=100000, **extractor_kwargs):
+    """
+    Stream one or more trace files through the extractor into feature shards
+
+    Files are processed in order as one stream, so a trip may span files.
+    Returns the list of shard paths.
+    """
+    extractor = StopEventExtractor(**extractor_kwargs)
+    writer = ShardWriter(output_dir, shard_size=shard_size)
+
+    for path in paths:
+        print(f"📂 Reading {path}...")
+        for chunk in read_trace_chunks(path, chunk_size=chunk_size):
+            writer.write(extractor.process(chunk))
+    writer.write(extractor.flush())
+    writer.close()
+
+    print(f"✅ Processed {extractor.fixes_processed:,} fixes → "
+          f"{writer.events_written:,} stop events in {len(writer.shard_paths)} shard(s)")
+    return writer.shard_paths
+
+def load_feature_shards(output_dir='stop_features', prefix='stop_features'):
+    """
+    Load feature shards as one DataFrame (e.g. for train_stop_classifier.prepare_data)
+    """
+    paths = sorted(glob.glob(os.path.join(output_dir, f"{prefix}_*.csv")))
+    if not paths:
+        raise FileNotFoundError(f"No feature shards found in {output_dir}")
+    return pd.concat((pd.read_csv(p) for p in paths), ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract stop-event features from GPS traces')
+    parser.add_argument('paths', nargs='+', help='CSV or NDJSON trace files (optionally .gz)')
+    parser.add_argument('--output-dir', default='stop_features')
+    parser.add_argument('--chunk-size', type=int, default=500000, help='Fixes read per chunk')
+    parser.add_argument('--shard-size', type=int, default=100000, help='Stop events per shard')
+    parser.add_argument('--stop-speed', type=float, default=STOP_SPEED_KMH, help='Stopped below this km/h')
+    parser.add_argument('--min-dwell', type=float, default=MIN_DWELL_SECONDS, help='Minimum stop length (s)')
+    parser.add_argument('--timezone', default=None, help='Timezone for hour/day_of_week, e.g. Asia/Kolkata')
+    args = parser.parse_args()
+
+    extract_stop_events(
+        args.paths, output_dir=args.output_dir, chunk_size=args.chunk_size,
+        shard_size=args.shard_size, stop_speed_kmh=args.stop_speed,
+        min_dwell_seconds=args.min_dwell, timezone=args.timezone
+    )
+
+if __name__ == "__main__":
+    main()
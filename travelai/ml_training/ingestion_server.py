@@ -0,0 +1,629 @@
+"""
+Multi-Vehicle GPS Ingestion Server
+
+Live front end for a whole fleet: buses push GPS fixes, the server runs
+streaming stop detection + fusion for every vehicle and emits stop events.
+
+    vehicles ──TCP (NDJSON, one fix per line)──┐
+             ──HTTP POST /fixes────────────────┴─▶ asyncio server
+                                                    │ shard = crc32(vehicle_id) % workers
+                                                    ▼
+                  queue per shard (batches of fixes, at most --queue-batches in flight)
+                                                    ▼
+                worker process k: {vehicle_id: StreamingStopDetector}
+                                                    ▼
+          shared event queue (events + batch acks) ─▶ asyncio.Queue `events` ─▶ NDJSON file
+
+A vehicle always lands on the same worker, so its fixes are processed in
+order and its detector state never moves. Visit counts (the visit_count
+feature) are fleet-wide: one table, served by a manager process, that every
+worker increments once per stop event, so they do not depend on --workers. Fixes are forwarded in batches;
+each shard has a semaphore of in-flight batches that the worker's acks
+release. When it is exhausted the connection feeding that shard stops being
+read, and TCP flow control pushes back on the sender. Vehicles that go quiet
+for --idle-seconds are flushed (their open stop closed) and dropped. A worker
+that dies makes submits and stop() raise instead of waiting for it forever.
+
+Fix lines are the streaming_stop_detector.py fix format with a 'vehicle_id':
+    {"vehicle_id": "KA-19-1234", "timestamp": 1700000000, "latitude": 12.87, "longitude": 74.84, "speed": 0.0}
+
+Usage:
+    python ingestion_server.py serve --port 8765 --workers 4 --output stop_events.ndjson
+    python ingestion_server.py load-test --vehicles 10000 --ticks 30 --workers 2
+    curl -X POST --data-binary @fixes.ndjson localhost:8765/fixes
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import zlib
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_BATCH_SIZE = 512         # fixes per batch sent to a worker
+DEFAULT_QUEUE_BATCHES = 32       # batches a shard may have in flight before backpressure
+DEFAULT_FLUSH_MS = 20            # partial batches are sent at least this often
+IDLE_VEHICLE_SECONDS = 600
+REQUIRED_FIELDS = ('timestamp', 'latitude', 'longitude')
+MAX_HTTP_BODY = 64 * 1024 * 1024
+WORKER_CHECK_SECONDS = 1.0       # how often the events bridge checks for crashed workers
+
+def shard_of(vehicle_id, n_shards):
+    """Worker index for a vehicle (stable across processes and runs, unlike hash())"""
+    return zlib.crc32(str(vehicle_id).encode()) % n_shards
+
+class FleetVisitCounts:
+    """
+    Grid cell -> stop count table for the whole fleet
+
+    Lives in the visit manager process; workers hold proxies to it, so each
+    increment is one round trip per stop event (not per fix).
+    """
+
+    def __init__(self):
+        self._counts = {}
+        # The manager serves every worker connection on its own thread
+        self._lock = threading.Lock()
+
+    def increment(self, cell):
+        with self._lock:
+            count = self._counts[cell] = self._counts.get(cell, 0) + 1
+        return count
+
+class VisitManager(BaseManager):
+    pass
+
+VisitManager.register('FleetVisitCounts', FleetVisitCounts)
+
+def _shard_worker(shard, fixes_queue, events_queue, processed, errors, ready, model_config,
+                  timezone, idle_seconds, visits):
+    """One worker process: per-vehicle streaming detectors for the vehicles of one shard"""
+    # Ctrl-C goes to the parent, which shuts the workers down in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from streaming_stop_detector import StreamingStopDetector, build_stream_models
+
+    type_model, location_model, detector = build_stream_models(**model_config)
+    for model in (type_model, location_model):
+        if hasattr(model, 'load'):
+            model.load()
+    ready.set()
+
+    streams = {}      # vehicle_id -> StreamingStopDetector
+    last_seen = {}    # vehicle_id -> monotonic time of its last fix
+    next_sweep = time.monotonic() + idle_seconds
+
+    while True:
+        batch = fixes_queue.get()
+        if batch is None:
+            break
+        now = time.monotonic()
+        events = []
+        for fix in batch:
+            vehicle = fix.get('vehicle_id', '')
+            stream = streams.get(vehicle)
+            if stream is None:
+                stream = streams[vehicle] = StreamingStopDetector(
+                    type_model, location_model, detector, timezone=timezone, visits=visits)
+            try:
+                event = stream.update(fix)
+            except (KeyError, TypeError, ValueError):
+                errors[shard] += 1
+                continue
+            last_seen[vehicle] = now
+            if event is not None:
+                events.append(event.to_dict())
+
+        if now >= next_sweep:
+            for vehicle in [v for v, seen in last_seen.items() if now - seen > idle_seconds]:
+                del last_seen[vehicle]
+                event = streams.pop(vehicle).flush()
+                if event is not None:
+                    events.append(event.to_dict())
+            next_sweep = now + idle_seconds
+
+        processed[shard] += len(batch)
+        # Sent even without events: it acks the batch and frees a slot for the next one
+        events_queue.put((shard, events, 1))
+
+    events = [event.to_dict() for event in (stream.flush() for stream in streams.values())
+              if event is not None]
+    if events:
+        events_queue.put((shard, events, 0))
+    events_queue.put((shard, None, 0))
+
+class IngestionService:
+    """
+    Sharded stop detection behind an asyncio front end
+
+    start() launches the worker processes; handle_connection is the
+    asyncio.start_server callback; fused stop events (StopEvent.to_dict())
+    arrive on `events`; stop() drains everything and shuts the workers down.
+
+    Args:
+        workers: worker processes (shards)
+        model_config: build_stream_models() arguments for every worker
+        events_maxsize: bound of `events`; a slow consumer backs up into the workers
+        share_models: fork workers from a preloaded server and map the models
+            and stop tables from the shared host (model_host.py) instead of
+            loading private copies in every worker
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, model_config=None, batch_size=DEFAULT_BATCH_SIZE,
+                 queue_batches=DEFAULT_QUEUE_BATCHES, flush_ms=DEFAULT_FLUSH_MS, timezone=None,
+                 idle_seconds=IDLE_VEHICLE_SECONDS, events_maxsize=100000, share_models=False):
+        self.n_shards = workers
+        self.model_config = model_config or {}
+        self.share_models = share_models
+        self.batch_size = batch_size
+        self.queue_batches = queue_batches
+        self.flush_interval = flush_ms / 1000.0
+        self.timezone = timezone
+        self.idle_seconds = idle_seconds
+        self.events = asyncio.Queue(maxsize=events_maxsize)
+
+        self.accepted = 0
+        self.rejected = 0
+        self.backpressure_waits = 0
+        self.events_emitted = 0
+
+        self._buffers = [[] for _ in range(workers)]
+        self._shard_cache = {}
+        self._host = None
+        self._running = False
+
+    async def start(self):
+        """Spawn the workers and wait until each has its models loaded"""
+        model_config = self.model_config
+        if self.share_models:
+            from model_host import ModelHost, worker_context
+            context = worker_context()
+            self._host = ModelHost()
+            model_config = self._host.share(model_config)
+        else:
+            context = multiprocessing.get_context('spawn')
+        self._loop = asyncio.get_running_loop()
+        self._locks = [asyncio.Lock() for _ in range(self.n_shards)]
+        self._slots = [asyncio.Semaphore(self.queue_batches) for _ in range(self.n_shards)]
+        self._stopping = asyncio.Event()
+        # Bounded by the semaphores, so puts never block the event loop
+        self._fix_queues = [context.Queue() for _ in range(self.n_shards)]
+        self._events_queue = context.Queue(maxsize=self.queue_batches * self.n_shards)
+        self._processed = context.Array('q', self.n_shards, lock=False)
+        self._errors = context.Array('q', self.n_shards, lock=False)
+        ready = [context.Event() for _ in range(self.n_shards)]
+        self._visit_manager = VisitManager(ctx=context)
+        self._visit_manager.start(signal.signal, (signal.SIGINT, signal.SIG_IGN))
+        # Held here as well: the table is freed once the parent's proxy is collected
+        self._visits = self._visit_manager.FleetVisitCounts()
+
+        self._processes = [
+            context.Process(target=_shard_worker, name=f'ingest-shard-{shard}', daemon=True, args=(
+                shard, self._fix_queues[shard], self._events_queue, self._processed, self._errors,
+                ready[shard], model_config, self.timezone, self.idle_seconds, self._visits))
+            for shard in range(self.n_shards)
+        ]
+        for process in self._processes:
+            process.start()
+        for shard, event in enumerate(ready):
+            while not await self._loop.run_in_executor(None, event.wait, 1.0):
+                if not self._processes[shard].is_alive():
+                    raise RuntimeError(f"Ingestion worker {shard} failed to start "
+                                       f"(exit code {self._processes[shard].exitcode})")
+
+        self._bridge = threading.Thread(target=self._forward_events, name='ingest-events', daemon=True)
+        self._bridge.start()
+        self._running = True
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Send buffered fixes, flush every vehicle's open stop and stop the workers"""
+        self._running = False
+        self._stopping.set()
+        errors = []
+        # Let the flusher finish its current batch rather than cancelling it mid-send
+        try:
+            await self._flusher
+        except RuntimeError as e:
+            errors.append(str(e))
+        for shard in range(self.n_shards):
+            try:
+                await self._flush_shard(shard)
+                await self._put_batch(shard, None)
+            except RuntimeError as e:
+                errors.append(str(e))
+        for process in self._processes:
+            await self._loop.run_in_executor(None, process.join)
+        await self._loop.run_in_executor(None, self._bridge.join)
+        self._visit_manager.shutdown()
+        if self._host is not None:
+            self._host.cleanup()
+        if errors:
+            raise RuntimeError('; '.join(dict.fromkeys(errors)))
+
+    def stats(self):
+        return {
+            'workers': self.n_shards,
+            'vehicles_seen': len(self._shard_cache),
+            'fixes_accepted': self.accepted,
+            'fixes_rejected': self.rejected + sum(self._errors),
+            'fixes_processed': sum(self._processed),
+            'stop_events': self.events_emitted,
+            'backpressure_waits': self.backpressure_waits,
+        }
+
+    def processed(self):
+        return sum(self._processed) + sum(self._errors)
+
+    async def submit_many(self, fixes):
+        """Route fixes to their shards' buffers, sending full batches (may wait on backpressure)"""
+        buffers, cache, n_shards = self._buffers, self._shard_cache, self.n_shards
+        for fix in fixes:
+            vehicle = fix.get('vehicle_id', '')
+            shard = cache.get(vehicle)
+            if shard is None:
+                shard = cache[vehicle] = shard_of(vehicle, n_shards)
+            buffer = buffers[shard]
+            buffer.append(fix)
+            if len(buffer) >= self.batch_size:
+                await self._flush_shard(shard)
+        self.accepted += len(fixes)
+
+    async def flush(self):
+        """Send every partial batch now"""
+        for shard in range(self.n_shards):
+            await self._flush_shard(shard)
+
+    async def _flush_shard(self, shard):
+        batch = self._buffers[shard]
+        if batch:
+            self._buffers[shard] = []
+            await self._put_batch(shard, batch)
+
+    async def _put_batch(self, shard, batch):
+        # The lock keeps batches in order while one of them waits for a free slot
+        async with self._locks[shard]:
+            slots = self._slots[shard]
+            if slots.locked():
+                self.backpressure_waits += 1
+            self._check_worker(shard)
+            await slots.acquire()
+            # The events bridge also releases a slot when it finds the worker dead
+            self._check_worker(shard)
+            self._fix_queues[shard].put(batch)
+
+    def _check_worker(self, shard):
+        process = self._processes[shard]
+        if not process.is_alive():
+            raise RuntimeError(f"Ingestion worker {shard} died (exit code {process.exitcode})")
+
+    async def _flush_periodically(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush()
+
+    def _forward_events(self):
+        """Thread: worker event batches -> self.events (blocks while the consumer is behind)"""
+        open_shards = set(range(self.n_shards))
+        next_check = time.monotonic() + WORKER_CHECK_SECONDS
+        while open_shards:
+            if time.monotonic() >= next_check:
+                # A crashed worker never sends its end marker; wake a sender blocked on it
+                for dead in [s for s in open_shards if self._processes[s].exitcode not in (None, 0)]:
+                    open_shards.discard(dead)
+                    self._loop.call_soon_threadsafe(self._slots[dead].release)
+                next_check = time.monotonic() + WORKER_CHECK_SECONDS
+            try:
+                shard, events, batches = self._events_queue.get(timeout=WORKER_CHECK_SECONDS)
+            except queue.Empty:
+                continue
+            if events is None:
+                open_shards.discard(shard)
+                continue
+            if events:
+                asyncio.run_coroutine_threadsafe(self._put_events(events), self._loop).result()
+            if batches:
+                self._loop.call_soon_threadsafe(self._slots[shard].release)
+
+    async def _put_events(self, events):
+        for event in events:
+            await self.events.put(event)
+        self.events_emitted += len(events)
+
+    def parse_lines(self, lines):
+        """Decode NDJSON fix lines, counting the ones that are not fixes"""
+        fixes = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                fix = json.loads(line)
+            except ValueError:
+                self.rejected += 1
+                continue
+            if not isinstance(fix, dict) or any(field not in fix for field in REQUIRED_FIELDS) or \
+                    not isinstance(fix.get('vehicle_id', ''), (str, int)):
+                self.rejected += 1
+                continue
+            fixes.append(fix)
+        return fixes
+
+    async def handle_connection(self, reader, writer):
+        """asyncio server callback: an NDJSON fix stream, or HTTP requests"""
+        try:
+            first = await reader.readline()
+            if first.startswith((b'POST ', b'GET ')):
+                await self._handle_http(first, reader, writer)
+                return
+
+            pending = first
+            while True:
+                chunk = await reader.read(1 << 16)
+                if not chunk:
+                    break
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                await self.submit_many(self.parse_lines(lines))
+            await self.submit_many(self.parse_lines([pending]))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_http(self, request_line, reader, writer):
+        """Minimal HTTP/1.1: POST /fixes (NDJSON or JSON array body), GET /stats"""
+        while request_line:
+            parts = request_line.decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            length = headers.get('content-length', '0')
+            if len(parts) < 2 or not length.isdigit():
+                await self._respond(writer, 400, {'error': 'malformed request'}, keep_alive=False)
+                return
+            method, path = parts[:2]
+            length = int(length)
+            if length > MAX_HTTP_BODY:
+                await self._respond(writer, 413, {'error': 'body too large'}, keep_alive=False)
+                return
+            body = await reader.readexactly(length) if length else b''
+
+            if method == 'POST' and path == '/fixes':
+                rejected = self.rejected
+                if body.lstrip().startswith(b'['):
+                    try:
+                        lines = [json.dumps(fix) for fix in json.loads(body)]
+                    except ValueError:
+                        lines = [body]
+                else:
+                    lines = body.split(b'\n')
+                fixes = self.parse_lines(lines)
+                await self.submit_many(fixes)
+                status, payload = 202, {'accepted': len(fixes), 'rejected': self.rejected - rejected}
+            elif method == 'GET' and path == '/stats':
+                status, payload = 200, self.stats()
+            else:
+                status, payload = 404, {'error': f'no route for {method} {path}'}
+
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            await self._respond(writer, status, payload, keep_alive)
+            if not keep_alive:
+                return
+            request_line = await reader.readline()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        reason = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+                  413: 'Payload Too Large'}[status]
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+async def write_events(service, output_path):
+    """Consumer: append every stop event to an NDJSON file"""
+    with open(output_path, 'a') as f:
+        while True:
+            event = await service.events.get()
+            f.write(json.dumps(event, default=str) + '\n')
+            if service.events.empty():
+                f.flush()
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, workers=DEFAULT_WORKERS, output_path='stop_events.ndjson',
+                model_config=None, batch_size=DEFAULT_BATCH_SIZE, queue_batches=DEFAULT_QUEUE_BATCHES,
+                timezone=None, share_models=False):
+    service = IngestionService(workers, model_config, batch_size, queue_batches, timezone=timezone,
+                               share_models=share_models)
+    await service.start()
+    writer_task = asyncio.create_task(write_events(service, output_path))
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"🚌 Ingesting on {host}:{port} (NDJSON over TCP, or HTTP POST /fixes), "
+          f"{workers} worker(s) → {output_path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        while not service.events.empty():
+            await asyncio.sleep(0.01)
+        writer_task.cancel()
+        print(f"✅ {json.dumps(service.stats())}")
+
+def simulate_fleet(n_vehicles=10000, n_ticks=30, interval_s=5, seed=0):
+    """
+    Known stops and tick-by-tick fixes for a simulated fleet
+
+    Every vehicle alternates between driving (~30 km/h) and dwelling at a
+    stop, with its own phase. Returns (stop records, list of per-tick lists
+    of (vehicle index, NDJSON line)).
+    """
+    rng = np.random.default_rng(seed)
+    lat = 12.87 + rng.uniform(-0.1, 0.1, n_vehicles)
+    lon = 74.84 + rng.uniform(-0.1, 0.1, n_vehicles)
+    stops = [{'stop_name': f'Stop {i}', 'latitude': float(a), 'longitude': float(b)}
+             for i, (a, b) in enumerate(zip(lat[::10], lon[::10]))]
+
+    heading = rng.uniform(0, 360, n_vehicles)
+    drive_ticks, stop_ticks = 8, 4
+    phase = rng.integers(0, drive_ticks + stop_ticks, n_vehicles)
+    t0 = 1700000000
+    vehicle_ids = [f'BUS-{i:05d}' for i in range(n_vehicles)]
+
+    ticks = []
+    for tick in range(n_ticks):
+        moving = (tick + phase) % (drive_ticks + stop_ticks) < drive_ticks
+        speed = np.where(moving, rng.normal(30, 5, n_vehicles).clip(8), rng.uniform(0, 1, n_vehicles))
+        step_deg = speed * interval_s / 3600 / 111.0
+        lat = lat + step_deg * np.cos(np.radians(heading))
+        lon = lon + step_deg * np.sin(np.radians(heading))
+        ts = t0 + tick * interval_s
+        ticks.append([
+            (i, f'{{"vehicle_id": "{vehicle_ids[i]}", "timestamp": {ts}, "latitude": {lat[i]:.6f}, '
+                f'"longitude": {lon[i]:.6f}, "speed": {speed[i]:.2f}, "heading": {heading[i]:.1f}}}\n')
+            for i in range(n_vehicles)
+        ])
+    return stops, ticks
+
+async def _send(host, port, payload, chunk_size=1 << 16):
+    reader, writer = await asyncio.open_connection(host, port)
+    for start in range(0, len(payload), chunk_size):
+        writer.write(payload[start:start + chunk_size])
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+async def run_load_test(n_vehicles=10000, n_ticks=30, workers=DEFAULT_WORKERS, connections=8,
+                        batch_size=DEFAULT_BATCH_SIZE, queue_batches=DEFAULT_QUEUE_BATCHES,
+                        classifier='stop_classifier.tflite', scaler='scaler_params.json', output_path=None,
+                        share_models=False):
+    """
+    Replay a simulated fleet through a local server over TCP
+
+    Vehicles are split across `connections` clients (each vehicle's fixes on
+    one connection, in time order). Reports fixes/s accepted by the server and
+    fixes/s fully processed by the workers.
+    """
+    print("=" * 70)
+    print("INGESTION LOAD TEST")
+    print("=" * 70)
+    stops, ticks = simulate_fleet(n_vehicles, n_ticks)
+    payloads = [[] for _ in range(connections)]
+    for tick in ticks:
+        for i, line in tick:
+            payloads[i % connections].append(line)
+    payloads = [''.join(lines).encode() for lines in payloads]
+    n_fixes = n_vehicles * n_ticks
+    print(f"{n_vehicles:,} vehicles × {n_ticks} ticks = {n_fixes:,} fixes "
+          f"({sum(map(len, payloads)) / 1e6:.0f} MB) over {connections} connection(s), {workers} worker(s)")
+
+    model_config = {'stops': stops, 'classifier': classifier, 'scaler': scaler}
+    service = IngestionService(workers, model_config, batch_size, queue_batches, share_models=share_models)
+    await service.start()
+    server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+
+    events = []
+
+    async def consume():
+        while True:
+            events.append(await service.events.get())
+    consumer = asyncio.create_task(consume())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_send('127.0.0.1', port, payload) for payload in payloads))
+    while service.accepted + service.rejected < n_fixes:
+        await asyncio.sleep(0.005)
+    accepted_s = time.perf_counter() - start
+    await service.flush()
+    while service.processed() < service.accepted:
+        await asyncio.sleep(0.005)
+    processed_s = time.perf_counter() - start
+
+    server.close()
+    await server.wait_closed()
+    await service.stop()
+    await asyncio.sleep(0)
+    while not service.events.empty():
+        await asyncio.sleep(0.01)
+    consumer.cancel()
+    stats = service.stats()
+
+    print("-" * 70)
+    print(f"Accepted by server:      {n_fixes / accepted_s:>12,.0f} fixes/s ({accepted_s:.2f} s)")
+    print(f"Processed by workers:    {n_fixes / processed_s:>12,.0f} fixes/s ({processed_s:.2f} s)")
+    print(f"Stop events:             {len(events):>12,}")
+    print(f"Backpressure waits:      {stats['backpressure_waits']:>12,}")
+    print(f"Rejected fixes:          {stats['fixes_rejected']:>12,}")
+
+    results = {'vehicles': n_vehicles, 'fixes': n_fixes, 'workers': workers, 'connections': connections,
+               'accepted_fixes_per_s': n_fixes / accepted_s, 'processed_fixes_per_s': n_fixes / processed_s,
+               **stats}
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results saved to {output_path}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Multi-vehicle GPS ingestion with sharded stop detection')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('serve', help='Run the ingestion server')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=DEFAULT_PORT)
+    p.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    p.add_argument('--output', default='stop_events.ndjson')
+    p.add_argument('--stops', default=None, help='Known stops CSV instead of the location model')
+    p.add_argument('--classifier', default='stop_classifier.tflite')
+    p.add_argument('--scaler', default='scaler_params.json')
+    p.add_argument('--location-model', default='stop_location_model.tflite')
+    p.add_argument('--location-metadata', default='stop_location_metadata.json')
+    p.add_argument('--thresholds', default=None, help='Tuned fusion thresholds JSON')
+    p.add_argument('--meta-learner', default=None, help='Learned fusion weights')
+    p.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    p.add_argument('--queue-batches', type=int, default=DEFAULT_QUEUE_BATCHES)
+    p.add_argument('--timezone', default=None)
+    p.add_argument('--share-models', action='store_true',
+                   help='Workers map shared models/stop tables instead of loading their own')
+
+    p = sub.add_parser('load-test', help='Measure throughput with a simulated fleet')
+    p.add_argument('--vehicles', type=int, default=10000)
+    p.add_argument('--ticks', type=int, default=30, help='Fixes per vehicle (5 s apart)')
+    p.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    p.add_argument('--connections', type=int, default=8)
+    p.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    p.add_argument('--queue-batches', type=int, default=DEFAULT_QUEUE_BATCHES)
+    p.add_argument('--classifier', default='stop_classifier.tflite')
+    p.add_argument('--scaler', default='scaler_params.json')
+    p.add_argument('--output', default=None, help='Also write the results as JSON')
+    p.add_argument('--share-models', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        model_config = {'stops_csv': args.stops, 'classifier': args.classifier, 'scaler': args.scaler,
+                        'location_model': args.location_model, 'location_metadata': args.location_metadata,
+                        'thresholds': args.thresholds, 'meta_learner': args.meta_learner}
+        try:
+            asyncio.run(serve(args.host, args.port, args.workers, args.output, model_config,
+                              args.batch_size, args.queue_batches, args.timezone, args.share_models))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(run_load_test(args.vehicles, args.ticks, args.workers, args.connections,
+                                  args.batch_size, args.queue_batches, args.classifier, args.scaler,
+                                  args.output, args.share_models))
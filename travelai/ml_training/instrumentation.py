@@ -0,0 +1,242 @@
+"""
+Pipeline Instrumentation
+
+Times the stages of a training or suggestion run and records their memory
+high-water marks, so it is clear which stage dominates:
+
+    from instrumentation import span, traced
+
+    with span('fit', epochs=50):
+        model.fit(...)
+
+    @traced('fusion')
+    def predict_integrated(...): ...
+
+Each span records wall time, CPU time (process-wide) and how much it raised
+the process RSS peak; with memory tracing on it also records the Python heap
+peak (tracemalloc) above the span's starting point. Spans nest, and the run's
+timeline is written as JSON:
+
+    TRAVION_PROFILE=timeline.json python train_stop_classifier.py
+    TRAVION_PROFILE=timeline.json TRAVION_PROFILE_MEMORY=1 python ...
+    python cli.py --profile timeline.json suggest ...
+
+When profiling is off, span() returns a shared no-op context manager and
+@traced functions make one extra call, so the hooks can stay in hot paths.
+tracemalloc slows allocation-heavy Python code noticeably, which is why it
+is opt-in.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, RSS columns are left empty
+    resource = None
+
+# Individual span records kept per run; spans past this only feed the per-stage totals
+MAX_RECORDED_SPANS = 10000
+
+_NULL_SPAN = contextlib.nullcontext()
+_MB = 1024 * 1024
+
+_enabled = False
+_trace_memory = False
+_output_path = None
+_run_start = None
+_records = []
+_totals = {}
+_local = threading.local()
+_lock = threading.Lock()
+
+def _rss_peak_mb():
+    """Process RSS high-water mark in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / _MB if sys.platform == 'darwin' else peak / 1024
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+class _Span:
+    """An active span; use span() rather than creating these directly"""
+
+    __slots__ = ('name', 'meta', 'parent', 'depth', 'start', 'cpu_start',
+                 'rss_start', 'py_start', 'py_peak')
+
+    def __init__(self, name, meta):
+        self.name = name
+        self.meta = meta
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1] if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+
+        if _trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # The enclosing span keeps the peak seen so far before the counter is reset
+            if self.parent is not None and self.parent.py_peak is not None:
+                self.parent.py_peak = max(self.parent.py_peak, peak)
+            tracemalloc.reset_peak()
+            self.py_start = self.py_peak = current
+        else:
+            self.py_start = self.py_peak = None
+
+        self.rss_start = _rss_peak_mb()
+        self.cpu_start = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        cpu = time.process_time() - self.cpu_start
+        rss_peak = _rss_peak_mb()
+        _stack().pop()
+
+        record = {
+            'name': self.name,
+            'parent': self.parent.name if self.parent else None,
+            'depth': self.depth,
+            'start_s': round(self.start - _run_start, 6),
+            'wall_s': round(end - self.start, 6),
+            'cpu_s': round(cpu, 6),
+            'rss_peak_mb': None if rss_peak is None else round(rss_peak, 2),
+            'rss_growth_mb': None if rss_peak is None else round(rss_peak - self.rss_start, 2),
+        }
+        if self.py_start is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            self.py_peak = max(self.py_peak, peak)
+            record['py_peak_mb'] = round((self.py_peak - self.py_start) / _MB, 3)
+            record['py_net_mb'] = round((current - self.py_start) / _MB, 3)
+            if self.parent is not None and self.parent.py_peak is not None:
+                self.parent.py_peak = max(self.parent.py_peak, self.py_peak)
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        if self.meta:
+            record['meta'] = self.meta
+        _record(record)
+        return False
+
+def _record(record):
+    with _lock:
+        if len(_records) < MAX_RECORDED_SPANS:
+            _records.append(record)
+        totals = _totals.setdefault(record['name'], {
+            'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'max_rss_growth_mb': 0.0, 'max_py_peak_mb': None
+        })
+        totals['count'] += 1
+        totals['wall_s'] += record['wall_s']
+        totals['cpu_s'] += record['cpu_s']
+        if record['rss_growth_mb'] is not None:
+            totals['max_rss_growth_mb'] = max(totals['max_rss_growth_mb'], record['rss_growth_mb'])
+        if 'py_peak_mb' in record:
+            totals['max_py_peak_mb'] = max(totals['max_py_peak_mb'] or 0.0, record['py_peak_mb'])
+
+def span(name, **meta):
+    """Context manager timing one stage; keyword arguments are stored with the record"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, meta)
+
+def traced(name):
+    """Decorator form of span() for functions called once per stage or per event"""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def is_enabled():
+    return _enabled
+
+def enable(output_path=None, trace_memory=False):
+    """
+    Start recording spans
+
+    With output_path, the timeline is written there when the process exits.
+    """
+    global _enabled, _trace_memory, _output_path, _run_start
+    if _run_start is None:
+        _run_start = time.perf_counter()
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if output_path and _output_path is None:
+        atexit.register(_write_at_exit)
+    _output_path = output_path or _output_path
+    _enabled = True
+
+def disable():
+    """Stop recording spans (recorded spans are kept)"""
+    global _enabled
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def reset():
+    """Drop all recorded spans and restart the run clock"""
+    global _run_start
+    with _lock:
+        _records.clear()
+        _totals.clear()
+    _run_start = time.perf_counter()
+
+def timeline():
+    """The run's spans (in completion order) and per-stage totals as a dict"""
+    with _lock:
+        return {
+            'command': ' '.join(sys.argv),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'elapsed_s': round(time.perf_counter() - _run_start, 6) if _run_start else 0.0,
+            'trace_memory': _trace_memory,
+            'spans': list(_records),
+            'dropped_spans': sum(t['count'] for t in _totals.values()) - len(_records),
+            'stages': {name: dict(t, wall_s=round(t['wall_s'], 6), cpu_s=round(t['cpu_s'], 6))
+                       for name, t in _totals.items()},
+        }
+
+def write_timeline(path):
+    """Write timeline() as JSON"""
+    with open(path, 'w') as f:
+        json.dump(timeline(), f, indent=2)
+    return path
+
+def print_summary():
+    """Per-stage totals, slowest first"""
+    stages = timeline()['stages']
+    if not stages:
+        return
+    print("\n⏱️  Stage timings:")
+    print(f"   {'Stage':<24}{'Calls':>8}{'Wall (s)':>12}{'CPU (s)':>12}{'RSS +MB':>10}{'Py peak MB':>12}")
+    for name, t in sorted(stages.items(), key=lambda item: -item[1]['wall_s']):
+        py_peak = '-' if t['max_py_peak_mb'] is None else f"{t['max_py_peak_mb']:.1f}"
+        print(f"   {name:<24}{t['count']:>8}{t['wall_s']:>12.3f}{t['cpu_s']:>12.3f}"
+              f"{t['max_rss_growth_mb']:>10.1f}{py_peak:>12}")
+
+def _write_at_exit():
+    if _output_path and _records:
+        print_summary()
+        write_timeline(_output_path)
+        print(f"⏱️  Timeline written to {_output_path}")
+
+if os.environ.get('TRAVION_PROFILE'):
+    enable(os.environ['TRAVION_PROFILE'], trace_memory=os.environ.get('TRAVION_PROFILE_MEMORY') == '1')
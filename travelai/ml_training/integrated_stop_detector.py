@@ -69,29 +69,540 @@ BENEFITS:
 
 import numpy as np
 import json
+import sys
 from typing import Dict, Tuple, Optional
 
+from instrumentation import traced
+
+# Stop types the type classifier can output (train_stop_classifier.STOP_TYPES)
+TYPE_MODEL_TYPES = ('traffic_signal', 'toll_gate', 'regular_stop', 'gas_station', 'rest_area', 'unknown')
+
+# Every final_type the fusion rules can produce; array APIs use indices into this
+FUSED_TYPES = TYPE_MODEL_TYPES + (
+    'regular_bus_stop', 'rest_area_at_bus_stop', 'possible_new_bus_stop', 'unknown_stop'
+)
+FUSED_TYPE_IDS = {name: i for i, name in enumerate(FUSED_TYPES)}
+
+# Tunable decision-rule thresholds (see tune_fusion_thresholds.py)
+DEFAULT_THRESHOLDS = {
+    'LOCATION_HIGH_CONF': 0.85,      # Rule 1: trust the location model
+    'LOCATION_LOW_CONF': 0.40,       # Rules 3/5: location model uncertain below this
+    'TYPE_HIGH_CONF': 0.80,          # Rules 2/3: trust the type classifier
+    'KNOWN_STOP_RADIUS': 100,        # Rule 1 (and 2x for rule 4), meters
+    'TYPE_OVERRIDE_CONF': 0.9,       # Rule 4: toll/gas overrides a nearby known stop
+    'TYPE_MEDIUM_CONF': 0.6,         # Rule 5: blend both models
+    'EXTENDED_DWELL_SECONDS': 900,   # Rule 1: rest area at a bus stop (15 minutes)
+    'TYPE_FALLBACK_CONF': 0.5,       # Rule 6: type classifier alone
+}
+
+def encode_stop_types(stop_types) -> np.ndarray:
+    """Map stop type names to FUSED_TYPES indices"""
+    try:
+        return np.array([FUSED_TYPE_IDS[name] for name in stop_types], dtype=np.int64)
+    except KeyError as e:
+        raise ValueError(f"Unknown stop type {e.args[0]!r}; expected one of {TYPE_MODEL_TYPES}")
+
+# Columns of the meta-learner ("Model 3") input, see calculate_combined_features
+TYPE_FEATURE_COLUMNS = ('dwell_time', 'speed_before', 'heading', 'visit_count', 'hour', 'day_of_week')
+COMBINED_FEATURE_NAMES = TYPE_FEATURE_COLUMNS + (
+    'location_confidence', 'distance_norm', 'is_known_stop',
+    'type_confidence', 'confidence_product', 'confidence_mean'
+)
+
+def combined_feature_matrix(events, dtype=np.float32) -> np.ndarray:
+    """
+    The 12 combined features for many events at once
+
+    Args:
+        events: columnar table (DataFrame or dict of arrays) with the type
+            classifier features (TYPE_FEATURE_COLUMNS), location_confidence,
+            distance, is_known_stop and optionally type_confidence (0.5 if absent)
+
+    Returns:
+        (n, 12) matrix, columns in COMBINED_FEATURE_NAMES order, matching
+        calculate_combined_features() row for row
+    """
+    location_confidence = np.asarray(events['location_confidence'], dtype=np.float64)
+    n = len(location_confidence)
+    type_confidence = (np.asarray(events['type_confidence'], dtype=np.float64)
+                       if 'type_confidence' in events else np.full(n, 0.5))
+
+    X = np.empty((n, len(COMBINED_FEATURE_NAMES)), dtype=dtype)
+    for j, column in enumerate(TYPE_FEATURE_COLUMNS):
+        X[:, j] = events[column]
+    X[:, 6] = location_confidence
+    X[:, 7] = np.minimum(np.asarray(events['distance'], dtype=np.float64), 1000) / 1000
+    X[:, 8] = np.asarray(events['is_known_stop'], dtype=bool)
+    X[:, 9] = type_confidence
+    X[:, 10] = location_confidence * type_confidence
+    X[:, 11] = (location_confidence + type_confidence) / 2
+    return X
+
+class MetaLearner:
+    """
+    NumPy forward pass of the meta-learner trained by train_meta_learner.py
+
+    Loads meta_learner_weights.npz (scaler + dense layers); outputs are
+    FUSED_TYPES ids, so no TensorFlow is needed at fusion time.
+    """
+
+    def __init__(self, weights_path: str = 'meta_learner_weights.npz'):
+        with np.load(weights_path, allow_pickle=False) as data:
+            class_names = tuple(str(name) for name in data['class_names'])
+            if class_names != FUSED_TYPES[:len(class_names)]:
+                raise ValueError(f"{weights_path} was trained for classes {class_names}, "
+                                 f"expected a prefix of {FUSED_TYPES}")
+            self.mean = data['mean'].astype(np.float32)
+            self.scale = data['scale'].astype(np.float32)
+            self.layers = [(data[f'W{i}'].astype(np.float32), data[f'b{i}'].astype(np.float32))
+                           for i in range(int(data['n_layers']))]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, shape (n, n_classes), for a (n, 12) feature matrix"""
+        h = (np.asarray(X, dtype=np.float32) - self.mean) / self.scale
+        for W, b in self.layers[:-1]:
+            h = np.maximum(h @ W + b, 0.0)
+        W, b = self.layers[-1]
+        logits = h @ W + b
+        logits -= logits.max(axis=1, keepdims=True)
+        p = np.exp(logits)
+        p /= p.sum(axis=1, keepdims=True)
+        return p
+
+    def predict(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """(FUSED_TYPES id, confidence) per row"""
+        p = self.predict_proba(X)
+        type_id = p.argmax(axis=1)
+        return type_id, p[np.arange(len(p)), type_id]
+
+@traced('fusion_batch')
+def fuse_arrays(location_confidence, distance, is_known_stop, type_id, type_confidence,
+                dwell_time, thresholds: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The six fusion rules of predict_integrated() evaluated with NumPy masks
+
+    Event inputs are arrays of shape (n,); threshold values may be scalars or
+    arrays that broadcast against them (e.g. shape (g, 1) to score g threshold
+    combinations at once, giving (g, n) outputs). Thresholds not given use
+    DEFAULT_THRESHOLDS.
+
+    Returns:
+        (rule, final_type_id, confidence, should_learn) - rule is 1-6, the
+        first rule that fired, as in the scalar cascade
+    """
+    lc = np.asarray(location_confidence, dtype=np.float64)
+    dist = np.asarray(distance, dtype=np.float64)
+    known = np.asarray(is_known_stop, dtype=bool)
+    type_id = np.asarray(type_id, dtype=np.int64)
+    tc = np.asarray(type_confidence, dtype=np.float64)
+    dwell = np.asarray(dwell_time, dtype=np.float64)
+    t = {name: np.asarray(thresholds.get(name, default)) for name, default in DEFAULT_THRESHOLDS.items()}
+
+    ids = FUSED_TYPE_IDS
+    type_confident = tc > t['TYPE_HIGH_CONF']
+    type_overrides = tc > t['TYPE_OVERRIDE_CONF']
+    type_fallback = tc > t['TYPE_FALLBACK_CONF']
+
+    # Rule conditions in cascade order; np.select picks the first that holds
+    conditions = [
+        known & (lc > t['LOCATION_HIGH_CONF']) & (dist < t['KNOWN_STOP_RADIUS']),
+        (type_id == ids['regular_stop']) & ~known,
+        (lc < t['LOCATION_LOW_CONF']) & type_confident,
+        known & (dist < t['KNOWN_STOP_RADIUS'] * 2) &
+            ((type_id == ids['toll_gate']) | (type_id == ids['gas_station'])),
+        (lc > t['LOCATION_LOW_CONF']) & (tc > t['TYPE_MEDIUM_CONF']),
+    ]
+    shape = np.broadcast_shapes(*(np.shape(c) for c in conditions), np.shape(type_fallback))
+    conditions = [np.broadcast_to(c, shape) for c in conditions]
+
+    rule = np.select(conditions, [1, 2, 3, 4, 5], default=6)
+
+    final_type = np.select(conditions, [
+        np.where(dwell > t['EXTENDED_DWELL_SECONDS'], ids['rest_area_at_bus_stop'], ids['regular_bus_stop']),
+        np.where(type_confident, ids['possible_new_bus_stop'], ids['unknown_stop']),
+        type_id,
+        np.where(type_overrides, type_id, ids['regular_bus_stop']),
+        np.where(known, ids['regular_bus_stop'], type_id),
+    ], default=np.where(type_fallback, type_id, ids['unknown']))
+
+    confidence = np.select(conditions, [
+        np.minimum(0.98, lc),
+        np.where(type_confident, tc * 0.7, 0.3),
+        tc,
+        np.where(type_overrides, tc, 0.75),
+        np.where(known, lc * 0.7 + tc * 0.3, lc * 0.3 + tc * 0.7),
+    ], default=np.where(type_fallback, tc, 0.2))
+
+    should_learn = conditions[1] & type_confident
+
+    return rule, final_type, confidence, should_learn
+
+# Stop type names -> small integer codes. Starts as FUSED_TYPES (so codes match
+# FUSED_TYPE_IDS); unseen names from the type model are interned and appended.
+_TYPE_NAMES = list(FUSED_TYPES)
+_TYPE_CODES = dict(FUSED_TYPE_IDS)
+
+def stop_type_code(name: str) -> int:
+    """Interned integer code for a stop type name"""
+    code = _TYPE_CODES.get(name)
+    if code is None:
+        name = sys.intern(name)
+        code = _TYPE_CODES.setdefault(name, len(_TYPE_NAMES))
+        if code == len(_TYPE_NAMES):
+            _TYPE_NAMES.append(name)
+    return code
+
+def stop_type_name(code: int) -> str:
+    return _TYPE_NAMES[code]
+
+class LocationPrediction:
+    """Location model output (the location_prediction dict of predict_integrated)"""
+
+    __slots__ = ('is_known_stop', 'confidence', 'nearest_stop', 'distance')
+
+    def __init__(self, is_known_stop: bool, confidence: float,
+                 nearest_stop: Optional[str] = None, distance: float = float('inf')):
+        self.is_known_stop = is_known_stop
+        self.confidence = confidence
+        self.nearest_stop = nearest_stop
+        self.distance = distance
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> 'LocationPrediction':
+        return cls(d['is_known_stop'], d['confidence'], d.get('nearest_stop'), d['distance'])
+
+    def to_dict(self) -> Dict:
+        return {'is_known_stop': self.is_known_stop, 'confidence': self.confidence,
+                'nearest_stop': self.nearest_stop, 'distance': self.distance}
+
+class TypePrediction:
+    """Type classifier output, with the stop type held as an interned code"""
+
+    __slots__ = ('type_code', 'confidence', 'probabilities')
+
+    def __init__(self, stop_type, confidence: float, probabilities: Optional[Dict] = None):
+        self.type_code = stop_type if isinstance(stop_type, int) else stop_type_code(stop_type)
+        self.confidence = confidence
+        self.probabilities = probabilities
+
+    @property
+    def stop_type(self) -> str:
+        return _TYPE_NAMES[self.type_code]
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> 'TypePrediction':
+        return cls(d['stop_type'], d['confidence'], d.get('probabilities'))
+
+    def to_dict(self) -> Dict:
+        return {'stop_type': self.stop_type, 'confidence': self.confidence,
+                'probabilities': self.probabilities if self.probabilities is not None else {}}
+
+# Why a FusionResult was produced: (fusion rule, reasoning template). The
+# template is only formatted when .reasoning is read.
+REASONS = (
+    (1, "Known bus stop: {stop_name} ({distance:.0f}m away)"),
+    (1, "Known bus stop: {stop_name} ({distance:.0f}m away) - Extended stop ({minutes:.1f} min)"),
+    (2, "Possible new bus stop (not in database)"),
+    (2, "Stop at unknown location (low confidence)"),
+    (3, "Type classifier confident: {stop_type}"),
+    (4, "{stop_type} near {nearest_stop}"),
+    (4, "At known stop, but unclear type"),
+    (5, "Blended prediction from both models"),
+    (5, "Blended prediction from both models"),
+    (6, "Type classifier prediction"),
+    (6, "Low confidence from all models"),
+    # Rule 0: the meta-learner replaced the cascade
+    (0, "Meta-learner prediction"),
+    (0, "Meta-learner: known bus stop {stop_name} ({distance:.0f}m away)"),
+    (0, "Meta-learner: possible new bus stop (not in database)"),
+)
+(REASON_KNOWN_STOP, REASON_EXTENDED_STOP, REASON_NEW_STOP, REASON_UNKNOWN_LOCATION,
+ REASON_TYPE_CONFIDENT, REASON_TYPE_NEAR_STOP, REASON_UNCLEAR_AT_STOP, REASON_BLENDED_AT_STOP,
+ REASON_BLENDED, REASON_TYPE_ONLY, REASON_LOW_CONFIDENCE,
+ REASON_LEARNED, REASON_LEARNED_AT_STOP, REASON_LEARNED_NEW_STOP) = range(len(REASONS))
+
+# Reasons whose result carries the nearest known stop's name
+_NAMED_REASONS = frozenset((REASON_KNOWN_STOP, REASON_EXTENDED_STOP, REASON_UNCLEAR_AT_STOP,
+                            REASON_BLENDED_AT_STOP, REASON_LEARNED_AT_STOP))
+
+# Reasons that flag the location for learning a new stop
+_LEARN_REASONS = frozenset((REASON_NEW_STOP, REASON_LEARNED_NEW_STOP))
+
+class FusionResult:
+    """
+    Compact result of IntegratedStopDetector.predict()
+
+    Holds the final type as an interned code, a reason code and references
+    (not copies) of the inputs; stop_name, should_learn, rule and reasoning
+    are derived on access. result['key'] and to_dict() give the
+    predict_integrated() dict.
+    """
+
+    __slots__ = ('type_code', 'confidence', 'reason', 'location', 'type_prediction', 'dwell_time')
+
+    DICT_KEYS = ('final_type', 'confidence', 'stop_name', 'reasoning', 'should_learn',
+                 'location_model_output', 'type_model_output')
+
+    def __init__(self, type_code: int, confidence: float, reason: int, location,
+                 type_prediction, dwell_time: float):
+        self.type_code = type_code
+        self.confidence = confidence
+        self.reason = reason
+        self.location = location
+        self.type_prediction = type_prediction
+        self.dwell_time = dwell_time
+
+    @property
+    def final_type(self) -> str:
+        return _TYPE_NAMES[self.type_code]
+
+    @property
+    def rule(self) -> int:
+        return REASONS[self.reason][0]
+
+    @property
+    def should_learn(self) -> bool:
+        return self.reason in _LEARN_REASONS
+
+    @property
+    def stop_name(self) -> Optional[str]:
+        if self.reason not in _NAMED_REASONS:
+            return None
+        location = self.location
+        return location['nearest_stop'] if isinstance(location, dict) else location.nearest_stop
+
+    @property
+    def reasoning(self) -> str:
+        template = REASONS[self.reason][1]
+        if '{' not in template:
+            return template
+        location, type_prediction = self.location, self.type_prediction
+        if isinstance(location, dict):
+            distance, nearest_stop = location['distance'], location['nearest_stop']
+        else:
+            distance, nearest_stop = location.distance, location.nearest_stop
+        if isinstance(type_prediction, dict):
+            stop_type = type_prediction['stop_type']
+        else:
+            stop_type = type_prediction.stop_type
+        return template.format(stop_name=nearest_stop, distance=distance, minutes=self.dwell_time / 60,
+                               stop_type=stop_type, nearest_stop=nearest_stop)
+
+    @property
+    def location_model_output(self) -> Dict:
+        location = self.location
+        return location if isinstance(location, dict) else location.to_dict()
+
+    @property
+    def type_model_output(self) -> Dict:
+        type_prediction = self.type_prediction
+        return type_prediction if isinstance(type_prediction, dict) else type_prediction.to_dict()
+
+    def __getitem__(self, key):
+        if key not in self.DICT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def keys(self):
+        return self.DICT_KEYS
+
+    def to_dict(self) -> Dict:
+        """The predict_integrated() result dict"""
+        return {
+            'final_type': _TYPE_NAMES[self.type_code],
+            'confidence': self.confidence,
+            'stop_name': self.stop_name,
+            'reasoning': self.reasoning,
+            'should_learn': self.reason in _LEARN_REASONS,
+            'location_model_output': self.location_model_output,
+            'type_model_output': self.type_model_output
+        }
+
+    def __repr__(self):
+        return (f"FusionResult(final_type={self.final_type!r}, confidence={self.confidence:.3f}, "
+                f"stop_name={self.stop_name!r}, should_learn={self.should_learn}, rule={self.rule})")
+
+_REGULAR_STOP = FUSED_TYPE_IDS['regular_stop']
+_TOLL_GATE = FUSED_TYPE_IDS['toll_gate']
+_GAS_STATION = FUSED_TYPE_IDS['gas_station']
+_UNKNOWN = FUSED_TYPE_IDS['unknown']
+_REGULAR_BUS_STOP = FUSED_TYPE_IDS['regular_bus_stop']
+_REST_AREA_AT_BUS_STOP = FUSED_TYPE_IDS['rest_area_at_bus_stop']
+_POSSIBLE_NEW_BUS_STOP = FUSED_TYPE_IDS['possible_new_bus_stop']
+_UNKNOWN_STOP = FUSED_TYPE_IDS['unknown_stop']
+
 class IntegratedStopDetector:
     """
     Combines location recognition and type classification
     for maximum accuracy in stop detection
     """
     
-    def __init__(self):
+    def __init__(self, config_path: Optional[str] = None, meta_learner_path: Optional[str] = None):
         # Model confidence thresholds
-        self.LOCATION_HIGH_CONF = 0.85
-        self.LOCATION_LOW_CONF = 0.40
-        self.TYPE_HIGH_CONF = 0.80
-        
+        self.LOCATION_HIGH_CONF = DEFAULT_THRESHOLDS['LOCATION_HIGH_CONF']
+        self.LOCATION_LOW_CONF = DEFAULT_THRESHOLDS['LOCATION_LOW_CONF']
+        self.TYPE_HIGH_CONF = DEFAULT_THRESHOLDS['TYPE_HIGH_CONF']
+        self.TYPE_OVERRIDE_CONF = DEFAULT_THRESHOLDS['TYPE_OVERRIDE_CONF']
+        self.TYPE_MEDIUM_CONF = DEFAULT_THRESHOLDS['TYPE_MEDIUM_CONF']
+        self.TYPE_FALLBACK_CONF = DEFAULT_THRESHOLDS['TYPE_FALLBACK_CONF']
+
         # Distance threshold for known stops (meters)
-        self.KNOWN_STOP_RADIUS = 100
-        
+        self.KNOWN_STOP_RADIUS = DEFAULT_THRESHOLDS['KNOWN_STOP_RADIUS']
+
+        # Dwell time after which a known stop is treated as a rest area (seconds)
+        self.EXTENDED_DWELL_SECONDS = DEFAULT_THRESHOLDS['EXTENDED_DWELL_SECONDS']
+
+        # Tuned thresholds (tune_fusion_thresholds.py) override the defaults
+        if config_path is not None:
+            self.load_thresholds(config_path)
+
+        # Learned fusion (train_meta_learner.py) replaces the rules when type features are given
+        self.meta_learner = None
+        if meta_learner_path is not None:
+            self.load_meta_learner(meta_learner_path)
+
+    def load_meta_learner(self, weights_path: str):
+        """Use a trained meta-learner (meta_learner_weights.npz) instead of the rule cascade"""
+        self.meta_learner = MetaLearner(weights_path)
+
+    def load_thresholds(self, config_path: str):
+        """
+        Load thresholds from a JSON file
+
+        Accepts the tuner's output ({'thresholds': {...}, ...}) or a flat
+        {name: value} mapping; names not given keep their current value.
+        """
+        with open(config_path) as f:
+            config = json.load(f)
+        thresholds = config.get('thresholds', config)
+
+        unknown = set(thresholds) - set(DEFAULT_THRESHOLDS)
+        if unknown:
+            raise ValueError(f"Unknown fusion thresholds in {config_path}: {sorted(unknown)}")
+        for name, value in thresholds.items():
+            setattr(self, name, value)
+
+    def thresholds(self) -> Dict:
+        """Current threshold values, keyed like DEFAULT_THRESHOLDS"""
+        return {name: getattr(self, name) for name in DEFAULT_THRESHOLDS}
+
+    @traced('fusion')
+    def predict(
+        self,
+        location_prediction,
+        type_prediction,
+        gps_coords: Tuple[float, float],
+        dwell_time: float,
+        type_features: Optional[Dict] = None
+    ) -> FusionResult:
+        """
+        Integrate predictions from both models into a compact FusionResult
+
+        Same rules and outputs as predict_integrated(), which wraps this.
+        Predictions may be dicts (see predict_integrated) or
+        LocationPrediction / TypePrediction objects; they are referenced by
+        the result, not copied, and reasoning is only formatted if read.
+
+        With a meta-learner loaded and the type classifier's input features
+        given, the meta-learner decides instead of the rules (rule 0).
+        """
+        if isinstance(location_prediction, dict):
+            is_known = location_prediction['is_known_stop']
+            loc_conf = location_prediction['confidence']
+            distance = location_prediction['distance']
+        else:
+            is_known = location_prediction.is_known_stop
+            loc_conf = location_prediction.confidence
+            distance = location_prediction.distance
+        if isinstance(type_prediction, dict):
+            type_code = _TYPE_CODES.get(type_prediction['stop_type'])
+            if type_code is None:
+                type_code = stop_type_code(type_prediction['stop_type'])
+            type_conf = type_prediction['confidence']
+        else:
+            type_code = type_prediction.type_code
+            type_conf = type_prediction.confidence
+
+        if self.meta_learner is not None and type_features is not None:
+            return self._predict_learned(location_prediction, type_prediction, type_features,
+                                         is_known, loc_conf, distance, type_conf, dwell_time)
+
+        # RULE 1: High-confidence known bus stop (rest area if stayed very long)
+        if is_known and loc_conf > self.LOCATION_HIGH_CONF and distance < self.KNOWN_STOP_RADIUS:
+            if dwell_time > self.EXTENDED_DWELL_SECONDS:
+                code, reason = _REST_AREA_AT_BUS_STOP, REASON_EXTENDED_STOP
+            else:
+                code, reason = _REGULAR_BUS_STOP, REASON_KNOWN_STOP
+            return FusionResult(code, min(0.98, loc_conf), reason,
+                                location_prediction, type_prediction, dwell_time)
+
+        # RULE 2: Type classifier says "regular stop" but NOT at known location
+        if type_code == _REGULAR_STOP and not is_known:
+            # Could be a new bus stop we don't know about - flag for adding to database
+            if type_conf > self.TYPE_HIGH_CONF:
+                return FusionResult(_POSSIBLE_NEW_BUS_STOP, type_conf * 0.7, REASON_NEW_STOP,
+                                    location_prediction, type_prediction, dwell_time)
+            # Low confidence - probably not a real stop
+            return FusionResult(_UNKNOWN_STOP, 0.3, REASON_UNKNOWN_LOCATION,
+                                location_prediction, type_prediction, dwell_time)
+
+        # RULE 3: Location says maybe, Type classifier is confident
+        if loc_conf < self.LOCATION_LOW_CONF and type_conf > self.TYPE_HIGH_CONF:
+            return FusionResult(type_code, type_conf, REASON_TYPE_CONFIDENT,
+                                location_prediction, type_prediction, dwell_time)
+
+        # RULE 4: Near a known stop but type suggests something else
+        if is_known and distance < self.KNOWN_STOP_RADIUS * 2 and type_code in (_TOLL_GATE, _GAS_STATION):
+            # Trust type classifier if very confident, otherwise blend
+            if type_conf > self.TYPE_OVERRIDE_CONF:
+                return FusionResult(type_code, type_conf, REASON_TYPE_NEAR_STOP,
+                                    location_prediction, type_prediction, dwell_time)
+            return FusionResult(_REGULAR_BUS_STOP, 0.75, REASON_UNCLEAR_AT_STOP,
+                                location_prediction, type_prediction, dwell_time)
+
+        # RULE 5: Both models have medium confidence - weight location model more heavily
+        if loc_conf > self.LOCATION_LOW_CONF and type_conf > self.TYPE_MEDIUM_CONF:
+            if is_known:
+                return FusionResult(_REGULAR_BUS_STOP, loc_conf * 0.7 + type_conf * 0.3, REASON_BLENDED_AT_STOP,
+                                    location_prediction, type_prediction, dwell_time)
+            return FusionResult(type_code, loc_conf * 0.3 + type_conf * 0.7, REASON_BLENDED,
+                                location_prediction, type_prediction, dwell_time)
+
+        # RULE 6: Default - trust type classifier if available
+        if type_conf > self.TYPE_FALLBACK_CONF:
+            return FusionResult(type_code, type_conf, REASON_TYPE_ONLY,
+                                location_prediction, type_prediction, dwell_time)
+        return FusionResult(_UNKNOWN, 0.2, REASON_LOW_CONFIDENCE,
+                            location_prediction, type_prediction, dwell_time)
+
+    def _predict_learned(self, location_prediction, type_prediction, type_features: Dict,
+                         is_known: bool, loc_conf: float, distance: float, type_conf: float,
+                         dwell_time: float) -> FusionResult:
+        """predict() through the meta-learner; dwell_time overrides type_features['dwell_time']"""
+        X = np.array([[
+            dwell_time, type_features['speed_before'], type_features['heading'],
+            type_features['visit_count'], type_features['hour'], type_features['day_of_week'],
+            loc_conf, min(distance, 1000) / 1000, 1.0 if is_known else 0.0,
+            type_conf, loc_conf * type_conf, (loc_conf + type_conf) / 2
+        ]], dtype=np.float32)
+        type_id, confidence = self.meta_learner.predict(X)
+        code = int(type_id[0])
+        if code == _POSSIBLE_NEW_BUS_STOP:
+            reason = REASON_LEARNED_NEW_STOP
+        elif is_known and code in (_REGULAR_BUS_STOP, _REST_AREA_AT_BUS_STOP):
+            reason = REASON_LEARNED_AT_STOP
+        else:
+            reason = REASON_LEARNED
+        return FusionResult(code, float(confidence[0]), reason,
+                            location_prediction, type_prediction, dwell_time)
+
     def predict_integrated(
         self,
         location_prediction: Dict,
         type_prediction: Dict,
         gps_coords: Tuple[float, float],
-        dwell_time: float
+        dwell_time: float,
+        type_features: Optional[Dict] = None
     ) -> Dict:
         """
         Integrate predictions from both models
@@ -110,6 +621,10 @@ class IntegratedStopDetector:
             }
             gps_coords: (latitude, longitude)
             dwell_time: seconds stopped
+            type_features: optional type classifier inputs (speed_before,
+                heading, visit_count, hour, day_of_week) for the
+                meta-learner, if one is loaded; dwell_time is always taken
+                from the argument above, as in predict_integrated_batch()
             
         Returns:
             integrated_result: {
@@ -119,112 +634,94 @@ class IntegratedStopDetector:
                 'reasoning': str,
                 'should_learn': bool
             }
+
+        Use predict() to skip building this dict.
         """
-        
+        return self.predict(location_prediction, type_prediction, gps_coords, dwell_time,
+                            type_features).to_dict()
+
+    def predict_integrated_batch(
+        self,
+        location_confidence,
+        distance,
+        is_known_stop,
+        stop_type,
+        type_confidence,
+        dwell_time,
+        nearest_stop=None,
+        type_features=None
+    ) -> Dict[str, np.ndarray]:
+        """
+        predict_integrated() for many events at once, from struct-of-arrays inputs
+
+        Args:
+            location_confidence, distance, is_known_stop: location model outputs, shape (n,)
+            stop_type: type classifier labels - names, or integer FUSED_TYPES ids
+            type_confidence: type classifier confidence, shape (n,)
+            dwell_time: seconds stopped, shape (n,)
+            nearest_stop: optional stop names, to fill 'stop_name' like the scalar path
+            type_features: optional columns speed_before, heading, visit_count,
+                hour, day_of_week (DataFrame or dict of arrays); with a
+                meta-learner loaded it replaces the rules for every event
+
+        Returns:
+            {
+                'final_type': str array,
+                'final_type_id': int array (FUSED_TYPES index),
+                'confidence': float array,
+                'should_learn': bool array,
+                'rule': int array (1-6, the rule that fired; 0 for the meta-learner),
+                'stop_name': object array (only with nearest_stop)
+            }
+
+        Outputs match predict_integrated() event for event. Type names the
+        fusion rules don't know are passed through; their ids continue after
+        FUSED_TYPES in sorted name order.
+        """
+        stop_type = np.asarray(stop_type)
+        if stop_type.dtype.kind in 'iu':
+            vocabulary, type_id = FUSED_TYPES, stop_type
+        else:
+            names, inverse = np.unique(stop_type.astype(str), return_inverse=True)
+            vocabulary = FUSED_TYPES + tuple(name for name in names if name not in FUSED_TYPE_IDS)
+            lookup = {name: i for i, name in enumerate(vocabulary)}
+            type_id = np.array([lookup[name] for name in names], dtype=np.int64)[inverse.reshape(-1)]
+
+        known = np.asarray(is_known_stop, dtype=bool)
+        learned = self.meta_learner is not None and type_features is not None
+        if learned:
+            events = {column: type_features[column] for column in TYPE_FEATURE_COLUMNS[1:]}
+            events.update(dwell_time=dwell_time, location_confidence=location_confidence,
+                          distance=distance, is_known_stop=known, type_confidence=type_confidence)
+            final_type_id, confidence = self.meta_learner.predict(combined_feature_matrix(events))
+            rule = np.zeros(len(final_type_id), dtype=np.int64)
+            should_learn = final_type_id == FUSED_TYPE_IDS['possible_new_bus_stop']
+        else:
+            rule, final_type_id, confidence, should_learn = fuse_arrays(
+                location_confidence, distance, known, type_id, type_confidence, dwell_time,
+                self.thresholds()
+            )
+
         result = {
-            'final_type': 'unknown',
-            'confidence': 0.0,
-            'stop_name': None,
-            'reasoning': '',
-            'should_learn': False,
-            'location_model_output': location_prediction,
-            'type_model_output': type_prediction
+            'final_type': np.array(vocabulary)[final_type_id],
+            'final_type_id': final_type_id,
+            'confidence': confidence,
+            'should_learn': should_learn,
+            'rule': rule,
         }
-        
-        # RULE 1: High-confidence known bus stop
-        if (location_prediction['is_known_stop'] and 
-            location_prediction['confidence'] > self.LOCATION_HIGH_CONF and
-            location_prediction['distance'] < self.KNOWN_STOP_RADIUS):
-            
-            result['final_type'] = 'regular_bus_stop'
-            result['stop_name'] = location_prediction['nearest_stop']
-            result['confidence'] = min(0.98, location_prediction['confidence'])
-            result['reasoning'] = f"Known bus stop: {result['stop_name']} ({location_prediction['distance']:.0f}m away)"
-            
-            # If stayed very long, might be rest area
-            if dwell_time > 900:  # 15 minutes
-                result['final_type'] = 'rest_area_at_bus_stop'
-                result['reasoning'] += f" - Extended stop ({dwell_time/60:.1f} min)"
-            
-            return result
-        
-        # RULE 2: Type classifier says "regular stop" but NOT at known location
-        if (type_prediction['stop_type'] == 'regular_stop' and
-            not location_prediction['is_known_stop']):
-            
-            # Could be a new bus stop we don't know about
-            if type_prediction['confidence'] > self.TYPE_HIGH_CONF:
-                result['final_type'] = 'possible_new_bus_stop'
-                result['confidence'] = type_prediction['confidence'] * 0.7
-                result['reasoning'] = "Possible new bus stop (not in database)"
-                result['should_learn'] = True  # Flag for adding to database
-            else:
-                # Low confidence - probably not a real stop
-                result['final_type'] = 'unknown_stop'
-                result['confidence'] = 0.3
-                result['reasoning'] = "Stop at unknown location (low confidence)"
-            
-            return result
-        
-        # RULE 3: Location says maybe, Type classifier is confident
-        if (location_prediction['confidence'] < self.LOCATION_LOW_CONF and
-            type_prediction['confidence'] > self.TYPE_HIGH_CONF):
-            
-            result['final_type'] = type_prediction['stop_type']
-            result['confidence'] = type_prediction['confidence']
-            result['reasoning'] = f"Type classifier confident: {type_prediction['stop_type']}"
-            
-            return result
-        
-        # RULE 4: Near a known stop but type suggests something else
-        if (location_prediction['is_known_stop'] and
-            location_prediction['distance'] < self.KNOWN_STOP_RADIUS * 2 and
-            type_prediction['stop_type'] in ['toll_gate', 'gas_station']):
-            
-            # Trust type classifier if very confident
-            if type_prediction['confidence'] > 0.9:
-                result['final_type'] = type_prediction['stop_type']
-                result['confidence'] = type_prediction['confidence']
-                result['reasoning'] = f"{type_prediction['stop_type']} near {location_prediction['nearest_stop']}"
+        if nearest_stop is not None:
+            # Rules 1, 4 (blended) and 5 (known stop) report the nearest stop, as does
+            # the meta-learner for bus stop verdicts at a known stop
+            ids = FUSED_TYPE_IDS
+            if learned:
+                has_stop_name = known & ((final_type_id == ids['regular_bus_stop']) |
+                                         (final_type_id == ids['rest_area_at_bus_stop']))
             else:
-                # Blend predictions
-                result['final_type'] = 'regular_bus_stop'
-                result['stop_name'] = location_prediction['nearest_stop']
-                result['confidence'] = 0.75
-                result['reasoning'] = "At known stop, but unclear type"
-            
-            return result
-        
-        # RULE 5: Both models have medium confidence
-        if (location_prediction['confidence'] > self.LOCATION_LOW_CONF and
-            type_prediction['confidence'] > 0.6):
-            
-            # Weight location model more heavily
-            if location_prediction['is_known_stop']:
-                result['final_type'] = 'regular_bus_stop'
-                result['stop_name'] = location_prediction['nearest_stop']
-                result['confidence'] = (location_prediction['confidence'] * 0.7 + 
-                                       type_prediction['confidence'] * 0.3)
-            else:
-                result['final_type'] = type_prediction['stop_type']
-                result['confidence'] = (location_prediction['confidence'] * 0.3 + 
-                                       type_prediction['confidence'] * 0.7)
-            
-            result['reasoning'] = "Blended prediction from both models"
-            return result
-        
-        # RULE 6: Default - trust type classifier if available
-        if type_prediction['confidence'] > 0.5:
-            result['final_type'] = type_prediction['stop_type']
-            result['confidence'] = type_prediction['confidence']
-            result['reasoning'] = "Type classifier prediction"
-        else:
-            result['final_type'] = 'unknown'
-            result['confidence'] = 0.2
-            result['reasoning'] = "Low confidence from all models"
-        
+                has_stop_name = (rule == 1) | ((rule == 4) & (final_type_id == ids['regular_bus_stop'])) | \
+                             ((rule == 5) & known)
+            result['stop_name'] = np.where(has_stop_name, np.asarray(nearest_stop, dtype=object), None)
         return result
-    
+
     def calculate_combined_features(
         self,
         location_features: Dict,
@@ -242,36 +739,29 @@ class IntegratedStopDetector:
         - Type model confidence (1)
         - Combined features (2): location*type, location+type
         Total: 12 features
+
+        Names in COMBINED_FEATURE_NAMES; combined_feature_matrix() builds the
+        same rows for whole event tables.
         """
-        
-        # Original features from type classifier
-        type_feat = np.array([
+        location_confidence = location_features['confidence']
+        model_confidence = type_features.get('model_confidence', 0.5)
+        return np.array([
+            # Original features from type classifier
             type_features['dwell_time'],
             type_features['speed_before'],
             type_features['heading'],
             type_features['visit_count'],
             type_features['hour'],
-            type_features['day_of_week']
-        ])
-        
-        # Location features
-        loc_feat = np.array([
-            location_features['confidence'],
+            type_features['day_of_week'],
+            # Location features
+            location_confidence,
             min(location_features['distance'], 1000) / 1000,  # Normalize to 0-1
-            1.0 if location_features['is_known_stop'] else 0.0
+            1.0 if location_features['is_known_stop'] else 0.0,
+            # Meta features
+            model_confidence,
+            location_confidence * model_confidence,  # Interaction
+            (location_confidence + model_confidence) / 2  # Average
         ])
-        
-        # Meta features
-        meta_feat = np.array([
-            type_features.get('model_confidence', 0.5),
-            location_features['confidence'] * type_features.get('model_confidence', 0.5),  # Interaction
-            (location_features['confidence'] + type_features.get('model_confidence', 0.5)) / 2  # Average
-        ])
-        
-        # Combine all
-        combined = np.concatenate([type_feat, loc_feat, meta_feat])
-        
-        return combined
 
 
 def demonstrate_integration():
@@ -0,0 +1,413 @@
+"""
+Shared Model Host for Multi-Process Inference
+
+Worker pools (ingestion_server.py shards, evaluation workers) each load the
+models and stop tables on their own. Most of a worker's memory is the
+TensorFlow import, parsed metadata and stop lists, and all of it is repeated
+in every process. The host keeps one read-only copy that every worker maps:
+
+    parent: host.share(model_config)
+        ↓   <root>/<sha256>.tflite           flatbuffer, TFLite mmaps it (model_path)
+        ↓   <root>/<sha256>.stops/*.npy      stop names + radian coordinates, np.load(mmap_mode='r')
+    worker_context(): forkserver with TensorFlow + the detector modules preloaded
+        ↓   fork
+    workers: build_stream_models(**shared_config) → page-cache / copy-on-write pages, not copies
+
+Artifacts are stored under the SHA-256 of their source file, so publishing the
+same model twice is free and workers attach by hash (`host.attach(key)`).
+The default root is /dev/shm (RAM-backed) when it exists; set
+TRAVION_MODEL_HOST to use another directory.
+
+/dev/shm is RAM, so artifacts do not linger: publishing a new version of a
+file removes the version hosted from the same path before it, and
+host.cleanup() (or cleanup_on_exit=True) removes what this host published.
+Workers that already mapped a removed file keep their mapping.
+
+Measured on one core with 3 workers: a spawned worker holds ~440 MB PSS
+(~295 MB private). A worker forked from the preloaded server holds ~86 MB
+(~11 MB private). `python model_host.py report` measures this for your models.
+
+Usage:
+    host = ModelHost()
+    shared_config = host.share({'classifier': 'stop_classifier.tflite', 'stops_csv': 'sample_stops.csv'})
+    context = worker_context()
+    context.Process(target=worker, args=(shared_config,)).start()
+
+    python model_host.py publish stop_classifier.tflite stop_location_model.tflite
+    python model_host.py clean
+    python model_host.py report --workers 4 --stops 100000 --output memory_report.json
+"""
+
+import argparse
+import atexit
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from artifact_cache import file_digest
+from stop_dataset import load_stop_records
+
+DEFAULT_HOST_DIR = os.environ.get('TRAVION_MODEL_HOST') or (
+    '/dev/shm/travion-models' if os.path.isdir('/dev/shm')
+    else os.path.join(tempfile.gettempdir(), 'travion-models'))
+
+# Imported once by the fork server so workers inherit them instead of importing again
+PRELOAD_MODULES = ['numpy', 'tensorflow', 'integrated_stop_detector', 'streaming_stop_detector']
+
+STOP_TABLE_SUFFIX = '.stops'
+SOURCE_SUFFIX = '.source'        # hidden .<artifact>.source files hold the path it was published from
+STOP_TABLE_ARRAYS = ('names', 'lats', 'lons', 'cos_lats')
+
+def stop_records_and_meta(path):
+    """Stop records of any stop file, plus the other keys of a location metadata JSON"""
+    meta = {}
+    if path.endswith('.json'):
+        with open(path) as f:
+            metadata = json.load(f)
+        if isinstance(metadata, dict):
+            meta = {k: v for k, v in metadata.items() if k != 'bus_stops'}
+    return load_stop_records(path), meta
+
+def write_stop_table(stops, directory, meta=None):
+    """Stop records as .npy arrays (names, radians) a worker can memory-map"""
+    os.makedirs(directory, exist_ok=True)
+    lats = np.radians(np.array([s['latitude'] for s in stops], dtype=np.float64))
+    arrays = {
+        'names': np.array([str(s.get('stop_name', s.get('stop_id', ''))) for s in stops]),
+        'lats': lats,
+        'lons': np.radians(np.array([s['longitude'] for s in stops], dtype=np.float64)),
+        'cos_lats': np.cos(lats),
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), values)
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta or {}, f)
+
+def attach_stop_table(directory):
+    """Read-only memory-mapped stop table written by write_stop_table"""
+    table = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+             for name in STOP_TABLE_ARRAYS}
+    with open(os.path.join(directory, 'meta.json')) as f:
+        table['meta'] = json.load(f)
+    return table
+
+def is_stop_table(path):
+    return bool(path) and os.path.isdir(path) and os.path.exists(os.path.join(path, 'names.npy'))
+
+def _remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class ModelHost:
+    """
+    Content-addressed, read-only model artifacts shared between processes
+
+    Args:
+        root: directory the artifacts live in (RAM-backed /dev/shm by default)
+        cleanup_on_exit: remove the artifacts this host published when the process exits
+    """
+
+    def __init__(self, root=DEFAULT_HOST_DIR, cleanup_on_exit=False):
+        self.root = root
+        self._published = []      # artifacts this host created (others may be shared with other hosts)
+        os.makedirs(root, exist_ok=True)
+        if cleanup_on_exit:
+            atexit.register(self.cleanup)
+
+    def _publish(self, key, suffix, write, source):
+        """Write an artifact next to its final name and rename it into place"""
+        final = os.path.join(self.root, key + suffix)
+        if not os.path.exists(final):
+            staging = os.path.join(self.root, f'.{key}{suffix}.{os.getpid()}')
+            write(staging)
+            try:
+                os.rename(staging, final)
+                self._published.append(final)
+            except OSError:
+                # Another process published the same artifact first
+                _remove_path(staging)
+        self._retire_versions(os.path.abspath(source), final)
+        return final
+
+    def _retire_versions(self, source, current):
+        """Record where `current` came from and remove older artifacts from the same source"""
+        with open(self._source_marker(current), 'w') as f:
+            f.write(source)
+        for name in os.listdir(self.root):
+            if not (name.startswith('.') and name.endswith(SOURCE_SUFFIX)):
+                continue
+            artifact = os.path.join(self.root, name[1:-len(SOURCE_SUFFIX)])
+            if artifact == current:
+                continue
+            try:
+                with open(os.path.join(self.root, name)) as f:
+                    if f.read() != source:
+                        continue
+            except FileNotFoundError:
+                continue
+            self._remove(artifact)
+
+    def _source_marker(self, artifact):
+        return os.path.join(self.root, f'.{os.path.basename(artifact)}{SOURCE_SUFFIX}')
+
+    def _remove(self, artifact):
+        _remove_path(artifact)
+        _remove_path(self._source_marker(artifact))
+
+    def publish(self, path):
+        """Host a .tflite (or any) file; returns its key"""
+        key = file_digest(path)
+        suffix = os.path.splitext(path)[1]
+        self._publish(key, suffix, lambda staging: shutil.copyfile(path, staging), path)
+        return key
+
+    def publish_stop_table(self, path):
+        """Host the stops of a location metadata JSON or stops CSV as mapped arrays; returns the key"""
+        key = file_digest(path)
+
+        def write(staging):
+            stops, meta = stop_records_and_meta(path)
+            write_stop_table(stops, staging, meta)
+
+        self._publish(key, STOP_TABLE_SUFFIX, write, path)
+        return key
+
+    def attach(self, key):
+        """Path of a hosted artifact (a stop table is a directory)"""
+        for name in os.listdir(self.root):
+            if name.partition('.')[0] == key and not name.startswith('.'):
+                return os.path.join(self.root, name)
+        raise FileNotFoundError(f"No artifact {key[:12]}... in {self.root} (publish it first)")
+
+    def cleanup(self):
+        """Remove the artifacts this host published"""
+        for artifact in self._published:
+            self._remove(artifact)
+        self._published = []
+
+    def clear(self):
+        """Remove every hosted artifact, including leftovers of interrupted publishes"""
+        for name in os.listdir(self.root):
+            _remove_path(os.path.join(self.root, name))
+        self._published = []
+
+    def artifacts(self):
+        """{key: path} of everything hosted"""
+        return {name.split('.')[0]: os.path.join(self.root, name)
+                for name in sorted(os.listdir(self.root)) if not name.startswith('.')}
+
+    def share(self, model_config):
+        """
+        build_stream_models() arguments with every artifact replaced by its hosted copy
+
+        Files that do not exist are left alone (build_stream_models reports them).
+        """
+        shared = dict(model_config)
+        defaults = {'classifier': 'stop_classifier.tflite',
+                    'location_model': 'stop_location_model.tflite',
+                    'location_metadata': 'stop_location_metadata.json'}
+        if shared.get('stops') is not None or shared.get('stops_csv'):
+            defaults = {'classifier': defaults['classifier']}
+        for name, default in defaults.items():
+            path = shared.get(name, default)
+            if path and os.path.isfile(path):
+                shared[name] = self.attach(self.publish_stop_table(path) if name == 'location_metadata'
+                                           else self.publish(path))
+        if shared.get('stops_csv') and os.path.isfile(shared['stops_csv']):
+            shared['stops_csv'] = self.attach(self.publish_stop_table(shared['stops_csv']))
+        return shared
+
+def worker_context(preload=PRELOAD_MODULES):
+    """
+    Multiprocessing context whose workers share the preloaded modules
+
+    A fork server imports TensorFlow and the detector modules once; workers
+    are forked from it, so those pages are shared copy-on-write. Models are
+    still loaded in each worker, after the fork. Falls back to spawn where
+    forkserver is unavailable.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    from multiprocessing import forkserver
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(list(preload))
+    # The fork server does not inherit sys.path (Python < 3.12), so it gets this
+    # directory through its environment; start it now and leave ours as it was
+    here = os.path.dirname(os.path.abspath(__file__))
+    previous = os.environ.get('PYTHONPATH')
+    os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [here, previous]))
+    try:
+        forkserver.ensure_running()
+    finally:
+        if previous is None:
+            del os.environ['PYTHONPATH']
+        else:
+            os.environ['PYTHONPATH'] = previous
+    return context
+
+def memory_usage(pid='self'):
+    """RSS, PSS and USS (private) of a process in MB, from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss_mb': values['Rss'] / 1024,
+        'pss_mb': values['Pss'] / 1024,
+        'uss_mb': (values['Private_Clean'] + values['Private_Dirty']) / 1024,
+    }
+
+def _report_worker(model_config, ready, done):
+    """Load the stream models, run one prediction each and wait to be measured"""
+    from streaming_stop_detector import build_stream_models
+    type_model, location_model, _ = build_stream_models(**model_config)
+    for model in (type_model, location_model):
+        if hasattr(model, 'load'):
+            model.load()
+    features = {name: 1.0 for name in type_model.feature_names}
+    type_model(features)
+    location_model(12.87, 74.84)
+    ready.set()
+    done.wait()
+
+def _measure_pool(context, model_config, workers, extra_pids=()):
+    ready = [context.Event() for _ in range(workers)]
+    done = context.Event()
+    processes = [context.Process(target=_report_worker, args=(model_config, ready[i], done))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    for i, event in enumerate(ready):
+        while not event.wait(1.0):
+            if not processes[i].is_alive():
+                raise RuntimeError(f"Report worker {i} failed (exit code {processes[i].exitcode})")
+    time.sleep(0.5)
+    per_process = [dict(memory_usage(p.pid), role='worker') for p in processes]
+    per_process += [dict(memory_usage(pid), role='fork server') for pid in extra_pids()]
+    done.set()
+    for process in processes:
+        process.join()
+    return {
+        'processes': per_process,
+        'total': {k: sum(p[k] for p in per_process) for k in ('rss_mb', 'pss_mb', 'uss_mb')},
+    }
+
+def _fork_server_pids():
+    from multiprocessing import forkserver
+    pid = getattr(forkserver._forkserver, '_forkserver_pid', None)
+    return [pid] if pid else []
+
+def memory_report(model_config=None, workers=4, host_root=DEFAULT_HOST_DIR, output_path=None):
+    """
+    Memory of `workers` stream-model workers: spawned with private copies vs shared host
+
+    Totals use PSS (shared pages split between the processes mapping them),
+    so they add up to what the pool really costs.
+    """
+    model_config = model_config or {}
+    print(f"🧪 Measuring {workers} worker(s), each loading its own models (spawn)...")
+    private = _measure_pool(multiprocessing.get_context('spawn'), model_config, workers, lambda: [])
+
+    print(f"🧪 Measuring {workers} worker(s) attached to the shared host ({host_root})...")
+    host = ModelHost(host_root)
+    shared_config = host.share(model_config)
+    context = worker_context()
+    try:
+        shared = _measure_pool(context, shared_config, workers,
+                               _fork_server_pids if context.get_start_method() == 'forkserver' else lambda: [])
+    finally:
+        host.cleanup()
+
+    report = {'workers': workers, 'model_config': model_config, 'shared_config': shared_config,
+              'private': private, 'shared': shared}
+
+    print("\n" + "=" * 70)
+    print(f"{'':<34}{'RSS MB':>12}{'PSS MB':>12}{'USS MB':>12}")
+    print("-" * 70)
+    for name, result in (('Private copies', private), ('Shared host', shared)):
+        for i, p in enumerate(result['processes']):
+            label = f"{name} · {p['role']} {i if p['role'] == 'worker' else ''}".rstrip()
+            print(f"{label:<34}{p['rss_mb']:>12.1f}{p['pss_mb']:>12.1f}{p['uss_mb']:>12.1f}")
+        total = result['total']
+        print(f"{name + ' · total':<34}{total['rss_mb']:>12.1f}{total['pss_mb']:>12.1f}{total['uss_mb']:>12.1f}")
+        print("-" * 70)
+    saved = private['total']['pss_mb'] - shared['total']['pss_mb']
+    print(f"Shared host saves {saved:,.0f} MB PSS "
+          f"({saved / max(private['total']['pss_mb'], 1e-9):.0%}) across the pool")
+    print("=" * 70)
+
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {output_path}")
+    return report
+
+def _synthetic_metadata(n_stops, metadata_path, directory):
+    """Copy of the location metadata with n_stops random stops (stop tables the size of a city)"""
+    from trace_simulator import load_stop_table
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    stops = load_stop_table(n_stops=n_stops)
+    metadata['bus_stops'] = stops.to_dict('records')
+    metadata['num_bus_stops'] = n_stops
+    path = os.path.join(directory, f'stop_location_metadata_{n_stops}.json')
+    with open(path, 'w') as f:
+        json.dump(metadata, f)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Shared read-only model host for worker pools')
+    parser.add_argument('--root', default=DEFAULT_HOST_DIR, help='Host directory')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('publish', help='Host model files / stop tables and print their keys')
+    p.add_argument('paths', nargs='+', help='.tflite files, stop_location_metadata.json or stop CSVs')
+
+    p = sub.add_parser('list', help='Hosted artifacts')
+
+    p = sub.add_parser('clean', help='Remove every hosted artifact')
+
+    p = sub.add_parser('report', help='Per-process and total memory, private copies vs shared host')
+    p.add_argument('--workers', type=int, default=4)
+    p.add_argument('--classifier', default='stop_classifier.tflite')
+    p.add_argument('--scaler', default='scaler_params.json')
+    p.add_argument('--location-model', default='stop_location_model.tflite')
+    p.add_argument('--location-metadata', default='stop_location_metadata.json')
+    p.add_argument('--stops', type=int, default=0,
+                   help='Replace the metadata stop list with this many random stops')
+    p.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    host = ModelHost(args.root)
+    if args.command == 'publish':
+        for path in args.paths:
+            is_table = path.endswith(('.json', '.csv'))
+            key = host.publish_stop_table(path) if is_table else host.publish(path)
+            print(f"📦 {path} → {key}  ({host.attach(key)})")
+    elif args.command == 'list':
+        for key, path in host.artifacts().items():
+            print(f"{key}  {path}")
+    elif args.command == 'clean':
+        n_artifacts = len(host.artifacts())
+        host.clear()
+        print(f"✅ Removed {n_artifacts} artifact(s) from {host.root}")
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            metadata = args.location_metadata
+            if args.stops:
+                metadata = _synthetic_metadata(args.stops, metadata, tmp)
+            config = {'classifier': args.classifier, 'scaler': args.scaler,
+                      'location_model': args.location_model, 'location_metadata': metadata}
+            memory_report(config, args.workers, args.root, args.output)
@@ -0,0 +1,364 @@
+"""
+Parallel Dual-Model Inference
+
+The "PARALLEL MODEL INFERENCE (both models run together)" box of the
+integrated detector: for each stop event the location model and the type
+classifier are dispatched at the same time to their own worker pools.
+
+    stop event ──┬──▶ location pool (N threads, one interpreter each) ─┐
+                 └──▶ type pool     (N threads, one interpreter each) ─┴─▶ (location, type)
+
+Each worker owns its TFLite interpreters (interpreters are not thread-safe;
+invoke() releases the GIL, so workers overlap). Requests queued while a worker
+was busy are stacked into one invocation, up to --max-batch. Once batches start
+forming (the previous one held more than one event) the worker also waits up
+to --max-wait-ms for more; an idle worker runs a lone event straight away.
+Batches are padded to power-of-two sizes (capped at --max-batch) so each
+interpreter only ever sees a few tensor shapes; models with a fixed batch
+dimension run one event per call.
+
+The location model may be a stop_candidates.LiveIndex: every event is decoded
+against the stops published when it was submitted, so promoted new stops show
+up as nearest stops just as they do without the runner.
+
+Usage:
+    runner = DualModelRunner()
+    location_prediction, type_prediction = runner.predict(features, lat, lon)
+    runner.close()
+
+    python parallel_inference.py --events 5000 --clients 32    # latency / throughput report
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from streaming_stop_detector import TFLiteLocationModel, TFLiteTypeModel, load_interpreter
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 0.5
+
+_STOP = object()
+
+def _bucket(n, max_batch):
+    """Smallest power of two >= n, but never more than max_batch"""
+    return min(1 << (n - 1).bit_length(), max(n, max_batch))
+
+class MicroBatchPool:
+    """
+    Worker threads serving one model from a shared request queue
+
+    submit(x) takes one input row and returns a Future of the model's output row.
+    """
+
+    def __init__(self, tflite_path, workers=DEFAULT_WORKERS, max_batch=DEFAULT_MAX_BATCH,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, name='model'):
+        self.tflite_path = tflite_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self.invocations = 0
+        self.events = 0
+
+        # Load every interpreter before accepting work so startup errors surface here
+        ready = []
+        for _ in range(workers):
+            ready.append(load_interpreter(tflite_path))
+        self._threads = [
+            threading.Thread(target=self._worker, args=(interpreter,), name=f'{name}-{i}', daemon=True)
+            for i, interpreter in enumerate(ready)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, x):
+        future = Future()
+        self._queue.put((x, future))
+        return future
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _collect(self, first, wait):
+        """The first request plus whatever is queued (and, if wait, arrives within max_wait)"""
+        batch = [first]
+        deadline = time.perf_counter() + (self.max_wait if wait else 0.0)
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                # Leave the shutdown signal for this worker's next loop
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self, loaded):
+        interpreter, input_index, output_index = loaded
+        signature = interpreter.get_input_details()[0].get('shape_signature')
+        batched = signature is not None and len(signature) > 0 and signature[0] == -1
+        current_size = 1
+        busy = False
+
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first, busy) if batched else [first]
+            busy = len(batch) > 1
+
+            try:
+                X = np.stack([x for x, _ in batch])
+                size = _bucket(len(batch), self.max_batch) if batched else 1
+                if size != len(X):
+                    X = np.concatenate([X, np.zeros((size - len(X),) + X.shape[1:], dtype=X.dtype)])
+                if size != current_size:
+                    interpreter.resize_tensor_input(input_index, X.shape)
+                    interpreter.allocate_tensors()
+                    current_size = size
+                interpreter.set_tensor(input_index, X)
+                interpreter.invoke()
+                outputs = interpreter.get_tensor(output_index)
+                for (_, future), output in zip(batch, outputs):
+                    future.set_result(output.copy())
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._lock:
+                self.invocations += 1
+                self.events += len(batch)
+
+class PendingPrediction:
+    """Both model futures for one stop event; result() decodes them"""
+
+    __slots__ = ('runner', 'location_model', 'location_future', 'type_future', 'lat', 'lon')
+
+    def __init__(self, runner, location_model, location_future, type_future, lat, lon):
+        self.runner = runner
+        self.location_model = location_model
+        self.location_future = location_future
+        self.type_future = type_future
+        self.lat = lat
+        self.lon = lon
+
+    def result(self, timeout=None):
+        """(location_prediction, type_prediction)"""
+        location_output = self.location_future.result(timeout)
+        type_output = self.type_future.result(timeout)
+        return (self.location_model.decode(location_output, self.lat, self.lon),
+                self.runner.type_model.decode(type_output))
+
+class DualModelRunner:
+    """
+    Runs the location model and the type classifier concurrently, micro-batched
+
+    Callable as inference(features, lat, lon) -> (location_prediction,
+    type_prediction), which is what StreamingStopDetector(inference=...) takes.
+    location_model may be a LiveIndex over a TFLiteLocationModel.
+    """
+
+    def __init__(self, type_model=None, location_model=None, workers=DEFAULT_WORKERS,
+                 max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.type_model = type_model or TFLiteTypeModel()
+        self.locator = location_model or TFLiteLocationModel()
+        self.type_pool = MicroBatchPool(self.type_model.tflite_path, workers, max_batch,
+                                        max_wait_ms, name='type')
+        self.location_pool = MicroBatchPool(self.location_model.tflite_path, workers, max_batch,
+                                            max_wait_ms, name='location')
+
+    @property
+    def location_model(self):
+        """The location model in use (the current snapshot if the locator is a LiveIndex)"""
+        return getattr(self.locator, 'current', self.locator)
+
+    def submit(self, features, lat, lon):
+        """Dispatch both models for one stop event without waiting"""
+        location_model = self.location_model
+        type_future = self.type_pool.submit(self.type_model.encode(features))
+        location_future = self.location_pool.submit(location_model.encode(lat, lon))
+        return PendingPrediction(self, location_model, location_future, type_future, lat, lon)
+
+    def predict(self, features, lat, lon):
+        return self.submit(features, lat, lon).result()
+
+    __call__ = predict
+
+    def sequential_predict(self, features, lat, lon):
+        """Both models one after the other on the calling thread (baseline)"""
+        return self.locator(lat, lon), self.type_model(features)
+
+    def stats(self):
+        return {pool.name: {'invocations': pool.invocations, 'events': pool.events,
+                            'mean_batch': pool.events / max(pool.invocations, 1)}
+                for pool in (self.location_pool, self.type_pool)}
+
+    def close(self):
+        self.type_pool.close()
+        self.location_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def synthetic_stop_events(n_events, stops, seed=0):
+    """(features, lat, lon) tuples around the known stops"""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(len(stops), size=n_events)
+    events = []
+    for i in picks:
+        features = {
+            'dwell_time': float(rng.uniform(10, 1800)), 'speed_before': float(rng.uniform(0, 80)),
+            'heading': float(rng.uniform(0, 360)), 'visit_count': int(rng.integers(1, 20)),
+            'hour': int(rng.integers(24)), 'day_of_week': int(rng.integers(7))
+        }
+        lat = float(stops[i]['latitude'] + rng.normal(0, 0.002))
+        lon = float(stops[i]['longitude'] + rng.normal(0, 0.002))
+        events.append((features, lat, lon))
+    return events
+
+def _latency_summary(latencies):
+    ms = np.array(latencies) * 1000
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p99_ms': float(np.percentile(ms, 99)),
+            'mean_ms': float(ms.mean())}
+
+def measure_single_event(predict, events, n_events=1000):
+    """Latency of one event at a time (no concurrency to batch with)"""
+    latencies = []
+    for features, lat, lon in events[:n_events]:
+        start = time.perf_counter()
+        predict(features, lat, lon)
+        latencies.append(time.perf_counter() - start)
+    return _latency_summary(latencies)
+
+def measure_under_load(predict, events, clients):
+    """
+    Closed-loop load: `clients` threads each send their share of events back to back
+
+    Returns throughput (events/s) and per-event latency percentiles.
+    """
+    latencies = [[] for _ in range(clients)]
+    shares = [events[i::clients] for i in range(clients)]
+
+    def client(i):
+        for features, lat, lon in shares[i]:
+            start = time.perf_counter()
+            predict(features, lat, lon)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    summary = _latency_summary([t for per_client in latencies for t in per_client])
+    summary['throughput_per_s'] = len(events) / elapsed
+    return summary
+
+def measure_burst(runner, events):
+    """Open-loop burst: submit every event, then collect (a replayed backlog)"""
+    start = time.perf_counter()
+    pending = [runner.submit(features, lat, lon) for features, lat, lon in events]
+    for p in pending:
+        p.result()
+    elapsed = time.perf_counter() - start
+    return {'throughput_per_s': len(events) / elapsed}
+
+def run_report(n_events=5000, clients=32, workers=DEFAULT_WORKERS, max_batch=DEFAULT_MAX_BATCH,
+               max_wait_ms=DEFAULT_MAX_WAIT_MS, output_path=None):
+    print("=" * 78)
+    print("DUAL-MODEL INFERENCE")
+    print("=" * 78)
+    with DualModelRunner(workers=workers, max_batch=max_batch, max_wait_ms=max_wait_ms) as runner:
+        stops = [{'latitude': lat, 'longitude': lon}
+                 for lat, lon in zip(np.degrees(runner.location_model.lats),
+                                     np.degrees(runner.location_model.lons))]
+        events = synthetic_stop_events(n_events, stops)
+
+        # Warm up interpreters and allocation paths
+        for features, lat, lon in events[:50]:
+            runner.predict(features, lat, lon)
+            runner.sequential_predict(features, lat, lon)
+
+        n_single = min(1000, n_events)
+        rows = {
+            'sequential, 1 event': measure_single_event(runner.sequential_predict, events, n_single),
+            'runner, 1 event': measure_single_event(runner.predict, events, n_single),
+            f'sequential, {clients} clients': measure_under_load(_locked(runner), events, clients),
+            f'runner, {clients} clients': measure_under_load(runner.predict, events, clients),
+        }
+        start = time.perf_counter()
+        for features, lat, lon in events:
+            runner.sequential_predict(features, lat, lon)
+        rows['sequential, burst'] = {'throughput_per_s': len(events) / (time.perf_counter() - start)}
+        rows['runner, burst'] = measure_burst(runner, events)
+        stats = runner.stats()
+
+    print(f"{workers} worker(s) per model, max batch {max_batch}, max wait {max_wait_ms} ms, "
+          f"{n_events:,} events")
+    print("-" * 78)
+    print(f"{'Mode':<30}{'p50 (ms)':>12}{'p99 (ms)':>12}{'Throughput (ev/s)':>22}")
+    print("-" * 78)
+    for mode, row in rows.items():
+        throughput = f"{row['throughput_per_s']:,.0f}" if 'throughput_per_s' in row else '-'
+        p50 = f"{row['p50_ms']:.3f}" if 'p50_ms' in row else '-'
+        p99 = f"{row['p99_ms']:.3f}" if 'p99_ms' in row else '-'
+        print(f"{mode:<30}{p50:>12}{p99:>12}{throughput:>22}")
+    print("-" * 78)
+    for name, s in stats.items():
+        print(f"{name:<10} {s['invocations']:,} invocations, mean batch {s['mean_batch']:.1f}")
+
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump({'config': {'workers': workers, 'max_batch': max_batch, 'max_wait_ms': max_wait_ms,
+                                  'clients': clients, 'n_events': n_events},
+                       'results': rows, 'batching': stats}, f, indent=2)
+        print(f"\n✅ Results saved to {output_path}")
+    return rows
+
+def _locked(runner):
+    """Sequential baseline made safe for concurrent clients (interpreters are not thread-safe)"""
+    lock = threading.Lock()
+
+    def predict(features, lat, lon):
+        with lock:
+            return runner.sequential_predict(features, lat, lon)
+    return predict
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Parallel, micro-batched dual-model inference benchmark')
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent callers for the load test')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Threads per model')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument('--output', default=None, help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    run_report(args.events, args.clients, args.workers, args.max_batch, args.max_wait_ms, args.output)
@@ -17,10 +17,14 @@ Example: Mangalore → Karkala
 import numpy as np
 import pandas as pd
 from typing import List, Dict, Tuple, Optional
+import copy
 import json
 from datetime import datetime, timedelta
 import math
 
+from instrumentation import traced
+from stop_dataset import load_stops, normalize_stops
+
 class RouteBasedStopSuggester:
     """
     Suggests relevant bus stops based on journey route
@@ -28,9 +32,10 @@ class RouteBasedStopSuggester:
     
     def __init__(self, stops_csv_path: str):
         """
-        Initialize with bus stop dataset
+        Initialize with bus stop dataset (CSV or JSON, any schema
+        stop_dataset.load_stops understands)
         
-        Expected CSV columns:
+        Columns after loading:
         - stop_id: Unique identifier
         - stop_name: Name of the stop
         - latitude: GPS latitude
@@ -38,13 +43,35 @@ class RouteBasedStopSuggester:
         - route_ids: Comma-separated route numbers (optional)
         - sequence: Stop sequence on route (optional)
         """
-        self.stops_df = pd.read_csv(stops_csv_path)
+        self.stops_df = load_stops(stops_csv_path)
         self.routes = {}  # route_id -> list of stops
         
         # Build route index if available
         if 'route_ids' in self.stops_df.columns:
             self._build_route_index()
     
+    @classmethod
+    def from_records(cls, stops: List[Dict]) -> 'RouteBasedStopSuggester':
+        """A suggester over stop records instead of a file"""
+        suggester = cls.__new__(cls)
+        suggester.stops_df = normalize_stops(pd.DataFrame(stops))
+        suggester.routes = {}
+        if 'route_ids' in suggester.stops_df.columns:
+            suggester._build_route_index()
+        return suggester
+
+    def with_stops(self, stops: List[Dict]) -> 'RouteBasedStopSuggester':
+        """
+        A copy that also suggests `stops` (records with stop_name, latitude,
+        longitude and optionally stop_id / route_ids); this one is left untouched
+        """
+        suggester = copy.copy(self)
+        suggester.stops_df = pd.concat([self.stops_df, pd.DataFrame(stops)], ignore_index=True)
+        suggester.routes = {}
+        if 'route_ids' in suggester.stops_df.columns:
+            suggester._build_route_index()
+        return suggester
+
     def _build_route_index(self):
         """Build index of routes and their stops"""
         for _, stop in self.stops_df.iterrows():
@@ -107,6 +134,7 @@ class RouteBasedStopSuggester:
         # If deviation is small, point is likely on route
         return deviation < tolerance_km
     
+    @traced('corridor_scoring')
     def suggest_stops_between(self, 
                              origin: str,
                              destination: str,
@@ -163,35 +191,10 @@ class RouteBasedStopSuggester:
                 if dist_from_origin < 0.5 or dist_from_dest < 0.5:
                     continue
                 
-                # Calculate relevance score
-                # Higher score = more relevant
-                score = 100
-                
-                # Prefer stops roughly in the middle
-                middle_position = abs(dist_from_origin - route_distance / 2)
-                score -= middle_position * 2
-                
-                # Calculate bearing to stop
-                bearing_to_stop = self.calculate_bearing(
-                    origin_lat, origin_lon, stop_lat, stop_lon
-                )
-                bearing_diff = abs(bearing_to_stop - route_bearing)
-                if bearing_diff > 180:
-                    bearing_diff = 360 - bearing_diff
-                
-                # Penalize stops not aligned with route direction
-                score -= bearing_diff / 2
-                
-                candidate_stops.append({
-                    'stop_id': stop.get('stop_id', ''),
-                    'stop_name': stop['stop_name'],
-                    'latitude': stop_lat,
-                    'longitude': stop_lon,
-                    'distance_from_origin_km': round(dist_from_origin, 2),
-                    'distance_from_dest_km': round(dist_from_dest, 2),
-                    'relevance_score': round(score, 2),
-                    'estimated_arrival_time': None  # Will be calculated
-                })
+                candidate_stops.append(self._describe_stop(
+                    stop, origin_coords, dist_from_origin, dist_from_dest,
+                    route_bearing, route_distance
+                ))
         
         # Sort by distance from origin (natural journey order)
         candidate_stops.sort(key=lambda x: x['distance_from_origin_km'])
@@ -206,6 +209,68 @@ class RouteBasedStopSuggester:
         
         return suggested_stops
     
+    def _describe_stop(self, stop, origin_coords: Tuple[float, float],
+                       dist_from_origin: float, dist_from_dest: float,
+                       route_bearing: float, route_distance: float) -> Dict:
+        """Suggestion entry (distances, relevance score) for one stop on the route"""
+        origin_lat, origin_lon = origin_coords
+        stop_lat = stop['latitude']
+        stop_lon = stop['longitude']
+        
+        # Calculate relevance score
+        # Higher score = more relevant
+        score = 100
+        
+        # Prefer stops roughly in the middle
+        middle_position = abs(dist_from_origin - route_distance / 2)
+        score -= middle_position * 2
+        
+        # Calculate bearing to stop
+        bearing_to_stop = self.calculate_bearing(
+            origin_lat, origin_lon, stop_lat, stop_lon
+        )
+        bearing_diff = abs(bearing_to_stop - route_bearing)
+        if bearing_diff > 180:
+            bearing_diff = 360 - bearing_diff
+        
+        # Penalize stops not aligned with route direction
+        score -= bearing_diff / 2
+        
+        return {
+            'stop_id': stop.get('stop_id', ''),
+            'stop_name': stop['stop_name'],
+            'latitude': stop_lat,
+            'longitude': stop_lon,
+            'distance_from_origin_km': round(dist_from_origin, 2),
+            'distance_from_dest_km': round(dist_from_dest, 2),
+            'relevance_score': round(score, 2),
+            'estimated_arrival_time': None  # Will be calculated
+        }
+    
+    def describe_route_stops(self, stops: List[Dict],
+                             origin_coords: Tuple[float, float],
+                             dest_coords: Tuple[float, float]) -> List[Dict]:
+        """
+        Suggestion entries for stops already chosen for a route (in journey
+        order), as suggest_stops_between returns them - e.g. from a
+        precomputed suggestion bundle
+        """
+        origin_lat, origin_lon = origin_coords
+        dest_lat, dest_lon = dest_coords
+        route_bearing = self.calculate_bearing(origin_lat, origin_lon, dest_lat, dest_lon)
+        route_distance = self.haversine_distance(origin_lat, origin_lon, dest_lat, dest_lon)
+        
+        described = [
+            self._describe_stop(
+                stop, origin_coords,
+                self.haversine_distance(origin_lat, origin_lon, stop['latitude'], stop['longitude']),
+                self.haversine_distance(stop['latitude'], stop['longitude'], dest_lat, dest_lon),
+                route_bearing, route_distance
+            )
+            for stop in stops
+        ]
+        return self._add_arrival_estimates(described, origin_coords, average_speed_kmh=40)
+    
     def _resolve_location(self, location: str) -> Optional[Tuple[float, float]]:
         """
         Resolve location string to coordinates
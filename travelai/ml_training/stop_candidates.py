@@ -0,0 +1,319 @@
+"""
+New Bus Stop Discovery
+
+Collects the stops the fusion rules flag as `possible_new_bus_stop`
+(should_learn=True) and turns repeated sightings into real stops:
+
+    flagged stop event (lat, lon)
+        ↓
+    spatial hash grid (cells ≈ merge radius) → nearest cluster within merge_radius_m
+        ↓  merge (count, centroid, vehicles) or start a new cluster
+    support ≥ min_support from ≥ min_vehicles vehicles
+        ↓
+    promoted stop → published to every LiveIndex (nearest-stop model, route suggester)
+
+Each observation only looks at the clusters in the neighbouring grid cells,
+so adding one is O(1) regardless of how many candidates exist. Clusters whose
+centroids drift within the merge radius of each other are merged, unless both
+are already promoted: published stops are never retracted, so two promoted
+clusters stay separate stops.
+
+LiveIndex holds an immutable index object and swaps in an updated copy when
+stops are published (copy-on-write). Readers just use `live.current` (or
+call the LiveIndex) and never take a lock; a reader keeps the snapshot it
+started with.
+
+Usage:
+    locator = LiveIndex(NearestStopLocationModel.from_csv('sample_stops.csv'))
+    routes = LiveIndex(RouteBasedStopSuggester('sample_stops.csv'))
+    store = CandidateStore(indexes=[locator, routes])
+    stream = StreamingStopDetector(type_model, locator)
+    for event in stream.run(fixes):
+        store.observe(event)                 # promotes and publishes as support builds up
+    store.save('stop_candidates.json')
+
+    python stop_candidates.py stop_events.ndjson --output stop_candidates.json
+"""
+
+import argparse
+import json
+import math
+import threading
+
+METERS_PER_DEGREE = 111320.0
+
+DEFAULT_MERGE_RADIUS_M = 60
+DEFAULT_MIN_SUPPORT = 5
+DEFAULT_MIN_VEHICLES = 1
+
+class LiveIndex:
+    """
+    Copy-on-write holder for an index with a with_stops(stops) copy method
+
+    publish() builds the new version off to the side and swaps the reference;
+    concurrent readers see either the old or the new index, never a partial one.
+    """
+
+    def __init__(self, index):
+        self.current = index
+        self.version = 0
+        self._write_lock = threading.Lock()
+
+    def publish(self, stops):
+        with self._write_lock:
+            self.current = self.current.with_stops(stops)
+            self.version += 1
+
+    def __call__(self, *args, **kwargs):
+        return self.current(*args, **kwargs)
+
+class Cluster:
+    """Running summary of nearby new-stop sightings"""
+
+    __slots__ = ('cluster_id', 'lat_sum', 'lon_sum', 'count', 'confidence_sum', 'vehicles',
+                 'first_seen', 'last_seen', 'cell', 'stop_id')
+
+    def __init__(self, cluster_id, lat, lon, confidence, vehicle_id, timestamp):
+        self.cluster_id = cluster_id
+        self.lat_sum = lat
+        self.lon_sum = lon
+        self.count = 1
+        self.confidence_sum = confidence
+        self.vehicles = {vehicle_id} if vehicle_id is not None else set()
+        self.first_seen = self.last_seen = timestamp
+        self.cell = None
+        self.stop_id = None          # set once promoted
+
+    @property
+    def latitude(self):
+        return self.lat_sum / self.count
+
+    @property
+    def longitude(self):
+        return self.lon_sum / self.count
+
+    def add(self, lat, lon, confidence, vehicle_id, timestamp):
+        self.lat_sum += lat
+        self.lon_sum += lon
+        self.count += 1
+        self.confidence_sum += confidence
+        if vehicle_id is not None:
+            self.vehicles.add(vehicle_id)
+        if timestamp is not None:
+            self.first_seen = timestamp if self.first_seen is None else min(self.first_seen, timestamp)
+            self.last_seen = timestamp if self.last_seen is None else max(self.last_seen, timestamp)
+
+    def absorb(self, other):
+        """Merge another cluster into this one"""
+        self.lat_sum += other.lat_sum
+        self.lon_sum += other.lon_sum
+        self.count += other.count
+        self.confidence_sum += other.confidence_sum
+        self.vehicles |= other.vehicles
+        for timestamp in (other.first_seen, other.last_seen):
+            if timestamp is not None:
+                self.first_seen = timestamp if self.first_seen is None else min(self.first_seen, timestamp)
+                self.last_seen = timestamp if self.last_seen is None else max(self.last_seen, timestamp)
+        if self.stop_id is None:
+            self.stop_id = other.stop_id
+
+    def to_dict(self):
+        return {
+            'cluster_id': self.cluster_id,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'count': self.count,
+            'mean_confidence': self.confidence_sum / self.count,
+            'vehicles': sorted(str(v) for v in self.vehicles),
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'stop_id': self.stop_id
+        }
+
+class CandidateStore:
+    """
+    Spatially clustered new-stop candidates
+
+    Args:
+        merge_radius_m: sightings within this distance of a cluster centroid join it
+        min_support: sightings needed before a cluster becomes a stop
+        min_vehicles: distinct vehicles needed before a cluster becomes a stop
+        indexes: LiveIndex objects that promoted stops are published to
+    """
+
+    def __init__(self, merge_radius_m=DEFAULT_MERGE_RADIUS_M, min_support=DEFAULT_MIN_SUPPORT,
+                 min_vehicles=DEFAULT_MIN_VEHICLES, indexes=()):
+        self.merge_radius_m = merge_radius_m
+        self.min_support = min_support
+        self.min_vehicles = min_vehicles
+        self.indexes = list(indexes)
+        self.cell_degrees = merge_radius_m / METERS_PER_DEGREE
+        self.clusters = {}    # cluster_id -> Cluster
+        self.promoted = []    # stop records, in promotion order
+        self._grid = {}       # (lat cell, lon cell) -> cluster ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.clusters)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _distance_m(self, lat1, lon1, lat2, lon2):
+        # Equirectangular approximation; exact enough at merge-radius scale
+        dy = (lat2 - lat1) * METERS_PER_DEGREE
+        dx = (lon2 - lon1) * METERS_PER_DEGREE * math.cos(math.radians((lat1 + lat2) / 2))
+        return math.hypot(dx, dy)
+
+    def _nearest_cluster(self, lat, lon, exclude=None, skip_promoted=False):
+        """Closest cluster within merge_radius_m of (lat, lon), searching neighbouring cells"""
+        i, j = self._cell(lat, lon)
+        # Cells are square in degrees, so they get narrower in meters away from the equator
+        lon_reach = math.ceil(1 / max(math.cos(math.radians(lat)), 0.01))
+        best, best_distance = None, self.merge_radius_m
+        for di in (-1, 0, 1):
+            for dj in range(-lon_reach, lon_reach + 1):
+                for cluster_id in self._grid.get((i + di, j + dj), ()):
+                    if cluster_id == exclude:
+                        continue
+                    cluster = self.clusters[cluster_id]
+                    if skip_promoted and cluster.stop_id is not None:
+                        continue
+                    distance = self._distance_m(lat, lon, cluster.latitude, cluster.longitude)
+                    if distance <= best_distance:
+                        best, best_distance = cluster, distance
+        return best
+
+    def _place(self, cluster):
+        """(Re)bin a cluster under its current centroid"""
+        cell = self._cell(cluster.latitude, cluster.longitude)
+        if cell == cluster.cell:
+            return
+        if cluster.cell is not None:
+            members = self._grid[cluster.cell]
+            members.remove(cluster.cluster_id)
+            if not members:
+                del self._grid[cluster.cell]
+        self._grid.setdefault(cell, []).append(cluster.cluster_id)
+        cluster.cell = cell
+
+    def _remove(self, cluster):
+        members = self._grid[cluster.cell]
+        members.remove(cluster.cluster_id)
+        if not members:
+            del self._grid[cluster.cell]
+        del self.clusters[cluster.cluster_id]
+
+    def add(self, lat, lon, confidence=1.0, vehicle_id=None, timestamp=None):
+        """
+        Record one new-stop sighting
+
+        Returns the stop record if this sighting promoted its cluster, else None.
+        """
+        with self._lock:
+            cluster = self._nearest_cluster(lat, lon)
+            if cluster is None:
+                cluster = Cluster(self._next_id, lat, lon, confidence, vehicle_id, timestamp)
+                self.clusters[cluster.cluster_id] = cluster
+                self._next_id += 1
+            else:
+                cluster.add(lat, lon, confidence, vehicle_id, timestamp)
+                # The centroid moved; absorb any cluster it now overlaps (never a second stop)
+                other = self._nearest_cluster(cluster.latitude, cluster.longitude, exclude=cluster.cluster_id,
+                                              skip_promoted=cluster.stop_id is not None)
+                if other is not None:
+                    keep, drop = (cluster, other) if cluster.count >= other.count else (other, cluster)
+                    self._remove(drop)
+                    keep.absorb(drop)
+                    cluster = keep
+            self._place(cluster)
+
+            if cluster.stop_id is not None or cluster.count < self.min_support or \
+                    len(cluster.vehicles) < self.min_vehicles:
+                return None
+            cluster.stop_id = f'learned-{cluster.cluster_id}'
+            stop = {
+                'stop_id': cluster.stop_id,
+                'stop_name': f'New stop ({cluster.latitude:.5f}, {cluster.longitude:.5f})',
+                'latitude': cluster.latitude,
+                'longitude': cluster.longitude,
+                'support': cluster.count,
+            }
+            self.promoted.append(stop)
+
+        for index in self.indexes:
+            index.publish([stop])
+        return stop
+
+    def observe(self, event):
+        """
+        Record a stop event if fusion flagged it for learning
+
+        Accepts a StopEvent or its to_dict() form.
+        """
+        if isinstance(event, dict):
+            if not event.get('should_learn'):
+                return None
+            return self.add(event['latitude'], event['longitude'], event.get('confidence', 1.0),
+                            event.get('vehicle_id'), event.get('end_time'))
+        if not event.result.should_learn:
+            return None
+        return self.add(event.latitude, event.longitude, event.result.confidence,
+                        event.vehicle_id, event.end_time)
+
+    def candidates(self, min_count=1):
+        """Cluster summaries, most supported first"""
+        with self._lock:
+            clusters = [c.to_dict() for c in self.clusters.values() if c.count >= min_count]
+        return sorted(clusters, key=lambda c: -c['count'])
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'merge_radius_m': self.merge_radius_m, 'min_support': self.min_support,
+                       'min_vehicles': self.min_vehicles, 'promoted': self.promoted,
+                       'clusters': self.candidates()}, f, indent=2, default=str)
+
+    @classmethod
+    def load(cls, path, indexes=()):
+        """Restore a saved store; already promoted stops are not re-published"""
+        with open(path) as f:
+            saved = json.load(f)
+        store = cls(saved['merge_radius_m'], saved['min_support'], saved['min_vehicles'], indexes)
+        for record in saved['clusters']:
+            cluster = Cluster(record['cluster_id'], record['latitude'] * record['count'],
+                              record['longitude'] * record['count'],
+                              record['mean_confidence'] * record['count'], None, record['first_seen'])
+            cluster.count = record['count']
+            cluster.vehicles = set(record['vehicles'])
+            cluster.last_seen = record['last_seen']
+            cluster.stop_id = record['stop_id']
+            store.clusters[cluster.cluster_id] = cluster
+            store._place(cluster)
+            store._next_id = max(store._next_id, cluster.cluster_id + 1)
+        store.promoted = saved['promoted']
+        return store
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cluster flagged new-stop events into candidate stops')
+    parser.add_argument('events', nargs='+', help='Stop event NDJSON files (streaming_stop_detector.py output)')
+    parser.add_argument('--output', default='stop_candidates.json')
+    parser.add_argument('--merge-radius-m', type=float, default=DEFAULT_MERGE_RADIUS_M)
+    parser.add_argument('--min-support', type=int, default=DEFAULT_MIN_SUPPORT)
+    parser.add_argument('--min-vehicles', type=int, default=DEFAULT_MIN_VEHICLES)
+    args = parser.parse_args()
+
+    store = CandidateStore(args.merge_radius_m, args.min_support, args.min_vehicles)
+    n_events = 0
+    for path in args.events:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    n_events += 1
+                    store.observe(json.loads(line))
+    store.save(args.output)
+
+    print(f"✅ {n_events:,} stop events → {len(store):,} candidate cluster(s), "
+          f"{len(store.promoted)} promoted → {args.output}")
+    for stop in store.promoted:
+        print(f"   📍 {stop['stop_name']}  support {stop['support']}")
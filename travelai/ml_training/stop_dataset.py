@@ -0,0 +1,231 @@
+"""
+Unified Stop Dataset Loader
+
+Stops ship in several shapes:
+
+    assets/bus_stops_mangalore_karkala.csv   "Bus Stop","Latitude","Longitude" (quoted values)
+    assets/bus_stops.json                    [{"stop_id", "stop_name", "latitude", "longitude"}, ...]
+    stop_location_metadata.json              {"bus_stops": [...], "scaler_mean": ...}
+    your_bus_stops.csv                       stop_id, stop_name, latitude, longitude[, route_ids, ...]
+
+load_stops() turns any of them into one typed table:
+
+    stop_id (int64, 1..n when missing) · stop_name (str) · latitude, longitude (float64)
+    + any extra columns (route_ids, sequence, stop_type, ...) unchanged
+
+Parsed tables are cached twice:
+
+    in memory    keyed by (path, mtime, size)                repeated loads in one process
+    sidecar      .artifact_cache/stops/<hash of path>.npz    repeated loads across processes/runs
+
+The sidecar stores the source's mtime, size and SHA-256. If mtime and size
+match, the sidecar is used as is. If only the mtime changed (touched, copied),
+the hash decides; the file is parsed again only when its contents changed.
+Every column keeps its dtype: numeric columns as arrays, string columns as
+unicode arrays plus a missing mask, anything else (bools with gaps, route id
+lists) as JSON. A cache directory that is not writable just means no sidecar.
+
+Usage:
+    stops = load_stops('../assets/bus_stops_mangalore_karkala.csv')
+    stops.to_dict('records')
+
+    python stop_dataset.py ../assets/bus_stops.json ../assets/bus_stops_mangalore_karkala.csv
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifact_cache import DEFAULT_CACHE_DIR, file_digest
+
+STOP_COLUMNS = ['stop_id', 'stop_name', 'latitude', 'longitude']
+
+# Normalized header (lowercase, underscores) -> canonical column
+COLUMN_ALIASES = {
+    'bus_stop': 'stop_name', 'name': 'stop_name', 'stop': 'stop_name', 'stopname': 'stop_name',
+    'lat': 'latitude', 'lon': 'longitude', 'lng': 'longitude', 'long': 'longitude',
+    'id': 'stop_id', 'stopid': 'stop_id',
+}
+
+SIDECAR_DIR = os.path.join(DEFAULT_CACHE_DIR, 'stops')
+SIDECAR_VERSION = 2
+
+_memory_cache = {}   # abspath -> (mtime_ns, size, DataFrame)
+
+def _normalize_header(name):
+    key = str(name).strip().lower().replace(' ', '_').replace('-', '_')
+    return COLUMN_ALIASES.get(key, key)
+
+def normalize_stops(df, source='stops'):
+    """Canonical column names and types for a raw stop table"""
+    df = df.rename(columns=_normalize_header)
+    missing = {'latitude', 'longitude'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{source} must contain latitude and longitude columns (missing: {sorted(missing)})")
+
+    df = df.copy()
+    df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
+    df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
+    df = df.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+
+    if 'stop_id' not in df.columns:
+        df['stop_id'] = np.arange(1, len(df) + 1)
+    elif pd.api.types.is_numeric_dtype(df['stop_id']) and df['stop_id'].notna().all():
+        df['stop_id'] = df['stop_id'].astype(np.int64)
+    else:
+        df['stop_id'] = df['stop_id'].astype(str)
+    if 'stop_name' not in df.columns:
+        df['stop_name'] = [f'Stop {i}' for i in df['stop_id']]
+    df['stop_name'] = df['stop_name'].astype(str).str.strip()
+    df['latitude'] = df['latitude'].astype(np.float64)
+    df['longitude'] = df['longitude'].astype(np.float64)
+
+    extra = [c for c in df.columns if c not in STOP_COLUMNS]
+    return df[STOP_COLUMNS + extra]
+
+def parse_stops(path):
+    """Read and normalize a stop file without any caching"""
+    stem = path[:-3] if path.endswith('.gz') else path
+    if stem.endswith('.json'):
+        with (gzip.open(path, 'rt') if path.endswith('.gz') else open(path)) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('bus_stops', data.get('stops', data))
+        df = pd.DataFrame(data)
+    elif stem.endswith(('.ndjson', '.jsonl')):
+        df = pd.read_json(path, lines=True)
+    else:
+        df = pd.read_csv(path, skipinitialspace=True)
+    return normalize_stops(df, source=path)
+
+def sidecar_path(path, sidecar_dir=SIDECAR_DIR):
+    key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:32]
+    return os.path.join(sidecar_dir, f'{key}.npz')
+
+def _encode_column(values):
+    """(kind, arrays) for one column, without pickles"""
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return 'array', {'': values.to_numpy()}
+    if all(isinstance(v, str) for v in values[values.notna()]):
+        return 'str', {'': values.fillna('').astype(str).to_numpy(dtype=str), 'na': values.isna().to_numpy()}
+    # Mixed objects (True/None, lists of route ids, ...) keep their Python types through JSON
+    return 'json', {'': np.array(json.dumps(values.tolist()))}
+
+def _decode_column(kind, dtype, arrays):
+    if kind == 'array':
+        return arrays['']
+    if kind == 'str':
+        values = arrays[''].astype(object)
+        values[arrays['na']] = None
+        return pd.Series(values, dtype=object).astype(dtype)
+    return pd.Series(json.loads(str(arrays[''])), dtype=object).astype(dtype)
+
+def _write_sidecar(df, path, stat, digest):
+    columns = []
+    arrays = {}
+    try:
+        for i, column in enumerate(df.columns):
+            kind, encoded = _encode_column(df[column])
+            columns.append({'name': column, 'kind': kind, 'dtype': str(df[column].dtype)})
+            arrays[f'c{i}'] = encoded['']
+            if 'na' in encoded:
+                arrays[f'na{i}'] = encoded['na']
+    except (TypeError, ValueError):
+        # Values JSON cannot represent: parse this file every time
+        return
+    arrays['__meta__'] = np.array(json.dumps({
+        'version': SIDECAR_VERSION, 'source': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size, 'sha256': digest, 'columns': columns}))
+    target = sidecar_path(path)
+    staging = f'{target}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(staging, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(staging, target)
+    except OSError:
+        # Read-only location: run without a sidecar
+        if os.path.exists(staging):
+            os.remove(staging)
+
+def _read_sidecar(path):
+    """(meta, DataFrame) from a sidecar, or (None, None) if absent or unreadable"""
+    try:
+        with np.load(sidecar_path(path), allow_pickle=False) as data:
+            meta = json.loads(str(data['__meta__']))
+            if meta.get('version') != SIDECAR_VERSION or meta.get('source') != os.path.abspath(path):
+                return None, None
+            columns = {}
+            for i, column in enumerate(meta['columns']):
+                arrays = {'': data[f'c{i}']}
+                if f'na{i}' in data.files:
+                    arrays['na'] = data[f'na{i}']
+                columns[column['name']] = _decode_column(column['kind'], column['dtype'], arrays)
+        return meta, pd.DataFrame(columns, columns=[c['name'] for c in meta['columns']])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, None
+
+def _load_from_disk(path, stat, use_sidecar):
+    if not use_sidecar:
+        return parse_stops(path)
+    meta, df = _read_sidecar(path)
+    if meta is not None and meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+        return df
+    digest = file_digest(path)
+    if meta is not None and meta['sha256'] == digest:
+        # Same contents, new mtime (touched or copied): refresh the stamp only
+        _write_sidecar(df, path, stat, digest)
+        return df
+    df = parse_stops(path)
+    _write_sidecar(df, path, stat, digest)
+    return df
+
+def load_stops(path, cache=True):
+    """
+    Stops from any supported CSV / JSON schema as a typed DataFrame (STOP_COLUMNS first)
+
+    With cache=False the file is parsed every time and no sidecar is read or written.
+    Returns a copy, so callers may modify it.
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    if cache:
+        cached = _memory_cache.get(key)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2].copy()
+    df = _load_from_disk(path, stat, use_sidecar=cache)
+    if cache:
+        _memory_cache[key] = (stat.st_mtime_ns, stat.st_size, df)
+    return df.copy()
+
+def load_stop_records(path, cache=True):
+    """load_stops() as a list of dicts (stop_id, stop_name, latitude, longitude, ...)"""
+    return load_stops(path, cache).to_dict('records')
+
+def clear_memory_cache():
+    _memory_cache.clear()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Normalize stop files and build their cache sidecars')
+    parser.add_argument('paths', nargs='+', help='Stop CSV / JSON files')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        timings = []
+        for cache in (False, True, True):
+            clear_memory_cache()
+            start = time.perf_counter()
+            df = load_stops(path, cache=cache)
+            timings.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        load_stops(path)
+        in_memory = (time.perf_counter() - start) * 1000
+        print(f"📍 {path}: {len(df):,} stops, columns {list(df.columns)}")
+        print(f"   parse {timings[0]:.2f} ms · sidecar {timings[2]:.2f} ms · in memory {in_memory:.3f} ms")
@@ -0,0 +1,538 @@
+"""
+Streaming Stop Detection
+
+The "GPS Position Stream → Stop Detected?" front end of the integrated
+detector (see integrated_stop_detector.py), for replaying traces or feeding
+live fixes one at a time:
+
+    GPS fixes (any iterable / generator)
+        ↓
+    Moving ⇄ Stopped state machine with hysteresis
+    (stop below 2 km/h, moving again only above 5 km/h)
+        ↓  on stop exit
+    dwell_time, speed_before, heading, visit_count, hour, day_of_week
+        ↓
+    Location model + Type classifier → fusion rules (IntegratedStopDetector.predict)
+        ↓
+    StopEvent
+
+Each fix costs O(1) time and memory: the detector keeps running sums for
+the open stop and the speeds of the last few fixes, never the fixes themselves.
+Features follow gps_trace_processor.StopEventExtractor, so events match the
+data the classifier was trained on.
+
+A fix is a mapping with 'timestamp' (unix s/ms or ISO-8601), 'latitude',
+'longitude' and optionally 'speed' (km/h), 'heading' (degrees) and
+'vehicle_id'. Missing speed/heading are derived from the previous fix.
+
+Usage:
+    python streaming_stop_detector.py trips.csv --output stop_events.ndjson
+    python streaming_stop_detector.py trips.csv --stops sample_stops.csv   # no location model
+"""
+
+import argparse
+import copy
+import json
+import math
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+from gps_trace_processor import (
+    MIN_DWELL_SECONDS, SPEED_BEFORE_FIXES, STOP_SPEED_KMH, VISIT_CELL_DEGREES, read_trace_chunks
+)
+from integrated_stop_detector import TYPE_MODEL_TYPES, IntegratedStopDetector
+from model_host import attach_stop_table, is_stop_table
+from stop_candidates import CandidateStore, LiveIndex
+from stop_dataset import load_stop_records
+
+# Once stopped, the vehicle only counts as moving again above this speed, so
+# GPS speed jitter around STOP_SPEED_KMH does not split one stop into several
+RESUME_SPEED_KMH = 5.0
+
+EARTH_RADIUS_KM = 6371
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _bearing_deg(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = math.sin(dlon) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
+    return (math.degrees(math.atan2(x, y)) + 360) % 360
+
+def _timestamp_seconds(value):
+    """Unix seconds from epoch seconds/milliseconds or an ISO-8601 string"""
+    if isinstance(value, str):
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    value = float(value)
+    # Millisecond epochs are > 1e12 for any date after 2001
+    return value / 1000.0 if value > 1e12 else value
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+class StopEvent:
+    """A closed stop: where/when, the classifier features, and the fused prediction"""
+
+    __slots__ = ('vehicle_id', 'start_time', 'end_time', 'latitude', 'longitude', 'n_fixes',
+                 'features', 'location_prediction', 'type_prediction', 'result')
+
+    def __init__(self, vehicle_id, start_time, end_time, latitude, longitude, n_fixes,
+                 features, location_prediction, type_prediction, result):
+        self.vehicle_id = vehicle_id
+        self.start_time = start_time
+        self.end_time = end_time
+        self.latitude = latitude
+        self.longitude = longitude
+        self.n_fixes = n_fixes
+        self.features = features
+        self.location_prediction = location_prediction
+        self.type_prediction = type_prediction
+        self.result = result
+
+    def to_dict(self):
+        return {
+            'vehicle_id': self.vehicle_id,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'n_fixes': self.n_fixes,
+            **self.features,
+            'final_type': self.result.final_type,
+            'confidence': self.result.confidence,
+            'stop_name': self.result.stop_name,
+            'should_learn': self.result.should_learn,
+            'reasoning': self.result.reasoning
+        }
+
+class VisitCounts(dict):
+    """Grid cell -> number of stop events seen, shared by the detectors given the same instance"""
+
+    def increment(self, cell):
+        count = self[cell] = self.get(cell, 0) + 1
+        return count
+
+class StreamingStopDetector:
+    """
+    Turns a stream of GPS fixes into fused stop events
+
+    Args:
+        type_model: callable(features dict) -> type prediction
+            ({'stop_type', 'confidence', 'probabilities'}), e.g. TFLiteTypeModel
+        location_model: callable(lat, lon) -> location prediction
+            ({'is_known_stop', 'confidence', 'nearest_stop', 'distance'}),
+            e.g. TFLiteLocationModel or NearestStopLocationModel
+        detector: IntegratedStopDetector (fusion rules and thresholds)
+        inference: optional callable(features, lat, lon) -> (location prediction,
+            type prediction) that runs both models together, e.g.
+            parallel_inference.DualModelRunner; replaces the two calls above
+        visits: optional VisitCounts (or anything with its increment(cell)),
+            to share visit counts between detectors - one per vehicle, across
+            worker processes in ingestion_server.py
+
+    Call update(fix) per fix (returns a StopEvent when a stop ends, else None)
+    and flush() at the end of the stream, or iterate run(fixes).
+    """
+
+    def __init__(self, type_model, location_model, detector=None,
+                 stop_speed_kmh=STOP_SPEED_KMH, resume_speed_kmh=RESUME_SPEED_KMH,
+                 min_dwell_seconds=MIN_DWELL_SECONDS, speed_before_fixes=SPEED_BEFORE_FIXES,
+                 visit_cell_degrees=VISIT_CELL_DEGREES, timezone=None, inference=None, visits=None):
+        if resume_speed_kmh < stop_speed_kmh:
+            raise ValueError("resume_speed_kmh must be >= stop_speed_kmh")
+        self.type_model = type_model
+        self.location_model = location_model
+        self.inference = inference
+        self.detector = detector or IntegratedStopDetector()
+        self.stop_speed_kmh = stop_speed_kmh
+        self.resume_speed_kmh = resume_speed_kmh
+        self.min_dwell_seconds = min_dwell_seconds
+        self.visit_cell_degrees = visit_cell_degrees
+        self.timezone = None
+        if timezone:
+            from zoneinfo import ZoneInfo
+            self.timezone = ZoneInfo(timezone)
+
+        self._speeds = deque(maxlen=speed_before_fixes)  # speeds of the last fixes, None unless moving
+        self._visits = VisitCounts() if visits is None else visits  # grid cell -> stop events seen
+        self.fixes_processed = 0
+        self.events_emitted = 0
+        self._reset_vehicle(None)
+
+    def _reset_vehicle(self, vehicle_id):
+        self._vehicle = vehicle_id
+        self._prev = None             # (ts, lat, lon, heading) of the previous fix
+        self._speeds.clear()
+        self._speed_sum = 0.0
+        self._n_moving = 0
+        self._stopped = False
+
+    def update(self, fix):
+        """Process one fix; returns the StopEvent it closes, if any"""
+        self.fixes_processed += 1
+        ts = _timestamp_seconds(fix['timestamp'])
+        lat, lon = float(fix['latitude']), float(fix['longitude'])
+        vehicle = fix.get('vehicle_id', '')
+
+        event = None
+        if vehicle != self._vehicle:
+            event = self._close_stop() if self._stopped else None
+            self._reset_vehicle(vehicle)
+
+        # Derive speed/heading from the previous fix where the log has none
+        speed, heading = fix.get('speed'), fix.get('heading')
+        speed = None if _is_missing(speed) else float(speed)
+        heading = None if _is_missing(heading) else float(heading)
+        prev = self._prev
+        if prev is not None:
+            dt = ts - prev[0]
+            if speed is None and dt > 0:
+                speed = _haversine_km(prev[1], prev[2], lat, lon) / (dt / 3600.0)
+            if heading is None:
+                heading = _bearing_deg(prev[1], prev[2], lat, lon)
+
+        if self._stopped:
+            if speed is not None and speed > self.resume_speed_kmh:
+                event = self._close_stop()
+                self._add_window_speed(speed)
+            else:
+                self._extend_stop(ts, lat, lon)
+                self._add_window_speed(None)
+        elif speed is not None and speed < self.stop_speed_kmh:
+            self._open_stop(ts, lat, lon, heading)
+            self._add_window_speed(None)
+        else:
+            # Unknown speed (first fix of a vehicle) counts as moving, but not towards speed_before
+            self._add_window_speed(speed)
+
+        self._prev = (ts, lat, lon, heading)
+        return event
+
+    def flush(self):
+        """Close the stop still open at the end of the stream"""
+        event = self._close_stop() if self._stopped else None
+        self._reset_vehicle(None)
+        return event
+
+    def run(self, fixes):
+        """Yield StopEvents for an iterable of fixes, flushing at the end"""
+        for fix in fixes:
+            event = self.update(fix)
+            if event is not None:
+                yield event
+        event = self.flush()
+        if event is not None:
+            yield event
+
+    def _add_window_speed(self, speed):
+        """
+        Slide the speed_before window by one fix (speed None for stopped fixes)
+
+        As in StopEventExtractor, speed_before averages the moving fixes among
+        the last speed_before_fixes fixes, not the last moving fixes.
+        """
+        if len(self._speeds) == self._speeds.maxlen and self._speeds[0] is not None:
+            self._speed_sum -= self._speeds[0]
+            self._n_moving -= 1
+        self._speeds.append(speed)
+        if speed is not None:
+            self._speed_sum += speed
+            self._n_moving += 1
+
+    def _open_stop(self, ts, lat, lon, heading):
+        self._stopped = True
+        self._start_ts = self._end_ts = ts
+        self._lat_sum, self._lon_sum, self._n_fixes = lat, lon, 1
+        # Direction of travel on the last fix before the stop (headings while stationary are noise)
+        prev_heading = self._prev[3] if self._prev is not None else None
+        self._stop_heading = prev_heading if prev_heading is not None else heading
+        self._speed_before = self._speed_sum / self._n_moving if self._n_moving else 0.0
+
+    def _extend_stop(self, ts, lat, lon):
+        self._end_ts = ts
+        self._lat_sum += lat
+        self._lon_sum += lon
+        self._n_fixes += 1
+
+    def _close_stop(self):
+        """Features → both models → fusion for the open stop (None if too short)"""
+        self._stopped = False
+        dwell = self._end_ts - self._start_ts
+        if dwell < self.min_dwell_seconds:
+            return None
+
+        lat, lon = self._lat_sum / self._n_fixes, self._lon_sum / self._n_fixes
+        cell = (math.floor(lat / self.visit_cell_degrees), math.floor(lon / self.visit_cell_degrees))
+        visit_count = self._visits.increment(cell)
+
+        start = datetime.fromtimestamp(self._start_ts, tz=timezone.utc)
+        if self.timezone is not None:
+            start = start.astimezone(self.timezone)
+
+        features = {
+            'dwell_time': dwell,
+            'speed_before': min(max(self._speed_before, 0.0), 120.0),
+            'heading': self._stop_heading if self._stop_heading is not None else 0.0,
+            'visit_count': visit_count,
+            'hour': start.hour,
+            'day_of_week': start.weekday()
+        }
+        if self.inference is not None:
+            location_prediction, type_prediction = self.inference(features, lat, lon)
+        else:
+            location_prediction = self.location_model(lat, lon)
+            type_prediction = self.type_model(features)
+        result = self.detector.predict(location_prediction, type_prediction, (lat, lon), dwell, features)
+
+        self.events_emitted += 1
+        return StopEvent(self._vehicle, self._start_ts, self._end_ts, lat, lon, self._n_fixes,
+                         features, location_prediction, type_prediction, result)
+
+def load_interpreter(tflite_path):
+    """A TFLite interpreter with tensors allocated, plus its input/output indices"""
+    import tensorflow as tf
+    interpreter = tf.lite.Interpreter(model_path=tflite_path)
+    interpreter.allocate_tensors()
+    return (interpreter, interpreter.get_input_details()[0]['index'],
+            interpreter.get_output_details()[0]['index'])
+
+class TFLiteTypeModel:
+    """
+    Stop type classifier (stop_classifier.tflite) applied to one stop's features
+
+    encode()/decode() are the pre/post-processing around the model, so other
+    runners (parallel_inference.py) can batch the interpreter calls. The
+    interpreter itself is only loaded on the first direct call.
+    """
+
+    def __init__(self, tflite_path='stop_classifier.tflite', scaler_path='scaler_params.json'):
+        with open(scaler_path) as f:
+            params = json.load(f)
+        self.tflite_path = tflite_path
+        self.feature_names = params['feature_names']
+        self.mean = np.array(params['mean'], dtype=np.float32)
+        self.scale = np.array(params['scale'], dtype=np.float32)
+        self.fused = params.get('normalization_fused', False)
+        self._interpreter = None
+
+    def encode(self, features):
+        """Model input row (float32, scaled unless normalization is fused)"""
+        x = np.array([features[name] for name in self.feature_names], dtype=np.float32)
+        return x if self.fused else (x - self.mean) / self.scale
+
+    def decode(self, probabilities):
+        best = int(np.argmax(probabilities))
+        return {
+            'stop_type': TYPE_MODEL_TYPES[best],
+            'confidence': float(probabilities[best]),
+            'probabilities': {name: float(p) for name, p in zip(TYPE_MODEL_TYPES, probabilities)}
+        }
+
+    def load(self):
+        """Load the interpreter now rather than on the first call"""
+        if self._interpreter is None:
+            self._interpreter = load_interpreter(self.tflite_path)
+        return self._interpreter
+
+    def __call__(self, features):
+        interpreter, input_index, output_index = self._interpreter or self.load()
+        interpreter.set_tensor(input_index, self.encode(features)[np.newaxis])
+        interpreter.invoke()
+        return self.decode(interpreter.get_tensor(output_index)[0])
+
+class NearestStopLocationModel:
+    """
+    Distance-only location model: nearest known stop from a stop table
+
+    Confidence falls off linearly to 0 at twice `radius_m`; a stop within
+    `radius_m` is "known". Used when no trained location model is available.
+    `stops` may also be a stop table hosted by model_host.py (mapped arrays).
+    """
+
+    def __init__(self, stops, radius_m=100):
+        if isinstance(stops, dict):
+            self.names = stops['names']
+            self.lats, self.lons, self.cos_lats = stops['lats'], stops['lons'], stops['cos_lats']
+        else:
+            self.names = [str(s.get('stop_name', s.get('stop_id', ''))) for s in stops]
+            self.lats = np.radians(np.array([s['latitude'] for s in stops], dtype=np.float64))
+            self.lons = np.radians(np.array([s['longitude'] for s in stops], dtype=np.float64))
+            self.cos_lats = np.cos(self.lats)
+        self.radius_m = radius_m
+
+    @classmethod
+    def from_csv(cls, stops_csv, radius_m=100):
+        """From a stop file (any stop_dataset.py schema) or a hosted stop table directory"""
+        if is_stop_table(stops_csv):
+            return cls(attach_stop_table(stops_csv), radius_m)
+        return cls(load_stop_records(stops_csv), radius_m)
+
+    def with_stops(self, stops):
+        """A copy that also knows `stops` (records); this model is left untouched"""
+        model = copy.copy(self)
+        model.names = list(self.names) + [str(s.get('stop_name', s.get('stop_id', ''))) for s in stops]
+        model.lats = np.concatenate([self.lats, np.radians([s['latitude'] for s in stops])])
+        model.lons = np.concatenate([self.lons, np.radians([s['longitude'] for s in stops])])
+        model.cos_lats = np.cos(model.lats)
+        return model
+
+    def nearest(self, lat, lon):
+        """(index, distance in meters) of the closest known stop"""
+        lat, lon = math.radians(lat), math.radians(lon)
+        a = (np.sin((self.lats - lat) / 2) ** 2 +
+             math.cos(lat) * self.cos_lats * np.sin((self.lons - lon) / 2) ** 2)
+        i = int(np.argmin(a))
+        return i, 2 * EARTH_RADIUS_KM * 1000 * math.asin(math.sqrt(a[i]))
+
+    def __call__(self, lat, lon):
+        i, distance = self.nearest(lat, lon)
+        return {
+            'is_known_stop': distance <= self.radius_m,
+            'confidence': max(0.0, 1.0 - distance / (2 * self.radius_m)),
+            'nearest_stop': str(self.names[i]),
+            'distance': distance
+        }
+
+class TFLiteLocationModel(NearestStopLocationModel):
+    """
+    Location model (stop_location_model.tflite) plus the nearest known stop
+    from the stop list shipped in stop_location_metadata.json (or its
+    model_host.py stop table)
+    """
+
+    def __init__(self, tflite_path='stop_location_model.tflite',
+                 metadata_path='stop_location_metadata.json', threshold=0.5):
+        if is_stop_table(metadata_path):
+            table = attach_stop_table(metadata_path)
+            metadata = table['meta']
+            super().__init__(table)
+        else:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            super().__init__(load_stop_records(metadata_path))
+        self.tflite_path = tflite_path
+        self.mean = np.array(metadata['scaler_mean'], dtype=np.float32)
+        self.scale = np.array(metadata['scaler_scale'], dtype=np.float32)
+        self.fused = metadata.get('normalization_fused', False)
+        self.threshold = threshold
+        self._interpreter = None
+
+    def encode(self, lat, lon):
+        x = np.array([lat, lon], dtype=np.float32)
+        return x if self.fused else (x - self.mean) / self.scale
+
+    def decode(self, output, lat, lon):
+        confidence = float(output[0])
+        i, distance = self.nearest(lat, lon)
+        return {
+            'is_known_stop': confidence >= self.threshold,
+            'confidence': confidence,
+            'nearest_stop': str(self.names[i]),
+            'distance': distance
+        }
+
+    def load(self):
+        """Load the interpreter now rather than on the first call"""
+        if self._interpreter is None:
+            self._interpreter = load_interpreter(self.tflite_path)
+        return self._interpreter
+
+    def __call__(self, lat, lon):
+        interpreter, input_index, output_index = self._interpreter or self.load()
+        interpreter.set_tensor(input_index, self.encode(lat, lon)[np.newaxis])
+        interpreter.invoke()
+        return self.decode(interpreter.get_tensor(output_index)[0], lat, lon)
+
+def iter_trace_fixes(paths, chunk_size=100000):
+    """Yield fixes (dicts) from CSV/NDJSON trace files, reading them in chunks"""
+    for path in paths:
+        for chunk in read_trace_chunks(path, chunk_size=chunk_size):
+            yield from chunk.to_dict('records')
+
+def build_stream_models(stops_csv=None, classifier='stop_classifier.tflite', scaler='scaler_params.json',
+                        location_model='stop_location_model.tflite',
+                        location_metadata='stop_location_metadata.json', thresholds=None,
+                        meta_learner=None, stops=None):
+    """
+    (type model, location model, fusion detector) for StreamingStopDetector
+
+    Known stops come from `stops` (records) or stops_csv by distance if
+    given, else from the trained location model.
+    """
+    if stops is not None:
+        locator = NearestStopLocationModel(stops)
+    elif stops_csv:
+        locator = NearestStopLocationModel.from_csv(stops_csv)
+    else:
+        locator = TFLiteLocationModel(location_model, location_metadata)
+    detector = IntegratedStopDetector(config_path=thresholds, meta_learner_path=meta_learner)
+    return TFLiteTypeModel(classifier, scaler), locator, detector
+
+def detect_stops(paths, output_path='stop_events.ndjson', stops_csv=None,
+                 classifier='stop_classifier.tflite', scaler='scaler_params.json',
+                 location_model='stop_location_model.tflite',
+                 location_metadata='stop_location_metadata.json', thresholds=None, timezone=None,
+                 meta_learner=None, candidates_path=None):
+    """
+    Replay trace files through the streaming detector into an NDJSON file of stop events
+
+    With stops_csv, known stops come from the table by distance instead of
+    the location model. With meta_learner (meta_learner_weights.npz) the
+    learned fusion replaces the rule cascade. With candidates_path, flagged
+    new stops are clustered (stop_candidates.py); promoted ones become known
+    stops for the rest of the replay and the store is saved there.
+    """
+    type_model, locator, detector = build_stream_models(stops_csv, classifier, scaler, location_model,
+                                                        location_metadata, thresholds, meta_learner)
+    store = None
+    if candidates_path:
+        locator = LiveIndex(locator)
+        store = CandidateStore(indexes=[locator])
+    stream = StreamingStopDetector(type_model, locator, detector, timezone=timezone)
+
+    counts = {}
+    with open(output_path, 'w') as f:
+        for event in stream.run(iter_trace_fixes(paths)):
+            f.write(json.dumps(event.to_dict(), default=str) + '\n')
+            final_type = event.result.final_type
+            counts[final_type] = counts.get(final_type, 0) + 1
+            if store is not None:
+                store.observe(event)
+
+    print(f"✅ {stream.fixes_processed:,} fixes → {stream.events_emitted:,} stop events → {output_path}")
+    for final_type, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"   {final_type:<24}{count:>8,}")
+    if store is not None:
+        store.save(candidates_path)
+        print(f"📍 {len(store):,} new-stop candidate(s), {len(store.promoted)} promoted → {candidates_path}")
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Streaming stop detection over GPS traces')
+    parser.add_argument('paths', nargs='+', help='CSV or NDJSON trace files (optionally .gz)')
+    parser.add_argument('--output', default='stop_events.ndjson')
+    parser.add_argument('--stops', default=None,
+                        help='Known stops CSV (distance-based location instead of the location model)')
+    parser.add_argument('--classifier', default='stop_classifier.tflite')
+    parser.add_argument('--scaler', default='scaler_params.json')
+    parser.add_argument('--location-model', default='stop_location_model.tflite')
+    parser.add_argument('--location-metadata', default='stop_location_metadata.json')
+    parser.add_argument('--thresholds', default=None, help='Tuned fusion thresholds JSON')
+    parser.add_argument('--timezone', default=None, help='Timezone for hour/day_of_week, e.g. Asia/Kolkata')
+    parser.add_argument('--meta-learner', default=None, help='Learned fusion weights (meta_learner_weights.npz)')
+    parser.add_argument('--learn-stops', default=None,
+                        help='Cluster flagged new stops and save the candidates to this JSON file')
+    args = parser.parse_args()
+
+    detect_stops(args.paths, args.output, args.stops, args.classifier, args.scaler,
+                 args.location_model, args.location_metadata, args.thresholds, args.timezone,
+                 args.meta_learner, args.learn_stops)
@@ -0,0 +1,319 @@
+"""
+Offline Suggestion Bundle
+
+Precomputes route stop suggestions for every (or every configured) pair of
+stops and stores them in one compact SQLite file the app (or a server) can
+answer routes from with a single indexed read:
+
+    stop table (stop_dataset.load_stops)
+        ↓  origins split across worker processes
+    distances to a block of destinations computed once per task and
+    shared by its origins (NumPy): on-route test, 0.5 km
+        exclusion, journey order, first max_stops - same selection as
+        RouteBasedStopSuggester.suggest_stops_between
+        ↓
+    deduplicate identical stop lists (many pairs share one)
+        ↓
+    suggestion_bundle.db
+        stops       (stop_id PK, stop_name, latitude, longitude)
+        stop_lists  (list_id PK, n_stops, stop_ids BLOB int32 little-endian)
+        routes      (origin_id, destination_id) PK → list_id      WITHOUT ROWID
+        meta        (key PK, value)
+
+Only the stop choice is stored. Distances, relevance scores and arrival
+times depend on nothing but the three coordinates, so they are recomputed
+when a route is read (SuggestionBundle.suggest) instead of being stored
+once per pair.
+
+Lookup from the app:
+    SELECT l.stop_ids FROM routes r JOIN stop_lists l ON l.list_id = r.list_id
+    WHERE r.origin_id = ? AND r.destination_id = ?
+
+Usage:
+    python suggestion_bundle.py export --stops ../assets/bus_stops.json --workers 4
+    python suggestion_bundle.py export --stops stops.csv --pairs od_pairs.csv --output bundle.db
+    python suggestion_bundle.py show --bundle suggestion_bundle.db --origin 1 --destination 20
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+
+from artifact_cache import file_digest
+from stop_dataset import load_stops
+
+BUNDLE_VERSION = 1
+EARTH_RADIUS_KM = 6371          # as in RouteBasedStopSuggester.haversine_distance
+ROUTE_TOLERANCE_KM = 5.0        # is_point_on_route tolerance used by suggest_stops_between
+ENDPOINT_EXCLUSION_KM = 0.5     # stops this close to either end are not suggested
+DEFAULT_MAX_STOPS = 20
+DESTINATION_BLOCK = 256         # destinations scored together (block × stops matrix)
+ORIGINS_PER_TASK = 32
+
+_worker_stops = None
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized RouteBasedStopSuggester.haversine_distance"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * (2 * np.arcsin(np.sqrt(a)))
+
+def _init_worker(lats, lons, max_stops):
+    global _worker_stops
+    _worker_stops = (lats, lons, max_stops)
+
+def route_stop_lists(origins, destinations, lats, lons, max_stops=DEFAULT_MAX_STOPS):
+    """
+    Chosen stop indices for origin × destination pairs
+
+    Args:
+        origins: origin stop indices
+        destinations: per origin, an array of destination indices (None = all others)
+
+    Returns, per origin, (destination indices, chosen stop indices of all its
+    routes concatenated, number chosen per route).
+    """
+    n = len(lats)
+    all_stops = np.arange(n)
+    if any(d is None for d in destinations):
+        wanted = all_stops
+    else:
+        wanted = np.unique(np.concatenate(destinations))
+
+    from_origins = _haversine_km(lats[origins, None], lons[origins, None], lats[None], lons[None])
+    # suggest_stops_between sorts by the rounded distance; stable, so table order breaks ties
+    orders = np.argsort(np.round(from_origins, 2), axis=1, kind='stable')
+    parts = [([], [], []) for _ in origins]
+
+    # Distances to a block of destinations are shared by every origin of the task
+    for start in range(0, len(wanted), DESTINATION_BLOCK):
+        block = wanted[start:start + DESTINATION_BLOCK]
+        to_block = _haversine_km(lats[None], lons[None], lats[block, None], lons[block, None])
+        for row, origin in enumerate(origins):
+            dests = destinations[row]
+            rows = block != origin if dests is None else np.isin(block, dests)
+            if not rows.any():
+                continue
+            order = orders[row]
+            d_origin = from_origins[row][order]
+            d_dest = to_block[rows][:, order]
+            d_direct = from_origins[row][block[rows]]
+            keep = ((d_origin[None] + d_dest) - d_direct[:, None] < ROUTE_TOLERANCE_KM) & \
+                   (d_dest >= ENDPOINT_EXCLUSION_KM) & (d_origin >= ENDPOINT_EXCLUSION_KM)[None]
+            # First max_stops kept stops per route: rank each kept position within its row
+            columns = np.nonzero(keep)[1]
+            kept = keep.sum(axis=1)
+            rank = np.arange(len(columns)) - np.repeat(np.cumsum(kept) - kept, kept)
+            dest_list, chosen, counts = parts[row]
+            dest_list.append(block[rows])
+            chosen.append(order[columns[rank < max_stops]])
+            counts.append(np.minimum(kept, max_stops))
+
+    return [tuple(np.concatenate(p) if p else np.empty(0, dtype=np.int64) for p in part) for part in parts]
+
+def _route_task(task):
+    origins, destinations = task
+    lats, lons, max_stops = _worker_stops
+    return origins, route_stop_lists(origins, destinations, lats, lons, max_stops)
+
+def _pair_tasks(n_stops, pairs=None):
+    """Origin chunks with their destinations (None = every other stop)"""
+    if pairs is None:
+        origins = np.arange(n_stops)
+        destinations = [None] * n_stops
+    else:
+        by_origin = {}
+        for origin, destination in pairs:
+            if origin != destination:
+                by_origin.setdefault(origin, []).append(destination)
+        origins = np.array(sorted(by_origin), dtype=np.int64)
+        destinations = [np.array(sorted(set(by_origin[o])), dtype=np.int64) for o in origins]
+    return [(origins[i:i + ORIGINS_PER_TASK], destinations[i:i + ORIGINS_PER_TASK])
+            for i in range(0, len(origins), ORIGINS_PER_TASK)]
+
+def _stop_ids(stops):
+    """Stop ids as int32-compatible integers (the bundle's route keys)"""
+    ids = stops['stop_id']
+    if not np.issubdtype(ids.dtype, np.integer) or ids.min() < 0 or ids.max() >= 2 ** 31:
+        raise ValueError("Bundle route keys need non-negative integer stop_ids below 2^31 "
+                         "(stop_dataset fills in 1..n when the file has none)")
+    if ids.duplicated().any():
+        raise ValueError(f"Duplicate stop_ids: {sorted(ids[ids.duplicated()].unique())[:10]}")
+    return ids.to_numpy(dtype=np.int64)
+
+def _read_pairs(path, id_to_index):
+    """(origin index, destination index) pairs from a CSV with origin_id, destination_id"""
+    import pandas as pd
+    df = pd.read_csv(path)
+    missing = {'origin_id', 'destination_id'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} must contain origin_id and destination_id columns")
+    unknown = set(df['origin_id']).union(df['destination_id']) - set(id_to_index)
+    if unknown:
+        raise ValueError(f"{path} refers to unknown stop ids: {sorted(unknown)[:10]}")
+    return [(id_to_index[o], id_to_index[d]) for o, d in zip(df['origin_id'], df['destination_id'])]
+
+def export_bundle(stops_path, output_path='suggestion_bundle.db', pairs_path=None,
+                  max_stops=DEFAULT_MAX_STOPS, workers=1):
+    """
+    Precompute suggestions for all (or pairs_path) stop pairs into a SQLite bundle
+
+    Returns summary statistics (pairs, unique stop lists, bytes, seconds).
+    """
+    start_time = time.perf_counter()
+    stops = load_stops(stops_path)
+    ids = _stop_ids(stops)
+    lats = stops['latitude'].to_numpy(dtype=np.float64)
+    lons = stops['longitude'].to_numpy(dtype=np.float64)
+    pairs = _read_pairs(pairs_path, {int(i): k for k, i in enumerate(ids)}) if pairs_path else None
+    tasks = _pair_tasks(len(stops), pairs)
+
+    list_ids = {}   # stop id bytes -> list_id
+    routes = []     # (origin_id, destination_id, list_id)
+
+    def collect(origins, results):
+        for origin, (dests, chosen, counts) in zip(origins, results):
+            origin_id = int(ids[origin])
+            packed = ids[chosen].astype('<i4').tobytes()
+            ends = (np.cumsum(counts) * 4).tolist()
+            for dest_id, start, end in zip(ids[dests].tolist(), [0] + ends[:-1], ends):
+                list_id = list_ids.setdefault(packed[start:end], len(list_ids))
+                routes.append((origin_id, dest_id, list_id))
+
+    if workers > 1 and len(tasks) > 1:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(min(workers, len(tasks)), initializer=_init_worker,
+                          initargs=(lats, lons, max_stops)) as pool:
+            for origins, results in pool.imap_unordered(_route_task, tasks):
+                collect(origins, results)
+    else:
+        for origins, destinations in tasks:
+            collect(origins, route_stop_lists(origins, destinations, lats, lons, max_stops))
+    compute_seconds = time.perf_counter() - start_time
+
+    staging = f'{output_path}.{os.getpid()}.tmp'
+    if os.path.exists(staging):
+        os.remove(staging)
+    db = sqlite3.connect(staging)
+    db.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+        CREATE TABLE stops (stop_id INTEGER PRIMARY KEY, stop_name TEXT NOT NULL,
+                            latitude REAL NOT NULL, longitude REAL NOT NULL);
+        CREATE TABLE stop_lists (list_id INTEGER PRIMARY KEY, n_stops INTEGER NOT NULL,
+                                 stop_ids BLOB NOT NULL);
+        CREATE TABLE routes (origin_id INTEGER NOT NULL, destination_id INTEGER NOT NULL,
+                             list_id INTEGER NOT NULL,
+                             PRIMARY KEY (origin_id, destination_id)) WITHOUT ROWID;
+    """)
+    with db:
+        db.executemany('INSERT INTO stops VALUES (?, ?, ?, ?)',
+                       zip(ids.tolist(), stops['stop_name'].astype(str), lats.tolist(), lons.tolist()))
+        db.executemany('INSERT INTO stop_lists VALUES (?, ?, ?)',
+                       ((list_id, len(key) // 4, key) for key, list_id in list_ids.items()))
+        routes.sort()
+        db.executemany('INSERT INTO routes VALUES (?, ?, ?)', routes)
+        meta = {
+            'version': BUNDLE_VERSION,
+            'generated_at': datetime.now().isoformat(),
+            'stops_source': os.path.basename(stops_path),
+            'stops_sha256': file_digest(stops_path),
+            'max_stops': max_stops,
+            'route_tolerance_km': ROUTE_TOLERANCE_KM,
+            'endpoint_exclusion_km': ENDPOINT_EXCLUSION_KM,
+            'n_stops': len(stops),
+            'n_routes': len(routes),
+            'n_stop_lists': len(list_ids),
+        }
+        db.executemany('INSERT INTO meta VALUES (?, ?)', ((k, json.dumps(v)) for k, v in meta.items()))
+    db.execute('VACUUM')
+    db.close()
+    os.replace(staging, output_path)
+
+    stats = {
+        'n_routes': len(routes),
+        'n_stop_lists': len(list_ids),
+        'bytes': os.path.getsize(output_path),
+        'compute_seconds': round(compute_seconds, 2),
+        'seconds': round(time.perf_counter() - start_time, 2),
+    }
+    print(f"✅ {stats['n_routes']:,} routes → {stats['n_stop_lists']:,} unique stop lists, "
+          f"{stats['bytes'] / 1024:,.0f} KB → {output_path} ({stats['seconds']:.1f}s)")
+    return stats
+
+class SuggestionBundle:
+    """
+    Read-only access to an exported bundle
+
+    stop_ids() is the single indexed read the app does; suggest() adds the
+    same distances, scores and arrival estimates suggest_stops_between returns.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+        self.meta = {k: json.loads(v) for k, v in self.db.execute('SELECT key, value FROM meta')}
+        self.stops = {row[0]: {'stop_id': row[0], 'stop_name': row[1], 'latitude': row[2], 'longitude': row[3]}
+                      for row in self.db.execute('SELECT stop_id, stop_name, latitude, longitude FROM stops')}
+        self._suggester = None
+
+    def stop_ids(self, origin_id, destination_id):
+        """Suggested stop ids in journey order, or None if the pair was not precomputed"""
+        row = self.db.execute(
+            'SELECT l.stop_ids FROM routes r JOIN stop_lists l ON l.list_id = r.list_id '
+            'WHERE r.origin_id = ? AND r.destination_id = ?', (origin_id, destination_id)).fetchone()
+        return None if row is None else np.frombuffer(row[0], dtype='<i4').tolist()
+
+    def suggest(self, origin_id, destination_id):
+        """Suggestion dicts as RouteBasedStopSuggester.suggest_stops_between returns them, or None"""
+        stop_ids = self.stop_ids(origin_id, destination_id)
+        if stop_ids is None:
+            return None
+        if self._suggester is None:
+            from route_based_suggestions import RouteBasedStopSuggester
+            self._suggester = RouteBasedStopSuggester.from_records(list(self.stops.values()))
+        origin, destination = self.stops[origin_id], self.stops[destination_id]
+        return self._suggester.describe_route_stops(
+            [self.stops[i] for i in stop_ids],
+            (origin['latitude'], origin['longitude']),
+            (destination['latitude'], destination['longitude']))
+
+    def close(self):
+        self.db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Precomputed route suggestions for offline use')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('export', help='Compute suggestions for stop pairs into a SQLite bundle')
+    p.add_argument('--stops', default='sample_stops.csv', help='Stop CSV / JSON (see stop_dataset.py)')
+    p.add_argument('--pairs', default=None, help='CSV with origin_id, destination_id (default: all pairs)')
+    p.add_argument('--output', default='suggestion_bundle.db')
+    p.add_argument('--max-stops', type=int, default=DEFAULT_MAX_STOPS)
+    p.add_argument('--workers', type=int, default=1)
+
+    p = sub.add_parser('show', help='Read one route from a bundle')
+    p.add_argument('--bundle', default='suggestion_bundle.db')
+    p.add_argument('--origin', type=int, required=True, help='Origin stop_id')
+    p.add_argument('--destination', type=int, required=True, help='Destination stop_id')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_bundle(args.stops, args.output, args.pairs, args.max_stops, args.workers)
+    else:
+        bundle = SuggestionBundle(args.bundle)
+        suggestions = bundle.suggest(args.origin, args.destination)
+        if suggestions is None:
+            print(f"Route {args.origin} → {args.destination} is not in {args.bundle}")
+        else:
+            origin, destination = bundle.stops[args.origin], bundle.stops[args.destination]
+            print(f"📍 {origin['stop_name']} → {destination['stop_name']}: {len(suggestions)} stop(s)")
+            for i, stop in enumerate(suggestions, 1):
+                print(f"{i:>3}. {stop['stop_name']:<30} {stop['distance_from_origin_km']:>7.2f} km  "
+                      f"~{stop['estimated_travel_minutes']} min")
@@ -0,0 +1,22 @@
+"""
+The ml_training scripts import each other by module name (they are run from
+that directory), so the tests put it on sys.path the same way.
+"""
+
+import os
+import sys
+
+import pytest
+
+ML_TRAINING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ML_TRAINING_DIR not in sys.path:
+    sys.path.insert(0, ML_TRAINING_DIR)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def working_directory(tmp_path_factory):
+    """Run from a scratch directory so .artifact_cache sidecars stay out of the source tree"""
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('cwd'))
+    yield
+    os.chdir(previous)
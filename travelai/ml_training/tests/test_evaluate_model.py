@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from sklearn.metrics import (
+    accuracy_score, confusion_matrix, precision_recall_fscore_support, roc_auc_score
+)
+
+from evaluate_model import (
+    StreamingMetrics, _summary_metrics, bootstrap_confusion_matrices, bootstrap_intervals,
+    compute_metrics, metrics_from_confusion
+)
+
+N_CLASSES = 5
+
+
+@pytest.fixture(scope='module')
+def labels():
+    rng = np.random.default_rng(3)
+    y_true = rng.integers(N_CLASSES, size=2000)
+    y_pred = np.where(rng.random(len(y_true)) < 0.8, y_true, rng.integers(N_CLASSES, size=len(y_true)))
+    return y_true, y_pred
+
+
+def test_bootstrap_matrices_match_per_resample_confusion_matrices(labels):
+    y_true, y_pred = labels
+    matrices = bootstrap_confusion_matrices(y_true, y_pred, n_resamples=50, seed=9, n_classes=N_CLASSES)
+
+    rng = np.random.default_rng(9)
+    indices = rng.integers(0, len(y_true), size=(50, len(y_true)))
+    expected = [confusion_matrix(y_true[i], y_pred[i], labels=list(range(N_CLASSES))) for i in indices]
+    np.testing.assert_array_equal(matrices, expected)
+
+
+def test_bootstrap_blocks_draw_the_same_resamples(labels):
+    y_true, y_pred = labels
+    whole = bootstrap_confusion_matrices(y_true, y_pred, n_resamples=50, seed=9, n_classes=N_CLASSES)
+    blocked = bootstrap_confusion_matrices(y_true, y_pred, n_resamples=50, seed=9, n_classes=N_CLASSES,
+                                           max_block_elements=7 * len(y_true))
+    np.testing.assert_array_equal(blocked, whole)
+
+
+@pytest.mark.parametrize('from_confusion', [False, True])
+def test_intervals_bracket_the_point_estimate(labels, from_confusion):
+    y_true, y_pred = labels
+    confusion = confusion_matrix(y_true, y_pred, labels=list(range(N_CLASSES)))
+    if from_confusion:
+        # Streaming evaluation only has the accumulated matrix: multinomial resampling
+        intervals = bootstrap_intervals(confusion=confusion, n_resamples=500, seed=1)
+    else:
+        intervals = bootstrap_intervals(y_true, y_pred, n_resamples=500, seed=1)
+    point = _summary_metrics(metrics_from_confusion(confusion))
+
+    assert intervals['n_resamples'] == 500 and intervals['confidence'] == 0.95
+    for name, value in point.items():
+        low, high = np.moveaxis(intervals[name], -1, 0)
+        assert np.all(low <= value) and np.all(value <= high), name
+        assert np.all(high - low < 0.1), name
+
+
+def test_multinomial_intervals_agree_with_row_resampling(labels):
+    y_true, y_pred = labels
+    confusion = confusion_matrix(y_true, y_pred, labels=list(range(N_CLASSES)))
+    rows = bootstrap_intervals(y_true, y_pred, n_resamples=2000, seed=2)
+    cells = bootstrap_intervals(confusion=confusion, n_resamples=2000, seed=2)
+    for name in ('accuracy', 'weighted_f1', 'recall'):
+        np.testing.assert_allclose(cells[name], rows[name], atol=0.01, err_msg=name)
+
+
+@pytest.fixture(scope='module')
+def predictions():
+    rng = np.random.default_rng(3)
+    y_true = rng.integers(N_CLASSES, size=5000)
+    logits = rng.normal(size=(len(y_true), N_CLASSES))
+    logits[np.arange(len(y_true)), y_true] += 1.5
+    proba = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    return y_true, proba
+
+
+def test_metrics_from_confusion_matches_sklearn(predictions):
+    y_true, proba = predictions
+    y_pred = proba.argmax(axis=1)
+    labels = list(range(N_CLASSES))
+    metrics = metrics_from_confusion(confusion_matrix(y_true, y_pred, labels=labels))
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y_true, y_pred, labels=labels, zero_division=0)
+
+    assert metrics['accuracy'] == pytest.approx(accuracy_score(y_true, y_pred))
+    np.testing.assert_allclose(metrics['precision'], precision)
+    np.testing.assert_allclose(metrics['recall'], recall)
+    np.testing.assert_allclose(metrics['f1'], f1)
+    np.testing.assert_array_equal(metrics['support'], support)
+
+
+def test_streaming_metrics_match_in_memory_metrics(predictions):
+    y_true, proba = predictions
+    streaming = StreamingMetrics(n_classes=N_CLASSES)
+    for start in range(0, len(y_true), 777):
+        streaming.update(y_true[start:start + 777], proba[start:start + 777])
+    result = streaming.result()
+    expected = compute_metrics(y_true, proba.argmax(axis=1), proba)
+
+    assert streaming.n_rows == len(y_true)
+    np.testing.assert_array_equal(result['confusion_matrix'], expected['confusion_matrix'])
+    for name in ('accuracy', 'precision', 'recall', 'f1'):
+        np.testing.assert_allclose(result[name], expected[name])
+    # ROC AUC is approximated at the histogram resolution
+    exact_auc = [roc_auc_score(y_true == i, proba[:, i]) for i in range(N_CLASSES)]
+    np.testing.assert_allclose(result['roc_auc'], exact_auc, atol=2e-3)
+
+
+def test_streaming_metrics_do_not_depend_on_chunking(predictions):
+    y_true, proba = predictions
+    whole = StreamingMetrics(n_classes=N_CLASSES).update(y_true, proba)
+    chunked = StreamingMetrics(n_classes=N_CLASSES)
+    for start in range(0, len(y_true), 1000):
+        chunked.update(y_true[start:start + 1000], proba[start:start + 1000])
+    np.testing.assert_array_equal(whole.confusion, chunked.confusion)
+    np.testing.assert_array_equal(whole.positive_hist, chunked.positive_hist)
+    np.testing.assert_array_equal(whole.negative_hist, chunked.negative_hist)
+
+
+@pytest.mark.parametrize('labels', [[0, N_CLASSES], [-1, 0]])
+def test_streaming_metrics_reject_out_of_range_labels(labels):
+    proba = np.full((2, N_CLASSES), 1.0 / N_CLASSES)
+    with pytest.raises(ValueError, match='Labels'):
+        StreamingMetrics(n_classes=N_CLASSES).update(labels, proba)
+
+
+def test_streaming_metrics_reject_wrong_probability_shape():
+    with pytest.raises(ValueError, match='shape'):
+        StreamingMetrics(n_classes=N_CLASSES).update([0, 1], np.zeros((2, N_CLASSES - 1)))
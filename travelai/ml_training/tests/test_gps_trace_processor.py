@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from gps_trace_processor import FEATURE_COLUMNS, StopEventExtractor
+from trace_simulator import load_stop_table, simulate_traces
+
+EVENT_COLUMNS = FEATURE_COLUMNS + ['latitude', 'longitude', 'start_time', 'n_fixes', 'vehicle_id']
+
+
+@pytest.fixture(scope='module')
+def traces():
+    stops = load_stop_table(n_stops=50, seed=1)
+    return pd.concat(simulate_traces(n_vehicles=6, duration_s=4 * 3600, stops=stops, seed=3),
+                     ignore_index=True)
+
+
+def extract_in_chunks(traces, chunk_size):
+    extractor = StopEventExtractor()
+    events = [extractor.process(traces.iloc[start:start + chunk_size])
+              for start in range(0, len(traces), chunk_size)]
+    events.append(extractor.flush())
+    return pd.concat([e for e in events if len(e)], ignore_index=True)[EVENT_COLUMNS]
+
+
+@pytest.mark.parametrize('chunk_size', [997, 20000])
+def test_extractor_output_does_not_depend_on_chunk_size(traces, chunk_size):
+    whole = extract_in_chunks(traces, len(traces))
+    assert len(whole) > 50
+    pd.testing.assert_frame_equal(extract_in_chunks(traces, chunk_size), whole)
+
+
+def test_every_vehicle_stops_and_short_stops_are_dropped(traces):
+    events = extract_in_chunks(traces, 5000)
+    assert set(events['vehicle_id']) == set(traces['vehicle_id'])
+    assert (events['dwell_time'] >= StopEventExtractor().min_dwell_seconds).all()
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from ingestion_server import IngestionService, shard_of
+from train_stop_classifier import FEATURE_COLUMNS, convert_to_tflite
+
+DEPOT = {'stop_name': 'Depot', 'latitude': 12.9, 'longitude': 74.8}
+
+
+@pytest.fixture(scope='module')
+def model_config(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('models')
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(len(FEATURE_COLUMNS),)),
+        tf.keras.layers.Dense(5, activation='softmax'),
+    ])
+    classifier = str(directory / 'stop_classifier.tflite')
+    convert_to_tflite(model, classifier)
+    scaler = directory / 'scaler_params.json'
+    scaler.write_text(json.dumps({'mean': [0.0] * len(FEATURE_COLUMNS), 'scale': [1.0] * len(FEATURE_COLUMNS),
+                                  'feature_names': FEATURE_COLUMNS}))
+    return {'stops': [DEPOT], 'classifier': classifier, 'scaler': str(scaler)}
+
+
+def depot_fixes(n_vehicles=8, n_visits=2):
+    # Every vehicle stops at the depot n_visits times: one visit cell for the whole fleet
+    speeds = [30, 30, 0, 0, 0, 0] * n_visits + [30]
+    return [{'vehicle_id': f'BUS-{v}', 'timestamp': 1_700_000_000 + 5 * i, 'latitude': DEPOT['latitude'],
+             'longitude': DEPOT['longitude'], 'speed': speed, 'heading': 90.0}
+            for i, speed in enumerate(speeds) for v in range(n_vehicles)]
+
+
+def run_service(model_config, fixes, workers):
+    async def run():
+        service = IngestionService(workers, model_config)
+        await service.start()
+        try:
+            await service.submit_many(fixes)
+        finally:
+            await service.stop()
+        return [service.events.get_nowait() for _ in range(service.events.qsize())]
+    return asyncio.run(run())
+
+
+def test_visit_counts_are_shared_across_shards(model_config):
+    fixes = depot_fixes()
+    assert len({shard_of(fix['vehicle_id'], 3) for fix in fixes}) == 3
+
+    for workers in (1, 3):
+        events = run_service(model_config, fixes, workers)
+        # Shards interleave, so which vehicle gets which count varies, but not the counts
+        assert sorted(event['visit_count'] for event in events) == list(range(1, 17))
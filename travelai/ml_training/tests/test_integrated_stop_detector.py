@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from integrated_stop_detector import (
+    FUSED_TYPES, TYPE_FEATURE_COLUMNS, IntegratedStopDetector, combined_feature_matrix, encode_stop_types
+)
+from tune_fusion_thresholds import simulate_recorded_events
+
+
+@pytest.fixture(scope='module')
+def events():
+    df = simulate_recorded_events(n_events=1500, seed=7)
+    df['nearest_stop'] = [f'Stop {i}' for i in range(len(df))]
+    return df
+
+
+def scalar_results(detector, df, type_features=None):
+    results = []
+    for i, row in enumerate(df.itertuples(index=False)):
+        location = {'is_known_stop': bool(row.is_known_stop), 'confidence': row.location_confidence,
+                    'nearest_stop': row.nearest_stop, 'distance': row.distance}
+        prediction = {'stop_type': row.stop_type, 'confidence': row.type_confidence, 'probabilities': {}}
+        features = None if type_features is None else {c: type_features[c][i] for c in type_features}
+        results.append(detector.predict_integrated(location, prediction, (0.0, 0.0), row.dwell_time, features))
+    return results
+
+
+def batch_results(detector, df, type_features=None):
+    return detector.predict_integrated_batch(
+        df['location_confidence'], df['distance'], df['is_known_stop'], df['stop_type'],
+        df['type_confidence'], df['dwell_time'], nearest_stop=df['nearest_stop'],
+        type_features=type_features)
+
+
+def assert_same_results(scalar, batch):
+    assert list(batch['final_type']) == [r['final_type'] for r in scalar]
+    np.testing.assert_allclose(batch['confidence'], [r['confidence'] for r in scalar], rtol=1e-6)
+    assert list(batch['should_learn']) == [r['should_learn'] for r in scalar]
+    assert list(batch['stop_name']) == [r['stop_name'] for r in scalar]
+
+
+def test_batch_rules_match_scalar_predict(events):
+    detector = IntegratedStopDetector()
+    batch = batch_results(detector, events)
+    assert set(batch['rule']) == {1, 2, 3, 4, 5, 6}
+    assert_same_results(scalar_results(detector, events), batch)
+
+
+def test_batch_integer_type_ids_match_type_names(events):
+    detector = IntegratedStopDetector()
+    by_name = batch_results(detector, events)
+    by_id = detector.predict_integrated_batch(
+        events['location_confidence'], events['distance'], events['is_known_stop'],
+        encode_stop_types(events['stop_type']), events['type_confidence'], events['dwell_time'])
+    for key in ('final_type', 'final_type_id', 'confidence', 'should_learn', 'rule'):
+        np.testing.assert_array_equal(by_id[key], by_name[key])
+
+
+@pytest.fixture
+def meta_learner_path(tmp_path):
+    rng = np.random.default_rng(0)
+    k = len(FUSED_TYPES)
+    path = tmp_path / 'meta_learner_weights.npz'
+    np.savez(path, class_names=np.array(FUSED_TYPES), mean=np.zeros(12), scale=np.ones(12),
+             n_layers=2, W0=rng.normal(size=(12, 16)), b0=np.zeros(16),
+             W1=rng.normal(size=(16, k)) * 0.1, b1=np.zeros(k))
+    return str(path)
+
+
+def test_combined_feature_matrix_matches_calculate_combined_features(events):
+    detector = IntegratedStopDetector()
+    rng = np.random.default_rng(1)
+    columns = {column: rng.uniform(0, 300, len(events)) for column in TYPE_FEATURE_COLUMNS}
+    table = dict(columns, location_confidence=events['location_confidence'], distance=events['distance'],
+                 is_known_stop=events['is_known_stop'], type_confidence=events['type_confidence'])
+    X = combined_feature_matrix(table, dtype=np.float64)
+    for i in range(0, len(events), 97):
+        row = events.iloc[i]
+        expected = detector.calculate_combined_features(
+            {'confidence': row['location_confidence'], 'distance': row['distance'],
+             'is_known_stop': row['is_known_stop']},
+            dict({c: columns[c][i] for c in columns}, model_confidence=row['type_confidence']))
+        np.testing.assert_allclose(X[i], expected)
+
+
+def test_meta_learner_batch_matches_scalar_predict(events, meta_learner_path):
+    detector = IntegratedStopDetector(meta_learner_path=meta_learner_path)
+    rng = np.random.default_rng(2)
+    n = len(events)
+    type_features = {column: rng.uniform(0, 300, n) for column in TYPE_FEATURE_COLUMNS[1:]}
+    # Both paths take dwell time from the dwell_time argument, not from type_features
+    scalar_features = dict(type_features, dwell_time=rng.uniform(0, 600, n))
+
+    batch = batch_results(detector, events, type_features)
+    assert (batch['rule'] == 0).all()
+    assert_same_results(scalar_results(detector, events, scalar_features), batch)
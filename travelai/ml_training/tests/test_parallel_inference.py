@@ -0,0 +1,105 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from parallel_inference import DualModelRunner, MicroBatchPool, _bucket, synthetic_stop_events
+from stop_candidates import LiveIndex
+from streaming_stop_detector import TFLiteLocationModel, TFLiteTypeModel, load_interpreter
+from train_stop_classifier import FEATURE_COLUMNS, convert_to_tflite
+
+STOPS = [{'stop_id': i + 1, 'stop_name': f'Stop {i + 1}', 'latitude': 12.8 + 0.01 * i,
+          'longitude': 74.8 + 0.007 * (i % 5)} for i in range(30)]
+
+
+def small_model(n_inputs, n_outputs, activation):
+    return tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(n_inputs,)),
+        tf.keras.layers.Dense(8, activation='relu'),
+        tf.keras.layers.Dense(n_outputs, activation=activation),
+    ])
+
+
+@pytest.fixture(scope='module')
+def models(tmp_path_factory):
+    root = tmp_path_factory.mktemp('models')
+    tf.keras.utils.set_random_seed(1)
+
+    type_path = str(root / 'stop_classifier.tflite')
+    convert_to_tflite(small_model(len(FEATURE_COLUMNS), 5, 'softmax'), type_path)
+    scaler_path = str(root / 'scaler_params.json')
+    with open(scaler_path, 'w') as f:
+        json.dump({'mean': [600, 40, 180, 10, 12, 3], 'scale': [500, 20, 100, 5, 7, 2],
+                   'feature_names': FEATURE_COLUMNS}, f)
+
+    location_path = str(root / 'stop_location_model.tflite')
+    convert_to_tflite(small_model(2, 1, 'sigmoid'), location_path)
+    metadata_path = str(root / 'stop_location_metadata.json')
+    with open(metadata_path, 'w') as f:
+        json.dump({'bus_stops': STOPS, 'scaler_mean': [12.9, 74.81], 'scaler_scale': [0.1, 0.01]}, f)
+
+    return (lambda: TFLiteTypeModel(type_path, scaler_path),
+            lambda: TFLiteLocationModel(location_path, metadata_path))
+
+
+@pytest.mark.parametrize('n, max_batch, expected', [
+    (1, 32, 1), (3, 32, 4), (17, 32, 32), (5, 5, 5), (3, 5, 4), (32, 32, 32), (40, 32, 40),
+])
+def test_bucket_is_a_power_of_two_capped_at_max_batch(n, max_batch, expected):
+    assert _bucket(n, max_batch) == expected
+
+
+def test_micro_batched_outputs_match_single_invocations(models):
+    type_model = models[0]()
+    rows = [type_model.encode(features) for features, _, _ in synthetic_stop_events(300, STOPS, seed=2)]
+
+    interpreter, input_index, output_index = load_interpreter(type_model.tflite_path)
+    expected = []
+    for x in rows:
+        interpreter.set_tensor(input_index, x[np.newaxis])
+        interpreter.invoke()
+        expected.append(interpreter.get_tensor(output_index)[0].copy())
+
+    pool = MicroBatchPool(type_model.tflite_path, workers=2, max_batch=5, max_wait_ms=2)
+    try:
+        futures = [None] * len(rows)
+
+        def client(offset):
+            for i in range(offset, len(rows), 4):
+                futures[i] = pool.submit(rows[i])
+        threads = [threading.Thread(target=client, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        outputs = [future.result(timeout=30) for future in futures]
+    finally:
+        pool.close()
+
+    np.testing.assert_allclose(outputs, expected, atol=1e-5)
+    assert pool.events == len(rows)
+
+
+def test_runner_matches_sequential_predict_through_live_index(models):
+    new_type_model, new_location_model = models
+    locator = LiveIndex(new_location_model())
+    events = synthetic_stop_events(100, STOPS, seed=3)
+    with DualModelRunner(new_type_model(), locator, workers=2, max_batch=8) as runner:
+        for features, lat, lon in events:
+            location, stop_type = runner.predict(features, lat, lon)
+            expected_location, expected_type = runner.sequential_predict(features, lat, lon)
+            assert location['nearest_stop'] == expected_location['nearest_stop']
+            assert location['distance'] == pytest.approx(expected_location['distance'])
+            assert location['confidence'] == pytest.approx(expected_location['confidence'], abs=1e-5)
+            assert stop_type['stop_type'] == expected_type['stop_type']
+            assert stop_type['confidence'] == pytest.approx(expected_type['confidence'], abs=1e-5)
+
+        # A promoted candidate stop is the nearest stop for events submitted after the swap
+        locator.publish([{'stop_name': 'Candidate 1', 'latitude': 13.5, 'longitude': 75.2}])
+        location, _ = runner.predict(events[0][0], 13.5001, 75.2001)
+        assert location['nearest_stop'] == 'Candidate 1'
+        assert location == pytest.approx(runner.sequential_predict(events[0][0], 13.5001, 75.2001)[0],
+                                         abs=1e-5)
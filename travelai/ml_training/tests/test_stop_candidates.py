@@ -0,0 +1,56 @@
+import pytest
+
+from stop_candidates import METERS_PER_DEGREE, CandidateStore
+
+
+class RecordingIndex:
+    """Stands in for a LiveIndex: keeps every published stop"""
+
+    def __init__(self):
+        self.stops = []
+
+    def publish(self, stops):
+        self.stops.extend(stops)
+
+
+def north(meters):
+    return 12.9 + meters / METERS_PER_DEGREE
+
+
+@pytest.fixture
+def store():
+    index = RecordingIndex()
+    return CandidateStore(merge_radius_m=60, min_support=2, min_vehicles=2, indexes=[index]), index
+
+
+def test_promoted_clusters_that_drift_together_stay_separate_stops(store):
+    store, index = store
+    for meters in (0, 100):
+        for vehicle in ('BUS-1', 'BUS-2'):
+            store.add(north(meters), 74.8, vehicle_id=vehicle)
+    assert len(store.promoted) == 2
+
+    # Sightings between the two pull their centroids within the merge radius
+    for _ in range(10):
+        store.add(north(50), 74.8, vehicle_id='BUS-3')
+    latitudes = sorted(c['latitude'] for c in store.candidates())
+    assert (latitudes[1] - latitudes[0]) * METERS_PER_DEGREE < 60
+
+    assert len(store) == 2
+    published = [stop['stop_id'] for stop in index.stops]
+    assert sorted(c['stop_id'] for c in store.candidates()) == sorted(published)
+    assert [stop['stop_id'] for stop in store.promoted] == published
+
+
+def test_candidate_drifting_onto_a_stop_is_absorbed(store):
+    store, index = store
+    for vehicle in ('BUS-1', 'BUS-2'):
+        store.add(north(0), 74.8, vehicle_id=vehicle)
+    # One vehicle only, so this cluster never becomes a stop of its own
+    store.add(north(100), 74.8, vehicle_id='BUS-3')
+    for _ in range(9):
+        store.add(north(55), 74.8, vehicle_id='BUS-3')
+
+    (cluster,) = store.candidates()
+    assert cluster['count'] == 12 and cluster['stop_id'] == store.promoted[0]['stop_id']
+    assert len(index.stops) == 1
@@ -0,0 +1,91 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import stop_dataset
+from stop_dataset import clear_memory_cache, load_stops, parse_stops, sidecar_path
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'assets')
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Sidecars go to .artifact_cache/stops under the working directory"""
+    monkeypatch.chdir(tmp_path)
+    clear_memory_cache()
+    yield tmp_path
+    clear_memory_cache()
+
+
+def load_from_sidecar(path):
+    """First load writes the sidecar, the second (memory cache cleared) reads it"""
+    load_stops(path)
+    assert os.path.exists(sidecar_path(path))
+    clear_memory_cache()
+    return load_stops(path)
+
+
+def test_json_sidecar_round_trip_keeps_values_and_dtypes(cache_dir):
+    path = cache_dir / 'stops.json'
+    path.write_text(json.dumps([
+        {'stop_id': 1, 'stop_name': ' Hampankatta ', 'latitude': 12.87, 'longitude': 74.84,
+         'active': True, 'route_ids': ['45', '47'], 'note': 'shelter'},
+        {'stop_id': 2, 'stop_name': 'Bejai', 'latitude': '12.89', 'longitude': 74.85,
+         'active': None, 'route_ids': [], 'note': None},
+        {'stop_id': 3, 'stop_name': 'Kadri', 'latitude': 12.88, 'longitude': 74.86,
+         'active': False, 'route_ids': ['13'], 'note': 'temple'},
+    ]))
+    path = str(path)
+
+    cached = load_from_sidecar(path)
+    parsed = parse_stops(path)
+    pd.testing.assert_frame_equal(cached, parsed)
+    assert cached['active'].tolist() == [True, None, False]
+    assert cached['route_ids'].tolist() == [['45', '47'], [], ['13']]
+    assert cached['note'].isna().tolist() == [False, True, False]
+
+
+def test_csv_sidecar_round_trip(cache_dir):
+    path = cache_dir / 'stops.csv'
+    path.write_text('"Bus Stop","Latitude","Longitude","route_ids"\n'
+                    '"Mangalore", "12.8700", "74.8400","45"\n'
+                    '"Karkala", "13.2100", "74.9900",\n')
+    cached = load_from_sidecar(str(path))
+    pd.testing.assert_frame_equal(cached, parse_stops(str(path)))
+    assert cached['stop_id'].tolist() == [1, 2]
+    assert cached['stop_name'].tolist() == ['Mangalore', 'Karkala']
+
+
+@pytest.mark.parametrize('name', ['bus_stops.json', 'bus_stops_mangalore_karkala.csv'])
+def test_shipped_stop_files_round_trip(name):
+    path = os.path.join(ASSETS_DIR, name)
+    before = set(os.listdir(ASSETS_DIR))
+    pd.testing.assert_frame_equal(load_from_sidecar(path), parse_stops(path))
+    # Sidecars live in the artifact cache, not next to the data
+    assert set(os.listdir(ASSETS_DIR)) == before
+    assert os.path.commonpath([os.path.abspath(sidecar_path(path)), os.getcwd()]) == os.getcwd()
+
+
+def test_changed_file_is_parsed_again(cache_dir):
+    path = cache_dir / 'stops.csv'
+    path.write_text('stop_name,latitude,longitude\nA,12.0,74.0\n')
+    assert load_from_sidecar(str(path))['stop_name'].tolist() == ['A']
+
+    path.write_text('stop_name,latitude,longitude\nB,12.5,74.5\nC,12.6,74.6\n')
+    clear_memory_cache()
+    assert load_stops(str(path))['stop_name'].tolist() == ['B', 'C']
+
+
+def test_same_contents_with_new_mtime_use_the_sidecar(cache_dir, monkeypatch):
+    path = cache_dir / 'stops.csv'
+    path.write_text('stop_name,latitude,longitude\nA,12.0,74.0\n')
+    expected = load_from_sidecar(str(path))
+    os.utime(path, ns=(0, 0))
+    clear_memory_cache()
+
+    def fail(path):
+        raise AssertionError('parsed although the contents did not change')
+    monkeypatch.setattr(stop_dataset, 'parse_stops', fail)
+    pd.testing.assert_frame_equal(load_stops(str(path)), expected)
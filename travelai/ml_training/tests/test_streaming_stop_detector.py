@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gps_trace_processor import STOP_SPEED_KMH
+from streaming_stop_detector import NearestStopLocationModel, StreamingStopDetector
+from test_gps_trace_processor import EVENT_COLUMNS, extract_in_chunks
+from trace_simulator import load_stop_table, simulate_traces
+
+
+@pytest.fixture(scope='module')
+def stops():
+    return load_stop_table(n_stops=50, seed=1)
+
+
+@pytest.fixture(scope='module')
+def traces(stops):
+    return pd.concat(simulate_traces(n_vehicles=6, duration_s=4 * 3600, stops=stops, seed=3),
+                     ignore_index=True)
+
+
+def fixed_type_model(features):
+    return {'stop_type': 'regular_stop', 'confidence': 0.9, 'probabilities': {}}
+
+
+def test_streaming_features_match_batch_extraction(traces, stops):
+    batch = extract_in_chunks(traces, 997)
+    # Without hysteresis both use the same stopped rule
+    detector = StreamingStopDetector(fixed_type_model, NearestStopLocationModel(stops.to_dict('records')),
+                                     resume_speed_kmh=STOP_SPEED_KMH)
+    streamed = pd.DataFrame([event.to_dict() for event in detector.run(traces.to_dict('records'))])
+
+    assert len(batch) > 50
+    assert len(streamed) == len(batch)
+    assert streamed['vehicle_id'].tolist() == batch['vehicle_id'].tolist()
+    for column in EVENT_COLUMNS[:-1]:
+        np.testing.assert_allclose(streamed[column].to_numpy(np.float64),
+                                   batch[column].to_numpy(np.float64), rtol=1e-9, err_msg=column)
+
+
+def test_hysteresis_keeps_speed_jitter_inside_one_stop(stops):
+    start = 1_700_000_000
+    speeds = [30, 30, 1, 1, 3, 1, 1, 1, 30, 30]   # 3 km/h is below the resume speed
+    fixes = [{'vehicle_id': 'BUS-1', 'timestamp': start + 5 * i, 'latitude': 12.9, 'longitude': 74.8,
+              'speed': speed, 'heading': 90.0} for i, speed in enumerate(speeds)]
+    detector = StreamingStopDetector(fixed_type_model, NearestStopLocationModel(stops.to_dict('records')))
+    events = list(detector.run(fixes))
+    assert len(events) == 1
+    assert events[0].n_fixes == 6 and events[0].features['dwell_time'] == 25
+    assert events[0].features['speed_before'] == 30
@@ -0,0 +1,109 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import suggestion_bundle
+from route_based_suggestions import RouteBasedStopSuggester
+from suggestion_bundle import SuggestionBundle, export_bundle
+
+ROUTE_FIELDS = ('stop_id', 'stop_name', 'distance_from_origin_km', 'distance_from_dest_km', 'relevance_score')
+
+
+@pytest.fixture(scope='module')
+def stops_path(tmp_path_factory):
+    rng = np.random.default_rng(4)
+    n = 24
+    path = tmp_path_factory.mktemp('stops') / 'stops.csv'
+    pd.DataFrame({
+        'stop_id': np.arange(1, n + 1),
+        'stop_name': [f'Stop {i}' for i in range(1, n + 1)],
+        'latitude': 12.85 + rng.uniform(0, 0.3, n),
+        'longitude': 74.85 + rng.uniform(0, 0.1, n),
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def bundle_path(stops_path, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('bundle') / 'suggestion_bundle.db')
+    export_bundle(stops_path, path, max_stops=6)
+    return path
+
+
+def routes(path):
+    db = sqlite3.connect(path)
+    try:
+        return db.execute('SELECT r.origin_id, r.destination_id, l.stop_ids FROM routes r '
+                          'JOIN stop_lists l ON l.list_id = r.list_id ORDER BY 1, 2').fetchall()
+    finally:
+        db.close()
+
+
+def test_bundle_matches_suggest_stops_between(stops_path, bundle_path):
+    suggester = RouteBasedStopSuggester(stops_path)
+    bundle = SuggestionBundle(bundle_path)
+    try:
+        stops = bundle.stops
+        n_suggestions = 0
+        for origin_id, origin in stops.items():
+            for destination_id, destination in stops.items():
+                if origin_id == destination_id:
+                    continue
+                expected = suggester.suggest_stops_between(
+                    f"{origin['latitude']},{origin['longitude']}",
+                    f"{destination['latitude']},{destination['longitude']}", max_stops=6)
+                assert bundle.stop_ids(origin_id, destination_id) == [s['stop_id'] for s in expected]
+                suggested = bundle.suggest(origin_id, destination_id)
+                assert [[s[k] for k in ROUTE_FIELDS] for s in suggested] == \
+                       [[s[k] for k in ROUTE_FIELDS] for s in expected]
+                n_suggestions += len(expected)
+        assert n_suggestions > 0
+    finally:
+        bundle.close()
+
+
+def test_bundle_does_not_depend_on_task_split(stops_path, bundle_path, tmp_path, monkeypatch):
+    # Several origin tasks per worker, and destinations scored in several blocks
+    monkeypatch.setattr(suggestion_bundle, 'ORIGINS_PER_TASK', 5)
+    parallel_path = str(tmp_path / 'parallel.db')
+    export_bundle(stops_path, parallel_path, max_stops=6, workers=2)
+    assert routes(parallel_path) == routes(bundle_path)
+
+    monkeypatch.setattr(suggestion_bundle, 'DESTINATION_BLOCK', 7)
+    blocked_path = str(tmp_path / 'blocked.db')
+    export_bundle(stops_path, blocked_path, max_stops=6)
+    assert routes(blocked_path) == routes(bundle_path)
+
+
+def test_pairs_file_limits_the_routes(stops_path, bundle_path, tmp_path):
+    pairs = tmp_path / 'pairs.csv'
+    pairs.write_text('origin_id,destination_id\n1,5\n5,1\n7,20\n')
+    path = str(tmp_path / 'pairs.db')
+    export_bundle(stops_path, path, pairs_path=str(pairs), max_stops=6)
+    full = {(o, d): ids for o, d, ids in routes(bundle_path)}
+    assert {(o, d): ids for o, d, ids in routes(path)} == {key: full[key] for key in [(1, 5), (5, 1), (7, 20)]}
+
+
+def test_more_on_route_stops_than_an_int16_count(tmp_path):
+    # 40,000 stops strung along one route: every one is on route, so a narrow
+    # running count of kept stops would wrap before the table ends
+    rng = np.random.default_rng(8)
+    n = 40_000
+    stops = pd.DataFrame({
+        'stop_id': np.arange(1, n + 3),
+        'stop_name': ['Origin', 'Destination'] + [f'Stop {i}' for i in range(n)],
+        'latitude': np.concatenate([[12.90, 13.00], rng.uniform(12.91, 12.99, n)]),
+        'longitude': np.concatenate([[74.80, 74.80], 74.80 + rng.uniform(-0.001, 0.001, n)]),
+    })
+    path = tmp_path / 'corridor.csv'
+    stops.to_csv(path, index=False)
+    lats, lons = stops['latitude'].to_numpy(), stops['longitude'].to_numpy()
+
+    (dests, chosen, counts), = suggestion_bundle.route_stop_lists(
+        np.array([0]), [np.array([1])], lats, lons, max_stops=20)
+    assert dests.tolist() == [1] and counts.tolist() == [20]
+
+    expected = RouteBasedStopSuggester(str(path)).suggest_stops_between('12.9,74.8', '13.0,74.8', max_stops=20)
+    assert (chosen + 1).tolist() == [s['stop_id'] for s in expected]
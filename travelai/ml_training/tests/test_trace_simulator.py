@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+import pytest
+
+from trace_simulator import TRACE_COLUMNS, load_stop_table, write_shard, write_sharded_traces
+
+N_VEHICLES = 12
+DURATION_S = 1800
+
+
+@pytest.fixture(scope='module')
+def stops():
+    return load_stop_table(n_stops=40, seed=2)
+
+
+def shard_bytes(output_dir, manifest):
+    contents = {}
+    for shard in manifest['shards']:
+        with open(os.path.join(output_dir, shard['path']), 'rb') as f:
+            contents[shard['path']] = f.read()
+    return contents
+
+
+def test_sharded_output_does_not_depend_on_worker_count(stops, tmp_path):
+    outputs = []
+    for workers in (1, 2):
+        output_dir = str(tmp_path / f'workers_{workers}')
+        manifest = write_sharded_traces(N_VEHICLES, DURATION_S, output_dir, shards=3, workers=workers,
+                                        stops=stops, seed=11, vehicles_per_chunk=3)
+        outputs.append(shard_bytes(output_dir, manifest))
+    assert len(outputs[0]) == 3
+    assert outputs[0] == outputs[1]
+
+
+def test_shard_only_depends_on_its_vehicles_and_seed(stops, tmp_path):
+    output_dir = str(tmp_path / 'fleet')
+    manifest = write_sharded_traces(N_VEHICLES, DURATION_S, output_dir, shards=3,
+                                    stops=stops, seed=11, vehicles_per_chunk=3)
+    fleet = shard_bytes(output_dir, manifest)
+
+    # Shard 1 (vehicles 4-7) written on its own, as another machine would
+    alone_dir = str(tmp_path / 'alone')
+    os.makedirs(alone_dir)
+    path, n_fixes = write_shard(1, stops, first_vehicle=4, n_vehicles=4, duration_s=DURATION_S,
+                                output_dir=alone_dir, seed=11, vehicles_per_chunk=3)
+    with open(path, 'rb') as f:
+        assert f.read() == fleet[os.path.basename(path)]
+    assert n_fixes == manifest['shards'][1]['n_fixes']
+
+
+def test_shards_are_sorted_by_vehicle_then_time(stops, tmp_path):
+    output_dir = str(tmp_path / 'fleet')
+    manifest = write_sharded_traces(N_VEHICLES, DURATION_S, output_dir, shards=2,
+                                    stops=stops, seed=11, vehicles_per_chunk=5)
+    df = pd.concat(pd.read_csv(os.path.join(output_dir, shard['path'])) for shard in manifest['shards'])
+    assert list(df.columns) == TRACE_COLUMNS
+    assert df['vehicle_id'].nunique() == N_VEHICLES
+    assert len(df) == manifest['n_fixes']
+    assert df['vehicle_id'].is_monotonic_increasing
+    assert df.groupby('vehicle_id')['timestamp'].apply(lambda t: t.is_monotonic_increasing).all()
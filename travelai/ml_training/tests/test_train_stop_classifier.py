@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from evaluate_model import model_inputs, predict_tflite_batched
+from train_stop_classifier import convert_to_tflite, fuse_normalization
+
+
+@pytest.fixture(scope='module')
+def model_and_data():
+    rng = np.random.default_rng(5)
+    X = np.column_stack([
+        rng.uniform(10, 1800, 256), rng.uniform(0, 80, 256), rng.uniform(0, 360, 256),
+        rng.integers(1, 20, 256), rng.integers(24, size=256), rng.integers(7, size=256),
+    ]).astype(np.float32)
+    scaler_params = {'mean': X.mean(axis=0).tolist(), 'scale': X.std(axis=0).tolist()}
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(X.shape[1],)),
+        tf.keras.layers.Dense(16, activation='relu'),
+        tf.keras.layers.Dense(5, activation='softmax'),
+    ])
+    return model, X, scaler_params
+
+
+def scaled(X, scaler_params):
+    return ((X - np.array(scaler_params['mean'])) / np.array(scaler_params['scale'])).astype(np.float32)
+
+
+def test_fused_model_on_raw_features_matches_model_on_scaled_features(model_and_data):
+    model, X, scaler_params = model_and_data
+    fused = fuse_normalization(model, scaler_params)
+    np.testing.assert_allclose(fused.predict(X, verbose=0),
+                               model.predict(scaled(X, scaler_params), verbose=0), atol=1e-5)
+
+
+def test_fused_tflite_export_takes_raw_features(model_and_data, tmp_path):
+    model, X, scaler_params = model_and_data
+    path = str(tmp_path / 'fused.tflite')
+    convert_to_tflite(model, path, scaler_params=scaler_params)
+    fused_params = dict(scaler_params, normalization_fused=True)
+
+    # evaluate_model feeds the fused export raw features and the .h5 scaled ones
+    np.testing.assert_array_equal(model_inputs(X, fused_params, path), X)
+    np.testing.assert_allclose(model_inputs(X, fused_params, 'stop_classifier_full.h5'),
+                               scaled(X, scaler_params), rtol=1e-6)
+
+    expected = model.predict(scaled(X, scaler_params), verbose=0)
+    outputs = predict_tflite_batched(path, model_inputs(X, fused_params, path), batch_size=100)
+    # Weights are stored as float16
+    np.testing.assert_allclose(outputs, expected, atol=1e-2)
+    assert (outputs.argmax(axis=1) == expected.argmax(axis=1)).mean() > 0.97
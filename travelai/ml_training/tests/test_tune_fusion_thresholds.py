@@ -0,0 +1,57 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from integrated_stop_detector import IntegratedStopDetector, encode_stop_types, fuse_arrays
+from tune_fusion_thresholds import event_arrays, grid_search, pick_best, simulate_recorded_events
+
+
+@pytest.fixture(scope='module')
+def events():
+    return simulate_recorded_events(n_events=400, seed=7)
+
+
+def scalar_final_types(detector, df):
+    return [detector.predict_integrated(
+                {'is_known_stop': bool(row.is_known_stop), 'confidence': row.location_confidence,
+                 'nearest_stop': None, 'distance': row.distance},
+                {'stop_type': row.stop_type, 'confidence': row.type_confidence, 'probabilities': {}},
+                (0.0, 0.0), row.dwell_time)['final_type']
+            for row in df.itertuples(index=False)]
+
+
+def test_fuse_arrays_broadcasts_threshold_grids(events):
+    inputs, _ = event_arrays(events)
+    radius = np.array([[50.0], [200.0]])
+    grid_outputs = fuse_arrays(thresholds={'KNOWN_STOP_RADIUS': radius}, **inputs)
+    assert grid_outputs[1].shape == (2, len(events))
+    for g in range(2):
+        single = fuse_arrays(thresholds={'KNOWN_STOP_RADIUS': radius[g, 0]}, **inputs)
+        for grid_output, single_output in zip(grid_outputs, single):
+            np.testing.assert_array_equal(grid_output[g], single_output)
+
+
+@pytest.mark.parametrize('max_block_elements', [20_000_000, 1000])
+def test_tuner_surface_matches_scalar_detector(events, max_block_elements):
+    grid = {'LOCATION_HIGH_CONF': [0.8, 0.9], 'KNOWN_STOP_RADIUS': [50, 150],
+            'EXTENDED_DWELL_SECONDS': [600, 1200]}
+    inputs, true_type = event_arrays(events)
+    names, combos, accuracy, _ = grid_search(inputs, true_type, grid, max_block_elements)
+    assert combos.tolist() == [list(c) for c in itertools.product(*grid.values())]
+
+    for combo, surface_accuracy in zip(combos, accuracy):
+        detector = IntegratedStopDetector()
+        for name, value in zip(names, combo):
+            setattr(detector, name, value)
+        predicted = encode_stop_types(scalar_final_types(detector, events))
+        assert surface_accuracy == pytest.approx((predicted == true_type).mean())
+
+
+def test_pick_best_respects_the_false_positive_cap():
+    accuracy = np.array([0.9, 0.95, 0.95, 0.8])
+    fp_rate = np.array([0.02, 0.10, 0.05, 0.01])
+    assert pick_best(accuracy, fp_rate) == 2
+    assert pick_best(accuracy, fp_rate, max_fp_rate=0.03) == 0
+    with pytest.raises(ValueError):
+        pick_best(accuracy, fp_rate, max_fp_rate=0.001)
@@ -0,0 +1,414 @@
+"""
+Synthetic GPS Trace Simulator
+
+Generates labelled vehicle traces along routes through a stop table, for
+end-to-end throughput tests of trace processing, stop detection and routing:
+
+    stop table (CSV or synthetic)
+        ↓
+    route: walk over each stop's nearest neighbours
+        ↓
+    timeline per vehicle: drive legs (city / highway speed) with
+        traffic signals (city), toll gates (highway), gas stations,
+        rest areas (after long driving) and dwells at the route's stops
+        ↓
+    fixes every interval_s: interpolated position + GPS noise, speed,
+        heading, stop_type label while stopped (STOP_TYPES names)
+        ↓
+    DataFrame chunks / fix dicts (generators)   or   sharded files + manifest
+
+Timelines are built per vehicle (a few dozen segments each); fixes are
+sampled for a whole block of vehicles at once with NumPy, so memory stays
+bounded by the block size however many fixes are generated. Shards are
+independent (seed + shard number), so they can be written by several
+processes and the output is the same for any number of workers.
+
+Output columns match gps_trace_processor.py input and are sorted by vehicle,
+then time: vehicle_id, timestamp, latitude, longitude, speed (km/h),
+heading, stop_type (empty while moving).
+
+Usage:
+    for chunk in simulate_traces(n_vehicles=100, duration_s=3600):
+        ...
+    stream.run(iter_fixes(n_vehicles=10))          # StreamingStopDetector
+
+    python trace_simulator.py --vehicles 1000 --duration 7200 --output-dir traces
+    python trace_simulator.py --vehicles 200000 --duration 14400 --shards 64 --workers 8 --format csv.gz
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from gps_trace_processor import STOP_TYPE_IDS
+from stop_dataset import load_stops
+
+METERS_PER_DEGREE = 111320.0
+
+STOP_TYPE_NAMES = np.array([name for name, _ in sorted(STOP_TYPE_IDS.items(), key=lambda item: item[1])]
+                           + [None], dtype=object)
+MOVING = len(STOP_TYPE_NAMES) - 1   # label index for moving fixes (None)
+
+# Stop table around the Mangalore-Karkala corridor when no CSV is given
+SYNTHETIC_BOUNDS = {'latitude': (12.8, 13.4), 'longitude': (74.7, 75.1)}
+
+DEFAULT_CONFIG = {
+    'interval_s': 5,              # seconds between fixes
+    'city_speed_kmh': (30, 8),    # mean, std per leg
+    'highway_speed_kmh': (70, 10),
+    'highway_leg_km': 5.0,        # legs at least this long are driven at highway speed
+    'gps_noise_m': 5.0,           # position noise (std)
+    'speed_noise': 0.05,          # relative speed noise (std) while moving
+    'heading_noise_deg': 5.0,
+    'dropout': 0.0,               # fraction of fixes lost
+    'signals_per_km': 0.4,        # traffic signals on city legs (Poisson rate)
+    'tolls_per_km': 0.02,         # toll gates on highway legs
+    'gas_station_prob': 0.04,     # per leg
+    'skip_stop_prob': 0.1,        # route stops driven past without stopping
+    'rest_after_s': 5400,         # driving time before a rest area becomes likely
+    'rest_prob': 0.5,             # per leg once rest_after_s is reached
+    'neighbours': 6,              # candidate next stops on the route walk
+    'start_time': 1700000000,     # earliest trip start (unix seconds)
+    'start_spread_s': 86400,      # trip starts are spread over this window
+}
+
+# Dwell (mean, std, minimum) in seconds per stop type
+DWELL_SECONDS = {
+    'traffic_signal': (25, 10, 8),
+    'toll_gate': (60, 20, 15),
+    'regular_stop': (120, 40, 20),
+    'gas_station': (420, 180, 120),
+    'rest_area': (1200, 300, 600),
+}
+
+TRACE_COLUMNS = ['vehicle_id', 'timestamp', 'latitude', 'longitude', 'speed', 'heading', 'stop_type']
+
+def load_stop_table(path=None, n_stops=200, seed=0):
+    """
+    Stop table (stop_name, latitude, longitude) from a stop file, or n_stops random stops
+
+    Files go through stop_dataset.load_stops, so any supported CSV / JSON schema works.
+    """
+    if path is None:
+        rng = np.random.default_rng(seed)
+        return pd.DataFrame({
+            'stop_name': [f'Stop {i}' for i in range(n_stops)],
+            'latitude': rng.uniform(*SYNTHETIC_BOUNDS['latitude'], n_stops),
+            'longitude': rng.uniform(*SYNTHETIC_BOUNDS['longitude'], n_stops),
+        })
+    return load_stops(path)[['stop_name', 'latitude', 'longitude']]
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    """Equirectangular distance; exact enough between neighbouring stops"""
+    dy = (lat2 - lat1) * METERS_PER_DEGREE
+    dx = (lon2 - lon1) * METERS_PER_DEGREE * np.cos(np.radians((lat1 + lat2) / 2))
+    return np.hypot(dx, dy) / 1000
+
+def nearest_neighbours(lats, lons, k=6, block=1024):
+    """(n, k) indices of each stop's k nearest other stops, computed in blocks"""
+    n = len(lats)
+    k = min(k, n - 1)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        d = _distance_km(lats[start:end, None], lons[start:end, None], lats[None], lons[None])
+        d[np.arange(end - start), np.arange(start, end)] = np.inf
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(d, nearest, axis=1).argsort(axis=1)
+        neighbours[start:end] = np.take_along_axis(nearest, order, axis=1)
+    return neighbours
+
+def _dwell(rng, stop_type):
+    mean, std, minimum = DWELL_SECONDS[stop_type]
+    return max(rng.normal(mean, std), minimum)
+
+class TraceSimulator:
+    """
+    Builds vehicle timelines over a stop table and samples them into fixes
+
+    Each vehicle's route, stops and start time come from its own random
+    stream (seed, vehicle number); GPS noise is drawn per block.
+
+    Args:
+        stops: DataFrame with latitude/longitude (see load_stop_table)
+        seed: the same seed and vehicle numbers always give the same traces
+        **config: overrides for DEFAULT_CONFIG
+    """
+
+    def __init__(self, stops, seed=0, **config):
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown simulator settings: {sorted(unknown)}")
+        if len(stops) < 2:
+            raise ValueError("The stop table needs at least two stops")
+        self.config = dict(DEFAULT_CONFIG, **config)
+        self.seed = seed
+        self.lats = stops['latitude'].to_numpy(dtype=np.float64)
+        self.lons = stops['longitude'].to_numpy(dtype=np.float64)
+        self.neighbours = nearest_neighbours(self.lats, self.lons, self.config['neighbours'])
+
+    def next_stop(self, rng, current, previous=None):
+        """One of the current stop's nearest neighbours, not going straight back if avoidable"""
+        options = self.neighbours[current]
+        if previous is not None and len(options) > 1:
+            options = options[options != previous]
+        return int(rng.choice(options))
+
+    def timeline(self, rng, duration_s):
+        """
+        Segments covering [0, duration_s] for one vehicle
+
+        Returns parallel lists: end time, start/end position, label index
+        (MOVING while driving) and speed (km/h).
+        """
+        cfg = self.config
+        ends, lat0, lon0, lat1, lon1, labels, speeds = [], [], [], [], [], [], []
+
+        def add(seconds, a_lat, a_lon, b_lat, b_lon, label, speed):
+            ends.append((ends[-1] if ends else 0.0) + seconds)
+            lat0.append(a_lat)
+            lon0.append(a_lon)
+            lat1.append(b_lat)
+            lon1.append(b_lon)
+            labels.append(label)
+            speeds.append(speed)
+
+        def stop_at(lat, lon, stop_type):
+            add(_dwell(rng, stop_type), lat, lon, lat, lon, STOP_TYPE_IDS[stop_type], 0.0)
+
+        current, previous = int(rng.integers(len(self.lats))), None
+        driving_s = 0.0
+        while not ends or ends[-1] < duration_s:
+            nxt = self.next_stop(rng, current, previous)
+            a_lat, a_lon, b_lat, b_lon = self.lats[current], self.lons[current], self.lats[nxt], self.lons[nxt]
+            leg_km = float(_distance_km(a_lat, a_lon, b_lat, b_lon))
+            highway = leg_km >= cfg['highway_leg_km']
+            mean, std = cfg['highway_speed_kmh'] if highway else cfg['city_speed_kmh']
+            speed = max(rng.normal(mean, std), 5.0)
+
+            # Stops along the leg, at fractions of its length
+            if highway:
+                events = ['toll_gate'] * rng.poisson(cfg['tolls_per_km'] * leg_km)
+            else:
+                events = ['traffic_signal'] * rng.poisson(cfg['signals_per_km'] * leg_km)
+            if rng.random() < cfg['gas_station_prob']:
+                events.append('gas_station')
+            if driving_s >= cfg['rest_after_s'] and rng.random() < cfg['rest_prob']:
+                events.append('rest_area')
+            fractions = np.sort(rng.random(len(events)))
+            order = rng.permutation(len(events))
+
+            done = 0.0
+            for fraction, i in zip(fractions, order):
+                p_lat, p_lon = a_lat + (b_lat - a_lat) * fraction, a_lon + (b_lon - a_lon) * fraction
+                q_lat, q_lon = a_lat + (b_lat - a_lat) * done, a_lon + (b_lon - a_lon) * done
+                add(leg_km * (fraction - done) / speed * 3600, q_lat, q_lon, p_lat, p_lon, MOVING, speed)
+                stop_at(p_lat, p_lon, events[i])
+                if events[i] == 'rest_area':
+                    driving_s = 0.0
+                done = fraction
+            q_lat, q_lon = a_lat + (b_lat - a_lat) * done, a_lon + (b_lon - a_lon) * done
+            add(leg_km * (1 - done) / speed * 3600, q_lat, q_lon, b_lat, b_lon, MOVING, speed)
+            driving_s += leg_km / speed * 3600
+
+            if rng.random() >= cfg['skip_stop_prob']:
+                stop_at(b_lat, b_lon, 'regular_stop')
+            current, previous = nxt, current
+        return ends, lat0, lon0, lat1, lon1, labels, speeds
+
+    def simulate_block(self, first_vehicle, n_vehicles, duration_s, vehicle_prefix='SIM'):
+        """
+        Fixes for vehicles first_vehicle .. first_vehicle + n_vehicles - 1 as one DataFrame
+        """
+        cfg = self.config
+        interval = cfg['interval_s']
+        n_per_vehicle = int(duration_s // interval) + 1
+        span = duration_s + interval   # keeps each vehicle's times apart in one sorted array
+
+        ends, lat0, lon0, lat1, lon1, labels, speeds, starts = [], [], [], [], [], [], [], []
+        vehicle_starts = np.empty(n_vehicles)
+        for v in range(first_vehicle, first_vehicle + n_vehicles):
+            rng = np.random.default_rng([self.seed, v])
+            vehicle_starts[v - first_vehicle] = cfg['start_time'] + rng.integers(0, max(cfg['start_spread_s'], 1))
+            segment_ends, *rest = self.timeline(rng, duration_s)
+            offset = (v - first_vehicle) * span
+            seg_starts = [0.0] + segment_ends[:-1]
+            ends.extend(e + offset for e in segment_ends)
+            starts.extend(s + offset for s in seg_starts)
+            for column, values in zip((lat0, lon0, lat1, lon1, labels, speeds), rest):
+                column.extend(values)
+
+        ends, starts = np.asarray(ends), np.asarray(starts)
+        lat0, lon0, lat1, lon1 = map(np.asarray, (lat0, lon0, lat1, lon1))
+        labels, speeds = np.asarray(labels, dtype=np.int8), np.asarray(speeds)
+
+        vehicle = np.repeat(np.arange(n_vehicles), n_per_vehicle)
+        local_t = np.tile(np.arange(n_per_vehicle) * float(interval), n_vehicles)
+        segment = np.searchsorted(ends, vehicle * span + local_t, side='right')
+        segment = np.minimum(segment, len(ends) - 1)
+        length = ends[segment] - starts[segment]
+        fraction = np.clip((vehicle * span + local_t - starts[segment]) / np.where(length > 0, length, 1), 0, 1)
+
+        rng = np.random.default_rng([self.seed, first_vehicle, n_vehicles, 1])
+        n = len(segment)
+        lat = lat0[segment] + (lat1[segment] - lat0[segment]) * fraction
+        lon = lon0[segment] + (lon1[segment] - lon0[segment]) * fraction
+        heading = (np.degrees(np.arctan2((lon1 - lon0) * np.cos(np.radians(lat0)), lat1 - lat0))[segment]
+                   + rng.normal(0, cfg['heading_noise_deg'], n)) % 360
+        label = labels[segment]
+        stopped = label != MOVING
+        speed = np.where(stopped, np.abs(rng.normal(0, 0.5, n)),
+                         speeds[segment] * (1 + rng.normal(0, cfg['speed_noise'], n))).clip(0)
+        heading = np.where(stopped, rng.uniform(0, 360, n), heading)
+        noise = rng.normal(0, cfg['gps_noise_m'], (2, n)) / METERS_PER_DEGREE
+        lat = lat + noise[0]
+        lon = lon + noise[1] / np.cos(np.radians(lat))
+
+        timestamp = vehicle_starts[vehicle] + local_t
+        if float(interval).is_integer():
+            timestamp = timestamp.astype(np.int64)
+        vehicle_ids = np.array([f'{vehicle_prefix}-{v:07d}'
+                                for v in range(first_vehicle, first_vehicle + n_vehicles)], dtype=object)
+        df = pd.DataFrame({
+            'vehicle_id': vehicle_ids[vehicle],
+            'timestamp': timestamp,
+            'latitude': lat.round(6),
+            'longitude': lon.round(6),
+            'speed': speed.round(2),
+            'heading': heading.round(1),
+            'stop_type': STOP_TYPE_NAMES[label],
+        })
+        if cfg['dropout'] > 0:
+            df = df[rng.random(n) >= cfg['dropout']].reset_index(drop=True)
+        return df
+
+def simulate_traces(n_vehicles=100, duration_s=3600, stops=None, seed=0, first_vehicle=0,
+                    vehicles_per_chunk=500, **config):
+    """
+    Yield DataFrame chunks of fixes (TRACE_COLUMNS), whole vehicles per chunk
+
+    Chunks are in vehicle order, so concatenated they are sorted by vehicle,
+    then time, as gps_trace_processor.py expects.
+    """
+    simulator = TraceSimulator(load_stop_table() if stops is None else stops, seed, **config)
+    end = first_vehicle + n_vehicles
+    for start in range(first_vehicle, end, vehicles_per_chunk):
+        yield simulator.simulate_block(start, min(vehicles_per_chunk, end - start), duration_s)
+
+def iter_fixes(n_vehicles=10, duration_s=3600, stops=None, seed=0, **kwargs):
+    """Yield fixes as dicts (the StreamingStopDetector input), vehicle by vehicle"""
+    for chunk in simulate_traces(n_vehicles, duration_s, stops, seed, **kwargs):
+        yield from chunk.to_dict('records')
+
+def _write_chunk(df, path, fmt, first):
+    """Append one chunk to a shard file"""
+    compression = 'gzip' if fmt.endswith('.gz') else None
+    mode = 'w' if first else 'a'
+    if fmt.startswith('ndjson'):
+        payload = df.to_json(orient='records', lines=True)
+        if compression:
+            import gzip
+            with gzip.open(path, mode + 't') as f:
+                f.write(payload)
+        else:
+            with open(path, mode) as f:
+                f.write(payload)
+    else:
+        df.to_csv(path, mode=mode, header=first, index=False,
+                  compression={'method': 'gzip'} if compression else None)
+
+def write_shard(shard, stops, first_vehicle, n_vehicles, duration_s, output_dir, fmt='csv',
+                seed=0, vehicles_per_chunk=500, config=None):
+    """Write one shard file; returns (path, fixes written)"""
+    path = os.path.join(output_dir, f'traces_{shard:05d}.{fmt}')
+    n_fixes = 0
+    chunks = simulate_traces(n_vehicles, duration_s, stops, seed, first_vehicle,
+                             vehicles_per_chunk, **(config or {}))
+    for i, chunk in enumerate(chunks):
+        _write_chunk(chunk, path, fmt, first=(i == 0))
+        n_fixes += len(chunk)
+    return path, n_fixes
+
+def _write_shard_job(job):
+    return write_shard(**job)
+
+def write_sharded_traces(n_vehicles, duration_s=3600, output_dir='traces', shards=1, workers=1,
+                         stops=None, fmt='csv', seed=0, vehicles_per_chunk=500, **config):
+    """
+    Simulate a fleet into `shards` files (whole vehicles per shard) plus manifest.json
+
+    Shards are generated by `workers` processes; each shard only depends on
+    its vehicle range and the seed. Returns the manifest dict.
+    """
+    if fmt not in ('csv', 'csv.gz', 'ndjson', 'ndjson.gz'):
+        raise ValueError(f"Unknown format {fmt!r} (csv, csv.gz, ndjson, ndjson.gz)")
+    stops = load_stop_table() if stops is None else stops
+    os.makedirs(output_dir, exist_ok=True)
+
+    per_shard = -(-n_vehicles // shards)
+    jobs = [dict(shard=shard, stops=stops, first_vehicle=start, n_vehicles=min(per_shard, n_vehicles - start),
+                 duration_s=duration_s, output_dir=output_dir, fmt=fmt, seed=seed,
+                 vehicles_per_chunk=vehicles_per_chunk, config=config)
+            for shard, start in enumerate(range(0, n_vehicles, per_shard))]
+
+    start_time = time.perf_counter()
+    if workers > 1 and len(jobs) > 1:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(min(workers, len(jobs))) as pool:
+            results = []
+            for path, n_fixes in pool.imap(_write_shard_job, jobs):
+                results.append((path, n_fixes))
+                print(f"   📄 {path}: {n_fixes:,} fixes")
+    else:
+        results = []
+        for job in jobs:
+            path, n_fixes = write_shard(**job)
+            results.append((path, n_fixes))
+            print(f"   📄 {path}: {n_fixes:,} fixes")
+    elapsed = time.perf_counter() - start_time
+
+    total = sum(n for _, n in results)
+    manifest = {
+        'n_vehicles': n_vehicles,
+        'duration_s': duration_s,
+        'seed': seed,
+        'format': fmt,
+        'n_stops': len(stops),
+        'config': dict(DEFAULT_CONFIG, **config),
+        'n_fixes': total,
+        'shards': [{'path': os.path.basename(p), 'n_fixes': n} for p, n in results],
+        'seconds': round(elapsed, 2),
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✅ {total:,} fixes for {n_vehicles:,} vehicles in {len(results)} shard(s) → {output_dir} "
+          f"({elapsed:.1f}s, {total / max(elapsed, 1e-9):,.0f} fixes/s)")
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Simulate labelled GPS traces for load tests')
+    parser.add_argument('--stops', default=None, help='Stop table CSV (default: random stops)')
+    parser.add_argument('--n-stops', type=int, default=200, help='Random stops without --stops')
+    parser.add_argument('--vehicles', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=3600, help='Seconds simulated per vehicle')
+    parser.add_argument('--interval', type=float, default=DEFAULT_CONFIG['interval_s'], help='Seconds between fixes')
+    parser.add_argument('--gps-noise', type=float, default=DEFAULT_CONFIG['gps_noise_m'], help='Position noise (m)')
+    parser.add_argument('--dropout', type=float, default=DEFAULT_CONFIG['dropout'], help='Fraction of fixes lost')
+    parser.add_argument('--output-dir', default='traces')
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--format', default='csv', choices=['csv', 'csv.gz', 'ndjson', 'ndjson.gz'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_sharded_traces(
+        args.vehicles, args.duration, args.output_dir, args.shards, args.workers,
+        stops=load_stop_table(args.stops, args.n_stops, args.seed), fmt=args.format, seed=args.seed,
+        interval_s=args.interval, gps_noise_m=args.gps_noise, dropout=args.dropout
+    )
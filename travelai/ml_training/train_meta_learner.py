@@ -0,0 +1,261 @@
+"""
+Meta-Learner ("Model 3") Training Script
+
+Learns the fusion step of IntegratedStopDetector: from the 12 combined
+features (type classifier inputs + both models' outputs, see
+calculate_combined_features) it predicts the final fused stop type directly,
+replacing the hand-written rule cascade with one small dense network.
+
+Training events are recorded model outputs with known outcomes - the same
+table tune_fusion_thresholds.py uses, plus the type classifier's six input
+features. Without --events a simulated set is generated.
+
+Outputs:
+- meta_learner.tflite           - for the app (normalization fused, raw features in)
+- meta_learner_weights.npz      - scaler + dense weights for MetaLearner (NumPy, no TF)
+- meta_learner_metadata.json    - feature/class names and test metrics vs the rules
+
+Usage:
+    python train_meta_learner.py [--events recorded_meta_events.csv] [--n-events 20000]
+    python cli.py fuse --input detections.json --meta-learner meta_learner_weights.npz
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from tensorflow import keras
+from tensorflow.keras import layers
+
+from instrumentation import span
+from integrated_stop_detector import (
+    COMBINED_FEATURE_NAMES, DEFAULT_THRESHOLDS, FUSED_TYPES, TYPE_FEATURE_COLUMNS,
+    MetaLearner, combined_feature_matrix, encode_stop_types, fuse_arrays
+)
+from train_stop_classifier import convert_to_tflite
+from tune_fusion_thresholds import BUS_STOP_TYPES, EVENT_COLUMNS, event_arrays, simulate_recorded_events
+
+META_EVENT_COLUMNS = EVENT_COLUMNS + [c for c in TYPE_FEATURE_COLUMNS if c not in EVENT_COLUMNS]
+
+# Type classifier input distributions per actual stop type (as in generate_synthetic_data)
+SPEED_BEFORE_PARAMS = {'traffic_signal': (35, 15), 'toll_gate': (70, 20), 'regular_stop': (30, 10),
+                       'gas_station': (60, 15), 'rest_area': (70, 15)}
+VISIT_COUNT_RANGES = {'traffic_signal': (1, 5), 'toll_gate': (1, 10), 'regular_stop': (3, 20),
+                      'gas_station': (1, 8), 'rest_area': (1, 5)}
+
+def simulate_meta_events(n_events=20000, seed=42):
+    """
+    simulate_recorded_events() plus the type classifier's input features
+
+    Features are drawn for the stop's actual type (bus stops of any kind are
+    regular stops to the type classifier).
+    """
+    df = simulate_recorded_events(n_events, seed)
+    rng = np.random.default_rng(seed + 1)
+    actual_type = df['true_type'].where(~df['true_type'].isin(BUS_STOP_TYPES), 'regular_stop').to_numpy()
+
+    speed_before = np.empty(n_events)
+    visit_count = np.empty(n_events, dtype=np.int64)
+    for name, (mean, std) in SPEED_BEFORE_PARAMS.items():
+        mask = actual_type == name
+        speed_before[mask] = rng.normal(mean, std, mask.sum())
+        visit_count[mask] = rng.integers(*VISIT_COUNT_RANGES[name], size=mask.sum())
+
+    df['speed_before'] = np.clip(speed_before, 0, 120)
+    df['heading'] = rng.uniform(0, 360, n_events)
+    df['visit_count'] = visit_count
+    df['hour'] = rng.integers(0, 24, n_events)
+    df['day_of_week'] = rng.integers(0, 7, n_events)
+    return df
+
+def load_meta_events(path):
+    """Recorded events (CSV) with META_EVENT_COLUMNS"""
+    df = pd.read_csv(path)
+    missing = set(META_EVENT_COLUMNS) - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} is missing columns: {sorted(missing)}")
+    return df
+
+def prepare_meta_data(df, seed=42):
+    """
+    Split events into train/val/test and fit the feature scaler
+
+    Returns (splits dict of raw feature matrices/labels/events, scaler params)
+    """
+    X = combined_feature_matrix(df)
+    y = encode_stop_types(df['true_type'])
+    index = np.arange(len(df))
+
+    idx_train, idx_test = train_test_split(index, test_size=0.2, random_state=seed, stratify=y)
+    idx_train, idx_val = train_test_split(idx_train, test_size=0.2, random_state=seed,
+                                          stratify=y[idx_train])
+
+    scaler = StandardScaler().fit(X[idx_train])
+    scaler_params = {
+        'mean': scaler.mean_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'feature_names': list(COMBINED_FEATURE_NAMES)
+    }
+    splits = {
+        'X_train': X[idx_train], 'y_train': y[idx_train],
+        'X_val': X[idx_val], 'y_val': y[idx_val],
+        'X_test': X[idx_test], 'y_test': y[idx_test],
+        'test_events': df.iloc[idx_test].reset_index(drop=True)
+    }
+    return splits, scaler_params
+
+def create_meta_model(n_features, n_classes):
+    """
+    Small dense network (no BatchNorm, so it exports to plain NumPy layers)
+    """
+    model = keras.Sequential([
+        layers.Input(shape=(n_features,)),
+        layers.Dense(32, activation='relu'),
+        layers.Dropout(0.2),
+        layers.Dense(16, activation='relu'),
+        layers.Dense(n_classes, activation='softmax')
+    ])
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.003),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    return model
+
+def scale(X, scaler_params):
+    return (X - np.asarray(scaler_params['mean'])) / np.asarray(scaler_params['scale'])
+
+def train_meta_model(splits, scaler_params):
+    """
+    Train on scaled features; the scaler is applied again by MetaLearner / the fused TFLite model
+    """
+    model = create_meta_model(len(COMBINED_FEATURE_NAMES), len(FUSED_TYPES))
+    early_stopping = keras.callbacks.EarlyStopping(monitor='val_loss', patience=8,
+                                                   restore_best_weights=True)
+    history = model.fit(
+        scale(splits['X_train'], scaler_params), splits['y_train'],
+        validation_data=(scale(splits['X_val'], scaler_params), splits['y_val']),
+        epochs=100,
+        batch_size=64,
+        callbacks=[early_stopping],
+        verbose=2
+    )
+    return model, history
+
+def save_numpy_weights(model, scaler_params, path='meta_learner_weights.npz'):
+    """Scaler + dense layer weights in the layout MetaLearner loads"""
+    dense = [layer for layer in model.layers if isinstance(layer, layers.Dense)]
+    arrays = {
+        'mean': np.asarray(scaler_params['mean'], dtype=np.float32),
+        'scale': np.asarray(scaler_params['scale'], dtype=np.float32),
+        'class_names': np.array(FUSED_TYPES),
+        'n_layers': np.array(len(dense))
+    }
+    for i, layer in enumerate(dense):
+        W, b = layer.get_weights()
+        arrays[f'W{i}'], arrays[f'b{i}'] = W.astype(np.float32), b.astype(np.float32)
+    np.savez(path, **arrays)
+
+def fusion_metrics(final_type, true_type):
+    """Accuracy and false-positive rate (bus stop verdict for a non-bus stop)"""
+    bus_ids = encode_stop_types(BUS_STOP_TYPES)
+    actual_bus = np.isin(true_type, bus_ids)
+    false_positives = (np.isin(final_type, bus_ids) & ~actual_bus).sum()
+    return {
+        'accuracy': float((final_type == true_type).mean()),
+        'false_positive_rate': float(false_positives / max(int((~actual_bus).sum()), 1))
+    }
+
+def time_per_event(fn, n_events, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / n_events * 1e6
+
+def main(events_path=None, n_events=20000, seed=42, thresholds_path=None):
+    print("=" * 70)
+    print("META-LEARNER TRAINING")
+    print("=" * 70)
+
+    with span('data_generation', n_events=n_events):
+        if events_path:
+            print(f"Loading recorded events from {events_path}...")
+            df = load_meta_events(events_path)
+        else:
+            print(f"Simulating {n_events:,} recorded events...")
+            df = simulate_meta_events(n_events, seed)
+    print("\nOutcome distribution:")
+    print(df['true_type'].value_counts())
+
+    with span('scaling'):
+        splits, scaler_params = prepare_meta_data(df, seed)
+
+    print("\nTraining meta-learner...")
+    with span('fit'):
+        model, history = train_meta_model(splits, scaler_params)
+
+    print("\nEvaluating on test set...")
+    with span('evaluate'):
+        X_test, y_test = splits['X_test'], splits['y_test']
+        meta_learner_probabilities = model.predict(scale(X_test, scaler_params), verbose=0)
+        learned = fusion_metrics(meta_learner_probabilities.argmax(axis=1), y_test)
+
+        thresholds = dict(DEFAULT_THRESHOLDS)
+        if thresholds_path:
+            with open(thresholds_path) as f:
+                config = json.load(f)
+            thresholds.update(config.get('thresholds', config))
+        inputs, true_type = event_arrays(splits['test_events'])
+        _, rule_type, _, _ = fuse_arrays(thresholds=thresholds, **inputs)
+        rules = fusion_metrics(rule_type, true_type)
+
+    print("\nConverting to TensorFlow Lite...")
+    with span('conversion'):
+        convert_to_tflite(model, 'meta_learner.tflite', scaler_params=scaler_params)
+
+    with span('export'):
+        save_numpy_weights(model, scaler_params)
+        metadata = {
+            'feature_names': list(COMBINED_FEATURE_NAMES),
+            'class_names': list(FUSED_TYPES),
+            'normalization_fused': True,
+            'n_events': len(df),
+            'test': {'meta_learner': learned, 'rules': rules},
+            'epochs': len(history.history['loss'])
+        }
+        with open('meta_learner_metadata.json', 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    # Fusion cost per event, both vectorized over the test set
+    meta = MetaLearner('meta_learner_weights.npz')
+    n_test = len(X_test)
+    meta_us = time_per_event(lambda: meta.predict(combined_feature_matrix(splits['test_events'])), n_test)
+    rules_us = time_per_event(lambda: fuse_arrays(thresholds=thresholds, **inputs), n_test)
+
+    print("\n" + "=" * 70)
+    print(f"{'':<16}{'Accuracy':>12}{'FP rate':>12}{'µs/event':>12}")
+    print("-" * 70)
+    print(f"{'Rule cascade':<16}{rules['accuracy']:>12.2%}{rules['false_positive_rate']:>12.2%}{rules_us:>12.3f}")
+    print(f"{'Meta-learner':<16}{learned['accuracy']:>12.2%}{learned['false_positive_rate']:>12.2%}{meta_us:>12.3f}")
+    print("=" * 70)
+
+    print("\n✅ Saved meta_learner.tflite, meta_learner_weights.npz and meta_learner_metadata.json")
+    print("   Use it: IntegratedStopDetector(meta_learner_path='meta_learner_weights.npz')")
+    return metadata
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the fusion meta-learner')
+    parser.add_argument('--events', default=None,
+                        help=f'Recorded events CSV ({", ".join(META_EVENT_COLUMNS)})')
+    parser.add_argument('--n-events', type=int, default=20000, help='Simulated events without --events')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--thresholds', default=None, help='Tuned thresholds JSON for the rule baseline')
+    args = parser.parse_args()
+
+    main(args.events, args.n_events, args.seed, args.thresholds)
@@ -25,6 +25,12 @@ import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 import json
+import os
+import sys
+import time
+
+from artifact_cache import ArtifactCache, DEFAULT_CACHE_DIR
+from instrumentation import span
 
 # Stop types
 STOP_TYPES = {
@@ -36,11 +42,16 @@ STOP_TYPES = {
     5: 'unknown'
 }
 
-def generate_synthetic_data(n_samples=10000):
+FEATURE_COLUMNS = ['dwell_time', 'speed_before', 'heading', 'visit_count', 'hour', 'day_of_week']
+
+def generate_synthetic_data(n_samples=10000, seed=None):
     """
     Generate synthetic training data based on typical stop patterns
     In production, this would be replaced with real GPS data
     """
+    if seed is not None:
+        np.random.seed(seed)
+    
     data = []
     
     for _ in range(n_samples):
@@ -119,19 +130,23 @@ def create_model(input_shape, num_classes):
     
     return model
 
-def train_model(X_train, y_train, X_val, y_val):
+def compile_model(model):
     """
-    Train the classification model
+    Compile with the optimizer/loss used for training
     """
-    # Create model
-    model = create_model(X_train.shape[1], len(STOP_TYPES))
-    
-    # Compile
     model.compile(
         optimizer=keras.optimizers.Adam(learning_rate=0.001),
         loss='sparse_categorical_crossentropy',
         metrics=['accuracy']
     )
+
+def train_model(X_train, y_train, X_val, y_val):
+    """
+    Train the classification model
+    """
+    # Create model
+    model = create_model(X_train.shape[1], len(STOP_TYPES))
+    compile_model(model)
     
     # Callbacks
     early_stopping = keras.callbacks.EarlyStopping(
@@ -159,10 +174,42 @@ def train_model(X_train, y_train, X_val, y_val):
     
     return model, history
 
-def convert_to_tflite(model, output_path='stop_classifier.tflite'):
+def scaler_arrays(params):
+    """
+    Return (mean, scale) from either scaler schema
+    
+    The classifier saves 'mean'/'scale' (scaler_params.json), the location
+    model 'scaler_mean'/'scaler_scale' (stop_location_metadata.json).
+    """
+    mean = params['mean'] if 'mean' in params else params['scaler_mean']
+    scale = params['scale'] if 'scale' in params else params['scaler_scale']
+    return np.asarray(mean, dtype=np.float32), np.asarray(scale, dtype=np.float32)
+
+def fuse_normalization(model, scaler_params):
+    """
+    Bake the fitted StandardScaler into the model as a Normalization layer
+    
+    The returned model takes raw (unscaled) features, so consumers can feed
+    the interpreter directly without loading the scaler and normalizing by hand.
+    """
+    mean, scale = scaler_arrays(scaler_params)
+    
+    inputs = layers.Input(shape=(len(mean),), name='raw_features')
+    normalized = layers.Normalization(mean=mean, variance=np.square(scale), name='fused_scaler')(inputs)
+    outputs = model(normalized)
+    
+    return keras.Model(inputs, outputs)
+
+def convert_to_tflite(model, output_path='stop_classifier.tflite', scaler_params=None):
     """
     Convert Keras model to TensorFlow Lite format for mobile deployment
+    
+    If scaler_params is given, normalization is fused into the exported model
+    and it expects raw features.
     """
+    if scaler_params is not None:
+        model = fuse_normalization(model, scaler_params)
+    
     # Convert to TFLite
     converter = tf.lite.TFLiteConverter.from_keras_model(model)
     
@@ -178,16 +225,53 @@ def convert_to_tflite(model, output_path='stop_classifier.tflite'):
     
     print(f"TFLite model saved to {output_path}")
     print(f"Model size: {len(tflite_model) / 1024:.2f} KB")
+    
+    return tflite_model
 
-def main():
-    print("Generating synthetic training data...")
-    df = generate_synthetic_data(n_samples=10000)
+def benchmark_tflite_model(tflite_path, X, y=None, n_latency_runs=500):
+    """
+    Measure size, single-sample latency and (optionally) accuracy of a TFLite model
+    
+    X must already be in the model's input space (scaled features).
+    """
+    interpreter = tf.lite.Interpreter(model_path=tflite_path)
+    interpreter.allocate_tensors()
+    input_index = interpreter.get_input_details()[0]['index']
+    output_index = interpreter.get_output_details()[0]['index']
     
-    print("\nData distribution:")
-    print(df['stop_type'].value_counts())
+    X = np.asarray(X, dtype=np.float32)
+    predictions = np.empty(len(X), dtype=np.int64)
+    latencies = []
     
+    for i in range(len(X)):
+        interpreter.set_tensor(input_index, X[i:i + 1])
+        start = time.perf_counter()
+        interpreter.invoke()
+        if i < n_latency_runs:
+            latencies.append(time.perf_counter() - start)
+        output = interpreter.get_tensor(output_index)[0]
+        # Binary sigmoid heads (location model) have a single output unit
+        predictions[i] = int(output[0] > 0.5) if len(output) == 1 else np.argmax(output)
+    
+    latencies_ms = np.array(latencies) * 1000
+    results = {
+        'size_kb': os.path.getsize(tflite_path) / 1024,
+        'latency_ms_p50': float(np.percentile(latencies_ms, 50)),
+        'latency_ms_p99': float(np.percentile(latencies_ms, 99)),
+    }
+    if y is not None:
+        results['accuracy'] = float(np.mean(predictions == np.asarray(y)))
+    
+    return results
+
+def prepare_data(df):
+    """
+    Split a stop dataset into train/val/test and normalize features
+    
+    Returns the scaled splits and the fitted scaler parameters
+    """
     # Prepare features and labels
-    feature_columns = ['dwell_time', 'speed_before', 'heading', 'visit_count', 'hour', 'day_of_week']
+    feature_columns = FEATURE_COLUMNS
     X = df[feature_columns].values
     y = df['stop_type'].values
     
@@ -201,36 +285,118 @@ def main():
     X_val = scaler.transform(X_val)
     X_test = scaler.transform(X_test)
     
-    # Save scaler parameters
     scaler_params = {
         'mean': scaler.mean_.tolist(),
         'scale': scaler.scale_.tolist(),
         'feature_names': feature_columns
     }
     
+    return X_train, X_val, X_test, y_train, y_val, y_test, scaler_params
+
+def load_or_prepare_data(cache, n_samples=10000, seed=42):
+    """
+    Return scaled splits + scaler params, generating and fitting only on a cache miss
+    
+    Returns (splits dict, scaler_params, splits_key)
+    """
+    dataset_key = cache.key(generate_synthetic_data, n_samples=n_samples, seed=seed)
+    splits_key = cache.key(dataset_key, prepare_data, FEATURE_COLUMNS)
+    
+    def build_splits():
+        print("Generating synthetic training data...")
+        with span('data_generation', n_samples=n_samples):
+            df = cache.fetch('dataset', dataset_key, 'dataset.pkl',
+                             lambda: generate_synthetic_data(n_samples=n_samples, seed=seed))
+        
+        print("\nData distribution:")
+        print(df['stop_type'].value_counts())
+        
+        with span('scaling'):
+            X_train, X_val, X_test, y_train, y_val, y_test, scaler_params = prepare_data(df)
+        return {
+            'X_train': X_train, 'X_val': X_val, 'X_test': X_test,
+            'y_train': y_train, 'y_val': y_val, 'y_test': y_test,
+            'scaler_mean': np.array(scaler_params['mean']),
+            'scaler_scale': np.array(scaler_params['scale'])
+        }
+    
+    splits = cache.fetch('splits+scaler', splits_key, 'splits.npz', build_splits)
+    scaler_params = {
+        'mean': splits['scaler_mean'].tolist(),
+        'scale': splits['scaler_scale'].tolist(),
+        'feature_names': FEATURE_COLUMNS
+    }
+    
+    return splits, scaler_params, splits_key
+
+def load_or_train_model(cache, splits, splits_key):
+    """
+    Return a compiled model and its training history, training only on a cache miss
+    
+    Returns (model, history dict, weights_key)
+    """
+    weights_key = cache.key(splits_key, create_model, compile_model, train_model)
+    
+    if cache.has(weights_key, 'model.weights.h5') and cache.has(weights_key, 'history.json'):
+        cache.record('weights', True)
+        model = create_model(splits['X_train'].shape[1], len(STOP_TYPES))
+        compile_model(model)
+        model.load_weights(cache.path(weights_key, 'model.weights.h5'))
+        return model, cache.load(weights_key, 'history.json'), weights_key
+    
+    model, history = train_model(splits['X_train'], splits['y_train'], splits['X_val'], splits['y_val'])
+    history_dict = {k: [float(v) for v in values] for k, values in history.history.items()}
+    
+    cache.save(weights_key, 'model.weights.h5', model, save=lambda m, p: m.save_weights(p))
+    cache.save(weights_key, 'history.json', history_dict)
+    cache.record('weights', False)
+    
+    return model, history_dict, weights_key
+
+def main(n_samples=10000, seed=42, cache_dir=DEFAULT_CACHE_DIR, fuse_scaler=False):
+    cache = ArtifactCache(cache_dir)
+    
+    splits, scaler_params, splits_key = load_or_prepare_data(cache, n_samples, seed)
+    X_test, y_test = splits['X_test'], splits['y_test']
+    
+    # Tells consumers whether the TFLite model already normalizes its inputs
+    scaler_params['normalization_fused'] = fuse_scaler
+    
     with open('scaler_params.json', 'w') as f:
         json.dump(scaler_params, f, indent=2)
     
     print("\nTraining model...")
-    model, history = train_model(X_train, y_train, X_val, y_val)
+    with span('fit'):
+        model, history, weights_key = load_or_train_model(cache, splits, splits_key)
     
     # Evaluate
     print("\nEvaluating on test set...")
-    test_loss, test_acc = model.evaluate(X_test, y_test)
+    with span('evaluate'):
+        test_loss, test_acc = model.evaluate(X_test, y_test)
     print(f"Test accuracy: {test_acc:.4f}")
     
     # Convert to TFLite
     print("\nConverting to TensorFlow Lite...")
-    convert_to_tflite(model)
+    tflite_key = cache.key(weights_key, convert_to_tflite, fuse_normalization, fused=fuse_scaler)
+    with span('conversion', fused=fuse_scaler):
+        tflite_model = cache.fetch(
+            'tflite', tflite_key, 'model.tflite',
+            lambda: convert_to_tflite(model, scaler_params=scaler_params if fuse_scaler else None)
+        )
     
-    # Save full model
-    model.save('stop_classifier_full.h5')
+    # Save TFLite + full model
+    with span('export'):
+        with open('stop_classifier.tflite', 'wb') as f:
+            f.write(tflite_model)
+        model.save('stop_classifier_full.h5')
     print("Full Keras model saved to stop_classifier_full.h5")
     
     # Print summary
     print("\nModel Summary:")
     model.summary()
     
+    cache.print_summary()
+    
     print("\n✅ Training complete!")
     print("\nNext steps:")
     print("1. Copy 'stop_classifier.tflite' to 'assets/' folder in Flutter project")
@@ -239,4 +405,5 @@ def main():
     print("4. Implement TFLite inference in Flutter app")
 
 if __name__ == "__main__":
-    main()
+    # --fuse-scaler: export a TFLite model that takes raw features
+    main(fuse_scaler='--fuse-scaler' in sys.argv)
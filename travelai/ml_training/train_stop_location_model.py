@@ -17,6 +17,12 @@ import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 import json
+import sys
+
+from artifact_cache import ArtifactCache, DEFAULT_CACHE_DIR, file_digest
+from instrumentation import span
+from stop_dataset import load_stops, normalize_stops, parse_stops
+from train_stop_classifier import fuse_normalization
 
 def load_your_bus_stops(csv_path):
     """
@@ -28,23 +34,23 @@ def load_your_bus_stops(csv_path):
     Example:
     1, 28.6139, 77.2090, "Connaught Place", "regular"
     2, 28.6517, 77.2219, "Red Fort", "regular"
-    """
-    df = pd.read_csv(csv_path)
-    
-    # Ensure required columns exist
-    required_cols = ['latitude', 'longitude']
-    if not all(col in df.columns for col in required_cols):
-        raise ValueError(f"CSV must contain: {required_cols}")
     
-    return df
+    The app's assets (bus_stops.json, "Bus Stop","Latitude","Longitude"
+    CSVs) work too; see stop_dataset.py. Raises ValueError without
+    latitude/longitude columns.
+    """
+    return load_stops(csv_path)
 
-def create_training_data(bus_stops_df, negative_samples_per_stop=5):
+def create_training_data(bus_stops_df, negative_samples_per_stop=5, seed=None):
     """
     Create training data from known bus stops
     
     Positive samples: Actual bus stop locations + small GPS noise
     Negative samples: Random locations NOT near bus stops
     """
+    if seed is not None:
+        np.random.seed(seed)
+    
     positive_data = []
     negative_data = []
     
@@ -151,16 +157,12 @@ def create_location_model():
     
     return model
 
-def train_location_model(csv_path):
+def prepare_location_data(bus_stops, training_data):
     """
-    Main training function
-    """
-    print(f"Loading bus stops from {csv_path}...")
-    bus_stops = load_your_bus_stops(csv_path)
-    print(f"Loaded {len(bus_stops)} bus stops")
+    Build train/test splits for the location model and fit the scaler
     
-    print("\nCreating training data...")
-    training_data = create_training_data(bus_stops)
+    Returns the scaled splits and the metadata saved next to the model
+    """
     print(f"Generated {len(training_data)} training samples")
     print(f"  Positive (bus stops): {training_data['is_bus_stop'].sum()}")
     print(f"  Negative (not stops): {(~training_data['is_bus_stop'].astype(bool)).sum()}")
@@ -179,7 +181,7 @@ def train_location_model(csv_path):
     X_train = scaler.fit_transform(X_train)
     X_test = scaler.transform(X_test)
     
-    # Save scaler and bus stops
+    # Scaler and bus stops are shipped with the model
     model_metadata = {
         'scaler_mean': scaler.mean_.tolist(),
         'scaler_scale': scaler.scale_.tolist(),
@@ -187,10 +189,12 @@ def train_location_model(csv_path):
         'bus_stops': bus_stops.to_dict('records')
     }
     
-    with open('stop_location_metadata.json', 'w') as f:
-        json.dump(model_metadata, f, indent=2)
-    
-    print("\nTraining model...")
+    return X_train, X_test, y_train, y_test, model_metadata
+
+def fit_location_model(X_train, y_train):
+    """
+    Train the location model
+    """
     model = create_location_model()
     
     history = model.fit(
@@ -205,23 +209,122 @@ def train_location_model(csv_path):
         verbose=1
     )
     
+    return model, history
+
+def convert_location_to_tflite(model, output_path='stop_location_model.tflite', model_metadata=None):
+    """
+    Convert the location model to TensorFlow Lite
+    
+    If model_metadata is given, normalization is fused into the exported
+    model and it expects raw (lat, lon).
+    """
+    if model_metadata is not None:
+        model = fuse_normalization(model, model_metadata)
+    
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    tflite_model = converter.convert()
+    
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    
+    print(f"Model saved! Size: {len(tflite_model) / 1024:.2f} KB")
+    
+    return tflite_model
+
+def load_or_prepare_location_data(cache, csv_path, bus_stops, seed=42):
+    """
+    Return scaled splits + metadata, building the dataset and scaler only on a cache miss
+    
+    Returns (splits, model_metadata, splits_key)
+    """
+    # The stop table comes from stop_dataset, so its parsing code is part of the key too
+    dataset_key = cache.key(load_your_bus_stops, parse_stops, normalize_stops, create_training_data,
+                            csv=file_digest(csv_path), seed=seed)
+    splits_key = cache.key(dataset_key, prepare_location_data)
+    
+    def build_splits():
+        print("\nCreating training data...")
+        with span('data_generation', n_stops=len(bus_stops)):
+            training_data = cache.fetch('dataset', dataset_key, 'dataset.pkl',
+                                        lambda: create_training_data(bus_stops, seed=seed))
+        with span('scaling'):
+            X_train, X_test, y_train, y_test, model_metadata = prepare_location_data(bus_stops, training_data)
+        return {
+            'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test,
+            'metadata_json': np.array(json.dumps(model_metadata))
+        }
+    
+    splits = cache.fetch('splits+scaler', splits_key, 'splits.npz', build_splits)
+    model_metadata = json.loads(str(splits['metadata_json']))
+    
+    return splits, model_metadata, splits_key
+
+def load_or_fit_location_model(cache, splits, splits_key):
+    """
+    Return the trained location model, fitting only on a cache miss
+    
+    Returns (model, weights_key)
+    """
+    weights_key = cache.key(splits_key, create_location_model, fit_location_model)
+    
+    if cache.has(weights_key, 'model.weights.h5'):
+        cache.record('weights', True)
+        model = create_location_model()
+        model.load_weights(cache.path(weights_key, 'model.weights.h5'))
+        return model, weights_key
+    
+    model, history = fit_location_model(splits['X_train'], splits['y_train'])
+    cache.save(weights_key, 'model.weights.h5', model, save=lambda m, p: m.save_weights(p))
+    cache.record('weights', False)
+    
+    return model, weights_key
+
+def train_location_model(csv_path, seed=42, cache_dir=DEFAULT_CACHE_DIR, fuse_scaler=False):
+    """
+    Main training function
+    
+    Dataset, splits/metadata, weights and the TFLite file are cached by
+    CSV contents + seed + code, so unchanged reruns skip straight to export.
+    """
+    cache = ArtifactCache(cache_dir)
+    
+    print(f"Loading bus stops from {csv_path}...")
+    bus_stops = load_your_bus_stops(csv_path)
+    print(f"Loaded {len(bus_stops)} bus stops")
+    
+    splits, model_metadata, splits_key = load_or_prepare_location_data(cache, csv_path, bus_stops, seed)
+    X_test, y_test = splits['X_test'], splits['y_test']
+    model_metadata['normalization_fused'] = fuse_scaler
+    
+    with open('stop_location_metadata.json', 'w') as f:
+        json.dump(model_metadata, f, indent=2)
+    
+    print("\nTraining model...")
+    with span('fit'):
+        model, weights_key = load_or_fit_location_model(cache, splits, splits_key)
+    
     # Evaluate
     print("\nEvaluating...")
-    results = model.evaluate(X_test, y_test)
+    with span('evaluate'):
+        results = model.evaluate(X_test, y_test)
     print(f"Test accuracy: {results[1]:.4f}")
     print(f"Test precision: {results[2]:.4f}")
     print(f"Test recall: {results[3]:.4f}")
     
     # Convert to TFLite
     print("\nConverting to TFLite...")
-    converter = tf.lite.TFLiteConverter.from_keras_model(model)
-    converter.optimizations = [tf.lite.Optimize.DEFAULT]
-    tflite_model = converter.convert()
-    
-    with open('stop_location_model.tflite', 'wb') as f:
-        f.write(tflite_model)
+    tflite_key = cache.key(weights_key, convert_location_to_tflite, fuse_normalization, fused=fuse_scaler)
+    with span('conversion', fused=fuse_scaler):
+        tflite_model = cache.fetch(
+            'tflite', tflite_key, 'model.tflite',
+            lambda: convert_location_to_tflite(model, model_metadata=model_metadata if fuse_scaler else None)
+        )
+    with span('export'):
+        with open('stop_location_model.tflite', 'wb') as f:
+            f.write(tflite_model)
     
-    print(f"Model saved! Size: {len(tflite_model) / 1024:.2f} KB")
+    cache.print_summary()
     
     print("\n✅ Training complete!")
     print("\nNext steps:")
@@ -243,4 +346,5 @@ if __name__ == "__main__":
         print("1, 28.6139, 77.2090, 'Connaught Place'")
         print("2, 28.6517, 77.2219, 'Red Fort'")
     else:
-        train_location_model(CSV_PATH)
+        # --fuse-scaler: export a TFLite model that takes raw (lat, lon)
+        train_location_model(CSV_PATH, fuse_scaler='--fuse-scaler' in sys.argv)
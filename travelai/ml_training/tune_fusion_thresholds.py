@@ -0,0 +1,267 @@
+"""
+Fusion Threshold Tuner
+
+The decision-rule thresholds in IntegratedStopDetector were hand-picked.
+This script scores every combination in a threshold grid against recorded
+model outputs with known outcomes, evaluating the rule cascade for all
+combinations at once (integrated_stop_detector.fuse_arrays broadcasts the
+thresholds against the event arrays), and writes the best configuration
+for the detector to load:
+
+    detector = IntegratedStopDetector(config_path='fusion_thresholds.json')
+
+Recorded outputs (CSV or .npz), one row per stop event:
+    location_confidence, distance, is_known_stop, stop_type,
+    type_confidence, dwell_time, true_type
+
+stop_type/true_type are names from integrated_stop_detector.FUSED_TYPES.
+Without --events, a synthetic set of recorded outputs is simulated.
+
+Usage:
+    python tune_fusion_thresholds.py --events recorded_fusion_events.csv
+    python tune_fusion_thresholds.py --max-fp-rate 0.05 --grid my_grid.json
+"""
+
+import argparse
+import itertools
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from integrated_stop_detector import (
+    DEFAULT_THRESHOLDS, FUSED_TYPE_IDS, encode_stop_types, fuse_arrays
+)
+
+EVENT_COLUMNS = ['location_confidence', 'distance', 'is_known_stop', 'stop_type',
+                 'type_confidence', 'dwell_time', 'true_type']
+
+# Final types that claim "this is a bus stop" - a false positive when it isn't
+BUS_STOP_TYPES = ('regular_bus_stop', 'rest_area_at_bus_stop', 'possible_new_bus_stop')
+
+DEFAULT_GRID = {
+    'LOCATION_HIGH_CONF': [0.75, 0.8, 0.85, 0.9, 0.95],
+    'LOCATION_LOW_CONF': [0.3, 0.4, 0.5],
+    'TYPE_HIGH_CONF': [0.7, 0.8, 0.9],
+    'KNOWN_STOP_RADIUS': [50, 100, 150, 200],
+    'TYPE_OVERRIDE_CONF': [0.8, 0.9, 0.95],
+    'TYPE_MEDIUM_CONF': [0.5, 0.6, 0.7],
+    'EXTENDED_DWELL_SECONDS': [600, 900, 1200],
+    'TYPE_FALLBACK_CONF': [0.4, 0.5, 0.6],
+}
+
+def simulate_recorded_events(n_events=10000, seed=42):
+    """
+    Synthetic recorded model outputs with known outcomes
+
+    Known bus stops, undiscovered bus stops and the non-bus stop types, with
+    noisy location/type model outputs whose confidences loosely track
+    whether they are right.
+    """
+    rng = np.random.default_rng(seed)
+    scenarios = rng.choice(
+        ['known_stop', 'new_stop', 'traffic_signal', 'toll_gate', 'gas_station', 'rest_area'],
+        size=n_events, p=[0.35, 0.05, 0.25, 0.1, 0.15, 0.1]
+    )
+    type_names = ['traffic_signal', 'toll_gate', 'regular_stop', 'gas_station', 'rest_area']
+    dwell_params = {'traffic_signal': (25, 10), 'toll_gate': (60, 20), 'regular_stop': (120, 40),
+                    'gas_station': (420, 180), 'rest_area': (1200, 300)}
+
+    rows = []
+    for scenario in scenarios:
+        at_stop = scenario in ('known_stop', 'new_stop')
+        actual_type = 'regular_stop' if at_stop else scenario
+
+        # Long layovers at known stops are rest areas at a bus stop
+        if scenario == 'known_stop' and rng.random() < 0.1:
+            dwell = rng.normal(1200, 300)
+        else:
+            dwell = rng.normal(*dwell_params[actual_type])
+        dwell = max(10.0, dwell)
+
+        if scenario == 'known_stop':
+            is_known = rng.random() < 0.9
+            location_confidence = rng.beta(8, 2) if is_known else rng.beta(3, 4)
+            distance = rng.exponential(40) if is_known else rng.uniform(100, 800)
+            true_type = 'rest_area_at_bus_stop' if dwell > 900 else 'regular_bus_stop'
+        elif scenario == 'new_stop':
+            is_known = False
+            location_confidence = rng.beta(2, 6)
+            distance = rng.uniform(200, 2000)
+            true_type = 'possible_new_bus_stop'
+        else:
+            # Non-bus stops are sometimes near a known stop
+            is_known = rng.random() < 0.2
+            location_confidence = rng.beta(2, 5) if is_known else rng.beta(1, 6)
+            distance = rng.uniform(50, 400) if is_known else rng.uniform(200, 2000)
+            true_type = scenario
+
+        # Type classifier: usually right and confident, otherwise a less confident wrong guess
+        if rng.random() < 0.85:
+            stop_type, type_confidence = actual_type, rng.beta(6, 2)
+        else:
+            stop_type = rng.choice([t for t in type_names if t != actual_type])
+            type_confidence = rng.beta(2, 3)
+
+        rows.append((location_confidence, distance, is_known, stop_type,
+                     type_confidence, dwell, true_type))
+
+    return pd.DataFrame(rows, columns=EVENT_COLUMNS)
+
+def load_events(path):
+    """Load recorded outputs from CSV or .npz into a DataFrame"""
+    if path.endswith('.npz'):
+        with np.load(path, allow_pickle=False) as data:
+            df = pd.DataFrame({column: data[column] for column in EVENT_COLUMNS})
+    else:
+        df = pd.read_csv(path)
+    missing = set(EVENT_COLUMNS) - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} is missing columns: {sorted(missing)}")
+    return df
+
+def event_arrays(df):
+    """Struct-of-arrays inputs for fuse_arrays, plus encoded ground truth"""
+    inputs = {
+        'location_confidence': df['location_confidence'].to_numpy(np.float64),
+        'distance': df['distance'].to_numpy(np.float64),
+        'is_known_stop': df['is_known_stop'].astype(bool).to_numpy(),
+        'type_id': encode_stop_types(df['stop_type']),
+        'type_confidence': df['type_confidence'].to_numpy(np.float64),
+        'dwell_time': df['dwell_time'].to_numpy(np.float64),
+    }
+    return inputs, encode_stop_types(df['true_type'])
+
+def score_thresholds(inputs, true_type, thresholds):
+    """
+    Accuracy and false-positive rate for one or many threshold settings
+
+    Threshold values of shape (g, 1) give (g,) accuracy/FP arrays.
+    """
+    _, final_type, _, _ = fuse_arrays(thresholds=thresholds, **inputs)
+    bus_ids = np.array([FUSED_TYPE_IDS[name] for name in BUS_STOP_TYPES])
+    predicted_bus = np.isin(final_type, bus_ids)
+    actual_bus = np.isin(true_type, bus_ids)
+
+    accuracy = (final_type == true_type).mean(axis=-1)
+    false_positives = (predicted_bus & ~actual_bus).sum(axis=-1)
+    fp_rate = false_positives / max(int((~actual_bus).sum()), 1)
+    return accuracy, fp_rate
+
+def grid_search(inputs, true_type, grid, max_block_elements=20_000_000):
+    """
+    Score every combination of the grid
+
+    Returns (names, combos, accuracy, fp_rate) with combos of shape (g, p)
+    in itertools.product order, so the surfaces reshape to the grid's shape.
+    Thresholds not in the grid keep their DEFAULT_THRESHOLDS value.
+    """
+    names = list(grid)
+    combos = np.array(list(itertools.product(*(grid[name] for name in names))), dtype=np.float64)
+    n_events = len(true_type)
+    block = max(1, max_block_elements // max(n_events, 1))
+
+    accuracy = np.empty(len(combos))
+    fp_rate = np.empty(len(combos))
+    for start in range(0, len(combos), block):
+        chunk = combos[start:start + block]
+        thresholds = {name: chunk[:, j:j + 1] for j, name in enumerate(names)}
+        accuracy[start:start + block], fp_rate[start:start + block] = score_thresholds(
+            inputs, true_type, thresholds
+        )
+    return names, combos, accuracy, fp_rate
+
+def pick_best(accuracy, fp_rate, max_fp_rate=None):
+    """Highest accuracy (lowest FP rate on ties), optionally under an FP-rate cap"""
+    candidates = np.arange(len(accuracy))
+    if max_fp_rate is not None:
+        candidates = candidates[fp_rate <= max_fp_rate]
+        if len(candidates) == 0:
+            raise ValueError(f"No threshold combination has a false-positive rate <= {max_fp_rate}")
+    order = np.lexsort((fp_rate[candidates], -accuracy[candidates]))
+    return candidates[order[0]]
+
+def as_threshold_value(name, value):
+    """Keep integer thresholds (radius, dwell) as ints in the written config"""
+    return int(value) if isinstance(DEFAULT_THRESHOLDS[name], int) else float(value)
+
+def main(events_path=None, grid_path=None, max_fp_rate=None, n_events=10000, seed=42,
+         output_path='fusion_thresholds.json', surface_path='fusion_threshold_surface.npz'):
+    print("=" * 70)
+    print("FUSION THRESHOLD TUNING")
+    print("=" * 70)
+
+    if events_path:
+        print(f"\n📊 Loading recorded model outputs from {events_path}...")
+        df = load_events(events_path)
+    else:
+        print(f"\n📊 Simulating {n_events:,} recorded stop events...")
+        df = simulate_recorded_events(n_events, seed)
+    inputs, true_type = event_arrays(df)
+
+    grid = DEFAULT_GRID
+    if grid_path:
+        with open(grid_path) as f:
+            grid = json.load(f)
+        unknown = set(grid) - set(DEFAULT_THRESHOLDS)
+        if unknown:
+            raise ValueError(f"Unknown thresholds in {grid_path}: {sorted(unknown)}")
+
+    n_combos = int(np.prod([len(values) for values in grid.values()]))
+    print(f"🔍 Scoring {n_combos:,} threshold combinations × {len(df):,} events...")
+    start = time.perf_counter()
+    names, combos, accuracy, fp_rate = grid_search(inputs, true_type, grid)
+    elapsed = time.perf_counter() - start
+    print(f"   done in {elapsed:.1f}s ({n_combos * len(df) / elapsed / 1e6:,.0f}M rule evaluations/s)")
+
+    baseline_accuracy, baseline_fp = score_thresholds(inputs, true_type, DEFAULT_THRESHOLDS)
+    best = pick_best(accuracy, fp_rate, max_fp_rate)
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    thresholds.update({name: as_threshold_value(name, combos[best, j]) for j, name in enumerate(names)})
+
+    print("\n" + "-" * 70)
+    print(f"{'Threshold':<26}{'Default':>12}{'Tuned':>12}")
+    print("-" * 70)
+    for name, default in DEFAULT_THRESHOLDS.items():
+        print(f"{name:<26}{default:>12}{thresholds[name]:>12}")
+    print("-" * 70)
+    print(f"{'Accuracy':<26}{float(baseline_accuracy):>12.4f}{accuracy[best]:>12.4f}")
+    print(f"{'False-positive rate':<26}{float(baseline_fp):>12.4f}{fp_rate[best]:>12.4f}")
+
+    with open(output_path, 'w') as f:
+        json.dump({
+            'thresholds': thresholds,
+            'accuracy': float(accuracy[best]),
+            'false_positive_rate': float(fp_rate[best]),
+            'default_accuracy': float(baseline_accuracy),
+            'default_false_positive_rate': float(baseline_fp),
+            'max_fp_rate': max_fp_rate,
+            'n_events': len(df),
+            'events': events_path or 'simulated',
+            'grid': grid
+        }, f, indent=2)
+    print(f"\n✅ Best configuration saved to {output_path}")
+
+    # Full accuracy / FP surfaces, one axis per tuned threshold
+    grid_shape = tuple(len(grid[name]) for name in names)
+    np.savez(surface_path,
+             names=np.array(names),
+             accuracy=accuracy.reshape(grid_shape),
+             false_positive_rate=fp_rate.reshape(grid_shape),
+             **{name: np.asarray(grid[name], dtype=np.float64) for name in names})
+    print(f"✅ Accuracy / false-positive surfaces saved to {surface_path}")
+
+    return thresholds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Tune IntegratedStopDetector thresholds')
+    parser.add_argument('--events', default=None, help='Recorded model outputs (CSV or .npz)')
+    parser.add_argument('--grid', default=None, help='JSON {threshold name: [values]}')
+    parser.add_argument('--max-fp-rate', type=float, default=None,
+                        help='Only consider settings at or below this false-positive rate')
+    parser.add_argument('--n-events', type=int, default=10000, help='Simulated events without --events')
+    parser.add_argument('--output', default='fusion_thresholds.json')
+    args = parser.parse_args()
+
+    main(args.events, args.grid, args.max_fp_rate, args.n_events, output_path=args.output)